@@ -0,0 +1,8 @@
+"""
+Benchmark suite for YouTube MP3 Downloader.
+
+The benchmarks drive the real download code against scripted stand-ins
+for ``yt-dlp`` and ``ffmpeg`` (see ``fakes.py`` and ``fake_bin/``), so
+they need neither network access nor the real tools. Run them with
+``python -m benchmarks``; see ``bench.py`` for the options.
+"""
@@ -0,0 +1,7 @@
+"""Run the benchmarks: ``python -m benchmarks``."""
+
+import sys
+
+from .bench import main
+
+sys.exit(main())
@@ -0,0 +1,672 @@
+"""
+Benchmarks of the download engine.
+
+Every benchmark runs the real download code with ``fake_bin`` first on
+PATH, so the numbers measure this program and not the network:
+
+- ``parser``: yt-dlp output lines per second through ``ProgressParser``
+  and through the full output processor.
+- ``ui_updates``: how far the window's update bridge and GLib idle queue
+  back up while a burst of output is drained at ``UPDATE_HZ``.
+- ``job_latency``: wall time of whole jobs (single video, serial and
+  parallel playlists, the transcode pipeline) from start to finish.
+- ``log_buffer``: memory retained by the log while far more lines than
+  its cap are posted, with the window shown and hidden.
+- ``stop_cleanup``: time for the stop button to terminate downloads and
+  delete their partial files, and whether any are left behind.
+
+Results are written as JSON. Given a baseline from an earlier run, each
+tracked metric is compared against it and the run fails when one got
+worse by more than the tolerance, or when a benchmark's own sanity
+checks failed.
+
+Usage::
+
+    python -m benchmarks -o results.json
+    python -m benchmarks --quick --baseline results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from youtubemp3downloader import config
+from youtubemp3downloader import download
+from youtubemp3downloader import events
+from youtubemp3downloader import logbuffer
+from youtubemp3downloader import progress
+from youtubemp3downloader import uibridge
+from youtubemp3downloader.jobqueue import JobQueue, JobRun, QueuedJob
+from youtubemp3downloader.logger import set_console_level
+from youtubemp3downloader.playlist_cache import PlaylistCache
+from youtubemp3downloader.runner import JobRunner
+
+from . import fakes
+
+SCHEMA_VERSION = 1
+
+DEFAULT_TOLERANCE = 0.25
+
+# Seconds a single job may take before the benchmark gives up on it
+JOB_TIMEOUT = 120.0
+
+HIGHER = "higher"
+LOWER = "lower"
+
+# Metrics compared against a baseline: pattern -> (better direction, absolute slack).
+# The slack keeps tiny values (a few milliseconds, a handful of lines) from
+# flagging noise as a regression.
+METRICS: Dict[str, Tuple[str, float]] = {
+    "parser.lines_per_sec": (HIGHER, 0),
+    "parser.processor_lines_per_sec": (HIGHER, 0),
+    "ui_updates.max_pending_lines": (LOWER, 50),
+    "ui_updates.max_idle_depth": (LOWER, 2),
+    "ui_updates.idle_callbacks": (LOWER, 2),
+    "job_latency.*.seconds": (LOWER, 0.1),
+    "log_buffer.retained_kib": (LOWER, 256),
+    "log_buffer.growth_kib": (LOWER, 64),
+    "log_buffer.hidden_retained_kib": (LOWER, 256),
+    "stop_cleanup.*.stop_seconds": (LOWER, 0.1),
+    "stop_cleanup.*.finish_seconds": (LOWER, 0.1),
+}
+
+
+class Context:
+    """Settings and scratch space shared by the benchmarks of one run."""
+
+    def __init__(self, workdir: str, quick: bool = False) -> None:
+        self.workdir = Path(workdir)
+        self.quick = quick
+        self.failed_checks: List[str] = []
+        self._dirs = 0
+
+    def scale(self, full: int, quick: int) -> int:
+        return quick if self.quick else full
+
+    def directory(self, name: str) -> str:
+        """A new empty directory for one benchmark step."""
+        self._dirs += 1
+        path = self.workdir / "{}-{}".format(name, self._dirs)
+        path.mkdir(parents=True)
+        return str(path)
+
+    def check(self, condition: bool, message: str) -> None:
+        """Record a failed sanity check; the run still completes."""
+        if not condition:
+            self.failed_checks.append(message)
+
+
+@contextlib.contextmanager
+def fake_tools(settings: fakes.FakeSettings) -> Iterator[None]:
+    """Put the fake yt-dlp and ffmpeg first on PATH, configured for a scenario."""
+    saved = dict(os.environ)
+    os.environ.update(settings.environ())
+    if not settings.replay:
+        os.environ.pop(fakes.ENV_REPLAY, None)
+    os.environ["PATH"] = fakes.FAKE_BIN + os.pathsep + saved.get("PATH", "")
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+class MainLoop:
+    """
+    Stand-in for the GLib main loop of the window.
+
+    Idle callbacks run as soon as the loop is free, and the update bridge
+    is drained into a ``LogBuffer`` every ``UPDATE_INTERVAL_MS``, the way
+    the window does it. The loop records how far both back up.
+    """
+
+    def __init__(self) -> None:
+        self.bridge = uibridge.UIUpdateBridge()
+        self.log = logbuffer.LogBuffer()
+        self.interval = uibridge.UPDATE_INTERVAL_MS / 1000.0
+        self._idle: Deque[Tuple[Callable[..., Any], Tuple[Any, ...]]] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.idle_callbacks = 0
+        self.max_idle_depth = 0
+        self.drains = 0
+        self.drained_lines = 0
+        self.max_pending_lines = 0
+
+    def idle_add(self, func: Callable[..., Any], *args: Any) -> None:
+        with self._lock:
+            self._idle.append((func, args))
+            self.idle_callbacks += 1
+            self.max_idle_depth = max(self.max_idle_depth, len(self._idle))
+        self._wake.set()
+
+    def _run_idle(self) -> None:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return
+                func, args = self._idle.popleft()
+            func(*args)
+
+    def _drain(self) -> None:
+        lines, _, _ = self.bridge.drain()
+        if lines:
+            self.drains += 1
+            self.drained_lines += len(lines)
+            self.max_pending_lines = max(self.max_pending_lines, len(lines))
+            self.log.plan(lines)
+
+    def run_until(self, done: Callable[[], bool], timeout: float = JOB_TIMEOUT) -> bool:
+        """
+        Run the loop until ``done`` returns True.
+
+        Returns:
+            False if the timeout expired first
+        """
+        deadline = time.monotonic() + timeout
+        next_tick = time.monotonic() + self.interval
+        while True:
+            self._run_idle()
+            now = time.monotonic()
+            if now >= next_tick:
+                self._drain()
+                next_tick = now + self.interval
+            if done():
+                self._drain()
+                return True
+            if now >= deadline:
+                return False
+            self._wake.wait(max(0.0, next_tick - now))
+            self._wake.clear()
+
+
+class WindowSink:
+    """Job sink that queues output like the window does."""
+
+    def __init__(self, loop: MainLoop) -> None:
+        self.loop = loop
+        self.started = time.perf_counter()
+        self.first_progress: Optional[float] = None
+        self.messages: List[Tuple[str, bool]] = []
+        self.finished: List[JobRun] = []
+
+    def job_log(self, run: JobRun, message: str, progress: bool) -> None:
+        if progress and self.first_progress is None:
+            self.first_progress = time.perf_counter() - self.started
+        self.loop.bridge.log(message, progress)
+
+    def job_message(self, run: JobRun, message: str, error: bool) -> None:
+        self.messages.append((message, error))
+
+    def job_notify(self, run: JobRun, title: str, message: str, icon: str) -> None:
+        pass
+
+    def job_finished(self, run: JobRun) -> None:
+        self.finished.append(run)
+
+
+class NullSink:
+    """Job sink that drops everything."""
+
+    def job_log(self, run: JobRun, message: str, progress: bool) -> None:
+        pass
+
+    def job_message(self, run: JobRun, message: str, error: bool) -> None:
+        pass
+
+    def job_notify(self, run: JobRun, title: str, message: str, icon: str) -> None:
+        pass
+
+    def job_finished(self, run: JobRun) -> None:
+        pass
+
+
+class JobBench:
+    """One job started through a ``JobRunner`` on a ``MainLoop``."""
+
+    def __init__(self, ctx: Context, job: QueuedJob, options: Optional[Dict[str, Any]] = None) -> None:
+        self.loop = MainLoop()
+        self.sink = WindowSink(self.loop)
+        self.job = job
+        state = ctx.directory("state")
+        self.queue = JobQueue(path=os.path.join(state, "queue.json"))
+        self.queue.add(job)
+        self.runner = JobRunner(
+            self.queue, self.sink, self.loop.idle_add,
+            options=lambda job: dict(options or {}),
+            playlist_cache=PlaylistCache(os.path.join(state, "playlists.json")),
+        )
+        self.started = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self.sink.started = self.started
+        self.runner.start_jobs()
+
+    def wait(self, timeout: float = JOB_TIMEOUT) -> float:
+        """Run the loop until the job ended; returns the seconds since ``start``."""
+        if not self.loop.run_until(lambda: not self.runner.busy, timeout):
+            self.runner.stop_all()
+            self.loop.run_until(lambda: not self.runner.busy, 10)
+            raise TimeoutError("Job did not finish within {:.0f}s".format(timeout))
+        return time.perf_counter() - self.started
+
+    @property
+    def run(self) -> Optional[JobRun]:
+        return self.sink.finished[-1] if self.sink.finished else None
+
+
+def run_job(ctx: Context, job: QueuedJob, options: Optional[Dict[str, Any]] = None) -> JobBench:
+    """Run one job to completion with the current fake tools."""
+    bench = JobBench(ctx, job, options)
+    bench.start()
+    bench.wait()
+    return bench
+
+
+def _files(folder: str, suffix: str = "") -> List[str]:
+    return sorted(name for name in os.listdir(folder) if name.endswith(suffix))
+
+
+def _repeat_rate(func: Callable[[], int], min_time: float) -> float:
+    """Run ``func`` until ``min_time`` passed; returns units per second."""
+    units = 0
+    started = time.perf_counter()
+    while True:
+        units += func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return units / elapsed
+
+
+def bench_parser(ctx: Context) -> Dict[str, Any]:
+    """Lines per second through the progress parser and the output processor."""
+    settings = fakes.FakeSettings(items=ctx.scale(200, 20), records=50)
+    folder = ctx.directory("parser")
+    cmd = download._base_command(False, "firefox")
+    cmd.extend(["-o", os.path.join(folder, "%(playlist_index|)s%(playlist_index& - |)s%(title)s.%(ext)s")])
+    cmd.append(fakes.playlist_url("parser"))
+    with fake_tools(settings):
+        output = subprocess.run(cmd, stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+    lines = output.splitlines(keepends=True)
+
+    parser = progress.ProgressParser()
+    parsed = [event for line in lines for event in parser.feed(line)]
+    ctx.check(
+        sum(isinstance(event, events.Progress) for event in parsed) == settings.items * settings.records,
+        "parser: progress records were not all parsed",
+    )
+    ctx.check(
+        sum(isinstance(event, events.PostprocessDone) for event in parsed) == settings.items,
+        "parser: not every item was reported done",
+    )
+
+    def parse() -> int:
+        parser = progress.ProgressParser()
+        for line in lines:
+            parser.feed(line)
+        return len(lines)
+
+    def process() -> int:
+        job = QueuedJob(fakes.playlist_url("parser"), "Playlist", folder)
+        processor = download._OutputProcessor(JobRun(job, NullSink()), {})
+        for line in lines:
+            processor.process_line(line)
+        return len(lines)
+
+    min_time = 0.2 if ctx.quick else 1.0
+    return {
+        "lines": len(lines),
+        "lines_per_sec": round(_repeat_rate(parse, min_time)),
+        "processor_lines_per_sec": round(_repeat_rate(process, min_time)),
+    }
+
+
+def bench_ui_updates(ctx: Context) -> Dict[str, Any]:
+    """Backlog of the update bridge and idle queue during a burst of output."""
+    settings = fakes.FakeSettings(items=ctx.scale(50, 10), records=100)
+    folder = ctx.directory("ui")
+    with fake_tools(settings):
+        bench = run_job(ctx, QueuedJob(fakes.playlist_url("ui"), "Playlist", folder))
+    loop = bench.loop
+    ctx.check(len(_files(folder, ".mp3")) == settings.items, "ui_updates: not every item was downloaded")
+    return {
+        "drains": loop.drains,
+        "drained_lines": loop.drained_lines,
+        "max_pending_lines": loop.max_pending_lines,
+        "mean_pending_lines": round(loop.drained_lines / loop.drains, 1) if loop.drains else 0,
+        "max_idle_depth": loop.max_idle_depth,
+        "idle_callbacks": loop.idle_callbacks,
+        "view_lines": loop.log.line_count,
+    }
+
+
+# name -> (URL, URL type, download options, playlist entries, fail rate)
+_LATENCY_SCENARIOS: List[Tuple[str, str, str, Dict[str, Any], int, float]] = [
+    ("video", fakes.video_url(1), "Video", {}, 1, 0.0),
+    ("playlist", fakes.playlist_url("serial"), "Playlist", {}, 40, 0.1),
+    ("parallel", fakes.playlist_url("parallel"), "Playlist", {"max_workers": 4}, 40, 0.1),
+    ("pipeline", fakes.playlist_url("pipeline"), "Playlist", {"max_workers": 4, "use_pipeline": True}, 40, 0.1),
+]
+
+
+def bench_job_latency(ctx: Context) -> Dict[str, Any]:
+    """Wall time of whole jobs from start to finish."""
+    results: Dict[str, Any] = {}
+    repeat = ctx.scale(3, 1)
+    for name, url, url_type, options, items, fail_rate in _LATENCY_SCENARIOS:
+        settings = fakes.FakeSettings(items=ctx.scale(items, min(items, 8)), records=20, fail_rate=fail_rate)
+        expected = (settings.items - len(settings.failing())) if url_type == "Playlist" else 1
+        timings: List[float] = []
+        first_progress: List[float] = []
+        with fake_tools(settings):
+            for _ in range(repeat):
+                folder = ctx.directory(name)
+                bench = JobBench(ctx, QueuedJob(url, url_type, folder), options)
+                bench.start()
+                timings.append(bench.wait())
+                if bench.sink.first_progress is not None:
+                    first_progress.append(bench.sink.first_progress)
+                run = bench.run
+                ctx.check(
+                    run is not None and run.successful == expected and len(_files(folder, ".mp3")) == expected,
+                    "job_latency.{}: expected {} downloaded file(s)".format(name, expected),
+                )
+        seconds = statistics.median(timings)
+        results[name] = {
+            "items": settings.items if url_type == "Playlist" else 1,
+            "seconds": round(seconds, 4),
+            "items_per_sec": round((settings.items if url_type == "Playlist" else 1) / seconds, 2),
+            "first_progress_seconds": round(statistics.median(first_progress), 4) if first_progress else None,
+        }
+    return results
+
+
+def _log_lines(count: int) -> Iterator[Tuple[str, bool]]:
+    """Output shaped like a playlist download: a few lines per item, mostly progress."""
+    index = 0
+    while count > 0:
+        index += 1
+        block = [
+            ("[download] Downloading item {} of 9999".format(index), False),
+            ("[youtube] {}: Downloading webpage".format(fakes.video_id(index)), False),
+            ("[download] Destination: /music/{} - Benchmark Track {}.webm".format(index, index), False),
+        ]
+        block.extend(
+            ("[download] {:5.1f}% at 1.50MiB/s ETA 00:{:02d}".format(percent, (100 - percent) // 10), True)
+            for percent in range(5, 101, 5)
+        )
+        block.append(("[ExtractAudio] Destination: /music/{} - Benchmark Track {}.mp3".format(index, index), False))
+        for entry in block[:count]:
+            yield entry
+        count -= len(block)
+
+
+class _ViewModel:
+    """The lines of the log view, updated the way the window applies a LogUpdate."""
+
+    def __init__(self) -> None:
+        self.lines: Deque[str] = deque()
+
+    def apply(self, update: Optional[logbuffer.LogUpdate]) -> None:
+        if update is None:
+            return
+        if update.replace_progress and self.lines:
+            self.lines.pop()
+        self.lines.extend(update.text.split("\n")[:-1])
+        for _ in range(update.evict):
+            self.lines.popleft()
+
+
+def bench_log_buffer(ctx: Context) -> Dict[str, Any]:
+    """Memory kept by the log while many more lines than its cap are posted."""
+    total = ctx.scale(200000, 30000)
+    batch = 200
+    bridge = uibridge.UIUpdateBridge()
+    buffer = logbuffer.LogBuffer(logbuffer.DEFAULT_MAX_LINES)
+    view = _ViewModel()
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        halfway = 0
+        for posted, (text, is_progress) in enumerate(_log_lines(total), 1):
+            bridge.log(text, is_progress)
+            if posted % batch == 0:
+                view.apply(buffer.plan(bridge.drain()[0]))
+            if posted == total // 2:
+                halfway, _ = tracemalloc.get_traced_memory()
+        view.apply(buffer.plan(bridge.drain()[0]))
+        current, peak = tracemalloc.get_traced_memory()
+
+        # Hidden window: nothing drains the bridge
+        hidden = uibridge.UIUpdateBridge()
+        before, _ = tracemalloc.get_traced_memory()
+        for text, is_progress in _log_lines(total):
+            hidden.log(text, is_progress)
+        hidden_current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ctx.check(len(view.lines) == buffer.line_count, "log_buffer: view and buffer disagree on the line count")
+    ctx.check(buffer.line_count <= buffer.max_lines, "log_buffer: line cap exceeded")
+    return {
+        "lines": total,
+        "view_lines": buffer.line_count,
+        "retained_kib": round((current - baseline) / 1024, 1),
+        "growth_kib": round(max(0, current - halfway) / 1024, 1),
+        "peak_kib": round((peak - baseline) / 1024, 1),
+        "hidden_retained_kib": round((hidden_current - before) / 1024, 1),
+    }
+
+
+_PARTIAL_SUFFIXES = (".part", ".ytdl", ".temp", ".webm", ".jpg")
+
+
+def bench_stop_cleanup(ctx: Context) -> Dict[str, Any]:
+    """Time for the stop button to end a job and delete its partial files."""
+    results: Dict[str, Any] = {}
+    # Items would take minutes each, so the stop always lands mid-download
+    settings = fakes.FakeSettings(items=8, records=10000, line_delay=0.01, size=1024 * 1024)
+    for name, options in (("serial", {}), ("parallel", {"max_workers": 4}), ("pipeline", {
+        "max_workers": 4, "use_pipeline": True
+    })):
+        folder = ctx.directory("stop")
+        with fake_tools(settings):
+            bench = JobBench(ctx, QueuedJob(fakes.playlist_url("stop-" + name), "Playlist", folder), options)
+            bench.start()
+
+            def downloading() -> bool:
+                for root, _, names in os.walk(folder):
+                    if any(name.endswith(".part") for name in names):
+                        return True
+                return False
+
+            if not bench.loop.run_until(downloading, 30):
+                ctx.check(False, "stop_cleanup.{}: no download started".format(name))
+                bench.runner.stop_all()
+                bench.loop.run_until(lambda: not bench.runner.busy, 10)
+                continue
+            started = time.perf_counter()
+            bench.runner.stop(bench.job.job_id)
+            stopped = time.perf_counter() - started
+            bench.loop.run_until(lambda: not bench.runner.busy, 30)
+            finished = time.perf_counter() - started
+
+        leftover = [
+            name for _, _, names in os.walk(folder) for name in names if name.endswith(_PARTIAL_SUFFIXES)
+        ]
+        ctx.check(not leftover, "stop_cleanup.{}: partial files left behind: {}".format(name, leftover))
+        ctx.check(not bench.runner.busy, "stop_cleanup.{}: job still running after stop".format(name))
+        results[name] = {
+            "stop_seconds": round(stopped, 4),
+            "finish_seconds": round(finished, 4),
+            "leftover_files": len(leftover),
+        }
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[Context], Dict[str, Any]]] = {
+    "parser": bench_parser,
+    "ui_updates": bench_ui_updates,
+    "job_latency": bench_job_latency,
+    "log_buffer": bench_log_buffer,
+    "stop_cleanup": bench_stop_cleanup,
+}
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric results keyed by dotted names, e.g. ``job_latency.video.seconds``."""
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def metric_spec(name: str) -> Optional[Tuple[str, float]]:
+    """Direction and slack of a tracked metric, or None if it is informational."""
+    for pattern, spec in METRICS.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return spec
+    return None
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: ``results`` section of this run
+        baseline: ``results`` section of an earlier run
+        tolerance: Relative change allowed before a metric counts as a regression
+
+    Returns:
+        A description of every regression
+    """
+    regressions = []
+    previous = flatten(baseline)
+    for name, value in sorted(flatten(results).items()):
+        spec = metric_spec(name)
+        before = previous.get(name)
+        if spec is None or not before:
+            continue
+        direction, slack = spec
+        if direction == HIGHER:
+            worse = value < before * (1 - tolerance) - slack
+        else:
+            worse = value > before * (1 + tolerance) + slack
+        if worse:
+            regressions.append("{}: {:g} (baseline {:g}, {:+.0%})".format(name, value, before, value / before - 1))
+    return regressions
+
+
+def run_benchmarks(names: Sequence[str], quick: bool = False) -> Dict[str, Any]:
+    """
+    Run benchmarks with an isolated configuration directory.
+
+    Returns:
+        The JSON document of the run
+    """
+    results: Dict[str, Any] = {}
+    saved_config_dir = config.CONFIG_DIR
+    with tempfile.TemporaryDirectory(prefix="ytmp3-bench-") as workdir:
+        config.CONFIG_DIR = Path(workdir) / "config"
+        ctx = Context(workdir, quick)
+        try:
+            for name in names:
+                print("Running {}...".format(name), file=sys.stderr)
+                results[name] = BENCHMARKS[name](ctx)
+        finally:
+            config.CONFIG_DIR = saved_config_dir
+    return {
+        "version": SCHEMA_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "results": results,
+        "failed_checks": ctx.failed_checks,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the download engine against a scripted yt-dlp and ffmpeg.",
+    )
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), metavar="NAME",
+                        help="Run only this benchmark (repeatable): " + ", ".join(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads, for a fast smoke run")
+    parser.add_argument("-o", "--output", metavar="FILE", help="Write the JSON results to FILE instead of stdout")
+    parser.add_argument("--baseline", metavar="FILE", help="Fail if a metric regressed against these results")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative change counted as a regression (default: %(default)s)")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point; returns 1 on regressions or failed checks."""
+    args = build_parser().parse_args(argv)
+    set_console_level(logging.ERROR)
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print("Could not read baseline {}: {}".format(args.baseline, e), file=sys.stderr)
+            return 2
+        if baseline.get("quick") != args.quick:
+            print("Warning: baseline and this run use different workloads (--quick)", file=sys.stderr)
+
+    document = run_benchmarks(args.only or list(BENCHMARKS), args.quick)
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for name, value in sorted(flatten(document["results"]).items()):
+        print("  {:<45} {:>14g}".format(name, value), file=sys.stderr)
+
+    status = 0
+    for message in document["failed_checks"]:
+        print("CHECK FAILED: {}".format(message), file=sys.stderr)
+        status = 1
+    if baseline is not None:
+        regressions = compare(document["results"], baseline.get("results", {}), args.tolerance)
+        for message in regressions:
+            print("REGRESSION: {}".format(message), file=sys.stderr)
+        if regressions:
+            status = 1
+        else:
+            print("No regressions against {}".format(args.baseline), file=sys.stderr)
+    return status
@@ -0,0 +1,407 @@
+"""
+Scripted stand-ins for yt-dlp and ffmpeg.
+
+``fake_bin/yt-dlp`` and ``fake_bin/ffmpeg`` call into this module. The
+fake yt-dlp understands the options the downloader passes: it lists
+playlists for ``--flat-playlist``, renders ``--progress-template`` records,
+the ``pre_process`` and ``after_move`` ``--print`` templates and ``-o``
+output templates, honours ``--playlist-items`` and
+``--download-archive``, grows ``.part`` files while "downloading" and
+leaves an MP3 (``-x``) or a staged audio file plus thumbnail behind. The
+fake ffmpeg copies its input to the output path.
+
+Both are configured through environment variables so that every process
+the download code starts picks up the same scenario:
+
+- ``YTMP3_FAKE_ITEMS``: entries of any playlist URL (default 10)
+- ``YTMP3_FAKE_RECORDS``: progress records per item (default 10)
+- ``YTMP3_FAKE_LINE_DELAY``: seconds between progress records (default 0)
+- ``YTMP3_FAKE_START_DELAY``: seconds before a process prints anything
+- ``YTMP3_FAKE_FAIL_RATE``: share of items reported unavailable (0.0 - 1.0)
+- ``YTMP3_FAKE_SEED``: seed choosing the failing items
+- ``YTMP3_FAKE_SIZE``: bytes written per file (default 4096)
+- ``YTMP3_FAKE_REPLAY``: recorded yt-dlp output to print instead
+- ``YTMP3_FAKE_FFMPEG_DELAY``: seconds each ffmpeg conversion takes
+
+Item ``n`` of every playlist has the video ID ``bench`` followed by ``n``
+as six digits, so a failing item fails the same way whether it is
+downloaded with the playlist or on its own.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import re
+import sys
+import time
+from typing import IO, Any, Dict, List, Mapping, Optional, Sequence, Set
+
+FAKE_BIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_bin")
+
+ENV_ITEMS = "YTMP3_FAKE_ITEMS"
+ENV_RECORDS = "YTMP3_FAKE_RECORDS"
+ENV_LINE_DELAY = "YTMP3_FAKE_LINE_DELAY"
+ENV_START_DELAY = "YTMP3_FAKE_START_DELAY"
+ENV_FAIL_RATE = "YTMP3_FAKE_FAIL_RATE"
+ENV_SEED = "YTMP3_FAKE_SEED"
+ENV_SIZE = "YTMP3_FAKE_SIZE"
+ENV_REPLAY = "YTMP3_FAKE_REPLAY"
+ENV_FFMPEG_DELAY = "YTMP3_FAKE_FFMPEG_DELAY"
+
+VIDEO_ID_PREFIX = "bench"
+TITLE_FORMAT = "Benchmark Track {}"
+UNAVAILABLE_MESSAGE = "Video unavailable. This video is no longer available"
+
+# Simulated transfer speed in bytes per second, reported in progress records
+REPORTED_SPEED = 1536 * 1024
+
+# yt-dlp options that take a value; everything else is a flag
+_VALUE_OPTIONS = {
+    "-o", "-f", "--print", "--progress-template", "--playlist-items", "--download-archive",
+    "--audio-format", "--postprocessor-args", "--convert-thumbnails", "--retries",
+    "--fragment-retries", "--socket-timeout", "--cookies-from-browser", "--cookies",
+    "--concurrent-fragments", "--http-chunk-size", "--limit-rate", "--audio-quality",
+}
+
+_FIELD_RE = re.compile(r"%\((?P<key>[^)&|]+)(?:&(?P<then>[^|)]*))?(?:\|(?P<default>[^)]*))?\)[sd]")
+
+
+def video_id(index: int) -> str:
+    """Video ID of playlist entry ``index``."""
+    return "{}{:06d}".format(VIDEO_ID_PREFIX, index)
+
+
+def index_of(vid: str) -> Optional[int]:
+    """Playlist index encoded in a fake video ID, or None."""
+    suffix = vid[len(VIDEO_ID_PREFIX):]
+    if vid.startswith(VIDEO_ID_PREFIX) and suffix.isdigit():
+        return int(suffix)
+    return None
+
+
+def playlist_url(name: str = "default") -> str:
+    """A playlist URL the downloader accepts; the name keeps caches apart."""
+    return "https://www.youtube.com/playlist?list=PLytmp3bench-{}".format(name)
+
+
+def video_url(index: int) -> str:
+    return "https://www.youtube.com/watch?v={}".format(video_id(index))
+
+
+def render(template: str, fields: Mapping[str, Any]) -> str:
+    """
+    Render a yt-dlp output template.
+
+    Supports ``%(key)s``, ``%(key|default)s`` and ``%(key&text|default)s``;
+    missing fields without a default render as ``NA`` like in yt-dlp.
+    """
+    def substitute(match: "re.Match[str]") -> str:
+        value = fields.get(match.group("key"))
+        if value is None or value == "":
+            default = match.group("default")
+            return default if default is not None else "NA"
+        then = match.group("then")
+        return then if then is not None else str(value)
+
+    return _FIELD_RE.sub(substitute, template)
+
+
+def parse_items(spec: str) -> List[int]:
+    """Expand a ``--playlist-items`` specification."""
+    indices: Set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            indices.update(range(int(start), int(end) + 1))
+        elif part:
+            indices.add(int(part))
+    return sorted(indices)
+
+
+class FakeSettings:
+    """A benchmark scenario for the fake tools."""
+
+    def __init__(
+        self,
+        items: int = 10,
+        records: int = 10,
+        line_delay: float = 0.0,
+        start_delay: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: str = "0",
+        size: int = 4096,
+        replay: Optional[str] = None,
+        ffmpeg_delay: float = 0.0,
+    ) -> None:
+        self.items = items
+        self.records = records
+        self.line_delay = line_delay
+        self.start_delay = start_delay
+        self.fail_rate = fail_rate
+        self.seed = seed
+        self.size = size
+        self.replay = replay
+        self.ffmpeg_delay = ffmpeg_delay
+
+    @classmethod
+    def from_environ(cls, environ: Mapping[str, str]) -> "FakeSettings":
+        return cls(
+            items=int(environ.get(ENV_ITEMS, 10)),
+            records=int(environ.get(ENV_RECORDS, 10)),
+            line_delay=float(environ.get(ENV_LINE_DELAY, 0)),
+            start_delay=float(environ.get(ENV_START_DELAY, 0)),
+            fail_rate=float(environ.get(ENV_FAIL_RATE, 0)),
+            seed=environ.get(ENV_SEED, "0"),
+            size=int(environ.get(ENV_SIZE, 4096)),
+            replay=environ.get(ENV_REPLAY) or None,
+            ffmpeg_delay=float(environ.get(ENV_FFMPEG_DELAY, 0)),
+        )
+
+    def environ(self) -> Dict[str, str]:
+        """Environment variables describing this scenario."""
+        result = {
+            ENV_ITEMS: str(self.items),
+            ENV_RECORDS: str(self.records),
+            ENV_LINE_DELAY: str(self.line_delay),
+            ENV_START_DELAY: str(self.start_delay),
+            ENV_FAIL_RATE: str(self.fail_rate),
+            ENV_SEED: self.seed,
+            ENV_SIZE: str(self.size),
+            ENV_FFMPEG_DELAY: str(self.ffmpeg_delay),
+        }
+        if self.replay:
+            result[ENV_REPLAY] = self.replay
+        return result
+
+    def fails(self, index: int) -> bool:
+        """True if item ``index`` is reported unavailable."""
+        if self.fail_rate <= 0:
+            return False
+        return random.Random("{}:{}".format(self.seed, index)).random() < self.fail_rate
+
+    def failing(self) -> List[int]:
+        """Indices of the playlist items that fail."""
+        return [index for index in range(1, self.items + 1) if self.fails(index)]
+
+
+def _parse_args(argv: Sequence[str]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"flags": set(), "positional": [], "prints": []}
+    args = iter(argv)
+    for arg in args:
+        if arg in _VALUE_OPTIONS:
+            options[arg] = next(args, "")
+            if arg == "--print":
+                options["prints"].append(options[arg])
+        elif arg.startswith("-"):
+            options["flags"].add(arg)
+        else:
+            options["positional"].append(arg)
+    return options
+
+
+def _write_file(path: str, size: int) -> None:
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+
+
+class _Output:
+    """Line-buffered writer, like yt-dlp with ``--newline``."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self.stream = stream
+
+    def __call__(self, line: str) -> None:
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def _print(options: Dict[str, Any], out: _Output, when: str, fields: Mapping[str, Any]) -> None:
+    """Render the ``--print`` templates of one stage."""
+    for template in options["prints"]:
+        stage, _, text = template.partition(":")
+        if stage == when:
+            out(render(text, fields))
+
+
+def _replay(path: str, settings: FakeSettings, out: _Output) -> int:
+    status = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            out(line)
+            if line.startswith("ERROR:"):
+                status = 1
+            if settings.line_delay:
+                time.sleep(settings.line_delay)
+    return status
+
+
+def _download_item(
+    settings: FakeSettings,
+    options: Dict[str, Any],
+    out: _Output,
+    index: int,
+    position: int,
+    count: int,
+    in_playlist: bool,
+) -> bool:
+    """Pretend to download one item; returns False if it failed."""
+    vid = video_id(index)
+    title = TITLE_FORMAT.format(index)
+    if in_playlist:
+        out("[download] Downloading item {} of {}".format(position, count))
+    out("[youtube] Extracting URL: {}".format(video_url(index)))
+    out("[youtube] {}: Downloading webpage".format(vid))
+
+    archive_path = options.get("--download-archive")
+    if archive_path and os.path.isfile(archive_path):
+        with open(archive_path, encoding="utf-8") as f:
+            if "youtube {}".format(vid) in (line.strip() for line in f):
+                out("[download] {}: has already been recorded in the archive".format(vid))
+                return True
+
+    if settings.fails(index):
+        out("ERROR: [youtube] {}: {}".format(vid, UNAVAILABLE_MESSAGE))
+        return False
+
+    fields: Dict[str, Any] = {
+        "id": vid,
+        "title": title,
+        "ext": "webm",
+        "playlist_index": str(index).zfill(len(str(settings.items))) if in_playlist else None,
+        "playlist_autonumber": str(position).zfill(len(str(count))) if in_playlist else None,
+        "n_entries": count if in_playlist else None,
+    }
+    _print(options, out, "pre_process", fields)
+    destination = render(options.get("-o") or "%(title)s [%(id)s].%(ext)s", fields)
+    base = os.path.splitext(destination)[0]
+    out("[info] {}: Downloading 1 format(s): 251".format(vid))
+    out("[download] Destination: {}".format(destination))
+
+    template = options.get("--progress-template", "")
+    if template.startswith("download:"):
+        template = template[len("download:"):]
+    records = max(1, settings.records)
+    size = settings.size
+    info = {
+        "info.id": vid,
+        "progress.total_bytes": size,
+        "progress.filename": destination,
+    }
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    with open(destination + ".part", "wb") as part:
+        for record in range(1, records + 1):
+            done = size * record // records
+            part.write(b"\0" * (done - part.tell()))
+            part.flush()
+            fields = dict(info)
+            fields.update({
+                "progress.status": "downloading",
+                "progress.downloaded_bytes": done,
+                "progress.speed": float(REPORTED_SPEED),
+                "progress.eta": (size - done) // REPORTED_SPEED,
+            })
+            if template:
+                out(render(template, fields))
+            else:
+                out("[download] {:5.1f}% of {}B".format(done * 100.0 / size, size))
+            if settings.line_delay:
+                time.sleep(settings.line_delay)
+    if template:
+        fields = dict(info)
+        fields.update({"progress.status": "finished", "progress.downloaded_bytes": size})
+        out(render(template, fields))
+    os.replace(destination + ".part", destination)
+
+    if "--write-thumbnail" in options["flags"]:
+        thumbnail = base + ".jpg"
+        with open(thumbnail, "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0cover of " + vid.encode())
+        out("[info] Writing video thumbnail 1 to: {}".format(thumbnail))
+
+    filepath = destination
+    if "-x" in options["flags"]:
+        # The WebM stream is Opus, which "best" copies into an .opus file
+        codec = options.get("--audio-format") or "mp3"
+        filepath = base + (".opus" if codec == "best" else "." + codec)
+        out("[ExtractAudio] Destination: {}".format(filepath))
+        _write_file(filepath, size)
+        os.remove(destination)
+        out("Deleting original file {} (pass -k to keep)".format(destination))
+    _print(options, out, "after_move", {"id": vid, "filepath": filepath})
+
+    if archive_path:
+        with open(archive_path, "a", encoding="utf-8") as f:
+            f.write("youtube {}\n".format(vid))
+    return True
+
+
+def ytdlp_main(argv: Sequence[str], environ: Mapping[str, str] = os.environ, stream: IO[str] = sys.stdout) -> int:
+    """Entry point of the fake yt-dlp; returns its exit status."""
+    settings = FakeSettings.from_environ(environ)
+    options = _parse_args(argv)
+    out = _Output(stream)
+    if "--version" in options["flags"]:
+        out("2099.01.01 (benchmark stand-in)")
+        return 0
+    if settings.start_delay:
+        time.sleep(settings.start_delay)
+    if settings.replay:
+        return _replay(settings.replay, settings, out)
+
+    urls = [arg for arg in options["positional"] if "://" in arg or arg.startswith("www.")]
+    if not urls:
+        out("ERROR: You must provide at least one URL.")
+        return 2
+    url = urls[-1]
+
+    in_playlist = "list=" in url
+    if in_playlist:
+        indices = list(range(1, settings.items + 1))
+    else:
+        vid = url.rsplit("v=", 1)[-1][:11]
+        indices = [index_of(vid) or 1]
+
+    if "--flat-playlist" in options["flags"]:
+        template = options.get("--print") or "%(id)s"
+        for index in indices:
+            out(render(template, {
+                "id": video_id(index),
+                "title": TITLE_FORMAT.format(index),
+                "playlist_index": index if in_playlist else None,
+                "duration": 180 + index,
+            }))
+        return 0
+
+    if in_playlist and options.get("--playlist-items"):
+        wanted = set(parse_items(options["--playlist-items"]))
+        indices = [index for index in indices if index in wanted]
+
+    failed = False
+    for position, index in enumerate(indices, 1):
+        if not _download_item(settings, options, out, index, position, len(indices), in_playlist):
+            failed = True
+    return 1 if failed else 0
+
+
+def ffmpeg_main(argv: Sequence[str], environ: Mapping[str, str] = os.environ, stream: IO[str] = sys.stdout) -> int:
+    """Entry point of the fake ffmpeg; returns its exit status."""
+    settings = FakeSettings.from_environ(environ)
+    out = _Output(stream)
+    if "-version" in argv:
+        out("ffmpeg version benchmark-stand-in")
+        return 0
+    sources = [argv[i + 1] for i, arg in enumerate(argv[:-1]) if arg == "-i"]
+    if not sources or len(argv) < 2:
+        out("At least one output file must be specified")
+        return 1
+    for source in sources:
+        if not os.path.isfile(source):
+            out("{}: No such file or directory".format(source))
+            return 1
+    if settings.ffmpeg_delay:
+        time.sleep(settings.ffmpeg_delay)
+    _write_file(argv[-1], os.path.getsize(sources[0]))
+    return 0
@@ -0,0 +1,41 @@
+"""Shared fixtures for the end-to-end tests against the fake yt-dlp and ffmpeg."""
+
+import os
+
+import pytest
+
+from benchmarks import bench, fakes
+from youtubemp3downloader import config
+from youtubemp3downloader.jobqueue import QueuedJob
+
+
+class FakeDownloads:
+    """Runs playlist jobs through a ``JobRunner`` with the fake tools first on PATH."""
+
+    def __init__(self, root):
+        self.root = root
+        self.ctx = bench.Context(str(root / "work"))
+
+    def run(self, seed, options=None, folder="music", **settings):
+        """Download the fake playlist for ``seed`` into ``folder``; returns the ``JobBench``.
+
+        ``settings`` override the small default scenario of three videos with two progress
+        records each.
+        """
+        path = self.root / folder
+        path.mkdir(exist_ok=True)
+        scenario = {"items": 3, "records": 2}
+        scenario.update(settings)
+        with bench.fake_tools(fakes.FakeSettings(seed=seed, **scenario)):
+            return bench.run_job(self.ctx, QueuedJob(fakes.playlist_url(seed), "Playlist", str(path)), options)
+
+    def files(self, suffix, folder="music"):
+        """Names of the files in ``folder`` ending in ``suffix``."""
+        return sorted(name for name in os.listdir(self.root / folder) if name.endswith(suffix))
+
+
+@pytest.fixture
+def fake_downloads(tmp_path, monkeypatch):
+    """A ``FakeDownloads`` with the settings directory kept inside ``tmp_path``."""
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path / "config")
+    return FakeDownloads(tmp_path)
@@ -0,0 +1,123 @@
+"""Tests for youtubemp3downloader.archive module."""
+
+from youtubemp3downloader import archive, config
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+def make_file(path, size=2048):
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+class TestArchiveEntry:
+    """Tests for the ArchiveEntry class."""
+
+    def test_present(self, tmp_path):
+        path = make_file(tmp_path / "Song.mp3")
+        entry = archive.ArchiveEntry(VIDEO_ID, path, 2048, 0.0)
+        assert entry.is_present()
+        assert entry.is_present(str(tmp_path))
+
+    def test_other_folder(self, tmp_path):
+        path = make_file(tmp_path / "Song.mp3")
+        entry = archive.ArchiveEntry(VIDEO_ID, path, 2048, 0.0)
+        assert not entry.is_present(str(tmp_path / "elsewhere"))
+        assert not entry.is_present(str(tmp_path) + "-other")
+
+    def test_subfolder(self, tmp_path):
+        (tmp_path / "Album").mkdir()
+        path = make_file(tmp_path / "Album" / "Song.mp3")
+        assert archive.ArchiveEntry(VIDEO_ID, path, 2048, 0.0).is_present(str(tmp_path))
+
+    def test_missing_or_empty_file(self, tmp_path):
+        assert not archive.ArchiveEntry(VIDEO_ID, str(tmp_path / "gone.mp3"), 1, 0.0).is_present()
+        empty = make_file(tmp_path / "empty.mp3", 0)
+        assert not archive.ArchiveEntry(VIDEO_ID, empty, 0, 0.0).is_present()
+
+
+class TestDownloadArchive:
+    """Tests for the DownloadArchive class."""
+
+    def test_default_path_is_in_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert archive.DownloadArchive().path == tmp_path / archive.ARCHIVE_FILENAME
+
+    def test_record_and_lookup(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        path = make_file(tmp_path / "Song.mp3")
+        assert store.record(VIDEO_ID, path)
+
+        entry = store.lookup(VIDEO_ID)
+        assert entry.path == path
+        assert entry.size == 2048
+        assert entry.completed_at > 0
+        assert store.lookup("aaaaaaaaaaa") is None
+
+    def test_record_requires_file(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        assert not store.record(VIDEO_ID, str(tmp_path / "missing.mp3"))
+        assert store.lookup(VIDEO_ID) is None
+
+    def test_record_replaces_previous_path(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        store.record(VIDEO_ID, make_file(tmp_path / "Old.mp3"))
+        store.record(VIDEO_ID, make_file(tmp_path / "New.mp3", 4096))
+        entry = store.lookup(VIDEO_ID)
+        assert entry.path.endswith("New.mp3")
+        assert entry.size == 4096
+
+    def test_present_ids(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        store.record("aaaaaaaaaaa", make_file(tmp_path / "A.mp3"))
+        store.record("bbbbbbbbbbb", make_file(tmp_path / "B.mp3"))
+        (tmp_path / "B.mp3").unlink()
+
+        present = store.present_ids(["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"], str(tmp_path))
+        assert list(present) == ["aaaaaaaaaaa"]
+
+    def test_lookup_many_in_chunks(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        path = make_file(tmp_path / "Song.mp3")
+        ids = ["v{:010d}".format(i) for i in range(1200)]
+        for video_id in ids[::100]:
+            store.record(video_id, path)
+        assert set(store.lookup_many(ids)) == set(ids[::100])
+
+    def test_export_ytdlp(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        music = tmp_path / "music"
+        music.mkdir()
+        store.record("aaaaaaaaaaa", make_file(music / "A.mp3"))
+        store.record("bbbbbbbbbbb", make_file(tmp_path / "B.mp3"))
+
+        target = tmp_path / "export" / "archive.txt"
+        assert store.export_ytdlp(target, str(music)) == 1
+        assert target.read_text() == "youtube aaaaaaaaaaa\n"
+
+        assert store.export_ytdlp(target, str(music), ["ccccccccccc", "aaaaaaaaaaa"]) == 2
+        assert target.read_text() == "youtube aaaaaaaaaaa\nyoutube ccccccccccc\n"
+
+    def test_forget(self, tmp_path):
+        store = archive.DownloadArchive(tmp_path / "archive.db")
+        store.record(VIDEO_ID, make_file(tmp_path / "Song.mp3"))
+        store.forget(VIDEO_ID)
+        assert store.lookup(VIDEO_ID) is None
+
+    def test_unreadable_database_is_a_miss(self, tmp_path):
+        path = tmp_path / "archive.db"
+        path.write_text("not a database")
+        store = archive.DownloadArchive(path)
+        assert store.lookup(VIDEO_ID) is None
+        assert not store.record(VIDEO_ID, make_file(tmp_path / "Song.mp3"))
+
+
+class TestYtdlpArchivePath:
+    """Tests for the ytdlp_archive_path function."""
+
+    def test_one_file_per_folder(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        first = archive.ytdlp_archive_path("/music/a")
+        assert first.parent == tmp_path / archive.YTDLP_ARCHIVE_DIR
+        assert first == archive.ytdlp_archive_path("/music/a/")
+        assert first != archive.ytdlp_archive_path("/music/b")
@@ -0,0 +1,185 @@
+"""Tests for youtubemp3downloader.bandwidth module."""
+
+import datetime
+import threading
+
+import pytest
+
+from youtubemp3downloader import bandwidth, download
+from youtubemp3downloader.bandwidth import BandwidthBudget, BandwidthSchedule
+
+KIB = 1024
+MIB = 1024 * 1024
+
+
+def at(hour, minute=0):
+    return datetime.datetime(2026, 10, 17, hour, minute)
+
+
+class FakeTime:
+    """Clock whose sleep advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+def make_budget(schedule, hour=12):
+    fake = FakeTime()
+    budget = BandwidthBudget(schedule, clock=fake.clock, now=lambda: at(hour), sleep=fake.sleep)
+    return budget, fake
+
+
+class TestParseRate:
+    """Tests for rate parsing and formatting."""
+
+    def test_units(self):
+        assert bandwidth.parse_rate("500K") == 500 * KIB
+        assert bandwidth.parse_rate("2.5m") == int(2.5 * MIB)
+        assert bandwidth.parse_rate("1MiB/s") == MIB
+        assert bandwidth.parse_rate("4096") == 4096
+
+    def test_unlimited(self):
+        for text in ("", "0", "unlimited", "Off"):
+            assert bandwidth.parse_rate(text) is None
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            bandwidth.parse_rate("fast")
+
+    def test_format(self):
+        assert bandwidth.format_rate(2 * MIB) == "2M"
+        assert bandwidth.format_rate(1536) == "1.5K"
+        assert bandwidth.format_rate(None) == "unlimited"
+
+
+class TestBandwidthSchedule:
+    """Tests for time-of-day rates."""
+
+    def test_period_and_default(self):
+        schedule = BandwidthSchedule.parse("4M", "08:00-18:00=1M")
+        assert schedule.rate_at(at(9)) == MIB
+        assert schedule.rate_at(at(18)) == 4 * MIB
+        assert schedule.rate_at(at(7, 59)) == 4 * MIB
+
+    def test_period_past_midnight(self):
+        schedule = BandwidthSchedule.parse("1M", "22:00-06:00=unlimited")
+        assert schedule.rate_at(at(23)) is None
+        assert schedule.rate_at(at(3)) is None
+        assert schedule.rate_at(at(12)) == MIB
+
+    def test_invalid_period(self):
+        with pytest.raises(ValueError):
+            BandwidthSchedule.parse("", "8-18=1M")
+        with pytest.raises(ValueError):
+            BandwidthSchedule.parse("", "08:00-25:00=1M")
+
+    def test_unlimited(self):
+        assert BandwidthSchedule.parse().is_unlimited
+        assert not BandwidthSchedule.parse("", "08:00-18:00=1M").is_unlimited
+
+    def test_invalid_settings_are_ignored(self):
+        schedule = bandwidth.schedule_from_settings({"bandwidth_limit": "lots"})
+        assert schedule.is_unlimited
+
+
+class TestBandwidthBudget:
+    """Tests for sharing the rate between downloads."""
+
+    def test_leases_split_the_rate(self):
+        budget, _ = make_budget(BandwidthSchedule(4 * MIB))
+        with budget.expect(2):
+            first = budget.lease()
+            assert first.args == ["--limit-rate", str(2 * MIB)]
+            second = budget.lease()
+            assert second.rate == 2 * MIB
+            first.release()
+            second.release()
+        assert budget.active == 0
+        assert budget.allocated == 0
+
+    def test_leases_never_exceed_the_rate(self):
+        budget, _ = make_budget(BandwidthSchedule(MIB))
+        leases = [budget.lease() for _ in range(4)]
+        assert leases[0].rate == MIB
+        # Nothing is left, so later downloads only get the minimum
+        assert [lease.rate for lease in leases[1:]] == [bandwidth.MIN_SHARE] * 3
+        leases[0].release()
+        with budget.expect(4):
+            assert budget.lease().rate == MIB // 4
+
+    def test_finished_download_frees_its_share(self):
+        budget, _ = make_budget(BandwidthSchedule(4 * MIB))
+        with budget.lease(), budget.lease():
+            pass
+        with budget.lease() as lease:
+            assert lease.rate == 4 * MIB
+
+    def test_schedule_decides_the_rate(self):
+        schedule = BandwidthSchedule.parse("", "08:00-18:00=1M")
+        day, _ = make_budget(schedule, hour=10)
+        night, _ = make_budget(schedule, hour=23)
+        assert day.lease().rate == MIB
+        assert night.lease().args == []
+
+    def test_no_budget_means_no_limit(self):
+        with bandwidth.lease(None) as lease, bandwidth.expect(None, 2):
+            assert lease.args == []
+
+    def test_token_bucket_holds_the_rate(self):
+        budget, fake = make_budget(BandwidthSchedule(MIB))
+        for _ in range(20):
+            budget.consume(256 * KIB)
+        # 5 MiB at 1 MiB/s, with one second of burst allowed
+        assert fake.now == pytest.approx(5.0, abs=1.0)
+
+    def test_consumers_share_the_bucket(self):
+        budget, fake = make_budget(BandwidthSchedule(MIB))
+        waits = [budget.consume(MIB // 2) for _ in range(4)]
+        assert waits == sorted(waits)
+        assert sum(MIB // 2 for _ in waits) / fake.now == pytest.approx(MIB, rel=0.01)
+
+    def test_unlimited_never_waits(self):
+        budget, fake = make_budget(BandwidthSchedule())
+        assert budget.consume(100 * MIB) == 0.0
+        assert fake.slept == 0.0
+
+    def test_stop_ends_the_wait(self):
+        budget, fake = make_budget(BandwidthSchedule(KIB))
+        stop = threading.Event()
+        stop.set()
+        budget.consume(MIB, stop)
+        assert fake.slept == 0.0
+
+
+class TestRateArguments:
+    """The download command carries the process's share."""
+
+    def test_download_command(self):
+        cmd = download._base_command(False, "firefox", rate_args=["--limit-rate", "1048576"])
+        assert cmd[cmd.index("--limit-rate") + 1] == "1048576"
+
+
+class TestLimitedPlaylist:
+    """Limited playlists take a fresh share for every video."""
+
+    def test_one_lease_per_video(self, fake_downloads):
+        budget = BandwidthBudget(BandwidthSchedule(4 * MIB))
+        leases = []
+
+        def lease():
+            taken = BandwidthBudget.lease(budget)
+            leases.append(taken.rate)
+            return taken
+
+        budget.lease = lease
+        fake_downloads.run("limited", {"bandwidth_budget": budget})
+        assert leases == [4 * MIB] * 3
+        assert budget.allocated == 0
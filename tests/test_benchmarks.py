@@ -0,0 +1,132 @@
+"""Tests for the benchmarks package (fake tools and result comparison)."""
+
+import io
+import os
+
+from benchmarks import bench, fakes
+from youtubemp3downloader import enumeration, events, progress
+
+OUTPUT_TEMPLATE = "%(playlist_index|)s%(playlist_index& - |)s%(title)s.%(ext)s"
+
+
+def fake_ytdlp(args, **settings):
+    """Run the fake yt-dlp in-process and return (status, output lines)."""
+    stream = io.StringIO()
+    status = fakes.ytdlp_main(args, fakes.FakeSettings(**settings).environ(), stream)
+    return status, stream.getvalue().splitlines(keepends=True)
+
+
+def parse(lines):
+    parser = progress.ProgressParser()
+    return [event for line in lines for event in parser.feed(line)]
+
+
+class TestRender:
+    """Tests for the output template renderer."""
+
+    def test_plain_and_default_fields(self):
+        assert fakes.render("%(title)s.%(ext)s", {"title": "Song", "ext": "webm"}) == "Song.webm"
+        assert fakes.render("%(speed|)s", {}) == ""
+        assert fakes.render("%(speed)s", {}) == "NA"
+
+    def test_conditional_text(self):
+        assert fakes.render(OUTPUT_TEMPLATE, {"playlist_index": "02", "title": "Song", "ext": "mp3"}) == "02 - Song.mp3"
+        assert fakes.render(OUTPUT_TEMPLATE, {"title": "Song", "ext": "mp3"}) == "Song.mp3"
+
+
+class TestFakeYtdlp:
+    """The fake yt-dlp must speak the protocol the real parser expects."""
+
+    def test_flat_playlist_matches_enumeration(self):
+        status, lines = fake_ytdlp(enumeration.build_command(fakes.playlist_url())[1:], items=3)
+        assert status == 0
+        assert [enumeration.parse_entry(line) for line in lines] == [
+            (fakes.video_id(i), "{} - Benchmark Track {}".format(i, i)) for i in (1, 2, 3)
+        ]
+
+    def test_download_produces_progress_records_and_mp3_files(self, tmp_path):
+        args = progress.PROGRESS_ARGS + ["-x", "-o", str(tmp_path / OUTPUT_TEMPLATE), fakes.playlist_url()]
+        status, lines = fake_ytdlp(args, items=2, records=4)
+        parsed = parse(lines)
+        assert status == 0
+        assert sum(isinstance(event, events.Progress) for event in parsed) == 8
+        assert sum(isinstance(event, events.PostprocessDone) for event in parsed) == 2
+        assert sorted(os.listdir(tmp_path)) == ["1 - Benchmark Track 1.mp3", "2 - Benchmark Track 2.mp3"]
+
+    def test_failure_mix_reports_unavailable_items(self, tmp_path):
+        settings = fakes.FakeSettings(items=20, fail_rate=0.3, seed="x")
+        failing = settings.failing()
+        assert 0 < len(failing) < 20
+        args = progress.PROGRESS_ARGS + ["-x", "-o", str(tmp_path / OUTPUT_TEMPLATE), fakes.playlist_url()]
+        status, lines = fake_ytdlp(args, items=20, records=1, fail_rate=0.3, seed="x")
+        errors = [event for event in parse(lines) if isinstance(event, events.ItemError)]
+        assert status == 1
+        assert [event.video_id for event in errors] == [fakes.video_id(i) for i in failing]
+
+    def test_playlist_items_and_archive_are_honoured(self, tmp_path):
+        archive = tmp_path / "archive.txt"
+        archive.write_text("youtube {}\n".format(fakes.video_id(2)))
+        args = progress.PROGRESS_ARGS + [
+            "-x", "-o", str(tmp_path / OUTPUT_TEMPLATE), "--playlist-items", "2-3",
+            "--download-archive", str(archive), fakes.playlist_url(),
+        ]
+        status, lines = fake_ytdlp(args, items=5, records=1)
+        parsed = parse(lines)
+        assert status == 0
+        assert [event.video_id for event in parsed if isinstance(event, events.Skipped)] == [fakes.video_id(2)]
+        assert [name for name in os.listdir(tmp_path) if name.endswith(".mp3")] == ["3 - Benchmark Track 3.mp3"]
+        assert archive.read_text().splitlines()[-1] == "youtube {}".format(fakes.video_id(3))
+
+
+class TestFakeFfmpeg:
+    """Tests for the fake ffmpeg."""
+
+    def test_copies_input_to_output(self, tmp_path):
+        source = tmp_path / "in.webm"
+        source.write_bytes(b"x" * 100)
+        target = tmp_path / "out.mp3.part"
+        assert fakes.ffmpeg_main(["-y", "-i", str(source), "-f", "mp3", str(target)], {}, io.StringIO()) == 0
+        assert target.stat().st_size == 100
+
+    def test_missing_input_fails(self, tmp_path):
+        assert fakes.ffmpeg_main(["-i", str(tmp_path / "missing"), str(tmp_path / "out")], {}, io.StringIO()) == 1
+
+
+class TestRunJob:
+    """End-to-end run of a job against the fake tools."""
+
+    def test_playlist_job_downloads_every_available_item(self, fake_downloads):
+        result = fake_downloads.run("e2e", items=4, fail_rate=0.5)
+        failing = len(fakes.FakeSettings(items=4, fail_rate=0.5, seed="e2e").failing())
+        expected = 4 - failing
+        assert result.run.successful == expected
+        assert result.run.failures == failing
+        assert len(fake_downloads.files(".mp3")) == expected
+        assert fakes.FAKE_BIN not in os.environ.get("PATH", "")
+
+
+class TestCompare:
+    """Tests for comparing results against a baseline."""
+
+    def test_flatten_keeps_numbers_only(self):
+        results = {"parser": {"lines": 10, "ok": True}, "job_latency": {"video": {"seconds": 0.5, "x": None}}}
+        assert bench.flatten(results) == {"parser.lines": 10, "job_latency.video.seconds": 0.5}
+
+    def test_slower_job_is_a_regression(self):
+        baseline = {"job_latency": {"video": {"seconds": 1.0}}}
+        assert bench.compare({"job_latency": {"video": {"seconds": 1.2}}}, baseline, 0.25) == []
+        regressions = bench.compare({"job_latency": {"video": {"seconds": 2.0}}}, baseline, 0.25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("job_latency.video.seconds")
+
+    def test_lower_throughput_is_a_regression(self):
+        baseline = {"parser": {"lines_per_sec": 1000}}
+        assert bench.compare({"parser": {"lines_per_sec": 2000}}, baseline) == []
+        assert bench.compare({"parser": {"lines_per_sec": 500}}, baseline)
+
+    def test_slack_absorbs_tiny_changes(self):
+        baseline = {"stop_cleanup": {"serial": {"stop_seconds": 0.01}}}
+        assert bench.compare({"stop_cleanup": {"serial": {"stop_seconds": 0.05}}}, baseline) == []
+
+    def test_untracked_and_new_metrics_are_ignored(self):
+        assert bench.compare({"parser": {"lines": 1}, "new": {"seconds": 9}}, {"parser": {"lines": 100}}) == []
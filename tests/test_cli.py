@@ -0,0 +1,105 @@
+"""Tests for youtubemp3downloader.cli module."""
+
+import io
+
+import pytest
+
+from youtubemp3downloader import cli, config, jobqueue
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PL1234567890abcdef"
+
+
+class TestArguments:
+    """Tests for argument and URL file handling."""
+
+    def test_read_url_file_skips_comments(self, tmp_path):
+        path = tmp_path / "urls.txt"
+        path.write_text("# nightly\n\n{}\n  {}  \n".format(VIDEO_URL, PLAYLIST_URL))
+        assert cli.read_url_file(str(path)) == [VIDEO_URL, PLAYLIST_URL]
+
+    def test_build_jobs(self):
+        jobs, invalid = cli.build_jobs([VIDEO_URL, "https://example.com", PLAYLIST_URL, VIDEO_URL], "/music")
+        assert [(job.url, job.url_type) for job in jobs] == [(VIDEO_URL, "Video"), (PLAYLIST_URL, "Playlist")]
+        assert invalid == ["https://example.com"]
+
+    def test_defaults(self):
+        args = cli.build_parser().parse_args([VIDEO_URL])
+        assert (args.output, args.jobs, args.workers, args.order) == (".", 1, 1, jobqueue.POLICY_FIFO)
+
+
+class TestMain:
+    """Tests for the exit status of main."""
+
+    def test_no_urls(self, capsys):
+        assert cli.main([]) == cli.EXIT_USAGE
+
+    def test_invalid_url(self, tmp_path, capsys):
+        assert cli.main(["-o", str(tmp_path), "not a url"]) == cli.EXIT_USAGE
+        assert "not a url" in capsys.readouterr().err
+
+    def test_jobs_out_of_range(self, capsys):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["-j", "0", VIDEO_URL])
+        assert exc.value.code == cli.EXIT_USAGE
+
+    def test_invalid_rate_schedule(self, capsys):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["--limit-schedule", "8-18=1M", VIDEO_URL])
+        assert exc.value.code == cli.EXIT_USAGE
+        assert "08:00-18:00=1M" in capsys.readouterr().err
+
+    def test_profile_parser_needs_trace(self, capsys):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["--profile-parser", VIDEO_URL])
+        assert exc.value.code == cli.EXIT_USAGE
+        assert "--trace" in capsys.readouterr().err
+
+    def test_missing_dependencies(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(cli.shutil, "which", lambda name: None)
+        assert cli.main(["-o", str(tmp_path), VIDEO_URL]) == cli.EXIT_DEPENDENCY
+        assert "ffmpeg" in capsys.readouterr().err
+
+    def test_interrupt_before_jobs_start(self, tmp_path, monkeypatch, capsys):
+        def interrupt(*args):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path / "config")
+        monkeypatch.setattr(cli, "missing_dependencies", lambda backend: [])
+        monkeypatch.setattr(cli, "_enumerate_playlists", interrupt)
+        order = [policy for policy in sorted(jobqueue.POLICIES) if policy != jobqueue.POLICY_FIFO][0]
+        argv = ["-o", str(tmp_path), "--no-archive", "--no-thumbnail-store", "--order", order, PLAYLIST_URL]
+        assert cli.main(argv) == cli.EXIT_INTERRUPTED
+        assert "Interrupted" in capsys.readouterr().err
+
+        monkeypatch.setattr(cli.library.LibraryIndex, "scan", interrupt)
+        assert cli.main(["-o", str(tmp_path), "--no-thumbnail-store", VIDEO_URL]) == cli.EXIT_INTERRUPTED
+
+
+class TestConsoleSink:
+    """Tests for the ConsoleSink class."""
+
+    def make_run(self, sink):
+        return jobqueue.JobRun(jobqueue.QueuedJob(VIDEO_URL, "Video", "/music"), sink)
+
+    def test_progress_lines_only_when_verbose(self):
+        out, err = io.StringIO(), io.StringIO()
+        sink = cli.ConsoleSink(out, err)
+        run = self.make_run(sink)
+        run.post_log("[download]  50.0%", progress=True)
+        run.log_message("Title")
+        run.report("broken", error=True)
+        assert out.getvalue() == "Title\n"
+        assert err.getvalue() == "broken\n"
+
+    def test_status_is_rate_limited(self):
+        out = io.StringIO()
+        sink = cli.ConsoleSink(out, io.StringIO())
+        job = jobqueue.QueuedJob(VIDEO_URL, "Video", "/music")
+        job.state = jobqueue.RUNNING
+        sink.status([job])
+        job.fraction = 0.5
+        sink.status([job])
+        assert out.getvalue().count("\n") == 1
+        sink.status([job], force=True)
+        assert "50%" in out.getvalue()
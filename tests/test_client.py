@@ -0,0 +1,57 @@
+"""Tests for youtubemp3downloader.client module."""
+
+import pytest
+
+from youtubemp3downloader import client, config, jobqueue
+from youtubemp3downloader.exceptions import ApiError
+
+
+class TestParseAddress:
+    """Tests for the parse_address function."""
+
+    def test_forms(self):
+        assert client.parse_address("unix:/run/ytmp3.sock") == ("unix", "/run/ytmp3.sock", 0)
+        assert client.parse_address("127.0.0.1:9000") == ("tcp", "127.0.0.1", 9000)
+        assert client.parse_address("http://localhost") == ("tcp", "localhost", client.DEFAULT_PORT)
+
+    def test_default_is_a_unix_socket(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+        assert client.default_address() == "unix:/run/user/1000/" + client.SOCKET_FILENAME
+        monkeypatch.delenv("XDG_RUNTIME_DIR")
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert client.default_address() == "unix:{}".format(tmp_path / client.SOCKET_FILENAME)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            client.parse_address("unix:")
+        with pytest.raises(ValueError):
+            client.parse_address("ftp://host")
+
+
+class TestDaemonClient:
+    """Tests for the DaemonClient class."""
+
+    def test_unreachable_service(self, tmp_path):
+        api = client.DaemonClient("unix:{}".format(tmp_path / "missing.sock"))
+        assert not api.ping()
+        with pytest.raises(ApiError) as exc:
+            api.jobs()
+        assert exc.value.status == 503
+
+
+class TestRemoteQueue:
+    """Tests for the RemoteQueue class."""
+
+    def test_mirrors_snapshots_and_progress(self, tmp_path):
+        remote = client.RemoteQueue()
+        remote.path = tmp_path / "queue.json"
+        summary = {"id": "abc", "number": 3, "url": "https://youtu.be/dQw4w9WgXcQ", "url_type": "Video",
+                   "label": "https://youtu.be/dQw4w9WgXcQ", "state": jobqueue.RUNNING, "status": "Starting...",
+                   "fraction": 0.0}
+        remote.replace([summary], paused=True)
+        remote.update_progress([{"id": "abc", "fraction": 0.5, "status": "Downloading"}])
+        job = remote.get("abc")
+        assert (job.number, job.fraction, job.status, remote.paused) == (3, 0.5, "Downloading", True)
+        assert remote.running() == [job]
+        remote.save()
+        assert not remote.path.exists()
@@ -0,0 +1,181 @@
+"""Tests for youtubemp3downloader.cookies module."""
+
+import os
+import stat
+import threading
+import time
+
+from youtubemp3downloader import config, cookies, download, engine, enumeration
+from youtubemp3downloader.exceptions import DownloadError
+
+JAR = "# Netscape HTTP Cookie File\n.youtube.com\tTRUE\t/\tTRUE\t0\tSID\tsecret\n"
+
+
+class FakeExporter:
+    """Exporter that writes a fixed jar and counts its calls."""
+
+    def __init__(self, fail=False, delay=0.0):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+
+    def __call__(self, browser, path):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise DownloadError("keyring locked")
+        with open(path, "w") as f:
+            f.write(JAR)
+
+
+def make_cache(tmp_path, exporter, mtime=100.0, ttl=cookies.DEFAULT_TTL):
+    """Cache whose browser database mtime is read from a mutable holder."""
+    holder = {"mtime": mtime}
+    cache = cookies.CookieJarCache(tmp_path / "cookies", ttl, exporter, lambda browser: holder["mtime"])
+    return cache, holder
+
+
+class TestCookieLease:
+    """Tests for the per-process cookie arguments."""
+
+    def test_without_auth_there_are_no_cookie_arguments(self):
+        lease = cookies.lease(False, "firefox")
+        assert lease.args == []
+        assert lease.options == {}
+
+    def test_fallback_reads_the_browser(self):
+        lease = cookies.CookieLease("brave")
+        assert lease.args == ["--cookies-from-browser", "brave"]
+        assert lease.options == {"cookiesfrombrowser": ("brave",)}
+
+    def test_copy_is_deleted_on_release(self, tmp_path):
+        path = tmp_path / "copy.txt"
+        path.write_text(JAR)
+        with cookies.CookieLease("firefox", str(path)) as lease:
+            assert lease.args == ["--cookies", str(path)]
+            assert lease.options == {"cookiefile": str(path)}
+        assert not path.exists()
+        assert lease.args == ["--cookies-from-browser", "firefox"]
+
+
+class TestCookieJarCache:
+    """Tests for exporting and reusing the cookie jar."""
+
+    def test_exports_once_and_hands_out_private_copies(self, tmp_path):
+        exporter = FakeExporter()
+        cache, _ = make_cache(tmp_path, exporter)
+        first = cache.lease("firefox")
+        second = cache.lease("firefox")
+        assert exporter.calls == 1
+        assert first.path != second.path
+        assert open(first.path).read() == JAR
+        first.release()
+        assert os.path.exists(second.path)
+        second.release()
+        assert cache.jar_path("firefox").is_file()
+
+    def test_jar_is_private(self, tmp_path):
+        cache, _ = make_cache(tmp_path, FakeExporter())
+        path = cache.jar("firefox")
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+
+    def test_database_change_exports_again(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cookies, "REEXPORT_GRACE", 0)
+        exporter = FakeExporter()
+        cache, holder = make_cache(tmp_path, exporter)
+        cache.jar("firefox")
+        cache.jar("firefox")
+        assert exporter.calls == 1
+        holder["mtime"] = 200.0
+        cache.jar("firefox")
+        assert exporter.calls == 2
+
+    def test_recent_jar_survives_database_change(self, tmp_path):
+        exporter = FakeExporter()
+        cache, holder = make_cache(tmp_path, exporter)
+        cache.jar("firefox")
+        holder["mtime"] = 200.0
+        cache.jar("firefox")
+        assert exporter.calls == 1
+
+    def test_ttl_expiry_exports_again(self, tmp_path):
+        exporter = FakeExporter()
+        cache, _ = make_cache(tmp_path, exporter, ttl=0)
+        cache.jar("firefox")
+        cache.jar("firefox")
+        assert exporter.calls == 2
+
+    def test_browsers_have_separate_jars(self, tmp_path):
+        exporter = FakeExporter()
+        cache, _ = make_cache(tmp_path, exporter)
+        assert cache.jar("firefox") != cache.jar("chrome")
+        assert exporter.calls == 2
+
+    def test_failed_export_falls_back_and_backs_off(self, tmp_path):
+        exporter = FakeExporter(fail=True)
+        cache, _ = make_cache(tmp_path, exporter)
+        assert cache.lease("chrome").args == ["--cookies-from-browser", "chrome"]
+        assert cache.lease("chrome").args == ["--cookies-from-browser", "chrome"]
+        assert exporter.calls == 1
+        assert not cache.jar_path("chrome").exists()
+
+    def test_invalidate_forces_export(self, tmp_path):
+        exporter = FakeExporter()
+        cache, _ = make_cache(tmp_path, exporter)
+        cache.jar("firefox")
+        cache.invalidate("firefox")
+        assert not cache.jar_path("firefox").exists()
+        cache.jar("firefox")
+        assert exporter.calls == 2
+
+    def test_parallel_workers_share_one_export(self, tmp_path):
+        exporter = FakeExporter(delay=0.05)
+        cache, _ = make_cache(tmp_path, exporter)
+        leases = []
+        threads = [threading.Thread(target=lambda: leases.append(cache.lease("firefox"))) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert exporter.calls == 1
+        assert len({lease.path for lease in leases}) == 6
+
+    def test_default_directory_follows_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert cookies.CookieJarCache().directory == tmp_path / cookies.COOKIES_DIR
+
+
+class TestCookieDatabaseMtime:
+    """Tests for locating the browser's cookie database."""
+
+    def test_newest_profile_wins(self, tmp_path, monkeypatch):
+        for profile, mtime in (("a.default", 100), ("b.work", 300)):
+            path = tmp_path / profile / "cookies.sqlite"
+            path.parent.mkdir()
+            path.write_bytes(b"")
+            os.utime(path, (mtime, mtime))
+        monkeypatch.setitem(cookies.COOKIE_DATABASES, "firefox", [str(tmp_path / "*" / "cookies.sqlite")])
+        assert cookies.cookie_database_mtime("firefox") == 300
+        assert cookies.cookie_database_mtime("firefox:work") == 300
+
+    def test_unknown_browser_has_no_database(self):
+        assert cookies.cookie_database_mtime("netscape") is None
+
+
+class TestCookieArguments:
+    """The commands take the lease's arguments in place of --cookies-from-browser."""
+
+    def test_download_command(self):
+        cmd = download._base_command(True, "firefox", cookie_args=["--cookies", "/tmp/jar.txt"])
+        assert cmd[-2:] == ["--cookies", "/tmp/jar.txt"]
+        assert "--cookies-from-browser" not in cmd
+
+    def test_enumeration_command(self):
+        cmd = enumeration.build_command("URL", True, "firefox", ["--cookies", "/tmp/jar.txt"])
+        assert cmd[-3:] == ["--cookies", "/tmp/jar.txt", "URL"]
+
+    def test_engine_options(self):
+        options = engine.build_options("/tmp/x", True, "firefox", cookie_options={"cookiefile": "/tmp/jar.txt"})
+        assert options["cookiefile"] == "/tmp/jar.txt"
+        assert "cookiesfrombrowser" not in options
@@ -0,0 +1,283 @@
+"""Tests for youtubemp3downloader.daemon module."""
+
+import http.client
+import json
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from youtubemp3downloader import client, config, daemon, download, jobqueue
+from youtubemp3downloader.exceptions import ApiError
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PL1234567890abcdef"
+
+
+def fake_download(run, *args, **kwargs):
+    """Stand-in for download_thread that finishes the run at once."""
+    run.log_message("Downloaded")
+    run.record_summary(1, 0, 0)
+    run.finished()
+
+
+def make_daemon(tmp_path, **kwargs):
+    settings = {"use_download_archive": False}
+    return daemon.Daemon(settings, tmp_path / "queue.json", tmp_path / "jobs.journal", **kwargs)
+
+
+class TestEventLog:
+    """Tests for the EventLog class."""
+
+    def test_since_returns_newer_events(self):
+        log = daemon.EventLog()
+        log.publish("log", message="a")
+        seq = log.publish("log", message="b")
+        events, missed = log.since(seq - 1)
+        assert [event["message"] for event in events] == ["b"]
+        assert not missed
+
+    def test_dropped_events_are_reported(self):
+        log = daemon.EventLog(size=2)
+        for i in range(4):
+            log.publish("log", message=str(i))
+        events, missed = log.since(0)
+        assert [event["seq"] for event in events] == [3, 4]
+        assert missed
+        assert log.since(99) == ([], True)
+
+    def test_wait_wakes_on_publish(self):
+        log = daemon.EventLog()
+        threading.Timer(0.05, log.publish, ("log",)).start()
+        events, _ = log.since(0, timeout=5)
+        assert len(events) == 1
+
+
+class TestDaemon:
+    """Tests for the Daemon class."""
+
+    def test_build_job_validates(self, tmp_path):
+        service = make_daemon(tmp_path, allowed_dirs=[str(tmp_path / "music")])
+        job = service.build_job({"url": PLAYLIST_URL, "output": str(tmp_path / "music" / "a"),
+                                 "playlist_items": "1-2", "playlist_info": [["v1", "1 - A"], ["v2", "2 - B"]]})
+        assert (job.url_type, job.pending) == ("Playlist", [1, 2])
+        assert (tmp_path / "music" / "a").is_dir()
+
+        with pytest.raises(ApiError):
+            service.build_job({"url": "https://example.com", "output": str(tmp_path / "music")})
+        with pytest.raises(ApiError):
+            service.build_job({"url": VIDEO_URL, "output": "relative"})
+        with pytest.raises(ApiError) as exc:
+            service.build_job({"url": VIDEO_URL, "output": str(tmp_path / "other")})
+        assert exc.value.status == 403
+
+    def test_rejects_public_addresses(self, tmp_path):
+        with pytest.raises(ValueError):
+            daemon.make_server(make_daemon(tmp_path), "0.0.0.0:0")
+
+    def test_shared_socket_needs_allowed_folders(self, tmp_path):
+        address = "unix:{}".format(tmp_path / "api.sock")
+        with pytest.raises(ValueError):
+            daemon.make_server(make_daemon(tmp_path), address, socket_mode=0o660)
+        assert not (tmp_path / "api.sock").exists()
+
+
+def serve(service, address, socket_mode=0o600):
+    """Serve a daemon's API and queue on background threads; returns a stop function."""
+    server = daemon.make_server(service, address, socket_mode)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    loop = threading.Thread(target=service.run, daemon=True)
+    loop.start()
+
+    def stop():
+        service.shutdown()
+        loop.join(5)
+        server.shutdown()
+        server.server_close()
+    return server, stop
+
+
+class TestApi:
+    """End-to-end tests of the API over a Unix socket."""
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(download, "download_thread", fake_download)
+        service = make_daemon(tmp_path)
+        address = "unix:{}".format(tmp_path / "api.sock")
+        _, stop = serve(service, address)
+        yield service, client.DaemonClient(address)
+        stop()
+
+    def test_submit_and_follow_events(self, service, tmp_path):
+        service, api = service
+        since = api.jobs()["seq"]
+        job = api.submit(VIDEO_URL, str(tmp_path / "music"))
+        assert job["url_type"] == "Video"
+
+        seen = []
+        while not any(event["type"] == "finished" for event in seen):
+            result = api.events(since, timeout=5)
+            seen.extend(result["events"])
+            since = result["seq"]
+        assert any(event["type"] == "log" and event["message"] == "Downloaded" for event in seen)
+        assert api.jobs()["jobs"][0]["state"] == jobqueue.DONE
+        assert api.stats()["videos"]["downloaded"] == 1
+
+    def test_errors(self, service, tmp_path):
+        _, api = service
+        with pytest.raises(ApiError) as exc:
+            api.remove("missing")
+        assert exc.value.status == 404
+        with pytest.raises(ApiError) as exc:
+            api.request("GET", "/api/nothing")
+        assert exc.value.status == 404
+
+    def test_metrics_endpoint(self, service, tmp_path):
+        service, api = service
+        service.metrics.record_bytes(2048)
+        connection = api._connect(5)
+        try:
+            connection.request("GET", "/metrics")
+            response = connection.getresponse()
+            text = response.read().decode("utf-8")
+        finally:
+            connection.close()
+        assert response.status == 200
+        assert response.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+        assert "ytmp3_downloaded_bytes_total 2048" in text
+
+    def test_pause_holds_jobs(self, service, tmp_path):
+        _, api = service
+        api.pause()
+        api.submit(VIDEO_URL, str(tmp_path / "music"))
+        assert api.stats()["queued"] == 1
+        since = api.jobs()["seq"]
+        api.resume()
+        seen = []
+        while not any(event["type"] == "finished" for event in seen):
+            result = api.events(since, timeout=5)
+            seen.extend(result["events"])
+            since = result["seq"]
+        assert api.stats()["queued"] == 0
+
+    def test_body_is_read_before_answering(self, service, tmp_path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(str(tmp_path / "api.sock"))
+        try:
+            sock.sendall(b"POST /api/queue/pause HTTP/1.1\r\nHost: localhost\r\n"
+                         b"Content-Type: application/json\r\nContent-Length: 2\r\n\r\n")
+            # A server answering from the headers alone would have closed the connection by now
+            time.sleep(0.2)
+            sock.sendall(b"{}")
+            response = b""
+            while True:
+                chunk = sock.recv(1024)
+                if not chunk:
+                    break
+                response += chunk
+            headers, _, body = response.partition(b"\r\n\r\n")
+            assert headers.startswith(b"HTTP/1.0 200")
+            assert json.loads(body.decode("utf-8"))["paused"] is True
+        finally:
+            sock.close()
+
+    def test_client_gone_before_response(self):
+        class Gone:
+            def write(self, data):
+                raise BrokenPipeError()
+
+        handler = daemon._RequestHandler.__new__(daemon._RequestHandler)
+        handler.request_version = "HTTP/1.1"
+        handler.requestline = "GET /api/jobs HTTP/1.1"
+        handler.wfile = Gone()
+        handler._send_json({"jobs": []})
+        assert handler.close_connection
+
+
+class TestSharedSocket:
+    """A socket shared with the group limits what other users may do."""
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(download, "download_thread", fake_download)
+        service = make_daemon(tmp_path, allowed_dirs=[str(tmp_path / "music")])
+        address = "unix:{}".format(tmp_path / "api.sock")
+        _, stop = serve(service, address, socket_mode=0o660)
+        yield client.DaemonClient(address)
+        stop()
+
+    def test_owner_may_use_browser_cookies(self, service, tmp_path):
+        assert stat.S_IMODE(os.stat(tmp_path / "api.sock").st_mode) == 0o660
+        job = service.submit(VIDEO_URL, str(tmp_path / "music"), use_auth=True)
+        assert job["url_type"] == "Video"
+
+    def test_other_users_may_not(self, service, tmp_path, monkeypatch):
+        monkeypatch.setattr(daemon, "_peer_uid", lambda connection: os.getuid() + 1)
+        with pytest.raises(ApiError) as exc:
+            service.submit(VIDEO_URL, str(tmp_path / "music"), use_auth=True)
+        assert exc.value.status == 403
+        with pytest.raises(ApiError) as exc:
+            service.submit(VIDEO_URL, str(tmp_path / "elsewhere"))
+        assert exc.value.status == 403
+        assert service.submit(VIDEO_URL, str(tmp_path / "music"))["url_type"] == "Video"
+
+
+class TestTcpApi:
+    """Tests for refusing requests a web page could send to the TCP port."""
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path / "config")
+        monkeypatch.setattr(download, "download_thread", fake_download)
+        server, stop = serve(make_daemon(tmp_path), "127.0.0.1:0")
+        yield "127.0.0.1:{}".format(server.server_address[1])
+        stop()
+
+    def post(self, address, headers, body=None):
+        """Submit a job with raw headers; returns the response status."""
+        host, port = address.split(":")
+        connection = http.client.HTTPConnection(host, int(port), timeout=5)
+        payload = json.dumps(body or {"url": VIDEO_URL, "output": "/tmp"})
+        try:
+            connection.request("POST", "/api/jobs", body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        return response.status
+
+    def test_token_file_is_private(self, service):
+        path = client.token_path()
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert client.read_token() == path.read_text().strip()
+
+    def test_client_sends_the_token(self, service, tmp_path):
+        api = client.DaemonClient(service)
+        assert api.submit(VIDEO_URL, str(tmp_path / "music"))["url_type"] == "Video"
+
+    @pytest.mark.parametrize("headers, status", [
+        ({"Content-Type": "application/json"}, 401),
+        ({"Content-Type": "text/plain", "Authorization": None}, 415),
+        ({"Content-Type": "application/json", "Authorization": None, "Origin": "https://evil.example"}, 403),
+        ({"Content-Type": "application/json", "Authorization": None, "Host": "evil.example"}, 403),
+    ])
+    def test_refused_requests(self, service, tmp_path, headers, status):
+        if "Authorization" in headers:
+            headers["Authorization"] = "Bearer {}".format(client.read_token())
+        body = {"url": VIDEO_URL, "output": str(tmp_path / "created")}
+        assert self.post(service, headers, body) == status
+        assert not (tmp_path / "created").exists()
+
+    def test_metrics_need_no_token(self, service):
+        host, port = service.split(":")
+        connection = http.client.HTTPConnection(host, int(port), timeout=5)
+        try:
+            connection.request("GET", "/metrics")
+            assert connection.getresponse().status == 200
+        finally:
+            connection.close()
@@ -0,0 +1,193 @@
+"""Tests for youtubemp3downloader.engine module."""
+
+import types
+
+import pytest
+
+from youtubemp3downloader import engine, events
+from youtubemp3downloader.exceptions import DownloadError
+
+
+class FakeDownloadCancelled(Exception):
+    pass
+
+
+class FakeDownloadError(Exception):
+    pass
+
+
+class FakeYoutubeDL:
+    """Stand-in for yt_dlp.YoutubeDL that replays a scripted download."""
+
+    instances = []
+
+    def __init__(self, params):
+        self.params = params
+        self.downloads = []
+        self.closed = False
+        FakeYoutubeDL.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+    def extract_info(self, url, download=True, extra_info=None, process=True):
+        if not download:
+            entries = [{"id": "aaaaaaaaaaa", "title": "First"}, {"id": "bbbbbbbbbbb", "title": "Second"}]
+            return {"entries": (entry for entry in entries)}
+        self.downloads.append((url, extra_info))
+        info = {"id": url[-11:], "title": "Song", "playlist_index": 1, "n_entries": 2}
+        hook = self.params["progress_hooks"][0]
+        self.params["logger"].debug("[download] Destination: /tmp/Song.webm")
+        hook({"status": "downloading", "filename": "/tmp/Song.webm", "info_dict": info,
+              "downloaded_bytes": 50, "total_bytes": 100, "speed": 2048, "eta": 5})
+        hook({"status": "finished", "filename": "/tmp/Song.webm", "info_dict": info})
+        self.params["postprocessor_hooks"][0]({
+            "status": "finished",
+            "postprocessor": "MoveFilesAfterDownload",
+            "info_dict": {"filepath": "/tmp/Song.mp3"},
+        })
+        return info
+
+
+@pytest.fixture
+def fake_yt_dlp(monkeypatch):
+    FakeYoutubeDL.instances = []
+    module = types.SimpleNamespace(
+        YoutubeDL=FakeYoutubeDL,
+        utils=types.SimpleNamespace(DownloadCancelled=FakeDownloadCancelled, DownloadError=FakeDownloadError),
+    )
+    monkeypatch.setattr(engine, "yt_dlp", module)
+    return module
+
+
+class TestBuildOptions:
+    """Tests for build_options function."""
+
+    def test_mp3_extraction(self):
+        options = engine.build_options("/tmp/%(title)s.%(ext)s")
+        keys = [pp["key"] for pp in options["postprocessors"]]
+        assert keys == ["FFmpegExtractAudio", "FFmpegMetadata", "EmbedThumbnail"]
+        assert options["postprocessor_args"] == {"ffmpeg": ["-b:a", "320k"]}
+        assert options["outtmpl"] == {"default": "/tmp/%(title)s.%(ext)s"}
+
+    def test_pipeline_stage_skips_extraction(self):
+        options = engine.build_options("/tmp/x", extract_audio=False)
+        keys = [pp["key"] for pp in options["postprocessors"]]
+        assert "FFmpegExtractAudio" not in keys
+        assert "postprocessor_args" not in options
+
+    def test_stored_cover_is_not_fetched(self):
+        options = engine.build_options("/tmp/x", fetch_thumbnail=False)
+        assert options["writethumbnail"] is False
+        assert "EmbedThumbnail" not in [pp["key"] for pp in options["postprocessors"]]
+        options = engine.build_options("/tmp/x", extract_audio=False, fetch_thumbnail=False)
+        assert "FFmpegThumbnailsConvertor" not in [pp["key"] for pp in options["postprocessors"]]
+
+    def test_auth_and_items(self):
+        options = engine.build_options("/tmp/x", use_auth=True, auth_browser="brave", playlist_items="1-3")
+        assert options["cookiesfrombrowser"] == ("brave",)
+        assert options["playlist_items"] == "1-3"
+
+    def test_download_archive(self):
+        assert "download_archive" not in engine.build_options("/tmp/x")
+        options = engine.build_options("/tmp/x", download_archive="/tmp/archive.txt")
+        assert options["download_archive"] == "/tmp/archive.txt"
+
+
+class TestInProcessEngine:
+    """Tests for InProcessEngine class."""
+
+    def test_unavailable_raises(self, monkeypatch):
+        monkeypatch.setattr(engine, "yt_dlp", None)
+        assert not engine.is_available()
+        with pytest.raises(DownloadError):
+            engine.InProcessEngine("/tmp/x", lambda event: None)
+
+    def test_events_from_hooks(self, fake_yt_dlp):
+        received = []
+        ydl_engine = engine.InProcessEngine("/tmp/x", received.append)
+        assert ydl_engine.download("https://www.youtube.com/watch?v=aaaaaaaaaaa") == 0
+
+        kinds = [type(event) for event in received]
+        assert events.ItemStart in kinds
+        assert events.Destination(path="/tmp/Song.webm") in received
+        assert events.PostprocessDone(path="/tmp/Song.mp3") in received
+        progress = [event for event in received if isinstance(event, events.Progress)]
+        assert progress[0].percent == 50.0
+        assert progress[0].speed == "2.00KiB/s"
+        assert progress[0].eta == "00:05"
+
+    def test_instance_reused_across_items(self, fake_yt_dlp):
+        ydl_engine = engine.InProcessEngine("/tmp/x", lambda event: None)
+        ydl_engine.download("https://www.youtube.com/watch?v=aaaaaaaaaaa", extra_info={"ytmp3_prefix": "1 - "})
+        ydl_engine.download("https://www.youtube.com/watch?v=bbbbbbbbbbb", extra_info={"ytmp3_prefix": "2 - "})
+        assert len(FakeYoutubeDL.instances) == 1
+        assert len(FakeYoutubeDL.instances[0].downloads) == 2
+        ydl_engine.close()
+        assert FakeYoutubeDL.instances[0].closed
+
+    def test_thumbnail_is_fetched_per_item(self, fake_yt_dlp):
+        ydl_engine = engine.InProcessEngine("/tmp/x", lambda event: None)
+        params = FakeYoutubeDL.instances[0].params
+        ydl_engine.download("https://www.youtube.com/watch?v=aaaaaaaaaaa", fetch_thumbnail=False)
+        assert params["writethumbnail"] is False
+        ydl_engine.download("https://www.youtube.com/watch?v=bbbbbbbbbbb")
+        assert params["writethumbnail"] is True
+
+    def test_rate_limiter_gets_received_bytes(self, fake_yt_dlp):
+        calls = []
+        ydl_engine = engine.InProcessEngine("/tmp/x", lambda event: None, rate_limiter=lambda n, stop: calls.append(n))
+        ydl_engine.download("https://www.youtube.com/watch?v=aaaaaaaaaaa")
+        ydl_engine.download("https://www.youtube.com/watch?v=bbbbbbbbbbb")
+        assert calls == [50, 50]
+
+    def test_stop_cancels_download(self, fake_yt_dlp):
+        ydl_engine = engine.InProcessEngine("/tmp/x", lambda event: None)
+        ydl_engine.stop_event.set()
+        assert ydl_engine.download("https://www.youtube.com/watch?v=aaaaaaaaaaa") == 1
+
+    def test_logged_errors_become_events(self, fake_yt_dlp):
+        received = []
+        ydl_engine = engine.InProcessEngine("/tmp/x", received.append)
+        ydl_engine._ydl.params["logger"].error("ERROR: [youtube] aaaaaaaaaaa: Video unavailable")
+        assert events.ItemError("ERROR: [youtube] aaaaaaaaaaa: Video unavailable") in received
+
+    def test_already_downloaded_is_skipped(self, fake_yt_dlp):
+        received = []
+        ydl_engine = engine.InProcessEngine("/tmp/x", received.append)
+        ydl_engine._ydl.params["logger"].debug("[download] /tmp/Song.mp3 has already been downloaded")
+        assert events.Skipped("/tmp/Song.mp3") in received
+
+
+class TestFetchPlaylistInfo:
+    """Tests for fetch_playlist_info function."""
+
+    def test_entries_in_order(self, fake_yt_dlp):
+        info = engine.fetch_playlist_info("https://www.youtube.com/playlist?list=PLxxxxxxxxxxxxx")
+        assert list(info.items()) == [("aaaaaaaaaaa", "1 - First"), ("bbbbbbbbbbb", "2 - Second")]
+
+    def test_iter_entries_is_lazy(self, fake_yt_dlp):
+        entries = engine.iter_playlist_entries("https://www.youtube.com/playlist?list=PLxxxxxxxxxxxxx")
+        assert next(entries) == ("aaaaaaaaaaa", "1 - First")
+        entries.close()
+        assert FakeYoutubeDL.instances[-1].closed
+
+
+class TestFormatting:
+    """Tests for the yt-dlp style formatting helpers."""
+
+    def test_format_speed(self):
+        assert events.format_speed(512) == "512.00B/s"
+        assert events.format_speed(1.5 * 1024 * 1024) == "1.50MiB/s"
+        assert events.format_speed(None) is None
+
+    def test_format_eta(self):
+        assert events.format_eta(65) == "01:05"
+        assert events.format_eta(3725) == "01:02:05"
+        assert events.format_eta(None) is None
@@ -0,0 +1,138 @@
+"""Tests for youtubemp3downloader.enumeration module."""
+
+import os
+import stat
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from youtubemp3downloader import enumeration
+from youtubemp3downloader.exceptions import DownloadError
+
+URL = "https://www.youtube.com/playlist?list=PLxxxxxxxxxxxxx"
+
+
+@pytest.fixture
+def fake_yt_dlp(tmp_path, monkeypatch):
+    """Install a scriptable yt-dlp executable at the front of PATH."""
+
+    def install(body):
+        script = tmp_path / "yt-dlp"
+        script.write_text("#!{}\nimport sys, time\n{}\n".format(sys.executable, body))
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        monkeypatch.setenv("PATH", "{}{}{}".format(tmp_path, os.pathsep, os.environ.get("PATH", "")))
+
+    return install
+
+
+class TestBuildCommand:
+    """Tests for the build_command function."""
+
+    def test_without_auth(self):
+        cmd = enumeration.build_command(URL)
+        assert cmd == ["yt-dlp", "--flat-playlist", "--print", enumeration.PRINT_TEMPLATE, URL]
+
+    def test_with_auth(self):
+        cmd = enumeration.build_command(URL, use_auth=True, auth_browser="brave")
+        assert cmd[-3:] == ["--cookies-from-browser", "brave", URL]
+
+
+class TestParseEntry:
+    """Tests for the parse_entry function."""
+
+    def test_entry(self):
+        entry = enumeration.parse_entry("abc:::1 - Title ::: with separator\n")
+        assert entry == ("abc", "1 - Title ::: with separator")
+
+    def test_other_output(self):
+        assert enumeration.parse_entry("WARNING: something") is None
+
+    def test_missing_id(self):
+        assert enumeration.parse_entry(":::1 - Title") is None
+
+    def test_line_with_duration(self):
+        assert enumeration.parse_line("abc:::213.0:::1 - Title") == ("abc", "1 - Title", 213.0)
+        assert enumeration.parse_entry("abc:::213.0:::1 - Title") == ("abc", "1 - Title")
+
+    def test_line_without_duration(self):
+        assert enumeration.parse_line("abc::::::1 - Title") == ("abc", "1 - Title", None)
+        assert enumeration.parse_line("abc:::1 - Title") == ("abc", "1 - Title", None)
+
+
+class TestStreamPlaylist:
+    """Tests for the stream_playlist generator."""
+
+    def test_yields_entries_in_order(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('[youtube:tab] Downloading page', flush=True)\n"
+            "for i in range(1, 4):\n"
+            "    print('id{0}:::{0} - Song {0}'.format(i), flush=True)"
+        )
+        entries = list(enumeration.stream_playlist(URL))
+        assert entries == [("id1", "1 - Song 1"), ("id2", "2 - Song 2"), ("id3", "3 - Song 3")]
+
+    def test_collects_durations(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('id1:::185.0:::1 - Song 1', flush=True)\n"
+            "print('id2::::::2 - Live', flush=True)"
+        )
+        durations = {}
+        entries = list(enumeration.stream_playlist(URL, durations=durations))
+        assert entries == [("id1", "1 - Song 1"), ("id2", "2 - Live")]
+        assert durations == {"id1": 185.0}
+
+    def test_entries_arrive_before_process_exits(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('id1:::1 - First', flush=True)\n"
+            "time.sleep(30)"
+        )
+        stream = enumeration.stream_playlist(URL)
+        assert next(stream) == ("id1", "1 - First")
+        stream.close()
+
+    def test_inactivity_timeout(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('id1:::1 - First', flush=True)\n"
+            "time.sleep(30)"
+        )
+        stream = enumeration.stream_playlist(URL, inactivity_timeout=0.5)
+        assert next(stream) == ("id1", "1 - First")
+        with pytest.raises(subprocess.TimeoutExpired):
+            next(stream)
+
+    def test_slow_but_steady_output_is_not_a_timeout(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "for i in range(1, 6):\n"
+            "    time.sleep(0.2)\n"
+            "    print('id{0}:::{0} - Song'.format(i), flush=True)"
+        )
+        entries = list(enumeration.stream_playlist(URL, inactivity_timeout=0.6))
+        assert len(entries) == 5
+
+    def test_failure_without_entries(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('ERROR: The playlist does not exist', flush=True)\n"
+            "sys.exit(1)"
+        )
+        with pytest.raises(DownloadError, match="does not exist"):
+            list(enumeration.stream_playlist(URL))
+
+    def test_failure_after_entries_keeps_them(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('id1:::1 - First', flush=True)\n"
+            "sys.exit(1)"
+        )
+        assert list(enumeration.stream_playlist(URL)) == [("id1", "1 - First")]
+
+    def test_stop_event_ends_stream(self, fake_yt_dlp):
+        fake_yt_dlp(
+            "print('id1:::1 - First', flush=True)\n"
+            "time.sleep(30)"
+        )
+        stop = threading.Event()
+        stream = enumeration.stream_playlist(URL, stop_event=stop)
+        assert next(stream) == ("id1", "1 - First")
+        stop.set()
+        assert list(stream) == []
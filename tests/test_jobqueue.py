@@ -0,0 +1,269 @@
+"""Tests for youtubemp3downloader.jobqueue module."""
+
+import subprocess
+import sys
+
+from youtubemp3downloader import config, jobqueue, journal
+
+URL = "https://www.youtube.com/playlist?list=PL1234567890abcdef"
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def playlist(count):
+    return {"v{:010d}".format(i): "{} - Title {}".format(i, i) for i in range(1, count + 1)}
+
+
+def make_job(url=URL, count=0, playlist_items=None):
+    url_type = "Playlist" if url == URL else "Video"
+    return jobqueue.QueuedJob(url, url_type, "/music", playlist_items=playlist_items, playlist_info=playlist(count))
+
+
+class RecordingSink:
+    """Job sink that records what a run forwards to it."""
+
+    def __init__(self):
+        self.lines = []
+        self.messages = []
+        self.notifications = []
+        self.finished = []
+
+    def job_log(self, run, message, progress):
+        self.lines.append((message, progress))
+
+    def job_message(self, run, message, error):
+        self.messages.append((message, error))
+
+    def job_notify(self, run, title, message, icon):
+        self.notifications.append(title)
+
+    def job_finished(self, run):
+        self.finished.append(run)
+
+
+class TestQueuedJob:
+    """Tests for the QueuedJob class."""
+
+    def test_pending_follows_selection(self):
+        assert make_job(count=6).pending == [1, 2, 3, 4, 5, 6]
+        assert make_job(count=6, playlist_items="2-3,9").pending == [2, 3]
+
+    def test_size(self):
+        assert make_job(count=6, playlist_items="1-2").size == 2
+        assert make_job().size == jobqueue.UNKNOWN_PLAYLIST_SIZE
+        assert make_job(VIDEO_URL).size == 1
+
+    def test_record_round_trip(self):
+        job = make_job(count=6, playlist_items="1-4")
+        job.pending = [3, 4]
+        job.journal_id = "abc"
+        job.durations = {"v0000000003": 213.0}
+        copy = jobqueue.QueuedJob.from_record(job.to_record())
+        assert (copy.job_id, copy.pending, copy.journal_id) == (job.job_id, [3, 4], "abc")
+        assert list(copy.playlist_info.items()) == list(job.playlist_info.items())
+        assert copy.durations == {"v0000000003": 213.0}
+        assert copy.pending_durations() == [213.0]
+
+
+class TestPolicies:
+    """Tests for the scheduling policies."""
+
+    def test_make_policy(self):
+        assert isinstance(jobqueue.make_policy(jobqueue.POLICY_ROUND_ROBIN), jobqueue.RoundRobinPolicy)
+        assert isinstance(jobqueue.make_policy("unknown"), jobqueue.FifoPolicy)
+        assert isinstance(jobqueue.make_policy(None), jobqueue.FifoPolicy)
+
+    def test_shortest_first(self):
+        big, video, small = make_job(count=40), make_job(VIDEO_URL), make_job(count=3)
+        policy = jobqueue.ShortestFirstPolicy()
+        assert policy.choose([big, small, video]) is video
+        assert policy.choose([big, small]) is small
+        assert policy.batch(big) is None
+
+    def test_shortest_first_uses_durations(self):
+        long_job, short_job = make_job(count=2), make_job(count=3)
+        long_job.durations = {video_id: 3600.0 for video_id in long_job.playlist_info}
+        short_job.durations = {video_id: 180.0 for video_id in short_job.playlist_info}
+        assert jobqueue.ShortestFirstPolicy().choose([long_job, short_job]) is short_job
+
+    def test_unknown_durations_count_as_average(self):
+        known, unknown = make_job(count=2), make_job(count=3)
+        known.durations = {video_id: 600.0 for video_id in known.playlist_info}
+        # Three videos of unknown length weigh as three average videos
+        assert unknown.estimated_seconds(600.0) == 1800.0
+        assert jobqueue.ShortestFirstPolicy().choose([unknown, known]) is known
+
+    def test_round_robin_batches(self):
+        policy = jobqueue.RoundRobinPolicy(chunk_size=2)
+        assert policy.batch(make_job(count=5)) == [1, 2]
+        assert policy.batch(make_job()) is None
+
+
+class TestJobQueue:
+    """Tests for the JobQueue class."""
+
+    def make_queue(self, tmp_path, **kwargs):
+        return jobqueue.JobQueue(tmp_path / "queue.json", **kwargs)
+
+    def test_default_path_is_in_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert jobqueue.JobQueue().path == tmp_path / jobqueue.QUEUE_FILENAME
+
+    def test_concurrency_limit(self, tmp_path):
+        queue = self.make_queue(tmp_path, max_running=2)
+        first, second, third = (queue.add(make_job()) for _ in range(3))
+        assert queue.next_job() == (first, None)
+        assert queue.next_job() == (second, None)
+        assert queue.next_job() is None
+        assert third.state == jobqueue.QUEUED
+
+        queue.finish_run(first, None, jobqueue.DONE)
+        assert queue.next_job() == (third, None)
+        assert [job.number for job in queue.jobs] == [1, 2, 3]
+
+    def test_move_and_remove(self, tmp_path):
+        queue = self.make_queue(tmp_path)
+        first, second, third = (queue.add(make_job()) for _ in range(3))
+        assert queue.move(third.job_id, -1)
+        assert not queue.move(first.job_id, -1)
+        assert queue.jobs == [first, third, second]
+        assert queue.remove(third.job_id) is third
+        assert queue.remove("missing") is None
+        assert queue.jobs == [first, second]
+
+    def test_round_robin_takes_turns(self, tmp_path):
+        queue = self.make_queue(tmp_path, policy=jobqueue.RoundRobinPolicy(chunk_size=2))
+        big = queue.add(make_job(count=5))
+        small = queue.add(make_job(count=2))
+
+        order = []
+        while True:
+            picked = queue.next_job()
+            if picked is None:
+                break
+            job, batch = picked
+            order.append((job.number, batch))
+            queue.finish_run(job, batch, jobqueue.DONE)
+
+        assert order == [(1, [1, 2]), (2, None), (1, [3, 4]), (1, None)]
+        assert big.state == small.state == jobqueue.DONE
+
+    def test_failed_turn_keeps_unfinished_videos(self, tmp_path):
+        queue = self.make_queue(tmp_path, policy=jobqueue.RoundRobinPolicy(chunk_size=3))
+        job = queue.add(make_job(count=5))
+        _, batch = queue.next_job()
+        # Video 1 done, video 2 failed, video 3 never started
+        queue.finish_run(job, batch, jobqueue.FAILED, {1: journal.DONE, 2: journal.FAILED})
+        assert job.state == jobqueue.QUEUED
+        assert job.pending == [3, 4, 5, 2]
+
+        _, batch = queue.next_job()
+        queue.finish_run(job, batch, jobqueue.FAILED, {3: journal.DONE, 4: journal.DONE, 5: journal.FAILED})
+        assert job.pending == [2, 5]
+        # The final turn succeeds only for the retried videos that failed before
+        _, batch = queue.next_job()
+        assert batch is None
+        queue.finish_run(job, batch, jobqueue.DONE)
+        assert job.state == jobqueue.DONE
+
+    def test_earlier_failures_fail_the_job(self, tmp_path):
+        queue = self.make_queue(tmp_path, policy=jobqueue.RoundRobinPolicy(chunk_size=1))
+        job = queue.add(make_job(count=3))
+        for outcome in (journal.FAILED, journal.FAILED, journal.DONE, journal.FAILED):
+            _, batch = queue.next_job()
+            queue.finish_run(job, batch, jobqueue.DONE, {batch[0]: outcome})
+        assert job.pending == [2]
+        assert job.failed_items == {1}
+        copy = jobqueue.QueuedJob.from_record(job.to_record())
+        assert (copy.retried, copy.failed_items) == ({1, 2}, {1})
+        # The last turn succeeds, but video 1 never did
+        _, batch = queue.next_job()
+        assert batch is None
+        queue.finish_run(job, batch, jobqueue.DONE)
+        assert job.state == jobqueue.FAILED
+
+    def test_turn_without_progress_fails_the_job(self, tmp_path):
+        queue = self.make_queue(tmp_path, policy=jobqueue.RoundRobinPolicy(chunk_size=2))
+        job = queue.add(make_job(count=5))
+        _, batch = queue.next_job()
+        queue.finish_run(job, batch, jobqueue.FAILED, {})
+        assert job.state == jobqueue.FAILED
+        assert job.pending == [1, 2, 3, 4, 5]
+
+    def test_cancelled_turn_ends_the_job(self, tmp_path):
+        queue = self.make_queue(tmp_path, policy=jobqueue.RoundRobinPolicy(chunk_size=2))
+        job = queue.add(make_job(count=5))
+        _, batch = queue.next_job()
+        queue.finish_run(job, batch, jobqueue.CANCELLED)
+        assert job.state == jobqueue.CANCELLED
+        assert job.pending == [1, 2, 3, 4, 5]
+        assert queue.clear_finished() == 1
+
+    def test_save_and_load(self, tmp_path):
+        queue = self.make_queue(tmp_path)
+        running = queue.add(make_job(count=3))
+        waiting = queue.add(make_job(VIDEO_URL))
+        finished = queue.add(make_job())
+        queue.next_job()
+        finished.state = jobqueue.DONE
+        queue.save()
+
+        restored = self.make_queue(tmp_path)
+        assert restored.load() == 2
+        assert [job.job_id for job in restored.jobs] == [running.job_id, waiting.job_id]
+        assert all(job.state == jobqueue.QUEUED for job in restored.jobs)
+        assert restored.jobs[0].pending == [1, 2, 3]
+
+    def test_unreadable_file(self, tmp_path):
+        (tmp_path / "queue.json").write_text("{not json")
+        assert self.make_queue(tmp_path).load() == 0
+
+
+class TestJobRun:
+    """Tests for the JobRun class."""
+
+    def test_forwards_to_sink(self):
+        sink = RecordingSink()
+        run = jobqueue.JobRun(make_job(count=3), sink)
+        run.post_log("line", progress=True)
+        run.log_message("done")
+        run.report("ok")
+        run.notify("Title", "body")
+        run.finished()
+        assert sink.lines == [("line", True), ("done", False)]
+        assert sink.messages == [("ok", False)]
+        assert sink.notifications == ["Title"]
+        assert sink.finished == [run]
+        assert not run.failed
+        run.report("boom", error=True)
+        assert run.failed
+
+    def test_progress_is_kept_on_the_job(self):
+        run = jobqueue.JobRun(make_job(), RecordingSink())
+        run.post_progress(0.5)
+        run.post_progress(text="Downloading")
+        assert (run.job.fraction, run.job.status) == (0.5, "Downloading")
+
+    def test_item_outcomes_by_index(self):
+        run = jobqueue.JobRun(make_job(count=3), RecordingSink(), batch=[1, 2, 3])
+        run.record_item("v0000000001", journal.DONE)
+        run.record_item("v0000000002", journal.DOWNLOADING)
+        run.record_item("v0000000003", journal.FAILED)
+        assert run.item_outcomes() == {1: journal.DONE, 3: journal.FAILED}
+
+    def test_playlist_items(self):
+        job = make_job(count=6, playlist_items="1-4")
+        job.pending = [3, 4]
+        assert jobqueue.JobRun(job, RecordingSink()).playlist_items == "3-4"
+        assert jobqueue.JobRun(job, RecordingSink(), batch=[3]).playlist_items == "3"
+        assert not jobqueue.JobRun(job, RecordingSink(), batch=[3]).is_final
+        assert jobqueue.JobRun(make_job(), RecordingSink()).playlist_items is None
+
+    def test_stop_terminates_processes(self):
+        run = jobqueue.JobRun(make_job(), RecordingSink())
+        assert run.stop() == 0
+        assert run.download_stopped.is_set() and run.download_cancel_requested.is_set()
+
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        run.active_processes.add(process)
+        assert run.stop() == 1
+        assert process.poll() is not None
@@ -0,0 +1,150 @@
+"""Tests for youtubemp3downloader.journal module."""
+
+from youtubemp3downloader import config, journal
+
+URL = "https://www.youtube.com/playlist?list=PL1234567890abcdef"
+PLAYLIST_INFO = {"v{:010d}".format(i): "{} - Title {}".format(i, i) for i in range(1, 7)}
+IDS = list(PLAYLIST_INFO)
+
+
+def make_journal(tmp_path, **kwargs):
+    return journal.JobJournal(tmp_path / "jobs.journal", sync=False, **kwargs)
+
+
+class TestJournalJob:
+    """Tests for the JournalJob class."""
+
+    def test_remaining_items_skip_finished(self):
+        job = journal.JournalJob("j", URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        job.states = {
+            IDS[0]: journal.DONE, IDS[1]: journal.FAILED, IDS[2]: journal.DOWNLOADING, IDS[4]: journal.SKIPPED
+        }
+        assert job.remaining_indices() == [3, 4, 6]
+        assert job.remaining_items() == "3-4,6"
+
+    def test_remaining_items_respect_selection(self):
+        job = journal.JournalJob("j", URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO, selected="2-4")
+        job.states = {IDS[1]: journal.DONE}
+        assert job.remaining_items() == "3-4"
+
+    def test_unknown_entries(self):
+        job = journal.JournalJob("j", URL, "Playlist", "/music")
+        assert job.remaining_items() is None
+
+    def test_record_round_trip(self):
+        job = journal.JournalJob("j", URL, "Playlist", "/music", True, "brave", PLAYLIST_INFO, "1-3", 12.5)
+        copy = journal.JournalJob.from_record(job.to_record())
+        assert list(copy.playlist_info.items()) == list(PLAYLIST_INFO.items())
+        assert (copy.use_auth, copy.auth_browser, copy.selected, copy.created_at) == (True, "brave", "1-3", 12.5)
+
+
+class TestJobJournal:
+    """Tests for the JobJournal class."""
+
+    def test_default_path_is_in_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert journal.JobJournal().path == tmp_path / journal.JOURNAL_FILENAME
+
+    def test_unfinished_job_is_replayed(self, tmp_path):
+        jobs = make_journal(tmp_path)
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        jobs.mark(job_id, IDS[0], journal.DOWNLOADING)
+        jobs.mark(job_id, IDS[0], journal.DONE)
+        jobs.mark(job_id, IDS[1], journal.DOWNLOADING)
+        jobs.close()
+
+        unfinished = make_journal(tmp_path).unfinished()
+        assert [job.job_id for job in unfinished] == [job_id]
+        assert unfinished[0].remaining_items() == "2-6"
+
+    def test_finished_jobs_are_not_offered(self, tmp_path):
+        jobs = make_journal(tmp_path)
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        jobs.finish(job_id)
+        other = jobs.begin(URL, "Playlist", "/music")
+        jobs.finish(other, journal.CANCELLED)
+        assert jobs.unfinished() == []
+
+    def test_newest_first(self, tmp_path, monkeypatch):
+        jobs = make_journal(tmp_path)
+        monkeypatch.setattr(journal.time, "time", lambda: 100.0)
+        first = jobs.begin(URL, "Playlist", "/music")
+        monkeypatch.setattr(journal.time, "time", lambda: 200.0)
+        second = jobs.begin(URL, "Playlist", "/other")
+        assert [job.job_id for job in jobs.unfinished()] == [second, first]
+
+    def test_torn_record_is_ignored(self, tmp_path):
+        jobs = make_journal(tmp_path)
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        jobs.mark(job_id, IDS[0], journal.DONE)
+        jobs.close()
+        with open(jobs.path, "a") as f:
+            f.write('{"op": "item", "job": "' + job_id + '", "id": "' + IDS[1])
+
+        reopened = make_journal(tmp_path)
+        reopened.mark(job_id, IDS[2], journal.DONE)
+        job = reopened.unfinished()[0]
+        assert job.states == {IDS[0]: journal.DONE, IDS[2]: journal.DONE}
+
+    def test_compaction_keeps_only_unfinished_state(self, tmp_path):
+        jobs = make_journal(tmp_path)
+        done = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        jobs.finish(done)
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        for video_id in IDS[:3]:
+            jobs.mark(job_id, video_id, journal.DOWNLOADING)
+            jobs.mark(job_id, video_id, journal.DONE)
+        jobs.compact()
+
+        lines = jobs.path.read_text().splitlines()
+        assert len(lines) == 4
+        assert jobs.unfinished()[0].remaining_items() == "4-6"
+
+        jobs.mark(job_id, IDS[3], journal.DONE)
+        assert jobs.unfinished()[0].remaining_items() == "5-6"
+
+    def test_compacts_after_many_records(self, tmp_path):
+        jobs = make_journal(tmp_path, compact_after=10)
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        for _ in range(5):
+            for video_id in IDS:
+                jobs.mark(job_id, video_id, journal.DOWNLOADING)
+                jobs.mark(job_id, video_id, journal.PENDING)
+        assert len(jobs.path.read_text().splitlines()) < 10
+        assert jobs.unfinished()[0].remaining_items() == "1-6"
+
+    def test_only_transitions_are_written(self, tmp_path):
+        jobs = make_journal(tmp_path)
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        for _ in range(3):
+            jobs.mark(job_id, IDS[0], journal.DOWNLOADING)
+        jobs.mark(job_id, IDS[0], journal.DONE)
+        jobs.mark(job_id, IDS[0], journal.DONE)
+        assert len(jobs.path.read_text().splitlines()) == 3
+
+    def test_group_commit(self, tmp_path, monkeypatch):
+        synced = []
+        now = [100.0]
+        monkeypatch.setattr(journal.os, "fsync", synced.append)
+        monkeypatch.setattr(journal.time, "monotonic", lambda: now[0])
+        jobs = journal.JobJournal(tmp_path / "jobs.journal")
+        job_id = jobs.begin(URL, "Playlist", "/music", playlist_info=PLAYLIST_INFO)
+        assert len(synced) == 1
+
+        # In-progress states share one fsync per interval
+        jobs.mark(job_id, IDS[0], journal.DOWNLOADING)
+        jobs.mark(job_id, IDS[1], journal.DOWNLOADING)
+        assert len(synced) == 1
+        now[0] += journal.SYNC_INTERVAL
+        jobs.mark(job_id, IDS[2], journal.DOWNLOADING)
+        assert len(synced) == 2
+
+        # Finished items and jobs are on disk before the call returns
+        jobs.mark(job_id, IDS[0], journal.DONE)
+        jobs.mark(job_id, IDS[1], journal.FAILED)
+        assert len(synced) == 4
+        jobs.mark(job_id, IDS[3], journal.DOWNLOADING)
+        jobs.close()
+        assert len(synced) == 5
+        jobs.finish(job_id)
+        assert len(synced) == 6
@@ -0,0 +1,225 @@
+"""Tests for youtubemp3downloader.library module."""
+
+import os
+import struct
+
+from youtubemp3downloader import config, library
+
+VIDEO_ID = "dQw4w9WgXcQ"
+URL = "https://www.youtube.com/watch?v=" + VIDEO_ID
+
+
+def syncsafe(value):
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def frame(frame_id, body, version=4):
+    size = syncsafe(len(body)) if version == 4 else struct.pack(">I", len(body))
+    return frame_id + size + b"\0\0" + body
+
+
+def write_mp3(path, frames, version=4, padding=64):
+    tag = b"".join(frames) + b"\0" * padding
+    header = b"ID3" + bytes([version, 0, 0]) + syncsafe(len(tag))
+    path.write_bytes(header + tag + b"\xff\xfb" + b"\0" * 256)
+    return str(path)
+
+
+def purl_frame(url=URL, version=4):
+    return frame(b"TXXX", b"\x03purl\x00" + url.encode(), version)
+
+
+def picture_frame(version=4):
+    return frame(b"APIC", b"\x00image/jpeg\x00\x03\x00" + b"\xff" * 4096, version)
+
+
+def ogg_pages(packet):
+    lacing = [255] * (len(packet) // 255) + [len(packet) % 255]
+    pages, offset = [], 0
+    for start in range(0, len(lacing), 255):
+        table = lacing[start:start + 255]
+        body = packet[offset:offset + sum(table)]
+        offset += len(body)
+        pages.append(b"OggS\0\0" + b"\0" * 20 + bytes([len(table)] + table) + body)
+    return b"".join(pages)
+
+
+def write_opus(path, comments):
+    tags = b"OpusTags" + struct.pack("<I", 6) + b"ffmpeg" + struct.pack("<I", len(comments))
+    tags += b"".join(struct.pack("<I", len(c)) + c for c in comments)
+    path.write_bytes(ogg_pages(b"OpusHead" + b"\0" * 11) + ogg_pages(tags) + ogg_pages(b"\0" * 64))
+    return str(path)
+
+
+def atom(kind, body):
+    return struct.pack(">I", len(body) + 8) + kind + body
+
+
+def write_m4a(path, items):
+    data = b"".join(atom(kind, atom(b"data", b"\0\0\0\x01\0\0\0\0" + value)) for kind, value in items)
+    ilst = atom(b"ilst", data)
+    moov = atom(b"moov", atom(b"udta", atom(b"meta", b"\0" * 4 + atom(b"hdlr", b"\0" * 25) + ilst)))
+    # ffmpeg writes the media data first and the metadata at the end
+    path.write_bytes(atom(b"ftyp", b"M4A \0\0\0\0") + atom(b"mdat", b"\0" * 256) + moov)
+    return str(path)
+
+
+class TestReadVideoId:
+    """Tests for the read_video_id function."""
+
+    def test_purl_tag(self, tmp_path):
+        path = write_mp3(tmp_path / "a.mp3", [frame(b"TIT2", b"\x03Song"), purl_frame()])
+        assert library.read_video_id(path) == VIDEO_ID
+
+    def test_comment_after_cover_art(self, tmp_path):
+        comment = frame(b"COMM", b"\x01eng" + "﻿\x00".encode("utf-16-le") + URL.encode("utf-16"))
+        path = write_mp3(tmp_path / "a.mp3", [picture_frame(), comment])
+        assert library.read_video_id(path) == VIDEO_ID
+
+    def test_id3v23(self, tmp_path):
+        path = write_mp3(tmp_path / "a.mp3", [picture_frame(3), purl_frame(version=3)], version=3)
+        assert library.read_video_id(path) == VIDEO_ID
+
+    def test_short_url(self, tmp_path):
+        path = write_mp3(tmp_path / "a.mp3", [frame(b"WOAS", b"https://youtu.be/" + VIDEO_ID.encode())])
+        assert library.read_video_id(path) == VIDEO_ID
+
+    def test_untagged_or_unrelated(self, tmp_path):
+        plain = tmp_path / "plain.mp3"
+        plain.write_bytes(b"\xff\xfb" + b"\0" * 64)
+        assert library.read_video_id(str(plain)) is None
+        other = write_mp3(tmp_path / "other.mp3", [purl_frame("https://example.com/track")])
+        assert library.read_video_id(other) is None
+        assert library.read_video_id(str(tmp_path / "missing.mp3")) is None
+
+    def test_opus_comment_after_cover_art(self, tmp_path):
+        # The cover comment is longer than one Ogg page
+        cover = b"METADATA_BLOCK_PICTURE=" + b"A" * 70000
+        path = write_opus(tmp_path / "a.opus", [b"title=Song", cover, b"PURL=" + URL.encode()])
+        assert library.read_video_id(path) == VIDEO_ID
+
+    def test_opus_ignores_description(self, tmp_path):
+        path = write_opus(tmp_path / "a.opus", [b"DESCRIPTION=see " + URL.encode()])
+        assert library.read_video_id(path) is None
+
+    def test_m4a_comment(self, tmp_path):
+        path = write_m4a(tmp_path / "a.m4a", [(b"covr", b"\xff" * 4096), (b"\xa9cmt", URL.encode())])
+        assert library.read_video_id(path) == VIDEO_ID
+        assert library.read_video_id(write_m4a(tmp_path / "b.m4a", [(b"\xa9nam", b"Song")])) is None
+
+
+class TestLibraryIndex:
+    """Tests for the LibraryIndex class."""
+
+    def make_index(self, tmp_path):
+        music = tmp_path / "music"
+        music.mkdir(exist_ok=True)
+        return music, library.LibraryIndex(str(music), tmp_path / "index.json")
+
+    def test_default_path_is_in_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        index = library.LibraryIndex(str(tmp_path / "music"))
+        assert index.path.parent == tmp_path / library.LIBRARY_DIR
+
+    def test_scan_finds_renamed_and_nested_files(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        (music / "Album").mkdir()
+        path = write_mp3(music / "Album" / "Renamed by hand.mp3", [purl_frame()])
+        write_mp3(music / "untagged.mp3", [])
+        (music / ".staging").mkdir()
+        write_mp3(music / ".staging" / "x.mp3", [purl_frame(URL[:-1] + "x")])
+
+        assert index.scan(workers=4) == 2
+        assert index.lookup(VIDEO_ID) == path
+        assert len(index) == 1
+
+    def test_persisted_index_skips_unchanged_files(self, tmp_path, monkeypatch):
+        music, index = self.make_index(tmp_path)
+        write_mp3(music / "a.mp3", [purl_frame()])
+        index.scan()
+        index.save()
+
+        reads = []
+        original = library.read_video_id
+        monkeypatch.setattr(library, "read_video_id", lambda path: reads.append(path) or original(path))
+        reloaded = library.LibraryIndex(str(music), tmp_path / "index.json")
+        assert reloaded.load()
+        assert reloaded.scan() == 0
+        assert reads == []
+        assert reloaded.lookup(VIDEO_ID)
+
+    def test_scan_drops_deleted_files(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        path = write_mp3(music / "a.mp3", [purl_frame()])
+        index.scan()
+        os.remove(path)
+        index.scan()
+        assert index.lookup(VIDEO_ID) is None
+
+    def test_load_ignores_other_folder(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        write_mp3(music / "a.mp3", [purl_frame()])
+        index.scan()
+        index.save()
+        other = library.LibraryIndex(str(tmp_path), tmp_path / "index.json")
+        assert not other.load()
+
+    def test_update_and_remove_path(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        old = write_mp3(music / "old.mp3", [purl_frame()])
+        index.update_path(old)
+        assert index.lookup(VIDEO_ID) == old
+
+        new = str(music / "new.mp3")
+        os.rename(old, new)
+        index.remove_path(old)
+        assert index.lookup(VIDEO_ID) is None
+        assert index.update_path(new) == VIDEO_ID
+        assert index.lookup(VIDEO_ID) == new
+
+    def test_remove_folder(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        (music / "Album").mkdir()
+        write_mp3(music / "Album" / "a.mp3", [purl_frame()])
+        index.scan()
+        index.remove_path(str(music / "Album"))
+        assert index.lookup(VIDEO_ID) is None
+
+    def test_update_folder_moved_in(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        index.scan()
+        (music / "Album" / "Disc 1").mkdir(parents=True)
+        path = write_mp3(music / "Album" / "Disc 1" / "a.mp3", [purl_frame()])
+        assert index.update_folder(str(music / "Album")) == 1
+        assert index.lookup(VIDEO_ID) == path
+
+    def test_update_folder_skips_hidden_folders(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        (music / ".staging").mkdir()
+        write_mp3(music / ".staging" / "a.mp3", [purl_frame()])
+        assert index.update_folder(str(music / ".staging")) == 0
+        assert index.lookup(VIDEO_ID) is None
+
+    def test_folders(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        (music / "Album" / "Disc 1").mkdir(parents=True)
+        (music / ".staging").mkdir()
+        assert sorted(index.folders()) == [str(music), str(music / "Album"), str(music / "Album" / "Disc 1")]
+        assert index.folders(str(music / "Album" / "Disc 1")) == [str(music / "Album" / "Disc 1")]
+        assert index.folders(str(music / ".staging")) == []
+
+    def test_scan_indexes_native_audio(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        path = write_opus(music / "Song.opus", [b"purl=" + URL.encode()])
+
+        assert index.scan() == 1
+        assert index.lookup(VIDEO_ID) == path
+        os.remove(path)
+        index.remove_path(path)
+        assert index.update_path(write_m4a(music / "Song.m4a", [(b"\xa9cmt", URL.encode())])) == VIDEO_ID
+
+    def test_update_ignores_other_files(self, tmp_path):
+        music, index = self.make_index(tmp_path)
+        (music / "a.webm").write_bytes(b"data")
+        assert index.update_path(str(music / "a.webm")) is None
+        assert not index.dirty
@@ -0,0 +1,95 @@
+"""Tests for youtubemp3downloader.logbuffer module."""
+
+from youtubemp3downloader import logbuffer
+
+
+def lines(*texts):
+    return [(text, False) for text in texts]
+
+
+class TestClampMaxLines:
+    """Tests for the clamp_max_lines function."""
+
+    def test_default(self):
+        assert logbuffer.clamp_max_lines(None) == logbuffer.DEFAULT_MAX_LINES
+
+    def test_bounds(self):
+        assert logbuffer.clamp_max_lines(1) == logbuffer.MIN_MAX_LINES
+        assert logbuffer.clamp_max_lines(10 ** 9) == logbuffer.MAX_MAX_LINES
+
+    def test_invalid(self):
+        assert logbuffer.clamp_max_lines("many") == logbuffer.DEFAULT_MAX_LINES
+
+
+class TestLogBuffer:
+    """Tests for the LogBuffer class."""
+
+    def test_empty_batch(self):
+        assert logbuffer.LogBuffer().plan([]) is None
+
+    def test_batch_is_joined(self):
+        log = logbuffer.LogBuffer()
+        update = log.plan(lines("a", "b"))
+        assert update.text == "a\nb\n"
+        assert not update.replace_progress
+        assert update.evict == 0
+        assert log.line_count == 2
+
+    def test_multiline_entry_counts_every_line(self):
+        log = logbuffer.LogBuffer()
+        log.plan(lines("a\nb\nc"))
+        assert log.line_count == 3
+
+    def test_progress_lines_collapse_within_batch(self):
+        log = logbuffer.LogBuffer()
+        update = log.plan([("x", False), ("10%", True), ("20%", True)])
+        assert update.text == "x\n20%\n"
+        assert log.trailing_progress
+
+    def test_progress_line_is_replaced_across_batches(self):
+        log = logbuffer.LogBuffer()
+        log.plan([("x", False), ("10%", True)])
+        update = log.plan([("20%", True), ("done", False)])
+        assert update.replace_progress
+        assert update.text == "20%\ndone\n"
+        assert log.line_count == 3
+        assert not log.trailing_progress
+
+    def test_regular_line_keeps_previous_progress_line(self):
+        log = logbuffer.LogBuffer()
+        log.plan([("10%", True)])
+        update = log.plan(lines("next"))
+        assert not update.replace_progress
+        assert log.line_count == 2
+
+    def test_evicts_in_chunks(self):
+        log = logbuffer.LogBuffer(100)
+        log.plan(lines(*map(str, range(100))))
+        update = log.plan(lines("extra"))
+        assert update.evict == 101 - (100 - log.evict_chunk)
+        assert log.line_count == 100 - log.evict_chunk
+        # No further eviction until the cap is reached again
+        assert log.plan(lines("more")).evict == 0
+
+    def test_oversized_batch_keeps_newest_lines(self):
+        log = logbuffer.LogBuffer(100)
+        log.plan(lines("old"))
+        update = log.plan(lines(*map(str, range(250))))
+        assert update.evict == 1
+        kept = update.text.splitlines()
+        assert kept[-1] == "249"
+        assert len(kept) == 100 - log.evict_chunk
+        assert log.line_count == len(kept)
+
+    def test_set_max_lines(self):
+        log = logbuffer.LogBuffer()
+        log.set_max_lines(200)
+        assert log.max_lines == 200
+        assert log.evict_chunk == 20
+
+    def test_reset(self):
+        log = logbuffer.LogBuffer()
+        log.plan([("10%", True)])
+        log.reset()
+        assert log.line_count == 0
+        assert not log.trailing_progress
@@ -0,0 +1,141 @@
+"""Tests for youtubemp3downloader.metrics module."""
+
+import pytest
+
+from benchmarks import fakes
+from youtubemp3downloader import metrics
+
+
+class TestRegistry:
+    """Tests for rendering the Prometheus text format."""
+
+    def test_counter_and_gauge(self):
+        registry = metrics.Registry()
+        counter = registry.counter("ytmp3_things_total", "Things.", ["kind"])
+        counter.inc(kind="a")
+        counter.inc(2.5, kind='say "hi"')
+        gauge = registry.gauge("ytmp3_level", "Level.")
+        gauge.set(3)
+        gauge.inc(-1)
+        assert registry.render() == (
+            "# HELP ytmp3_level Level.\n"
+            "# TYPE ytmp3_level gauge\n"
+            "ytmp3_level 2\n"
+            "# HELP ytmp3_things_total Things.\n"
+            "# TYPE ytmp3_things_total counter\n"
+            'ytmp3_things_total{kind="a"} 1\n'
+            'ytmp3_things_total{kind="say \\"hi\\""} 2.5\n'
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram("ytmp3_seconds", "Seconds.", [1, 5])
+        for value in (0.5, 2, 2, 9):
+            histogram.observe(value)
+        lines = registry.render().splitlines()[2:]
+        assert lines == [
+            'ytmp3_seconds_bucket{le="1"} 1',
+            'ytmp3_seconds_bucket{le="5"} 3',
+            'ytmp3_seconds_bucket{le="+Inf"} 4',
+            "ytmp3_seconds_sum 13.5",
+            "ytmp3_seconds_count 4",
+        ]
+
+    def test_unused_metrics_are_rendered_as_zero(self):
+        text = metrics.DownloadMetrics().render()
+        assert "ytmp3_downloaded_bytes_total 0" in text
+        assert 'ytmp3_item_download_seconds_bucket{le="+Inf"} 0' in text
+
+    def test_rejects_wrong_labels_and_duplicates(self):
+        registry = metrics.Registry()
+        counter = registry.counter("ytmp3_x_total", "X.", ["outcome"])
+        with pytest.raises(ValueError):
+            counter.inc(reason="y")
+        with pytest.raises(ValueError):
+            counter.inc(-1, outcome="done")
+        with pytest.raises(ValueError):
+            registry.counter("ytmp3_x_total", "X again.")
+
+    def test_collectors_run_before_rendering(self):
+        download_metrics = metrics.DownloadMetrics()
+        states = ["queued", "queued", "running"]
+        download_metrics.registry.add_collector(lambda: download_metrics.set_queue(states))
+        assert 'ytmp3_jobs{state="queued"} 2' in download_metrics.render()
+        states[:] = ["running"]
+        text = download_metrics.render()
+        assert 'ytmp3_jobs{state="queued"} 0' in text
+        assert 'ytmp3_jobs{state="running"} 1' in text
+
+
+class TestDownloadMetrics:
+    """Tests for what the downloads report."""
+
+    @pytest.mark.parametrize("message, reason", [
+        ("ERROR: [youtube] abc: Video unavailable. This video is no longer available", "unavailable"),
+        ("ERROR: [youtube] abc: Private video. Sign in if you've been granted access", "private"),
+        ("ERROR: unable to download video data: HTTP Error 403: Forbidden", "forbidden"),
+        ("ERROR: Unable to download webpage: The read operation timed out", "network"),
+        ("ffmpeg exited with code 1", "conversion"),
+        ("", "other"),
+    ])
+    def test_failure_classes(self, message, reason):
+        assert metrics.classify_failure(message) == reason
+
+    def test_outcomes(self):
+        download_metrics = metrics.DownloadMetrics()
+        download_metrics.record_outcomes(2, 1, ["HTTP Error 429: Too Many Requests", None])
+        assert download_metrics.items.value(outcome="done") == 2
+        assert download_metrics.items.value(outcome="skipped") == 1
+        assert download_metrics.items.value(outcome="failed") == 2
+        assert download_metrics.failures.value(reason="rate_limited") == 1
+        assert download_metrics.failures.value(reason="other") == 1
+
+
+class TestTextfile:
+    """Tests for writing metrics to a file."""
+
+    def test_close_writes_final_values(self, tmp_path):
+        download_metrics = metrics.DownloadMetrics()
+        exporter = metrics.TextfileExporter(download_metrics.registry, tmp_path / "out" / "ytmp3.prom", 60)
+        exporter.start()
+        download_metrics.record_bytes(4096)
+        exporter.close()
+        assert "ytmp3_downloaded_bytes_total 4096" in (tmp_path / "out" / "ytmp3.prom").read_text()
+        assert not (tmp_path / "out" / "ytmp3.prom.tmp").exists()
+
+    def test_settings(self, tmp_path):
+        download_metrics = metrics.DownloadMetrics()
+        assert metrics.exporter_from_settings({}, download_metrics) is None
+        exporter = metrics.exporter_from_settings(
+            {"metrics_textfile": str(tmp_path / "m.prom"), "metrics_interval": "bad"}, download_metrics
+        )
+        assert exporter.interval == metrics.DEFAULT_INTERVAL
+
+
+class TestMeasuredDownload:
+    """End-to-end runs against the fake tools."""
+
+    def run_measured(self, fake_downloads, seed, fail_rate=0.0, **options):
+        """Download a four video playlist; returns the metrics."""
+        download_metrics = metrics.DownloadMetrics()
+        options.update(download_metrics=download_metrics)
+        fake_downloads.run(seed, options, items=4, records=3, fail_rate=fail_rate)
+        return download_metrics
+
+    def test_serial_download(self, fake_downloads):
+        download_metrics = self.run_measured(fake_downloads, "serial-metrics")
+        assert download_metrics.items.value(outcome="done") == 4
+        assert download_metrics.downloaded_bytes.value() == 4 * fakes.FakeSettings().size
+        assert download_metrics.download_seconds.count() == 4
+        assert download_metrics.transcode_seconds.count() == 4
+        assert download_metrics.speed.count() > 0
+
+    def test_pipeline_failures_are_classified(self, fake_downloads):
+        download_metrics = self.run_measured(
+            fake_downloads, "pipeline-metrics", fail_rate=0.5, max_workers=2, use_pipeline=True
+        )
+        done = download_metrics.items.value(outcome="done")
+        failed = download_metrics.items.value(outcome="failed")
+        assert done + failed == 4 and failed > 0
+        assert download_metrics.failures.value(reason="unavailable") == failed
+        assert download_metrics.transcode_seconds.count() == done
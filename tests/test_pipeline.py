@@ -0,0 +1,156 @@
+"""Tests for youtubemp3downloader.pipeline module."""
+
+import os
+import threading
+import time
+
+from youtubemp3downloader.pipeline import (
+    TranscodePipeline,
+    TranscodeTask,
+    build_transcode_command,
+    find_staged_files,
+    remove_staged_files,
+    remove_staging,
+    staging_dir,
+)
+
+
+class TestBuildTranscodeCommand:
+    """Tests for build_transcode_command function."""
+
+    def test_without_thumbnail(self):
+        cmd = build_transcode_command("in.webm", "out.mp3.part")
+        assert cmd[0] == "ffmpeg"
+        assert cmd[cmd.index("-i") + 1] == "in.webm"
+        assert cmd[cmd.index("-b:a") + 1] == "320k"
+        assert cmd[cmd.index("-f") + 1] == "mp3"
+        assert cmd[-1] == "out.mp3.part"
+        assert "attached_pic" not in cmd
+
+    def test_with_thumbnail(self):
+        cmd = build_transcode_command("in.m4a", "out.mp3", thumbnail="cover.jpg")
+        inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+        assert inputs == ["in.m4a", "cover.jpg"]
+        assert "attached_pic" in cmd
+
+    def test_custom_bitrate(self):
+        cmd = build_transcode_command("in.webm", "out.mp3", bitrate="192k")
+        assert cmd[cmd.index("-b:a") + 1] == "192k"
+
+    def test_audio_args_replace_the_encoder(self):
+        cmd = build_transcode_command("in.webm", "out.opus", audio_args=["-c:a", "copy", "-f", "opus"])
+        assert cmd[cmd.index("-c:a") + 1] == "copy"
+        assert cmd[cmd.index("-f") + 1] == "opus"
+        assert "-b:a" not in cmd
+
+
+class TestFindStagedFiles:
+    """Tests for find_staged_files function."""
+
+    def test_audio_and_thumbnail(self, tmp_path):
+        (tmp_path / "01 - Song.webm").write_bytes(b"audio")
+        (tmp_path / "01 - Song.jpg").write_bytes(b"image")
+        audio, thumbnail = find_staged_files(str(tmp_path))
+        assert audio.endswith("01 - Song.webm")
+        assert thumbnail.endswith("01 - Song.jpg")
+
+    def test_partial_files_ignored(self, tmp_path):
+        (tmp_path / "Song.webm.part").write_bytes(b"audio")
+        assert find_staged_files(str(tmp_path)) == (None, None)
+
+    def test_missing_directory(self, tmp_path):
+        assert find_staged_files(str(tmp_path / "missing")) == (None, None)
+
+
+class TestRemoveStaged:
+    """Staged files are deleted once their item is finished with."""
+
+    def test_source_and_thumbnail_are_deleted(self, tmp_path):
+        source = tmp_path / "001 - a.webm"
+        thumbnail = tmp_path / "001 - a.jpg"
+        source.write_bytes(b"audio")
+        thumbnail.write_bytes(b"cover")
+        task = TranscodeTask(None, str(source), "out.mp3", str(thumbnail), staged=[str(source), str(thumbnail)])
+        task.remove_staged()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_missing_files_are_ignored(self, tmp_path):
+        kept = tmp_path / "002 - b.webm"
+        kept.write_bytes(b"audio")
+        remove_staged_files([str(tmp_path / "gone.webm")])
+        assert kept.exists()
+        assert TranscodeTask(None, str(kept), "out.mp3").staged == [str(kept)]
+
+
+class TestStagingDir:
+    """A journaled job stages into the same folder on every run."""
+
+    def test_job_folder_is_reused_until_removed(self, tmp_path):
+        path = staging_dir(str(tmp_path), "0123456789ab")
+        (tmp_path / path / "001 - a.webm.part").write_bytes(b"partial")
+        assert staging_dir(str(tmp_path), "0123456789ab") == path
+        assert os.listdir(path) == ["001 - a.webm.part"]
+        remove_staging(str(tmp_path), "0123456789ab")
+        assert not os.path.exists(path)
+
+    def test_unjournaled_runs_get_their_own_folder(self, tmp_path):
+        first, second = staging_dir(str(tmp_path)), staging_dir(str(tmp_path))
+        assert first != second
+        assert os.path.basename(first).startswith(".ytmp3-staging-")
+
+
+class TestTranscodePipeline:
+    """Tests for TranscodePipeline class."""
+
+    def test_all_tasks_transcoded(self):
+        results = []
+        lock = threading.Lock()
+
+        def on_finished(task, success):
+            with lock:
+                results.append((task.item, success))
+
+        transcoder = TranscodePipeline(lambda task: True, workers=2, on_finished=on_finished)
+        transcoder.start()
+        for i in range(5):
+            assert transcoder.submit(TranscodeTask(i, "in", "out"))
+        transcoder.close()
+        assert sorted(results) == [(i, True) for i in range(5)]
+
+    def test_failure_reported(self):
+        results = []
+
+        def transcode(task):
+            raise RuntimeError("ffmpeg crashed")
+
+        transcoder = TranscodePipeline(transcode, workers=1, on_finished=lambda t, ok: results.append(ok))
+        transcoder.start()
+        transcoder.submit(TranscodeTask(1, "in", "out"))
+        transcoder.close()
+        assert results == [False]
+
+    def test_full_queue_blocks_submit(self):
+        release = threading.Event()
+        transcoder = TranscodePipeline(lambda task: release.wait(), workers=1, queue_size=1)
+        transcoder.start()
+        transcoder.submit(TranscodeTask(1, "in", "out"))
+        time.sleep(0.05)
+        transcoder.submit(TranscodeTask(2, "in", "out"))
+
+        accepted = threading.Event()
+
+        def producer():
+            transcoder.submit(TranscodeTask(3, "in", "out"))
+            accepted.set()
+
+        threading.Thread(target=producer, daemon=True).start()
+        assert not accepted.wait(0.2)
+        release.set()
+        assert accepted.wait(2)
+        transcoder.close()
+
+    def test_stopped_pipeline_rejects_tasks(self):
+        stop = threading.Event()
+        stop.set()
+        transcoder = TranscodePipeline(lambda task: True, workers=1, stop_event=stop)
+        assert transcoder.submit(TranscodeTask(1, "in", "out")) is False
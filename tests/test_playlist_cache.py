@@ -0,0 +1,113 @@
+"""Tests for youtubemp3downloader.playlist_cache module."""
+
+import time
+
+from youtubemp3downloader import config, playlist_cache
+
+PLAYLIST_ID = "PL1234567890abcdef"
+
+
+def entries(count, prefix="v"):
+    return {"{}{:04d}".format(prefix, i): "{} - Title {}".format(i, i) for i in range(1, count + 1)}
+
+
+class TestPlaylistIdFromUrl:
+    """Tests for the playlist_id_from_url function."""
+
+    def test_playlist_url(self):
+        url = "https://www.youtube.com/playlist?list={}".format(PLAYLIST_ID)
+        assert playlist_cache.playlist_id_from_url(url) == PLAYLIST_ID
+
+    def test_video_url(self):
+        assert playlist_cache.playlist_id_from_url("https://youtu.be/dQw4w9WgXcQ") is None
+
+    def test_invalid_input(self):
+        assert playlist_cache.playlist_id_from_url(None) is None
+
+
+class TestPlaylistCache:
+    """Tests for the PlaylistCache class."""
+
+    def test_default_path_is_in_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        cache = playlist_cache.PlaylistCache()
+        assert cache.path == tmp_path / playlist_cache.CACHE_FILENAME
+
+    def test_miss(self, tmp_path):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db")
+        assert cache.get(PLAYLIST_ID) is None
+
+    def test_round_trip_keeps_order(self, tmp_path):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db")
+        info = {"zzz": "1 - Last id first", "aaa": "2 - Second"}
+        cache.put(PLAYLIST_ID, info)
+        cached = cache.get(PLAYLIST_ID)
+        assert list(cached.playlist_info.items()) == list(info.items())
+        assert cached.is_fresh
+
+    def test_durations_round_trip(self, tmp_path):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db")
+        cache.put(PLAYLIST_ID, entries(2), {"v0001": 185.0})
+        assert cache.get(PLAYLIST_ID).durations == {"v0001": 185.0}
+        url = "https://www.youtube.com/playlist?list={}".format(PLAYLIST_ID)
+        assert cache.durations_for(url) == {"v0001": 185.0}
+        assert cache.durations_for("https://youtu.be/dQw4w9WgXcQ") == {}
+
+    def test_persists_across_instances(self, tmp_path):
+        playlist_cache.PlaylistCache(tmp_path / "cache.db").put(PLAYLIST_ID, entries(3))
+        assert len(playlist_cache.PlaylistCache(tmp_path / "cache.db").get(PLAYLIST_ID).playlist_info) == 3
+
+    def test_put_replaces_entries(self, tmp_path):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db")
+        cache.put(PLAYLIST_ID, entries(5))
+        cache.put(PLAYLIST_ID, entries(2, prefix="w"))
+        assert list(cache.get(PLAYLIST_ID).playlist_info) == ["w0001", "w0002"]
+
+    def test_empty_playlist_is_not_stored(self, tmp_path):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db")
+        cache.put(PLAYLIST_ID, {})
+        assert cache.get(PLAYLIST_ID) is None
+
+    def test_stale_entries_are_still_returned(self, tmp_path, monkeypatch):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db", ttl=60)
+        cache.put(PLAYLIST_ID, entries(2))
+        now = time.time()
+        monkeypatch.setattr(playlist_cache.time, "time", lambda: now + 120)
+        cached = cache.get(PLAYLIST_ID)
+        assert cached is not None
+        assert not cached.is_fresh
+
+    def test_expired_entries_are_evicted(self, tmp_path, monkeypatch):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db", ttl=60, max_age=3600)
+        cache.put(PLAYLIST_ID, entries(2))
+        now = time.time()
+        monkeypatch.setattr(playlist_cache.time, "time", lambda: now + 7200)
+        assert cache.get(PLAYLIST_ID) is None
+
+    def test_size_eviction_drops_least_recently_used(self, tmp_path, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(playlist_cache.time, "time", lambda: clock[0])
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db", max_age=10 ** 9, max_entries=10)
+        cache.put("PLaaaaaaaaaaaaaa", entries(4))
+        clock[0] += 1
+        cache.put("PLbbbbbbbbbbbbbb", entries(4))
+        clock[0] += 1
+        cache.get("PLaaaaaaaaaaaaaa")
+        clock[0] += 1
+        cache.put("PLcccccccccccccc", entries(4))
+        assert cache.get("PLbbbbbbbbbbbbbb") is None
+        assert cache.get("PLaaaaaaaaaaaaaa") is not None
+        assert cache.get("PLcccccccccccccc") is not None
+
+    def test_invalidate(self, tmp_path):
+        cache = playlist_cache.PlaylistCache(tmp_path / "cache.db")
+        cache.put(PLAYLIST_ID, entries(2))
+        cache.invalidate(PLAYLIST_ID)
+        assert cache.get(PLAYLIST_ID) is None
+
+    def test_unusable_database_is_a_miss(self, tmp_path):
+        path = tmp_path / "cache.db"
+        path.write_text("not a database")
+        cache = playlist_cache.PlaylistCache(path)
+        cache.put(PLAYLIST_ID, entries(2))
+        assert cache.get(PLAYLIST_ID) is None
@@ -0,0 +1,93 @@
+"""Tests for youtubemp3downloader.profiles module."""
+
+from youtubemp3downloader import download, engine, profiles, startup
+
+
+class TestOutputProfiles:
+    """Tests for the yt-dlp and ffmpeg options of each profile."""
+
+    def test_default_is_the_historical_command(self):
+        cmd = download._base_command(False, "firefox")
+        start = cmd.index("-x")
+        assert cmd[start:start + 6] == [
+            "-x", "--audio-format", "mp3", "--postprocessor-args", "ffmpeg:-b:a 320k", "--embed-thumbnail",
+        ]
+
+    def test_vbr_uses_audio_quality(self):
+        profile = profiles.get_profile(profiles.PROFILE_MP3_V0)
+        assert profile.ytdlp_args() == ["-x", "--audio-format", "mp3", "--audio-quality", "0"]
+        assert profile.postprocessor() == {
+            "key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "0",
+        }
+
+    def test_native_keeps_the_codec(self):
+        profile = profiles.get_profile(profiles.PROFILE_NATIVE)
+        assert not profile.transcodes
+        assert profile.ytdlp_args() == ["-x", "--audio-format", "best"]
+        options = engine.build_options("/tmp/x", profile=profile)
+        assert options["postprocessors"][0] == {"key": "FFmpegExtractAudio", "preferredcodec": "best"}
+        assert "postprocessor_args" not in options
+
+    def test_unknown_profile_falls_back_to_default(self):
+        assert profiles.get_profile("flac").name == profiles.DEFAULT_PROFILE
+        assert profiles.get_profile(None).name == profiles.DEFAULT_PROFILE
+
+    def test_native_opus_without_mutagen_skips_the_cover(self, monkeypatch):
+        monkeypatch.setattr(startup, "_mutagen", {False: False})
+        profile = profiles.get_profile(profiles.PROFILE_NATIVE)
+        assert "--embed-thumbnail" not in download._base_command(False, "firefox", profile=profile)
+        assert profiles.get_profile(profiles.PROFILE_MP3_V0).embeds_thumbnail()
+
+    def test_cover_support_follows_the_backend(self, monkeypatch):
+        # The yt-dlp command bundles mutagen, this interpreter does not
+        monkeypatch.setattr(startup, "_mutagen", {False: True, True: False})
+        profile = profiles.get_profile(profiles.PROFILE_NATIVE)
+        assert "--embed-thumbnail" in download._base_command(False, "firefox", profile=profile)
+        options = engine.build_options("/tmp/x", profile=profile)
+        assert "EmbedThumbnail" not in [pp["key"] for pp in options["postprocessors"]]
+        # A cover that is neither embedded nor stored would be left next to the file
+        assert not options["writethumbnail"]
+        options = engine.build_options("/tmp/x", profile=profile, keep_thumbnail=True)
+        assert options["writethumbnail"]
+        assert "FFmpegThumbnailsConvertor" in [pp["key"] for pp in options["postprocessors"]]
+
+
+class TestOutputFor:
+    """Tests for the pipeline's choice of output file."""
+
+    def test_mp3_profiles_encode(self):
+        extension, args, cover = profiles.get_profile(profiles.PROFILE_MP3_320).output_for("a.webm")
+        assert (extension, cover) == (".mp3", True)
+        assert args == ["-c:a", "libmp3lame", "-b:a", "320k", "-id3v2_version", "3", "-f", "mp3"]
+        _, args, _ = profiles.get_profile(profiles.PROFILE_MP3_V0).output_for("a.webm")
+        assert args[:4] == ["-c:a", "libmp3lame", "-q:a", "0"]
+
+    def test_native_copies_into_a_matching_container(self):
+        native = profiles.get_profile(profiles.PROFILE_NATIVE)
+        assert native.output_for("a.webm") == (".opus", ["-c:a", "copy", "-f", "opus"], False)
+        assert native.output_for("a.m4a") == (".m4a", ["-c:a", "copy", "-f", "ipod"], True)
+
+    def test_every_extension_is_known(self):
+        assert {".mp3", ".opus", ".m4a"} <= set(profiles.AUDIO_EXTENSIONS)
+
+
+class TestNativeDownload:
+    """End-to-end run of the native profile against the fake tools."""
+
+    def test_playlist_is_saved_without_mp3_files(self, fake_downloads):
+        fake_downloads.run("native", {"output_profile": profiles.PROFILE_NATIVE})
+        assert len(fake_downloads.files(".opus")) == 3
+        assert not fake_downloads.files(".mp3")
+
+    def test_cover_support_is_resolved_once_per_run(self, fake_downloads, monkeypatch):
+        calls = []
+
+        def has_mutagen(in_process=False):
+            calls.append(in_process)
+            return True
+
+        monkeypatch.setattr(startup, "has_mutagen", has_mutagen)
+        options = {"output_profile": profiles.PROFILE_NATIVE, "max_workers": 2}
+        fake_downloads.run("native-workers", options)
+        assert calls == [False]
+        assert len(fake_downloads.files(".opus")) == 3
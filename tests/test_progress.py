@@ -0,0 +1,158 @@
+"""Tests for youtubemp3downloader.progress module."""
+
+from youtubemp3downloader import events, progress
+
+
+def record(status="downloading", video_id="abc123", downloaded="512", total_bytes="1024", estimate="",
+           speed="2048.0", eta="5", filename="/music/01 - Song.webm"):
+    return "\t".join([progress.RECORD_PREFIX, status, video_id, downloaded,
+                      total_bytes, estimate, speed, eta, filename]) + "\n"
+
+
+def item(video_id="abc123", index="1", total="3", title="Song"):
+    return "\t".join([progress.RECORD_PREFIX, progress.ITEM_RECORD, video_id, index, total, title]) + "\n"
+
+
+def saved(video_id="abc123", path="/music/01 - Song.mp3"):
+    return "\t".join([progress.RECORD_PREFIX, progress.SAVED_RECORD, video_id, path]) + "\n"
+
+
+class TestProgressTemplate:
+    """Tests for the yt-dlp command line arguments."""
+
+    def test_template_has_one_field_per_record_column(self):
+        assert progress.PROGRESS_TEMPLATE.count("\t") == 8
+        assert progress.ITEM_TEMPLATE.count("\t") == 5
+        assert progress.SAVED_TEMPLATE.count("\t") == 3
+        for template in (progress.PROGRESS_TEMPLATE, progress.ITEM_TEMPLATE, progress.SAVED_TEMPLATE):
+            assert template.startswith(progress.RECORD_PREFIX)
+
+    def test_args_use_newline_and_download_template(self):
+        args = progress.PROGRESS_ARGS
+        assert args[0] == "--newline"
+        assert args[2] == "download:" + progress.PROGRESS_TEMPLATE
+        assert args[args.index("pre_process:" + progress.ITEM_TEMPLATE) - 1] == "--print"
+        assert args[args.index("after_move:" + progress.SAVED_TEMPLATE) - 1] == "--print"
+        # --print alone would silence the log and skip the download
+        assert "--no-quiet" in args and "--no-simulate" in args
+
+
+class TestProgressRecords:
+    """Tests for parsing machine-readable progress records."""
+
+    def test_first_record_sets_destination(self):
+        parser = progress.ProgressParser()
+        result = parser.feed(record())
+        assert result == [
+            events.Destination("/music/01 - Song.webm"),
+            events.Progress(50.0, "2.00KiB/s", "00:05", 2048.0, 512.0),
+        ]
+        assert parser.state == progress.DOWNLOADING
+
+    def test_following_records_only_report_progress(self):
+        parser = progress.ProgressParser()
+        parser.feed(record())
+        result = parser.feed(record(downloaded="768"))
+        assert result == [events.Progress(75.0, "2.00KiB/s", "00:05", 2048.0, 768.0)]
+
+    def test_uses_estimate_when_total_is_unknown(self):
+        parser = progress.ProgressParser()
+        result = parser.feed(record(total_bytes="", estimate="2048"))
+        assert result[-1].percent == 25.0
+
+    def test_missing_values_do_not_report_progress(self):
+        parser = progress.ProgressParser()
+        result = parser.feed(record(total_bytes="NA", estimate="NA", speed="NA", eta="NA"))
+        assert not any(isinstance(event, events.Progress) for event in result)
+
+    def test_finished_record_moves_to_postprocessing(self):
+        parser = progress.ProgressParser()
+        parser.feed(record())
+        assert parser.feed(record(status="finished")) == []
+        assert parser.state == progress.POSTPROCESSING
+
+    def test_filename_may_contain_tabs(self):
+        parser = progress.ProgressParser()
+        result = parser.feed(record(filename="/music/a\tb.webm"))
+        assert events.Destination("/music/a\tb.webm") in result
+
+    def test_truncated_record_is_ignored(self):
+        parser = progress.ProgressParser()
+        assert parser.feed(progress.RECORD_PREFIX + "\tdownloading\tabc") == []
+
+
+class TestItemRecords:
+    """Tests for the records printed when an item starts and when it is saved."""
+
+    def test_item_record_starts_item(self):
+        parser = progress.ProgressParser()
+        assert parser.feed(item(index="02", total="5")) == [events.ItemStart(2, 5, "abc123", "Song")]
+        assert parser.item_id == "abc123"
+        assert not any(isinstance(event, events.ItemStart) for event in parser.feed(record()))
+
+    def test_single_video_has_no_item_start(self):
+        parser = progress.ProgressParser()
+        assert parser.feed(item(index="", total="")) == []
+        assert parser.item_id == "abc123"
+
+    def test_title_may_contain_tabs(self):
+        assert progress.ProgressParser().feed(item(title="a\tb"))[0].title == "a\tb"
+
+    def test_downloaded_item_is_done(self):
+        parser = progress.ProgressParser()
+        parser.feed(item())
+        parser.feed(record())
+        parser.feed(record(status="finished"))
+        assert parser.feed(saved()) == [events.PostprocessDone("/music/01 - Song.mp3", "abc123")]
+        assert parser.state == progress.IDLE
+
+    def test_item_without_download_was_skipped(self):
+        parser = progress.ProgressParser()
+        parser.feed(item())
+        # yt-dlp reports a file it found on disk as finished without downloading it
+        parser.feed(record(status="finished"))
+        assert parser.feed(saved(video_id="")) == [events.Skipped("/music/01 - Song.mp3", "abc123")]
+
+    def test_next_item_starts_undownloaded(self):
+        parser = progress.ProgressParser()
+        parser.feed(item())
+        parser.feed(record())
+        parser.feed(saved())
+        parser.feed(item(video_id="def456", index="2"))
+        assert parser.feed(saved(video_id="def456")) == [events.Skipped("/music/01 - Song.mp3", "def456")]
+
+    def test_truncated_records_are_ignored(self):
+        parser = progress.ProgressParser()
+        assert parser.feed(progress.RECORD_PREFIX + "\titem\tabc") == []
+        assert parser.feed(progress.RECORD_PREFIX + "\tsaved\tabc") == []
+
+
+class TestHumanLines:
+    """Tests for the human-readable lines yt-dlp still prints."""
+
+    def test_blank_line(self):
+        assert progress.ProgressParser().feed("   \n") == []
+
+    def test_item_and_destination_lines_are_only_logged(self):
+        for line in (
+            "[download] Downloading item 2 of 5",
+            "[download] Destination: /music/Song.webm",
+            "[download] /music/Song.mp3 has already been downloaded",
+            "[ExtractAudio] Destination: /music/Song.mp3",
+            "Deleting original file /music/Song.webm (pass -k to keep)",
+        ):
+            assert progress.ProgressParser().feed(line) == [events.LogLine(line)]
+
+    def test_recorded_in_archive(self):
+        line = "[youtube] dQw4w9WgXcQ: has already been recorded in the archive"
+        result = progress.ProgressParser().feed(line)
+        assert result == [events.LogLine(line), events.Skipped(None, "dQw4w9WgXcQ")]
+
+        line = "[download] Some song title has already been recorded in the archive"
+        result = progress.ProgressParser().feed(line)
+        assert result == [events.LogLine(line), events.Skipped()]
+
+    def test_error_with_video_id(self):
+        line = "ERROR: [youtube] dQw4w9WgXcQ: Video unavailable"
+        result = progress.ProgressParser().feed(line)
+        assert result == [events.LogLine(line), events.ItemError(line, "dQw4w9WgXcQ")]
@@ -0,0 +1,123 @@
+"""Tests for youtubemp3downloader.runner module."""
+
+import queue
+
+from youtubemp3downloader import download, jobqueue, journal, pipeline, runner
+
+from .test_jobqueue import RecordingSink, make_job
+
+
+def fake_download(failures=0):
+    """Return a download_thread replacement that finishes the run immediately."""
+    def download_thread(run, *args, **kwargs):
+        run.record_summary(1, 0, failures)
+        if failures:
+            run.report("failed", error=True)
+        run.finished()
+    return download_thread
+
+
+def drain(events, job_runner):
+    """Dispatch posted events until no job is running."""
+    while job_runner.busy:
+        func, args = events.get(timeout=5)
+        func(*args)
+
+
+def make_runner(tmp_path, max_running=1):
+    events = queue.Queue()
+    job_queue = jobqueue.JobQueue(tmp_path / "queue.json", max_running=max_running)
+    sink = RecordingSink()
+    job_runner = runner.JobRunner(job_queue, sink, lambda func, *args: events.put((func, args)))
+    return job_runner, events, sink
+
+
+class TestJobRunner:
+    """Tests for the JobRunner class."""
+
+    def test_respects_concurrency_limit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(download, "download_thread", fake_download())
+        job_runner, events, sink = make_runner(tmp_path, max_running=2)
+        jobs = [job_runner.queue.add(make_job(count=2)) for _ in range(3)]
+
+        assert len(job_runner.start_jobs()) == 2
+        drain(events, job_runner)
+        assert len(job_runner.start_jobs()) == 1
+        drain(events, job_runner)
+
+        assert [job.state for job in jobs] == [jobqueue.DONE] * 3
+        assert len(sink.finished) == 3
+
+    def test_failed_run_fails_the_job(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(download, "download_thread", fake_download(failures=1))
+        job_runner, events, sink = make_runner(tmp_path)
+        job = job_runner.queue.add(make_job(count=2))
+        job_runner.start_jobs()
+        drain(events, job_runner)
+        assert job.state == jobqueue.FAILED
+        assert sink.messages == [("failed", True)]
+
+    def test_failed_turn_videos_are_retried(self, tmp_path, monkeypatch):
+        attempts = []
+
+        def download_thread(run, *args, **kwargs):
+            video_ids = list(run.job.playlist_info)
+            for index in run.batch or run.job.pending:
+                attempts.append(index)
+                # Video 2 fails on its first attempt only
+                state = journal.FAILED if attempts.count(2) == 1 and index == 2 else journal.DONE
+                run.record_item(video_ids[index - 1], state)
+            if journal.FAILED in run.item_states.values():
+                run.report("failed", error=True)
+            run.finished()
+
+        monkeypatch.setattr(download, "download_thread", download_thread)
+        job_runner, events, _ = make_runner(tmp_path)
+        job_runner.queue.policy = jobqueue.RoundRobinPolicy(chunk_size=2)
+        job = job_runner.queue.add(make_job(count=5))
+        while job_runner.start_jobs():
+            drain(events, job_runner)
+        assert attempts == [1, 2, 3, 4, 5, 2]
+        assert job.state == jobqueue.DONE
+
+    def test_logs_reach_the_sink_directly(self, tmp_path):
+        job_runner, _, sink = make_runner(tmp_path)
+        run = jobqueue.JobRun(make_job(), job_runner)
+        run.log_message("hello")
+        assert sink.lines == [("hello", False)]
+
+    def test_stop_unknown_job(self, tmp_path):
+        job_runner, _, _ = make_runner(tmp_path)
+        assert job_runner.stop("missing") is None
+
+    def test_restore_queue_trims_finished_videos(self, tmp_path):
+        job_runner, _, _ = make_runner(tmp_path)
+        job_runner.job_journal = journal.JobJournal(tmp_path / "jobs.journal", sync=False)
+        job = make_job(count=3)
+        job.journal_id = job_runner.job_journal.begin(job.url, job.url_type, "/music", playlist_info=job.playlist_info)
+        job_runner.job_journal.mark(job.journal_id, list(job.playlist_info)[0], journal.DONE)
+        job_runner.queue.add(job)
+        job_runner.queue.save()
+
+        restored, _, _ = make_runner(tmp_path)
+        restored.job_journal = job_runner.job_journal
+        assert restored.restore_queue() == 1
+        assert restored.queue.jobs[0].pending == [2, 3]
+
+    def test_restore_queue_drops_jobs_the_journal_finished(self, tmp_path):
+        job_runner, _, _ = make_runner(tmp_path)
+        job_runner.job_journal = journal.JobJournal(tmp_path / "jobs.journal", sync=False)
+        job = make_job(count=1)
+        job.download_path = str(tmp_path)
+        job.journal_id = job_runner.job_journal.begin(job.url, job.url_type, job.download_path,
+                                                      playlist_info=job.playlist_info)
+        job_runner.job_journal.mark(job.journal_id, list(job.playlist_info)[0], journal.DONE)
+        staging = pipeline.staging_dir(job.download_path, job.journal_id)
+        job_runner.queue.add(job)
+        job_runner.queue.save()
+
+        restored, _, _ = make_runner(tmp_path)
+        restored.job_journal = job_runner.job_journal
+        assert restored.restore_queue() == 0
+        assert not job_runner.job_journal.unfinished()
+        assert not (tmp_path / staging).exists()
@@ -0,0 +1,118 @@
+"""Tests for youtubemp3downloader.scheduler module."""
+
+import threading
+import time
+
+from youtubemp3downloader import scheduler
+from youtubemp3downloader.scheduler import PlaylistItem, PlaylistScheduler, build_items
+
+
+def make_items(count):
+    return [PlaylistItem(i, "vid{:08d}".format(i), "Title {}".format(i)) for i in range(1, count + 1)]
+
+
+class TestBuildItems:
+    """Tests for build_items function."""
+
+    def test_all_entries(self):
+        items = build_items({"a": "1 - A", "b": "2 - B", "c": "3 - C"})
+        assert [(item.index, item.video_id) for item in items] == [(1, "a"), (2, "b"), (3, "c")]
+
+    def test_selected_entries(self):
+        items = build_items({"a": "1 - A", "b": "2 - B", "c": "3 - C"}, [1, 3])
+        assert [item.video_id for item in items] == ["a", "c"]
+
+    def test_item_url(self):
+        assert PlaylistItem(1, "dQw4w9WgXcQ", "x").url == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+class TestPlaylistScheduler:
+    """Tests for PlaylistScheduler class."""
+
+    def test_all_items_processed(self):
+        items = make_items(10)
+        pool = PlaylistScheduler(items, lambda item: scheduler.DONE, max_workers=3)
+        pool.run()
+        assert all(item.state == scheduler.DONE for item in items)
+
+    def test_mixed_outcomes_counted(self):
+        outcomes = {1: scheduler.DONE, 2: scheduler.SKIPPED, 3: scheduler.FAILED, 4: scheduler.DONE}
+        pool = PlaylistScheduler(make_items(4), lambda item: outcomes[item.index], max_workers=2)
+        pool.run()
+        counts = pool.counts()
+        assert counts[scheduler.DONE] == 2
+        assert counts[scheduler.SKIPPED] == 1
+        assert counts[scheduler.FAILED] == 1
+
+    def test_worker_exception_marks_failed(self):
+        def worker(item):
+            raise RuntimeError("boom")
+
+        items = make_items(2)
+        PlaylistScheduler(items, worker).run()
+        assert all(item.state == scheduler.FAILED for item in items)
+        assert items[0].error == "boom"
+
+    def test_runs_concurrently(self):
+        active = [0]
+        peak = [0]
+        lock = threading.Lock()
+
+        def worker(item):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return scheduler.DONE
+
+        PlaylistScheduler(make_items(8), worker, max_workers=4).run()
+        assert peak[0] > 1
+        assert peak[0] <= 4
+
+    def test_stop_cancels_pending_items(self):
+        stop = threading.Event()
+
+        def worker(item):
+            stop.set()
+            return scheduler.DONE
+
+        items = make_items(5)
+        PlaylistScheduler(items, worker, max_workers=1, stop_event=stop).run()
+        assert items[0].state == scheduler.DONE
+        assert all(item.state == scheduler.CANCELLED for item in items[1:])
+
+    def test_finished_callback_called_for_every_item(self):
+        seen = []
+        PlaylistScheduler(
+            make_items(3), lambda item: scheduler.DONE, on_item_finished=lambda item: seen.append(item.index)
+        ).run()
+        assert sorted(seen) == [1, 2, 3]
+
+    def test_worker_count_is_clamped(self):
+        pool = PlaylistScheduler([], lambda item: scheduler.DONE, max_workers=100)
+        assert pool.max_workers == scheduler.MAX_WORKERS
+
+    def test_limit_caps_running_items_and_can_change(self):
+        active = [0]
+        peaks = []
+        lock = threading.Lock()
+        pool = None
+
+        def worker(item):
+            with lock:
+                active[0] += 1
+                peaks.append(active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            if item.index == 4:
+                pool.set_limit(3)
+            return scheduler.DONE
+
+        pool = PlaylistScheduler(make_items(12), worker, max_workers=4, limit=1)
+        pool.run()
+        assert max(peaks[:4]) == 1
+        assert max(peaks) == 3
+        assert pool.counts()[scheduler.DONE] == 12
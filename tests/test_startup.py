@@ -0,0 +1,229 @@
+"""Tests for youtubemp3downloader.startup module."""
+
+import json
+import os
+import threading
+
+import pytest
+
+from youtubemp3downloader import config, engine, startup
+
+
+ENCODERS_OUTPUT = """Encoders:
+ V..... = Video
+ A..... = Audio
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC
+ A....D libmp3lame           libmp3lame MP3 (MPEG audio layer 3)
+ A....D libopus              libopus Opus
+"""
+
+
+@pytest.fixture
+def tools(tmp_path):
+    """A directory holding stand-in yt-dlp and ffmpeg binaries."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("yt-dlp", "ffmpeg"):
+        (bin_dir / name).write_text("")
+    return bin_dir
+
+
+def fake_which(bin_dir):
+    """shutil.which stand-in finding whatever exists in ``bin_dir``."""
+    def which(tool, path=None):
+        candidate = bin_dir / tool
+        return str(candidate) if candidate.exists() else None
+    return which
+
+
+DEBUG_OUTPUT = """[debug] Command-line config: ['--verbose', '--ignore-config']
+[debug] yt-dlp version stable@2024.08.06 from yt-dlp/yt-dlp [4d9231208] (zip)
+[debug] Optional libraries: Cryptodome-3.20.0, brotli-1.1.0, mutagen-1.47.0, sqlite3-3.45.1
+Usage: yt-dlp [OPTIONS] URL [URL...]
+"""
+
+
+def fake_run(cmd, stderr=False):
+    """Probe runner answering version, encoder and debug header queries."""
+    if stderr:
+        return DEBUG_OUTPUT
+    if "-encoders" in cmd:
+        return ENCODERS_OUTPUT
+    if os.path.basename(cmd[0]) == "ffmpeg":
+        return "ffmpeg version 6.1\nbuilt with gcc\n"
+    return "2024.08.06\n"
+
+
+def probe_in(bin_dir, path_env="/usr/bin"):
+    """probe_dependencies over the stand-in binaries."""
+    return lambda: startup.probe_dependencies(path_env, which=fake_which(bin_dir), run=fake_run)
+
+
+class TestProbe:
+    """Tests for looking up the external tools."""
+
+    def test_parse_encoders(self):
+        assert startup.parse_encoders(ENCODERS_OUTPUT) == ["libmp3lame", "libopus"]
+
+    def test_versions_and_encoders(self, tools):
+        report = probe_in(tools)()
+        assert report.version("yt-dlp") == "2024.08.06"
+        assert report.version("ffmpeg") == "ffmpeg version 6.1"
+        assert report.has_encoder("libmp3lame")
+        assert report.ytdlp_libraries == ["cryptodome", "brotli", "mutagen", "sqlite3"]
+        assert report.missing_required == []
+        assert report.missing_optional == ["notify-send", "xdg-open"]
+
+    def test_parse_libraries_without_header(self):
+        assert startup.parse_libraries("ERROR: You must provide at least one URL.") == []
+
+    def test_missing_tool(self, tools):
+        (tools / "ffmpeg").unlink()
+        report = probe_in(tools)()
+        assert report.missing_required == ["ffmpeg"]
+        assert report.encoders == []
+
+
+class TestDependencyCache:
+    """Tests for reusing the dependency report across starts."""
+
+    @pytest.fixture(autouse=True)
+    def path_env(self, monkeypatch):
+        """Pin PATH, which keys the cache."""
+        monkeypatch.setenv("PATH", "/usr/bin")
+
+    def test_round_trip(self, tmp_path, tools):
+        cache = startup.DependencyCache(tmp_path / "deps.json")
+        cache.save(probe_in(tools)())
+        loaded = cache.load()
+        assert loaded.cached
+        assert loaded.version("ffmpeg") == "ffmpeg version 6.1"
+        assert loaded.is_current("/usr/bin")
+
+    def test_default_path_in_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert startup.DependencyCache().path == tmp_path / startup.CACHE_FILENAME
+
+    def test_cache_without_libraries_is_probed_again(self, tmp_path, tools):
+        cache = startup.DependencyCache(tmp_path / "deps.json")
+        report = probe_in(tools)()
+        data = report.to_dict()
+        del data["ytdlp_libraries"]
+        cache.path.write_text(json.dumps(data))
+        assert cache.load() is None
+
+    def test_corrupt_cache_ignored(self, tmp_path):
+        path = tmp_path / "deps.json"
+        path.write_text("{not json")
+        assert startup.DependencyCache(path).load() is None
+
+    def test_stale_after_path_or_binary_change(self, tools):
+        report = probe_in(tools)()
+        assert not report.is_current("/opt/bin:/usr/bin")
+        ffmpeg = tools / "ffmpeg"
+        os.utime(ffmpeg, (1, 1))
+        assert not report.is_current("/usr/bin")
+
+    def test_cached_report_used_without_probing(self, tmp_path, tools):
+        cache = startup.DependencyCache(tmp_path / "deps.json")
+        cache.save(probe_in(tools)())
+
+        def probe():
+            raise AssertionError("probed despite a current cache")
+
+        report = startup.check_dependencies(cache, probe=probe, background=False)
+        assert report.cached
+
+    def test_missing_required_tool_probes_again(self, tmp_path, tools):
+        cache = startup.DependencyCache(tmp_path / "deps.json")
+        (tools / "yt-dlp").unlink()
+        cache.save(probe_in(tools)())
+        (tools / "yt-dlp").write_text("")
+        report = startup.check_dependencies(cache, probe=probe_in(tools), background=False)
+        assert not report.cached
+        assert report.missing_required == []
+        assert cache.load().missing_required == []
+
+    def test_background_revalidation_updates_cache(self, tmp_path, tools):
+        cache = startup.DependencyCache(tmp_path / "deps.json")
+        cache.save(probe_in(tools)())
+        probed = threading.Event()
+
+        def probe():
+            (tools / "notify-send").write_text("")
+            report = probe_in(tools)()
+            probed.set()
+            return report
+
+        assert startup.check_dependencies(cache, probe=probe).cached
+        assert probed.wait(5)
+        for thread in threading.enumerate():
+            if thread.name == "dependency-check":
+                thread.join(5)
+        assert cache.load().missing_optional == ["xdg-open"]
+
+
+class TestHasMutagen:
+    """Tests for probing mutagen once per backend."""
+
+    @pytest.fixture(autouse=True)
+    def fresh(self, monkeypatch):
+        monkeypatch.setattr(startup, "_mutagen", {})
+
+    def test_command_uses_the_cached_report(self, monkeypatch, tools):
+        reports = []
+
+        def check_dependencies(background=True):
+            reports.append(background)
+            return probe_in(tools)()
+
+        monkeypatch.setattr(startup, "check_dependencies", check_dependencies)
+        assert startup.has_mutagen()
+        assert startup.has_mutagen()
+        assert reports == [False]
+
+    def test_in_process_looks_in_this_interpreter(self, monkeypatch):
+        lookups = []
+        monkeypatch.setattr(startup.importlib.util, "find_spec", lambda name: lookups.append(name))
+        assert not startup.has_mutagen(in_process=True)
+        assert not startup.has_mutagen(in_process=True)
+        assert lookups == ["mutagen"]
+
+
+class TestStartupTimer:
+    """Tests for the --startup-timing report."""
+
+    def test_phases(self):
+        ticks = iter([0.0, 0.25, 0.75])
+        timer = startup.StartupTimer(clock=lambda: next(ticks))
+        assert timer.mark("imports") == 0.25
+        timer.mark("main window")
+        assert timer.total == 0.75
+        lines = timer.report().splitlines()
+        assert lines[0] == "Startup timing:"
+        assert lines[1].split() == ["imports", "250.0", "ms"]
+        assert lines[2].split() == ["main", "window", "500.0", "ms"]
+        assert lines[3].split() == ["total", "750.0", "ms"]
+
+    def test_deferred_work_is_not_in_total(self):
+        ticks = iter([0.0, 0.25, 1.0, 1.5])
+        timer = startup.StartupTimer(clock=lambda: next(ticks))
+        timer.mark("main window")
+        loaded = []
+        assert timer.measure_deferred("job modules", lambda: loaded.append(True)) == 0.5
+        assert loaded == [True]
+        assert timer.total == 0.25
+        lines = timer.report().splitlines()
+        assert lines[3] == "Deferred until needed:"
+        assert lines[4].split() == ["job", "modules", "500.0", "ms"]
+
+
+class TestLazyEngine:
+    """Tests for loading yt_dlp only when an engine is used."""
+
+    def test_availability_without_import(self, monkeypatch):
+        monkeypatch.setattr(engine, "yt_dlp", engine._NOT_LOADED)
+        monkeypatch.setattr(engine.importlib.util, "find_spec", lambda name: None)
+        assert engine.is_available() is False
+        assert engine.yt_dlp is engine._NOT_LOADED
@@ -0,0 +1,186 @@
+"""Tests for youtubemp3downloader.throughput module."""
+
+import json
+
+from youtubemp3downloader import config, download, throughput
+from youtubemp3downloader.throughput import ThroughputController, ThroughputStore, TuningProfile
+
+MIB = 1024 * 1024
+
+
+class FakeClock:
+    """Clock advanced by the test."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_window(controller, clock, speeds):
+    """Report the per-item speeds for one measurement window."""
+    for _ in range(5):
+        for key, speed in enumerate(speeds):
+            controller.record(key, speed)
+        clock.now += throughput.ADJUST_INTERVAL / 4
+
+
+def run_link(controller, clock, capacity, per_worker, windows):
+    """Simulate a link: each worker gets per_worker up to the shared capacity."""
+    for _ in range(windows):
+        for key in range(controller.workers, controller.max_workers):
+            controller.item_finished(key)
+        speed = min(per_worker, capacity / controller.workers)
+        run_window(controller, clock, [speed] * controller.workers)
+
+
+class TestTuningProfile:
+    """Tests for the settings and their yt-dlp arguments."""
+
+    def test_command_arguments(self):
+        assert TuningProfile().command_args() == []
+        assert TuningProfile(fragments=4, chunk_mb=8).command_args() == [
+            "--concurrent-fragments", "4", "--http-chunk-size", "8M",
+        ]
+
+    def test_ydl_options(self):
+        assert TuningProfile(fragments=3, chunk_mb=2).ydl_options() == {
+            "concurrent_fragment_downloads": 3, "http_chunk_size": 2 * MIB,
+        }
+
+    def test_from_dict_clamps_values(self):
+        profile = TuningProfile.from_dict({"workers": 0, "fragments": 99, "chunk_mb": 1000})
+        assert (profile.workers, profile.fragments, profile.chunk_mb) == (1, throughput.MAX_FRAGMENTS, 64)
+
+
+class TestThroughputController:
+    """Tests for the AIMD tuning loop."""
+
+    def test_grows_while_the_link_has_capacity(self):
+        clock = FakeClock()
+        changes = []
+        controller = ThroughputController(8, on_workers_changed=changes.append, clock=clock)
+        run_link(controller, clock, capacity=40 * MIB, per_worker=2 * MIB, windows=40)
+        assert controller.workers > 4
+        assert changes and changes[-1] == controller.workers
+
+    def test_stops_growing_once_the_link_is_full(self):
+        clock = FakeClock()
+        controller = ThroughputController(8, clock=clock)
+        run_link(controller, clock, capacity=4 * MIB, per_worker=2 * MIB, windows=40)
+        assert controller.workers <= 3
+        best = controller.best_profile()
+        assert best.throughput == 4 * MIB
+        assert best.workers == 2
+
+    def test_throttling_halves_the_settings(self):
+        clock = FakeClock()
+        controller = ThroughputController(8, TuningProfile(workers=6, fragments=4), clock=clock)
+        run_window(controller, clock, [MIB] * 6)
+        controller.record_error("ERROR: [youtube] x: HTTP Error 429: Too Many Requests")
+        run_window(controller, clock, [MIB] * 6)
+        assert (controller.workers, controller.fragments) == (3, 2)
+
+    def test_unrelated_errors_are_ignored(self):
+        clock = FakeClock()
+        controller = ThroughputController(8, TuningProfile(workers=4), clock=clock)
+        controller.record_error("ERROR: [youtube] x: Video unavailable")
+        assert not controller._throttled
+
+    def test_collapse_in_speed_backs_off(self):
+        clock = FakeClock()
+        controller = ThroughputController(8, TuningProfile(workers=4), clock=clock)
+        controller._stable_windows = 0
+        run_window(controller, clock, [2 * MIB] * 4)
+        run_window(controller, clock, [MIB / 4] * 4)
+        assert controller.workers == 2
+
+    def test_idle_workers_do_not_count(self):
+        clock = FakeClock()
+        controller = ThroughputController(8, TuningProfile(workers=4), clock=clock)
+        run_window(controller, clock, [MIB])
+        assert controller.best_profile() is None
+        assert controller.workers == 4
+
+    def test_chunk_size_follows_item_speed(self):
+        clock = FakeClock()
+        controller = ThroughputController(1, clock=clock)
+        run_window(controller, clock, [4 * MIB])
+        assert controller.current().chunk_mb == 4 * throughput.CHUNK_SECONDS + 1
+
+    def test_starts_from_profile_within_bounds(self):
+        controller = ThroughputController(4, TuningProfile(workers=6, fragments=3))
+        assert (controller.workers, controller.fragments) == (4, 3)
+
+
+class TestThroughputStore:
+    """Tests for the per-network settings file."""
+
+    def test_round_trip(self, tmp_path):
+        store = ThroughputStore(tmp_path / "t.json")
+        assert store.get("net") is None
+        store.put("net", TuningProfile(workers=3, fragments=2, chunk_mb=4, throughput=5 * MIB))
+        profile = ThroughputStore(tmp_path / "t.json").get("net")
+        assert (profile.workers, profile.fragments, profile.chunk_mb) == (3, 2, 4)
+        assert profile.updated_at > 0
+
+    def test_oldest_networks_are_dropped(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(throughput, "MAX_NETWORKS", 2)
+        store = ThroughputStore(tmp_path / "t.json")
+        for name in ("a", "b", "c"):
+            store.put(name, TuningProfile())
+        assert sorted(json.loads((tmp_path / "t.json").read_text())) == ["b", "c"]
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        (tmp_path / "t.json").write_text("{not json")
+        assert ThroughputStore(tmp_path / "t.json").get("net") is None
+
+    def test_default_path_follows_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert ThroughputStore().path == tmp_path / throughput.THROUGHPUT_FILENAME
+
+
+class TestNetworkId:
+    """Tests for identifying the current network."""
+
+    def test_is_stable(self):
+        assert throughput.network_id() == throughput.network_id()
+
+
+class TestTuningArguments:
+    """The download command carries the tuned fragment settings."""
+
+    def test_download_command(self):
+        cmd = download._base_command(False, "firefox", tuning_args=["--concurrent-fragments", "4"])
+        assert cmd[cmd.index("--concurrent-fragments") + 1] == "4"
+
+
+class TestAdaptiveDownload:
+    """End-to-end adaptive playlist download against the fake tools."""
+
+    def test_playlist_learns_settings(self, fake_downloads, monkeypatch):
+        monkeypatch.setattr(throughput, "ADJUST_INTERVAL", 0.05)
+        monkeypatch.setattr(throughput, "network_id", lambda: "test-net")
+        store = ThroughputStore()
+        result = fake_downloads.run(
+            "adaptive", {"max_workers": 1, "throughput_store": store}, items=6, records=20, line_delay=0.01
+        )
+        assert result.run.successful == 6
+        assert store.get("test-net") is not None
+
+    def test_configured_workers_are_the_ceiling(self, fake_downloads, monkeypatch):
+        monkeypatch.setattr(throughput, "network_id", lambda: "test-net")
+        store = ThroughputStore()
+        store.put("test-net", TuningProfile(workers=6, fragments=3))
+        started = []
+
+        class Recording(ThroughputController):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                started.append((self.max_workers, self.workers, self.fragments))
+
+        monkeypatch.setattr(throughput, "ThroughputController", Recording)
+        result = fake_downloads.run("ceiling", {"max_workers": 2, "throughput_store": store})
+        assert result.run.successful == 3
+        assert started == [(2, 2, 3)]
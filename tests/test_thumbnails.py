@@ -0,0 +1,338 @@
+"""Tests for youtubemp3downloader.thumbnails module."""
+
+import http.server
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from benchmarks import bench, fakes
+from youtubemp3downloader import config, download, events, thumbnails
+from youtubemp3downloader.exceptions import DownloadError
+from youtubemp3downloader.jobqueue import JobRun, QueuedJob
+
+JPEG = b"\xff\xd8\xff\xe0cover"
+
+
+class CountingStore(thumbnails.ThumbnailStore):
+    """Store that copies images as they are and counts what was added."""
+
+    def __init__(self, directory, **kwargs):
+        kwargs.setdefault("converter", shutil.copyfile)
+        super().__init__(directory, **kwargs)
+        self.added = []
+
+    def add_file(self, video_id, source):
+        self.added.append(video_id)
+        return super().add_file(video_id, source)
+
+
+class CoverServer:
+    """Local HTTP stand-in for YouTube's cover images, counting requests."""
+
+    def __init__(self, delay=0.0, missing=()):
+        self.requests = []
+        self.delay = delay
+        self.missing = set(missing)
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                video_id = self.path.rsplit("/", 1)[-1][:-len(".jpg")]
+                server.requests.append(video_id)
+                time.sleep(server.delay)
+                if video_id in server.missing:
+                    self.send_error(404)
+                    return
+                body = JPEG + video_id.encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    def urls(self, video_id):
+        return ["http://127.0.0.1:{}/vi/{}.jpg".format(self.httpd.server_port, video_id)]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def cover_server():
+    """Serve covers for every video ID."""
+    server = CoverServer()
+    yield server
+    server.close()
+
+
+def make_loader(tmp_path, server, **kwargs):
+    """Loader decoding covers to their bytes and delivering them to a list."""
+    loaded = []
+    loader = thumbnails.ThumbnailLoader(
+        CountingStore(tmp_path / "store"),
+        lambda path: open(path, "rb").read(),
+        lambda video_id, data: loaded.append(video_id),
+        lambda callback, *args: callback(*args),
+        urls=server.urls,
+        **kwargs,
+    )
+    return loader, loaded
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until the condition holds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def image(tmp_path, name, data=JPEG):
+    """Write an image file and return its path."""
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+class TestThumbnailStore:
+    """Tests for storing, sharing and evicting covers."""
+
+    def test_add_and_get(self, tmp_path):
+        store = CountingStore(tmp_path / "store")
+        assert store.get("vid1") is None
+        stored = store.add_file("vid1", image(tmp_path, "a.jpg"))
+        assert store.get("vid1") == stored
+        assert open(stored, "rb").read() == JPEG
+        assert os.path.isfile(tmp_path / "a.jpg")
+
+    def test_identical_covers_share_one_file(self, tmp_path):
+        store = CountingStore(tmp_path / "store")
+        first = store.add_file("vid1", image(tmp_path, "a.jpg"))
+        second = store.add_file("vid2", image(tmp_path, "b.jpg"))
+        assert first == second
+        assert store.total_bytes() == len(JPEG)
+
+    def test_least_recently_used_covers_are_evicted(self, tmp_path):
+        store = CountingStore(tmp_path / "store", max_bytes=25)
+        old = store.add_file("old", image(tmp_path, "old.jpg", b"o" * 10))
+        store.add_file("used", image(tmp_path, "used.jpg", b"u" * 10))
+        time.sleep(0.01)
+        store.get("used")
+        store.add_file("new", image(tmp_path, "new.jpg", b"n" * 10))
+        assert store.get("old") is None
+        assert not os.path.exists(old)
+        assert store.get("used") and store.get("new")
+        assert store.total_bytes() == 20
+
+    def test_a_cover_larger_than_the_store_is_kept(self, tmp_path):
+        store = CountingStore(tmp_path / "store", max_bytes=5)
+        assert store.add_file("vid1", image(tmp_path, "a.jpg"))
+        assert store.get("vid1")
+
+    def test_deleted_cover_is_a_miss(self, tmp_path):
+        store = CountingStore(tmp_path / "store")
+        os.remove(store.add_file("vid1", image(tmp_path, "a.jpg")))
+        assert store.get("vid1") is None
+        assert store.total_bytes() == 0
+
+    def test_failed_conversion_is_not_stored(self, tmp_path):
+        def converter(source, destination):
+            raise DownloadError("not an image")
+
+        store = thumbnails.ThumbnailStore(tmp_path / "store", converter=converter)
+        assert store.add_file("vid1", image(tmp_path, "a.jpg")) is None
+        assert store.get("vid1") is None
+
+    def test_default_directory_follows_config_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert thumbnails.ThumbnailStore().directory == tmp_path / thumbnails.THUMBNAILS_DIR
+
+    def test_settings(self):
+        assert thumbnails.store_from_settings({"thumbnail_store_mb": 0}) is None
+        assert thumbnails.store_from_settings({"thumbnail_store_mb": 5}).max_bytes == 5 * 1024 * 1024
+        assert thumbnails.store_from_settings({}).max_bytes == thumbnails.DEFAULT_MAX_BYTES
+
+
+class TestFetch:
+    """Tests for fetching covers by URL."""
+
+    def test_fetched_once(self, tmp_path):
+        urls = []
+
+        def fetcher(url):
+            urls.append(url)
+            time.sleep(0.05)
+            return JPEG
+
+        store = CountingStore(tmp_path / "store", fetcher=fetcher)
+        threads = [threading.Thread(target=store.fetch, args=("vid1",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert urls == thumbnails.thumbnail_urls("vid1")[:1]
+        assert store.fetch("vid1") == store.get("vid1")
+        assert len(urls) == 1
+
+    def test_falls_back_to_the_next_url(self, tmp_path):
+        def fetcher(url):
+            if "hqdefault" in url:
+                raise OSError("404")
+            return JPEG
+
+        store = CountingStore(tmp_path / "store", fetcher=fetcher)
+        assert store.fetch("vid1") is not None
+
+    def test_no_url_works(self, tmp_path):
+        def fetcher(url):
+            raise OSError("offline")
+
+        store = CountingStore(tmp_path / "store", fetcher=fetcher)
+        assert store.fetch("vid1") is None
+
+
+class TestConvertToJpeg:
+    """Tests for the fallback when ffmpeg is missing."""
+
+    def test_jpeg_is_copied(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PATH", str(tmp_path))
+        destination = tmp_path / "out.jpg"
+        thumbnails.convert_to_jpeg(image(tmp_path, "a.jpg"), str(destination))
+        assert destination.read_bytes() == JPEG
+
+    def test_other_images_fail(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("PATH", str(tmp_path))
+        with pytest.raises(DownloadError):
+            thumbnails.convert_to_jpeg(image(tmp_path, "a.webp", b"RIFF....WEBP"), str(tmp_path / "out.jpg"))
+
+
+class TestDownloadIntegration:
+    """The downloads fetch each cover once and reuse it afterwards."""
+
+    def test_command_thumbnail_flags(self):
+        cmd = download._base_command(False, "firefox", keep_thumbnail=True)
+        assert "--embed-thumbnail" in cmd and "--write-thumbnail" in cmd
+        cmd = download._base_command(False, "firefox", fetch_thumbnail=False, keep_thumbnail=True)
+        assert "--embed-thumbnail" not in cmd and "--write-thumbnail" not in cmd
+        cmd = download._base_command(False, "firefox", extract_audio=False, fetch_thumbnail=False)
+        assert "--write-thumbnail" not in cmd
+
+    def test_kept_thumbnail_moves_into_the_store(self, tmp_path):
+        store = CountingStore(tmp_path / "store")
+        mp3 = image(tmp_path, "Song.mp3", b"audio")
+        image(tmp_path, "Song.jpg")
+        run = JobRun(QueuedJob("URL", "Video", str(tmp_path)), bench.NullSink())
+        processor = download._OutputProcessor(run, {}, thumbnail_store=store)
+        processor.handle_event(events.PostprocessDone(mp3, "vid1"))
+        assert store.added == ["vid1"]
+        assert not os.path.exists(tmp_path / "Song.jpg")
+        assert processor.completed_path == mp3
+
+    def test_second_run_reuses_the_stored_covers(self, tmp_path, fake_downloads):
+        store = CountingStore(tmp_path / "store")
+        options = {"max_workers": 2, "thumbnail_store": store}
+        for run in range(2):
+            folder = "music{}".format(run)
+            fake_downloads.run("covers", options, folder=folder)
+            assert len(fake_downloads.files(".mp3", folder)) == 3
+            assert not fake_downloads.files(".jpg", folder)
+        assert sorted(store.added) == [fakes.video_id(i) for i in range(1, 4)]
+
+
+class TestLRUCache:
+    """Tests for the decoded cover cache."""
+
+    def test_least_recently_used_item_goes_first(self):
+        cache = thumbnails.LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert "b" not in cache
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert len(cache) == 2
+
+
+class TestThumbnailLoader:
+    """Tests for lazy loading against a local HTTP stand-in."""
+
+    def test_only_requested_covers_are_fetched(self, tmp_path, cover_server):
+        loader, loaded = make_loader(tmp_path, cover_server)
+        visible = ["vid{}".format(i) for i in range(10)]
+        loader.request(visible)
+        wait_for(lambda: len(loaded) == 10)
+        assert sorted(cover_server.requests) == sorted(visible)
+        assert loader.get("vid3") == JPEG + b"vid3"
+        loader.request(visible)
+        time.sleep(0.05)
+        assert len(cover_server.requests) == 10
+        loader.close()
+
+    def test_scrolling_past_rows_drops_their_requests(self, tmp_path):
+        server = CoverServer(delay=0.05)
+        try:
+            loader, loaded = make_loader(tmp_path, server, workers=2)
+            for top in range(0, 5000, 20):
+                loader.request(["vid{}".format(i) for i in range(top, top + 20)])
+            wait_for(lambda: "vid4999" in loaded)
+            assert len(server.requests) < 60
+            loader.close()
+        finally:
+            server.close()
+
+    def test_memory_is_bounded_by_the_cache(self, tmp_path, cover_server):
+        loader, loaded = make_loader(tmp_path, cover_server, cache_size=8)
+        loader.request(["vid{}".format(i) for i in range(30)])
+        wait_for(lambda: len(loaded) == 30)
+        assert len(loader.cache) == 8
+        loader.close()
+
+    def test_decoding_happens_off_the_calling_thread(self, tmp_path, cover_server):
+        threads = []
+
+        def decode(path):
+            threads.append(threading.get_ident())
+            return path
+
+        loaded = []
+        loader = thumbnails.ThumbnailLoader(
+            CountingStore(tmp_path / "store"), decode, lambda video_id, path: loaded.append(video_id),
+            lambda callback, *args: callback(*args), urls=cover_server.urls,
+        )
+        loader.request(["vid1", "vid2"])
+        wait_for(lambda: len(loaded) == 2)
+        assert threading.get_ident() not in threads
+        loader.close()
+
+    def test_missing_cover_is_not_requested_again(self, tmp_path):
+        server = CoverServer(missing={"gone"})
+        try:
+            loader, loaded = make_loader(tmp_path, server)
+            loader.request(["gone", "vid1"])
+            wait_for(lambda: loaded == ["vid1"] and len(server.requests) == 2)
+            loader.request(["gone"])
+            time.sleep(0.05)
+            assert server.requests.count("gone") == 1
+            loader.close()
+        finally:
+            server.close()
+
+    def test_stored_covers_are_not_downloaded_again(self, tmp_path, cover_server):
+        loader, loaded = make_loader(tmp_path, cover_server)
+        loader.request(["vid1"])
+        wait_for(lambda: loaded == ["vid1"])
+        loader.cache.clear()
+        loader.request(["vid1"])
+        wait_for(lambda: loaded == ["vid1", "vid1"])
+        assert cover_server.requests == ["vid1"]
+        loader.close()
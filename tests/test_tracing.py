@@ -0,0 +1,194 @@
+"""Tests for youtubemp3downloader.tracing module."""
+
+import json
+import os
+import pstats
+import threading
+
+from youtubemp3downloader import config, events, tracing
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def spans_named(tracer, name):
+    """The recorded spans with a given name."""
+    return [span for span in tracer.spans if span["name"] == name]
+
+
+class TestTracer:
+    """Tests for recording spans."""
+
+    def test_span_timestamps_are_relative_microseconds(self):
+        clock = FakeClock()
+        tracer = tracing.Tracer("job", clock=clock)
+        clock.now += 0.5
+        with tracing.span(tracer, "fetch playlist info", items=3):
+            clock.now += 0.25
+        span, = tracer.spans
+        assert span["ph"] == "X"
+        assert span["ts"] == 500000
+        assert span["dur"] == 250000
+        assert span["args"] == {"items": 3}
+
+    def test_failed_span_names_the_error(self):
+        tracer = tracing.Tracer()
+        try:
+            with tracing.span(tracer, "download"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        assert tracer.spans[0]["args"] == {"error": "ValueError"}
+
+    def test_span_without_tracer_records_nothing(self):
+        span = tracing.span(None, "download")
+        span.end()
+        with tracing.span(None, "cleanup"):
+            pass
+
+    def test_span_ends_once(self):
+        tracer = tracing.Tracer()
+        span = tracing.span(tracer, "job", tracing.JOB)
+        span.end()
+        span.end()
+        assert len(tracer.spans) == 1
+
+    def test_chrome_export_names_process_and_threads(self):
+        tracer = tracing.Tracer("playlist")
+        tracing.span(tracer, "download").end()
+        trace = tracer.to_chrome()
+        metadata = [event for event in trace["traceEvents"] if event["ph"] == "M"]
+        assert {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "playlist"}} in metadata
+        assert [event["args"]["name"] for event in metadata if event["name"] == "thread_name"] == ["MainThread"]
+        assert all(event["pid"] == os.getpid() for event in trace["traceEvents"])
+
+
+class TestItemTrace:
+    """Tests for following the phases of an item."""
+
+    def test_phases_follow_events(self):
+        tracer = tracing.Tracer()
+        trace = tracer.item("#1", video_id="abc")
+        trace.enter(tracing.EXTRACT)
+        trace.on_event(events.Destination("/music/a.webm"))
+        trace.on_event(events.Progress(50.0))
+        trace.on_event(events.LogLine("[ExtractAudio] Destination: /music/a.mp3"))
+        # Progress after the download must not reopen it
+        trace.on_event(events.Progress(100.0))
+        trace.on_event(events.LogLine("[EmbedThumbnail] ffmpeg: Adding thumbnail"))
+        trace.close("done")
+        names = [span["name"] for span in tracer.spans]
+        assert names == [tracing.EXTRACT, tracing.DOWNLOAD, tracing.CONVERT, tracing.EMBED, "#1"]
+        item = spans_named(tracer, "#1")[0]
+        assert item["args"] == {"video_id": "abc", "outcome": "done"}
+
+    def test_unrelated_lines_keep_the_phase(self):
+        assert tracing.phase_for(events.LogLine("[youtube] abc: Downloading webpage")) is None
+        assert tracing.phase_for(events.ItemError("ERROR: gone")) is None
+
+
+class TestSaving:
+    """Tests for writing traces and parser profiles."""
+
+    def test_save_writes_chrome_json(self, tmp_path):
+        tracer = tracing.Tracer.for_job(tmp_path, "https://www.youtube.com/watch?v=abc")
+        tracing.span(tracer, "download").end()
+        path = tracer.save()
+        assert path.parent == tmp_path
+        assert path.name.endswith("-watch-v-abc.json")
+        with open(path, encoding="utf-8") as f:
+            trace = json.load(f)
+        assert [event["name"] for event in trace["traceEvents"] if event["ph"] == "X"] == ["download"]
+
+    def test_parser_profile_saved_next_to_trace(self, tmp_path):
+        tracer = tracing.Tracer("job", tmp_path / "job.json", profile_parser=True)
+        assert tracer.profile(sorted, [3, 1, 2]) == [1, 2, 3]
+        tracer.save()
+        stats = pstats.Stats(str(tmp_path / "job.prof"))
+        assert stats.total_calls > 0
+
+    def test_profilers_of_concurrent_jobs_take_turns(self, tmp_path):
+        tracers = [tracing.Tracer(name, tmp_path / "{}.json".format(name), profile_parser=True) for name in "ab"]
+        errors = []
+
+        def parse(tracer):
+            try:
+                for _ in range(50):
+                    tracer.profile(sorted, list(range(200, 0, -1)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=parse, args=(tracer,)) for tracer in tracers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        for tracer in tracers:
+            tracer.save()
+            assert pstats.Stats(str(tracer.profile_path)).total_calls > 0
+
+    def test_nested_profile_runs_unprofiled(self, tmp_path):
+        outer = tracing.Tracer("outer", tmp_path / "outer.json", profile_parser=True)
+        inner = tracing.Tracer("inner", tmp_path / "inner.json", profile_parser=True)
+        assert outer.profile(inner.profile, sorted, [2, 1]) == [1, 2]
+        outer.save()
+        inner.save()
+        assert not inner.profile_path.exists()
+
+    def test_old_traces_pruned(self, tmp_path):
+        for i in range(5):
+            path = tmp_path / "{}.json".format(i)
+            path.write_text("{}")
+            os.utime(path, (i, i))
+        (tmp_path / "0.prof").write_text("")
+        assert tracing.prune(tmp_path, keep=3) == 2
+        assert sorted(os.listdir(tmp_path)) == ["2.json", "3.json", "4.json"]
+
+    def test_settings(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "CONFIG_DIR", tmp_path)
+        assert tracing.trace_dir_from_settings({}) is None
+        assert tracing.trace_dir_from_settings({"trace_jobs": True}) == str(tmp_path / tracing.TRACES_DIR)
+        assert tracing.trace_dir_from_settings({"trace_jobs": True, "trace_dir": "/tmp/t"}) == "/tmp/t"
+
+
+class TestTracedDownload:
+    """End-to-end traced runs against the fake tools."""
+
+    def run_traced(self, tmp_path, fake_downloads, seed, **options):
+        """Download a three video playlist with tracing on; returns the trace events."""
+        traces = tmp_path / "traces"
+        options.update(trace_dir=str(traces))
+        fake_downloads.run(seed, options)
+        trace_files = [name for name in os.listdir(traces) if name.endswith(".json")]
+        assert len(trace_files) == 1
+        with open(traces / trace_files[0], encoding="utf-8") as f:
+            return [event for event in json.load(f)["traceEvents"] if event["ph"] == "X"]
+
+    def test_serial_download_traces_items(self, tmp_path, fake_downloads):
+        spans = self.run_traced(tmp_path, fake_downloads, "serial-trace", profile_parser=True)
+        names = [span["name"] for span in spans]
+        assert "job" in names and "download" in names
+        items = [span for span in spans if span["name"].startswith("#")]
+        assert [span["args"]["outcome"] for span in items] == ["done"] * 3
+        assert names.count(tracing.DOWNLOAD) >= 3
+        assert os.listdir(tmp_path / "traces") and any(
+            name.endswith(".prof") for name in os.listdir(tmp_path / "traces")
+        )
+
+    def test_pipeline_traces_conversions(self, tmp_path, fake_downloads):
+        spans = self.run_traced(tmp_path, fake_downloads, "pipeline-trace", max_workers=2, use_pipeline=True)
+        items = [span for span in spans if span["name"].startswith("#")]
+        assert sorted(span["name"] for span in items) == ["#1", "#2", "#3"]
+        assert {span["args"]["outcome"] for span in items} == {"downloaded"}
+        conversions = [span for span in spans if span["name"] == tracing.CONVERT and "success" in span["args"]]
+        assert len(conversions) == 3
+        # Conversions run on the encoder threads, not on the download workers
+        assert not {span["tid"] for span in conversions} & {span["tid"] for span in items}
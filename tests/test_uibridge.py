@@ -0,0 +1,67 @@
+"""Tests for youtubemp3downloader.uibridge module."""
+
+import threading
+
+from youtubemp3downloader import uibridge
+
+
+class TestUIUpdateBridge:
+    """Tests for the UIUpdateBridge class."""
+
+    def test_empty_bridge(self):
+        bridge = uibridge.UIUpdateBridge()
+        assert not bridge.has_pending()
+        assert bridge.drain() == ([], None, None)
+
+    def test_log_lines_keep_order(self):
+        bridge = uibridge.UIUpdateBridge()
+        bridge.log("first")
+        bridge.log("second")
+        assert bridge.has_pending()
+        assert bridge.drain() == ([("first", False), ("second", False)], None, None)
+        assert not bridge.has_pending()
+
+    def test_consecutive_progress_lines_collapse(self):
+        bridge = uibridge.UIUpdateBridge()
+        bridge.log("start")
+        bridge.log("10%", progress=True)
+        bridge.log("20%", progress=True)
+        bridge.log("done")
+        bridge.log("30%", progress=True)
+        assert bridge.drain()[0] == [("start", False), ("20%", True), ("done", False), ("30%", True)]
+
+    def test_only_latest_progress_is_kept(self):
+        bridge = uibridge.UIUpdateBridge()
+        bridge.progress(0.1, "10%")
+        bridge.progress(0.5, "50%")
+        bridge.progress(text="50% | ETA 00:05")
+        assert bridge.drain() == ([], 0.5, "50% | ETA 00:05")
+        assert bridge.drain() == ([], None, None)
+
+    def test_fraction_is_clamped(self):
+        bridge = uibridge.UIUpdateBridge()
+        bridge.progress(1.7)
+        assert bridge.drain()[1] == 1.0
+        bridge.progress(-0.2)
+        assert bridge.drain()[1] == 0.0
+
+    def test_concurrent_writers_lose_no_lines(self):
+        bridge = uibridge.UIUpdateBridge()
+
+        def writer(n):
+            for i in range(500):
+                bridge.log("{}-{}".format(n, i))
+                bridge.progress(i / 500)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        lines, fraction, _ = bridge.drain()
+        assert len(lines) == 2000
+        assert fraction is not None
+
+    def test_update_interval_matches_rate(self):
+        assert 10 <= uibridge.UPDATE_HZ <= 20
+        assert uibridge.UPDATE_INTERVAL_MS == 1000 // uibridge.UPDATE_HZ
@@ -2,7 +2,7 @@
 
 import pytest
 
-from youtubemp3downloader.utils import classify_youtube_url
+from youtubemp3downloader.utils import classify_youtube_url, compress_ranges, parse_playlist_items, path_digest
 from youtubemp3downloader.exceptions import ValidationError
 
 
@@ -95,3 +95,57 @@ class TestClassifyYoutubeUrl:
     def test_leading_trailing_whitespace(self):
         url_type, _ = classify_youtube_url("  https://www.youtube.com/watch?v=dQw4w9WgXcQ  ")
         assert url_type == "Video"
+
+
+class TestParsePlaylistItems:
+    """Tests for parse_playlist_items function."""
+
+    def test_single_indices(self):
+        assert parse_playlist_items("3,1,2") == [1, 2, 3]
+
+    def test_ranges(self):
+        assert parse_playlist_items("1-3,7,9-10") == [1, 2, 3, 7, 9, 10]
+
+    def test_duplicates_removed(self):
+        assert parse_playlist_items("1-3,2") == [1, 2, 3]
+
+    def test_invalid_raises_validation_error(self):
+        with pytest.raises(ValidationError):
+            parse_playlist_items("1,abc")
+
+    def test_reversed_range_raises_validation_error(self):
+        with pytest.raises(ValidationError):
+            parse_playlist_items("5-2")
+
+
+class TestCompressRanges:
+    """Tests for compress_ranges function."""
+
+    def test_empty(self):
+        assert compress_ranges([]) == ""
+
+    def test_single_index(self):
+        assert compress_ranges([4]) == "4"
+
+    def test_runs_become_ranges(self):
+        assert compress_ranges(list(range(1, 500)) + list(range(501, 5001))) == "1-499,501-5000"
+
+    def test_unsorted_with_duplicates(self):
+        assert compress_ranges([9, 3, 1, 2, 3, 7]) == "1-3,7,9"
+
+    def test_round_trip(self):
+        indices = [1, 2, 3, 5, 8, 9, 10, 42]
+        assert parse_playlist_items(compress_ranges(indices)) == indices
+
+
+class TestPathDigest:
+    """Tests for the path_digest function."""
+
+    def test_normalized_paths_match(self):
+        assert path_digest("/music/a") == path_digest("/music/a/")
+        assert path_digest("/music/a") == path_digest("/music/b/../a")
+
+    def test_different_folders(self):
+        digest = path_digest("/music/a")
+        assert len(digest) == 16
+        assert digest != path_digest("/music/b")
@@ -1,23 +1,58 @@
 import gi
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gdk', '3.0')
-from gi.repository import Gtk, Gdk, GLib, Gio  # noqa: E402
+gi.require_version('Pango', '1.0')
+from gi.repository import Gtk, Gdk, GLib, Gio, Pango  # noqa: E402
 import subprocess  # noqa: E402
 import threading  # noqa: E402
+import time  # noqa: E402
 import os  # noqa: E402
 import re  # noqa: E402
+import importlib  # noqa: E402
 import shutil  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
 from pathlib import Path  # noqa: E402
 
+from . import archive  # noqa: E402
+from . import bandwidth  # noqa: E402
+from . import client  # noqa: E402
 from . import config  # noqa: E402
 from . import utils  # noqa: E402
-from . import download  # noqa: E402
-from .dialogs import PlaylistPreviewDialog  # noqa: E402
-from .exceptions import ValidationError  # noqa: E402
+from . import jobqueue  # noqa: E402
+from . import journal  # noqa: E402
+from . import library  # noqa: E402
+from . import logbuffer  # noqa: E402
+from . import metrics  # noqa: E402
+from . import pipeline  # noqa: E402
+from . import playlist_cache  # noqa: E402
+from . import profiles  # noqa: E402
+from . import throughput  # noqa: E402
+from . import uibridge  # noqa: E402
+from .exceptions import ApiError, ValidationError  # noqa: E402
 from .logger import get_logger  # noqa: E402
 
 logger = get_logger(__name__)
 
+# Modules only needed once a job starts or a playlist is previewed; the
+# methods using them import them, so they stay out of startup
+JOB_MODULES = ("download", "engine", "enumeration", "runner", "thumbnails", "tracing")
+
+# Seconds between batches of streamed playlist entries added to the preview
+PREVIEW_BATCH_INTERVAL = 0.1
+
+# Download button text for each output profile
+DOWNLOAD_LABELS = {
+    profiles.PROFILE_MP3_320: "⬇ Download MP3 (320kbps)",
+    profiles.PROFILE_MP3_V0: "⬇ Download MP3 (VBR V0)",
+    profiles.PROFILE_NATIVE: "⬇ Download Original Audio",
+}
+
+
+def import_job_modules():
+    """Import the modules in JOB_MODULES, as the first job or preview does"""
+    for name in JOB_MODULES:
+        importlib.import_module("." + name, __package__)
+
 
 class YouTubeMp3Downloader(Gtk.Window):
     def __init__(self):
@@ -36,15 +71,74 @@ class YouTubeMp3Downloader(Gtk.Window):
         # Notification status (loaded from config)
         self.notifications_enabled = self.config.get('notifications_enabled', True)
 
-        # Current download process
-        self.current_process = None
-        self.download_stopped = threading.Event()
-        self.download_cancel_requested = threading.Event()
-        self.current_downloading_file = None
-        self.current_download_original = None
-        self.download_lock = threading.Lock()
-        self.active_download_targets = set()
-        self._download_thread = None
+        # Download service that runs the jobs instead of this window, if enabled and answering
+        self.service = self._connect_service()
+        self._service_events = None
+        # Jobs this window handed to the service; only their reports pop up here
+        self._service_jobs = set()
+
+        # Queue of download jobs; each running job has its own JobRun
+        if self.service is not None:
+            self.job_queue = client.RemoteQueue()
+        else:
+            self.job_queue = jobqueue.JobQueue(
+                policy=jobqueue.make_policy(self.config.get('queue_policy', jobqueue.POLICY_FIFO)),
+                max_running=self.config.get('max_running_jobs', jobqueue.DEFAULT_MAX_RUNNING),
+            )
+        # Set by the stop button; queued jobs wait until the user continues
+        self.queue_paused = False
+        # Set while the window closes, so running jobs stay resumable
+        self.closing = False
+
+        # Write-ahead journal of download jobs, used to resume after a crash
+        self.job_journal = journal.JobJournal()
+
+        # Log lines and progress posted by download threads, drained at a fixed rate
+        self.ui_updates = uibridge.UIUpdateBridge()
+        self._ui_update_source = None
+        self._ui_mapped = False
+        self._ui_iconified = False
+
+        # Bounded log: line cap and collapsing of progress lines (loaded from config)
+        self.log_lines = logbuffer.LogBuffer(self.config.get('log_max_lines', logbuffer.DEFAULT_MAX_LINES))
+        self.collapse_progress_lines = self.config.get('collapse_progress_lines', True)
+
+        # On-disk cache of enumerated playlists
+        self.playlist_cache = playlist_cache.PlaylistCache(
+            ttl=self.config.get('playlist_cache_ttl', playlist_cache.DEFAULT_TTL)
+        )
+        self._preview_dialog = None
+
+        # Runs queued jobs on download threads; created with the first job (see job_runner)
+        self._job_runner = None
+
+        # Completed downloads, used to skip videos that are already on disk
+        self.download_archive = archive.DownloadArchive()
+
+        # Best download settings learned per network, used by adaptive downloads
+        self.throughput_store = throughput.ThroughputStore()
+
+        # Video covers fetched once and reused by every download (see thumbnail_store)
+        self._thumbnail_store = None
+
+        # One rate limit shared by every running download
+        self.bandwidth_budget = bandwidth.BandwidthBudget()
+
+        # Download metrics, written for Prometheus when metrics_textfile is set
+        self.download_metrics = metrics.DownloadMetrics()
+        self.metrics_exporter = metrics.exporter_from_settings(self.config, self.download_metrics)
+        if self.metrics_exporter is not None:
+            self.download_metrics.registry.add_collector(
+                lambda: self.download_metrics.set_queue([job.state for job in list(self.job_queue.jobs)])
+            )
+            self.metrics_exporter.start()
+
+        # Index of the MP3 files in the download folder, kept current by file monitors
+        self.library_index = None
+        # Folder -> monitor; Gio only reports the direct children of a folder
+        self._library_monitors = {}
+        # Tags of monitored files are read here, in event order, off the main loop
+        self._library_updates = ThreadPoolExecutor(max_workers=1, thread_name_prefix="library-update")
 
         # Apply saved window size
         window_width = self.config.get('window_width', 600)
@@ -61,12 +155,55 @@ class YouTubeMp3Downloader(Gtk.Window):
         # Connect close event to save configuration
         self.connect("delete-event", self.on_delete_event)
 
+        # Pause UI updates while the window is not visible
+        self.connect("map-event", self.on_map_event)
+        self.connect("unmap-event", self.on_unmap_event)
+        self.connect("window-state-event", self.on_window_state_event)
+
         # Create HeaderBar
         self.setup_headerbar()
 
         # Create interface
         self.setup_ui()
 
+        self._start_library_index()
+
+        if self.service is not None:
+            # The service restores and resumes its own jobs
+            self._attach_service()
+            return
+
+        # Continue the jobs that were still queued when the window was closed
+        GLib.idle_add(self._restore_queue)
+
+        # Offer to resume a download interrupted by a crash or by closing the window
+        GLib.idle_add(self._offer_resume)
+
+    @property
+    def job_runner(self):
+        """Runner of the queued jobs; its reports come back through the main loop"""
+        if self._job_runner is None:
+            from . import runner
+            self._job_runner = runner.JobRunner(
+                self.job_queue, self, GLib.idle_add,
+                options=self._download_options,
+                job_journal=self.job_journal,
+                playlist_cache=self.playlist_cache,
+            )
+        return self._job_runner
+
+    @property
+    def thumbnail_store(self):
+        """Cover cache shared by the downloads and the playlist preview"""
+        if self._thumbnail_store is None:
+            from . import thumbnails
+            self._thumbnail_store = thumbnails.store_from_settings(self.config)
+        return self._thumbnail_store
+
+    def _active_runs(self):
+        """Runs of the jobs in progress, without starting the runner"""
+        return dict(self._job_runner.runs) if self._job_runner is not None else {}
+
     def setup_headerbar(self):
         """Set up the top bar with a menu"""
         headerbar = Gtk.HeaderBar()
@@ -172,7 +309,8 @@ class YouTubeMp3Downloader(Gtk.Window):
 
         # Download and stop buttons
         buttons_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
-        self.download_button = Gtk.Button(label="⬇ Download MP3 (320kbps)")
+        self.download_button = Gtk.Button()
+        self.update_download_label()
         self.download_button.connect("clicked", self.on_download_clicked)
         self.download_button.get_style_context().add_class("suggested-action")  # Always visible
 
@@ -185,6 +323,46 @@ class YouTubeMp3Downloader(Gtk.Window):
         buttons_box.pack_start(self.stop_button, True, True, 0)
         vbox.pack_start(buttons_box, False, False, 5)
 
+        # Download queue: one row per job with its own progress
+        queue_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
+        self.queue_store = Gtk.ListStore(str, str, str, int)  # job ID, description, status, percent
+        self.queue_view = Gtk.TreeView(model=self.queue_store)
+        self.queue_view.set_headers_visible(False)
+
+        job_renderer = Gtk.CellRendererText()
+        job_renderer.set_property("ellipsize", Pango.EllipsizeMode.MIDDLE)
+        job_column = Gtk.TreeViewColumn("Job", job_renderer, text=1)
+        job_column.set_expand(True)
+        self.queue_view.append_column(job_column)
+
+        progress_renderer = Gtk.CellRendererProgress()
+        progress_column = Gtk.TreeViewColumn("Progress", progress_renderer, text=2, value=3)
+        progress_column.set_min_width(180)
+        self.queue_view.append_column(progress_column)
+        self.queue_view.get_selection().connect("changed", self._on_queue_selection_changed)
+
+        queue_scrolled = Gtk.ScrolledWindow()
+        queue_scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        queue_scrolled.set_size_request(-1, 100)
+        queue_scrolled.add(self.queue_view)
+        queue_box.pack_start(queue_scrolled, True, True, 0)
+
+        queue_buttons = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+        self.queue_up_button = self._make_icon_button("go-up-symbolic", "Move up", self.on_queue_up_clicked)
+        self.queue_down_button = self._make_icon_button("go-down-symbolic", "Move down", self.on_queue_down_clicked)
+        self.queue_remove_button = self._make_icon_button(
+            "list-remove-symbolic", "Remove from queue (stops it if running)", self.on_queue_remove_clicked
+        )
+        self.queue_clear_button = self._make_icon_button(
+            "edit-clear-all-symbolic", "Clear finished jobs", self.on_queue_clear_clicked
+        )
+        for queue_button in (self.queue_up_button, self.queue_down_button, self.queue_remove_button,
+                             self.queue_clear_button):
+            queue_buttons.pack_start(queue_button, False, False, 0)
+        queue_box.pack_start(queue_buttons, False, False, 0)
+        vbox.pack_start(queue_box, False, False, 0)
+        self._update_queue_buttons()
+
         # Progress bar
         self.progress_bar = Gtk.ProgressBar()
         self.progress_bar.set_show_text(True)
@@ -203,6 +381,8 @@ class YouTubeMp3Downloader(Gtk.Window):
         self.log_view.set_cursor_visible(False)
         self.log_view.set_wrap_mode(Gtk.WrapMode.WORD)
         self.log_buffer = self.log_view.get_buffer()
+        # Single mark kept at the end of the log for auto-scrolling
+        self._log_end_mark = self.log_buffer.create_mark("log-end", self.log_buffer.get_end_iter(), False)
         scrolled_window.add(self.log_view)
         vbox.pack_start(scrolled_window, True, True, 0)
 
@@ -213,13 +393,13 @@ class YouTubeMp3Downloader(Gtk.Window):
         self.copy_log_button.hide()  # Initially hidden
         vbox.pack_start(self.copy_log_button, False, False, 5)
 
-    def _set_ui_sensitive(self, sensitive):
-        """Sets the sensitivity of UI elements that should be disabled during download."""
-        self.url_entry.set_sensitive(sensitive)
-        self.folder_button.set_sensitive(sensitive)
-        self.open_folder_button.set_sensitive(sensitive)
-        self.clear_url_button.set_sensitive(sensitive)
-        self.paste_url_button.set_sensitive(sensitive)
+    def _make_icon_button(self, icon_name, tooltip, handler):
+        """Create a small button showing a symbolic icon"""
+        button = Gtk.Button()
+        button.add(Gtk.Image.new_from_gicon(Gio.ThemedIcon(name=icon_name), Gtk.IconSize.BUTTON))
+        button.set_tooltip_text(tooltip)
+        button.connect("clicked", handler)
+        return button
 
     def on_paste_url_clicked(self, button):
         """Paste URL from clipboard"""
@@ -267,6 +447,7 @@ class YouTubeMp3Downloader(Gtk.Window):
                     logger.info(f"Download path updated: {self.download_path}")
                 except Exception as e:
                     logger.error(f"Failed to save download path: {e}")
+                self._start_library_index()
 
             dialog.destroy()
         except Exception as e:
@@ -329,6 +510,154 @@ class YouTubeMp3Downloader(Gtk.Window):
         except Exception as e:
             logger.error(f"Unexpected error validating URL: {e}")
 
+    def _offer_resume(self):
+        """Ask whether to resume the most recent unfinished download job"""
+        self.job_journal.compact()
+        # Jobs restored with the queue resume from there
+        queued = {job.journal_id for job in self.job_queue.jobs}
+        jobs = [job for job in self.job_journal.unfinished() if job.job_id not in queued]
+        if not jobs:
+            return False
+        job = jobs[0]
+        remaining = job.remaining_items()
+        if remaining == "":
+            # Every item finished but the end record was lost
+            self.job_journal.finish(job.job_id)
+            pipeline.remove_staging(job.download_path, job.job_id)
+            return False
+
+        total = len(job.selected_indices()) if job.playlist_info else 0
+        if total:
+            left = len(job.remaining_indices())
+            details = "{} of {} video(s) left".format(left, total)
+        else:
+            details = "Already downloaded videos will be skipped"
+        dialog = Gtk.MessageDialog(
+            transient_for=self,
+            modal=True,
+            destroy_with_parent=True,
+            message_type=Gtk.MessageType.QUESTION,
+            buttons=Gtk.ButtonsType.NONE,
+            text="Resume interrupted download?"
+        )
+        dialog.format_secondary_text("{}\n\n{}\nDestination: {}".format(job.url, details, job.download_path))
+        dialog.add_buttons("Discard", Gtk.ResponseType.REJECT, "Resume", Gtk.ResponseType.ACCEPT)
+        dialog.set_default_response(Gtk.ResponseType.ACCEPT)
+        response = dialog.run()
+        dialog.destroy()
+
+        if response != Gtk.ResponseType.ACCEPT:
+            if response == Gtk.ResponseType.REJECT:
+                self.job_journal.finish(job.job_id, journal.DISCARDED)
+                pipeline.remove_staging(job.download_path, job.job_id)
+                logger.info(f"Discarded interrupted job {job.job_id}")
+            return False
+
+        if not os.path.isdir(job.download_path):
+            self.show_error_dialog("Folder does not exist:\n{}".format(job.download_path))
+            return False
+        logger.info(f"Resuming job {job.job_id}: {job.url} ({details})")
+        self.log_message("↻ Resuming interrupted download ({})".format(details))
+        self._enqueue_download(
+            job.url,
+            job.url_type,
+            job.use_auth,
+            job.auth_browser,
+            playlist_items=remaining,
+            playlist_info=job.playlist_info or None,
+            job_id=job.job_id,
+            download_path=job.download_path,
+        )
+        return False
+
+    def _restore_queue(self):
+        """Load the jobs left in the queue and continue where their journal stopped"""
+        if self.job_runner.restore_queue():
+            self.log_message("↻ Restored {} queued download(s)".format(len(self.job_queue)))
+            self._refresh_queue_view()
+            self._schedule_jobs()
+        return False
+
+    def _start_library_index(self):
+        """Index the download folder in the background and watch it for changes"""
+        self._unwatch_library_folders()
+        if self.library_index is not None:
+            self.library_index.save()
+            self.library_index = None
+        if not os.path.isdir(self.download_path):
+            return
+
+        index = library.LibraryIndex(self.download_path)
+        self.library_index = index
+        self._watch_library_folders(index, [index.folder])
+
+        def scan():
+            index.load()
+            GLib.idle_add(self._watch_library_folders, index, index.folders())
+            try:
+                index.scan()
+            except Exception as e:
+                logger.warning(f"Library scan failed: {e}")
+            index.save()
+            logger.info(f"Library index ready: {len(index)} video(s) in {index.folder}")
+
+        threading.Thread(target=scan, name="library-scan", daemon=True).start()
+
+    def _watch_library_folders(self, index, folders):
+        """Monitor folders of the library that are not watched yet"""
+        if index is not self.library_index:
+            return False
+        for folder in folders:
+            if folder in self._library_monitors:
+                continue
+            try:
+                monitor = Gio.File.new_for_path(folder).monitor_directory(
+                    Gio.FileMonitorFlags.WATCH_MOVES, None
+                )
+            except GLib.Error as e:
+                logger.warning(f"Could not watch {folder}: {e}")
+                continue
+            monitor.connect("changed", self._on_library_changed, index)
+            self._library_monitors[folder] = monitor
+        return False
+
+    def _unwatch_library_folders(self, path=None):
+        """Stop monitoring a folder and the folders below it (every folder by default)"""
+        prefix = os.path.join(path, "") if path else ""
+        for folder in list(self._library_monitors):
+            if path is None or folder == path or folder.startswith(prefix):
+                self._library_monitors.pop(folder).cancel()
+
+    def _on_library_changed(self, monitor, changed_file, other_file, event_type, index):
+        """Keep the library index in line with files and folders added, renamed or removed"""
+        path = changed_file.get_path()
+        if not path or index is not self.library_index:
+            return
+        if event_type in (Gio.FileMonitorEvent.CHANGES_DONE_HINT, Gio.FileMonitorEvent.MOVED_IN):
+            self._library_updates.submit(self._update_library_path, index, path, False)
+        elif event_type == Gio.FileMonitorEvent.CREATED:
+            self._library_updates.submit(self._update_library_path, index, path, True)
+        elif event_type in (Gio.FileMonitorEvent.DELETED, Gio.FileMonitorEvent.MOVED_OUT):
+            self._unwatch_library_folders(path)
+            self._library_updates.submit(index.remove_path, path)
+        elif event_type == Gio.FileMonitorEvent.RENAMED:
+            self._unwatch_library_folders(path)
+            self._library_updates.submit(index.remove_path, path)
+            if other_file is not None and other_file.get_path():
+                self._library_updates.submit(self._update_library_path, index, other_file.get_path(), False)
+
+    def _update_library_path(self, index, path, created):
+        """Index a file or folder reported by a library monitor (library update thread)"""
+        try:
+            if os.path.isdir(path):
+                index.update_folder(path)
+                GLib.idle_add(self._watch_library_folders, index, index.folders(path))
+            elif not created:
+                # Files are indexed once they are written completely
+                index.update_path(path)
+        except Exception as e:
+            logger.warning(f"Could not index {path}: {e}")
+
     def on_clear_url_clicked(self, button):
         """Clear the URL field"""
         self.url_entry.set_text("")
@@ -336,25 +665,29 @@ class YouTubeMp3Downloader(Gtk.Window):
 
     def on_delete_event(self, widget, event):
         """Save window configuration and gracefully stop downloads before closing"""
-        # Signal any running download to stop
-        self.download_stopped.set()
-        self.download_cancel_requested.set()
-
-        with self.download_lock:
-            process = self.current_process
-        if process:
+        # Signal running downloads to stop; their jobs stay in the journal and the queue
+        self.closing = True
+        if self._service_events is not None:
+            # Jobs keep running in the download service
+            self._service_events.stop()
+        if self._job_runner is not None:
             try:
-                process.terminate()
-                process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait(timeout=5)
+                self._job_runner.stop_all(closing=True)
             except Exception as e:
                 logger.warning(f"Error terminating process on close: {e}")
 
-        # Wait for download thread to finish
-        if self._download_thread and self._download_thread.is_alive():
-            self._download_thread.join(timeout=3)
+        # Wait for download threads to finish
+        if self._job_runner is not None:
+            self._job_runner.join(timeout=3)
+        self.job_queue.save()
+
+        self._unwatch_library_folders()
+        self._library_updates.shutdown(wait=False)
+        if self.library_index is not None:
+            self.library_index.save()
+        self.job_journal.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.close()
 
         try:
             # Get current window size
@@ -452,68 +785,167 @@ class YouTubeMp3Downloader(Gtk.Window):
             self.show_error_dialog(f"Could not copy log:\n{str(e)}")
 
     def on_stop_clicked(self, button):
-        """Stop the current download process"""
+        """Stop the running downloads and hold the queued ones"""
         self.log_message("")
         self.log_message("⏹ Stopping download...")
         logger.info("User requested download stop")
 
-        # Mark as stopped and request cancellation
-        self.download_stopped.set()
-        self.download_cancel_requested.set()
+        if self.service is not None:
+            self._service_call(self.service.stop)
+            return
 
-        # If there is a running process, terminate it
-        with self.download_lock:
-            process = self.current_process
-        if process:
-            try:
-                process.terminate()  # Try to terminate gracefully
-                logger.debug("Sent terminate signal to download process")
-                # Give time to terminate gracefully
-                try:
-                    process.wait(timeout=2)
-                    logger.debug("Download process terminated gracefully")
-                except subprocess.TimeoutExpired:
-                    # If it does not terminate in 2 seconds, force termination
-                    self.log_message("⚠ Forcing process termination...")
-                    logger.warning("Process did not terminate, forcing kill")
-                    process.kill()
-                    process.wait(timeout=5)
-                    logger.info("Download process killed")
+        # Queued jobs wait until the user continues
+        self.queue_paused = True
+        runs = list(self._active_runs().values())
+        for run in runs:
+            self._stop_run(run)
+        if not runs:
+            self.progress_bar.set_text("Stopped")
+            self.progress_bar.set_fraction(0.0)
 
-                # Clean up partial files
-                download.cleanup_partial_files(self)
+        waiting = len(self.job_queue.queued())
+        if waiting:
+            self.log_message("⏸ {} queued job(s) on hold, click Download to continue".format(waiting))
+        self._update_controls()
 
-                self.progress_bar.set_text("Stopped")
-                self.progress_bar.set_fraction(0.0)
-                self.log_message("✓ Download stopped by user")
-            except subprocess.SubprocessError as e:
-                logger.error(f"Error stopping download process: {e}")
-                self.log_message("✗ Error stopping: {}".format(str(e)))
-            except Exception as e:
-                logger.error(f"Unexpected error stopping download: {e}")
-                self.log_message("✗ Error stopping: {}".format(str(e)))
-        else:
-            # There is no process yet, but cancellation is requested
-            # The thread will detect it and stop
-            self.log_message("✓ Cancellation requested")
-            self.progress_bar.set_text("Cancelled")
-            self.progress_bar.set_fraction(0.0)
-            logger.info("Download cancellation requested (no process running)")
+    def _stop_run(self, run):
+        """Stop one running job and delete its partial files"""
+        from . import download
+        try:
+            if run.stop():
+                # Clean up partial files
+                download.cleanup_partial_files(run)
+                run.post_progress(0.0, "Stopped")
+                run.log_message("✓ Download stopped by user")
+            else:
+                # There is no process yet, but cancellation is requested
+                # The thread will detect it and stop
+                run.post_progress(0.0, "Cancelled")
+                run.log_message("✓ Cancellation requested")
+                logger.info("Download cancellation requested (no process running)")
+        except subprocess.SubprocessError as e:
+            logger.error(f"Error stopping download process: {e}")
+            self.log_message("✗ Error stopping: {}".format(str(e)))
+        except Exception as e:
+            logger.error(f"Unexpected error stopping download: {e}")
+            self.log_message("✗ Error stopping: {}".format(str(e)))
+        self._update_queue_progress()
 
     def log_message(self, message):
-        """Add message to the log area"""
-        end_iter = self.log_buffer.get_end_iter()
-        self.log_buffer.insert(end_iter, message + "\n")
+        """Add message to the log area (main thread only)"""
+        # Keep lines posted by download threads in order
+        self.flush_ui_updates()
+        self._append_log([(message, False)])
+
+    def _append_log(self, entries):
+        """Insert a batch of log entries in one operation, evicting old lines past the cap"""
+        update = self.log_lines.plan(entries)
+        if update is None:
+            return
+        buffer = self.log_buffer
+        if update.replace_progress:
+            # The last line is a progress line; the batch starts with its replacement
+            last_line = buffer.get_iter_at_line(max(0, buffer.get_line_count() - 2))
+            buffer.delete(last_line, buffer.get_end_iter())
+        buffer.insert(buffer.get_end_iter(), update.text)
+        if update.evict:
+            buffer.delete(buffer.get_start_iter(), buffer.get_iter_at_line(update.evict))
         # Auto-scroll to the end
-        mark = self.log_buffer.create_mark(None, end_iter, False)
-        self.log_view.scroll_to_mark(mark, 0.0, True, 0.0, 1.0)
+        buffer.move_mark(self._log_end_mark, buffer.get_end_iter())
+        self.log_view.scroll_to_mark(self._log_end_mark, 0.0, True, 0.0, 1.0)
+
+    def clear_log(self):
+        """Remove all log lines"""
+        self.ui_updates.drain()
+        self.log_buffer.set_text("")
+        self.log_lines.reset()
+
+    def post_log(self, message, progress=False):
+        """Queue a log line from any thread; progress lines may collapse into one"""
+        self.ui_updates.log(message, progress and self.collapse_progress_lines)
+
+    def post_progress(self, fraction=None, text=None):
+        """Queue a progress bar update from any thread; only the latest one is shown"""
+        self.ui_updates.progress(fraction, text)
+
+    def flush_ui_updates(self):
+        """Apply queued log lines in one insert and the latest progress state"""
+        entries, fraction, text = self.ui_updates.drain()
+        if entries:
+            self._append_log(entries)
+        if fraction is not None:
+            self.progress_bar.set_fraction(fraction)
+        if text is not None:
+            self.progress_bar.set_text(text)
+
+    def _start_ui_updates(self):
+        """Start draining queued updates if the window is visible"""
+        if self._ui_update_source is not None:
+            return
+        if not self._ui_mapped or self._ui_iconified:
+            return
+        self._ui_update_source = GLib.timeout_add(uibridge.UPDATE_INTERVAL_MS, self._on_ui_update_tick)
+
+    def _stop_ui_updates(self):
+        """Stop draining queued updates; they keep accumulating"""
+        if self._ui_update_source is not None:
+            GLib.source_remove(self._ui_update_source)
+            self._ui_update_source = None
+
+    def _on_ui_update_tick(self):
+        """Periodic drain; stops once no job is running and nothing is left"""
+        self.flush_ui_updates()
+        self._update_queue_progress()
+        if not self._active_runs() and not self.ui_updates.has_pending():
+            self._ui_update_source = None
+            return False
+        return True
+
+    def _resume_ui_updates(self):
+        """Show what accumulated while hidden and restart the drain"""
+        if not self._ui_mapped or self._ui_iconified:
+            return
+        if self._active_runs() or self.ui_updates.has_pending():
+            self.flush_ui_updates()
+            self._update_queue_progress()
+            self._start_ui_updates()
+
+    def on_map_event(self, widget, event):
+        """Window became visible"""
+        self._ui_mapped = True
+        self._resume_ui_updates()
+        return False
+
+    def on_unmap_event(self, widget, event):
+        """Window was hidden"""
+        self._ui_mapped = False
+        self._stop_ui_updates()
+        return False
+
+    def on_window_state_event(self, widget, event):
+        """Track minimizing and restoring the window"""
+        self._ui_iconified = bool(event.new_window_state & Gdk.WindowState.ICONIFIED)
+        if self._ui_iconified:
+            self._stop_ui_updates()
+        else:
+            self._resume_ui_updates()
+        return False
 
     def on_download_clicked(self, button):
-        """Start download"""
+        """Queue the URL for download"""
         url = self.url_entry.get_text().strip()
 
         logger.info("Download button clicked")
 
+        if not url and self.queue_paused and self.job_queue.queued():
+            # Continue the jobs held by the stop button
+            self.queue_paused = False
+            self.log_message("▶ Continuing the download queue")
+            if self.service is not None:
+                self._service_call(self.service.resume)
+            self._schedule_jobs()
+            return
+
         if not url:
             logger.warning("Empty URL provided")
             self.show_error_dialog("Please enter a YouTube URL")
@@ -583,122 +1015,478 @@ class YouTubeMp3Downloader(Gtk.Window):
             self.show_error_dialog("Destination folder is not writable:\n{}".format(str(download_dir)))
             return
 
-        self.download_path = str(download_dir)
-        self.folder_entry.set_text(self.download_path)
+        if str(download_dir) != self.download_path:
+            self.download_path = str(download_dir)
+            self.folder_entry.set_text(self.download_path)
+            self._start_library_index()
 
         use_auth = self.use_youtube_auth
         auth_browser = self.config.get('auth_browser', 'firefox')
 
         # For playlists, show preview dialog to let user select videos
         if url_type == "Playlist":
-            self.progress_bar.set_text("Fetching playlist info...")
-            self.progress_bar.set_fraction(0.0)
-            self._set_ui_sensitive(False)
-            self.download_button.set_sensitive(False)
-
-            def fetch_and_preview():
-                try:
-                    info_cmd = ["yt-dlp", "--flat-playlist", "--print",
-                                "%(id)s:::%(playlist_index|)s%(playlist_index& - |)s%(title)s"]
-                    if use_auth:
-                        info_cmd.extend(["--cookies-from-browser", auth_browser])
-                    info_cmd.append(url)
-
-                    result = subprocess.run(info_cmd, capture_output=True, text=True, timeout=60)
-                    playlist_info = {}
-                    if result.returncode == 0:
-                        for line in result.stdout.strip().split('\n'):
-                            if ':::' in line:
-                                parts = line.split(':::', 1)
-                                if len(parts) == 2:
-                                    playlist_info[parts[0].strip()] = parts[1].strip()
-                    GLib.idle_add(self._show_playlist_preview, url, url_type, use_auth, auth_browser, playlist_info)
-                except Exception as e:
-                    logger.error(f"Failed to fetch playlist info: {e}")
-                    GLib.idle_add(self._show_playlist_preview, url, url_type, use_auth, auth_browser, {})
+            from . import engine
+            backend = self.config.get('download_engine', engine.ENGINE_SUBPROCESS)
+            if backend == engine.ENGINE_INPROCESS and not engine.is_available():
+                backend = engine.ENGINE_SUBPROCESS
+            playlist_id = match.group(1)
+
+            cached = self.playlist_cache.get(playlist_id)
+            if cached:
+                # Show cached entries right away; refresh them in the background if stale
+                logger.info(f"Showing cached playlist {playlist_id} (age {cached.age:.0f}s)")
+                self._show_playlist_preview(
+                    url, url_type, use_auth, auth_browser, cached.playlist_info,
+                    revalidate=None if cached.is_fresh else (playlist_id, backend)
+                )
+                return
 
-            threading.Thread(target=fetch_and_preview, daemon=True).start()
+            # Open the preview right away and fill it in while yt-dlp enumerates
+            self._show_playlist_preview(url, url_type, use_auth, auth_browser, {}, stream=(playlist_id, backend))
             return
 
-        self._start_download(url, url_type, use_auth, auth_browser)
+        self._enqueue_download(url, url_type, use_auth, auth_browser)
 
-    def _show_playlist_preview(self, url, url_type, use_auth, auth_browser, playlist_info):
-        """Show playlist preview dialog after fetching info"""
-        self._set_ui_sensitive(True)
-        self.download_button.set_sensitive(True)
-        self.progress_bar.set_text("Waiting...")
+    def _show_playlist_preview(self, url, url_type, use_auth, auth_browser, playlist_info, revalidate=None,
+                               stream=None):
+        """Show playlist preview dialog
 
-        if not playlist_info:
+        ``revalidate`` is a (playlist_id, backend) pair when the entries came
+        from a stale cache and should be refreshed while the dialog is open.
+        ``stream`` is a (playlist_id, backend) pair when the playlist still
+        has to be enumerated; entries are added to the dialog as they arrive.
+        """
+        if not playlist_info and not stream:
             # Could not fetch info, proceed with full download
             self.log_message("Could not fetch playlist info, downloading all videos...")
-            self._start_download(url, url_type, use_auth, auth_browser)
+            self._enqueue_download(url, url_type, use_auth, auth_browser)
             return
 
-        dialog = PlaylistPreviewDialog(self, playlist_info)
+        # Imported on first use to keep it out of startup
+        from .dialogs import PlaylistPreviewDialog
+
+        dialog = PlaylistPreviewDialog(self, playlist_info, loading=stream is not None)
+        self._preview_dialog = dialog
+        stop_loading = threading.Event()
+        if revalidate:
+            self._revalidate_playlist(url, use_auth, auth_browser, *revalidate)
+        if stream:
+            self._stream_playlist(dialog, stop_loading, url, use_auth, auth_browser, *stream)
         response = dialog.run()
+        stop_loading.set()
+        self._preview_dialog = None
+        # The entries may have been streamed in or refreshed while the dialog was open
+        playlist_info = dialog.playlist_info
 
-        if response == Gtk.ResponseType.OK:
+        if response == Gtk.ResponseType.REJECT:
+            # Enumeration failed before reporting any video
+            dialog.destroy()
+            self.log_message("Could not fetch playlist info, downloading all videos...")
+            self._enqueue_download(url, url_type, use_auth, auth_browser)
+        elif response == Gtk.ResponseType.OK:
             selected = dialog.get_selected_indices()
             dialog.destroy()
             if not selected:
                 self.show_error_dialog("No videos selected for download.")
                 return
-            playlist_items = ",".join(str(i) for i in selected)
-            self._start_download(url, url_type, use_auth, auth_browser, playlist_items=playlist_items)
+            playlist_items = utils.compress_ranges(selected)
+            self._enqueue_download(
+                url, url_type, use_auth, auth_browser,
+                playlist_items=playlist_items, playlist_info=playlist_info
+            )
         else:
             dialog.destroy()
 
-    def _start_download(self, url, url_type, use_auth, auth_browser, playlist_items=None):
-        """Start the download thread"""
-        # Reset download status
-        self.download_stopped.clear()
-        self.download_cancel_requested.clear()
-        self.current_downloading_file = None
-        self.current_download_original = None
-
-        # Disable UI elements
-        self._set_ui_sensitive(False)
-
-        # Disable download button and enable stop button
-        self.download_button.set_sensitive(False)
-        self.download_button.get_style_context().remove_class("suggested-action")
-        self.stop_button.set_sensitive(True)
-        self.stop_button.get_style_context().add_class("destructive-action")
-        self.progress_bar.set_text("Downloading...")
-        self.progress_bar.set_fraction(0.0)
-
-        # Clear log and hide copy button
-        self.log_buffer.set_text("")
-        self.copy_log_button.hide()
+    def _stream_playlist(self, dialog, stop_event, url, use_auth, auth_browser, playlist_id, backend):
+        """Enumerate a playlist in the background, adding entries to the dialog in batches"""
+        from . import enumeration
+
+        def stream():
+            entries = []
+            durations = {}
+            batch = []
+            last_flush = time.monotonic()
+            error = None
+            try:
+                for entry in enumeration.stream_playlist(
+                    url, use_auth, auth_browser, backend, stop_event=stop_event, durations=durations
+                ):
+                    entries.append(entry)
+                    batch.append(entry)
+                    now = time.monotonic()
+                    if now - last_flush >= PREVIEW_BATCH_INTERVAL:
+                        GLib.idle_add(self._on_playlist_entries, dialog, batch)
+                        batch = []
+                        last_flush = now
+            except subprocess.TimeoutExpired as e:
+                error = "no response for {} seconds".format(int(e.timeout))
+            except Exception as e:
+                error = str(e)
+            if batch:
+                GLib.idle_add(self._on_playlist_entries, dialog, batch)
+            if error is None and entries and not stop_event.is_set():
+                self.playlist_cache.put(playlist_id, dict(entries), durations)
+            GLib.idle_add(self._on_playlist_stream_finished, dialog, error)
+
+        threading.Thread(target=stream, daemon=True).start()
+
+    def _on_playlist_entries(self, dialog, entries):
+        """Add a batch of streamed entries to the preview dialog"""
+        if dialog is self._preview_dialog:
+            dialog.append_entries(entries)
+        return False
 
-        self.log_message("Starting download of: {}".format(url))
-        self.log_message("Destination: {}".format(self.download_path))
-        if playlist_items:
-            self.log_message("Selected videos: {}".format(playlist_items))
-        self.log_message("-" * 60)
-        logger.info(f"Starting download thread for {url_type}")
+    def _on_playlist_stream_finished(self, dialog, error):
+        """Playlist enumeration for the preview dialog ended"""
+        if dialog is not self._preview_dialog:
+            return False
+        if error:
+            logger.error(f"Failed to fetch playlist info: {error}")
+        if error and not dialog.playlist_info:
+            dialog.response(Gtk.ResponseType.REJECT)
+        else:
+            dialog.finish_loading(error)
+        return False
 
-        # Run download in a separate thread
-        try:
-            self._download_thread = threading.Thread(
-                target=download.download_thread,
-                args=(self, url, url_type, self.download_path, use_auth, auth_browser, playlist_items)
-            )
-            self._download_thread.daemon = True
-            self._download_thread.start()
-            logger.debug("Download thread started")
-        except Exception as e:
-            logger.error(f"Failed to start download thread: {e}")
-            self.show_error_dialog(f"Could not start download:\n{str(e)}")
-            # Restore UI
-            self._set_ui_sensitive(True)
-            self.download_button.set_sensitive(True)
-            self.download_button.get_style_context().add_class("suggested-action")
-            self.stop_button.set_sensitive(False)
+    def _revalidate_playlist(self, url, use_auth, auth_browser, playlist_id, backend):
+        """Refresh a cached playlist in the background"""
+        from . import download
+
+        def revalidate():
+            durations = {}
+            try:
+                playlist_info = download.enumerate_playlist(url, use_auth, auth_browser, backend, durations)
+            except Exception as e:
+                logger.warning(f"Background playlist refresh failed: {e}")
+                return
+            if playlist_info:
+                self.playlist_cache.put(playlist_id, playlist_info, durations)
+                GLib.idle_add(self._on_playlist_revalidated, playlist_info)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
+    def _on_playlist_revalidated(self, playlist_info):
+        """Update an open preview dialog with refreshed playlist entries"""
+        dialog = self._preview_dialog
+        if dialog is not None and list(playlist_info.items()) != list(dialog.playlist_info.items()):
+            logger.info(f"Playlist changed since it was cached, now {len(playlist_info)} videos")
+            dialog.set_playlist_info(playlist_info)
+        return False
+
+    def _enqueue_download(
+        self, url, url_type, use_auth, auth_browser, playlist_items=None, playlist_info=None, job_id=None,
+        download_path=None
+    ):
+        """Add a download job to the queue and start it when a slot is free"""
+        if self.service is not None:
+            self._submit_to_service(url, use_auth, auth_browser, playlist_items, playlist_info, download_path)
+            return
+        if not self.job_queue.has_active():
+            # Start a fresh log for a new batch of work
+            self.clear_log()
+            self.copy_log_button.hide()
+
+        job = jobqueue.QueuedJob(
+            url, url_type, download_path or self.download_path, use_auth, auth_browser,
+            playlist_items=playlist_items, playlist_info=playlist_info, journal_id=job_id,
+            durations=self.playlist_cache.durations_for(url) if playlist_info else None,
+        )
+        self.job_queue.add(job)
+        self.job_queue.save()
+        self.log_message("📥 Queued job {}: {}".format(job.number, url))
+
+        # Ready for the next URL
+        self.url_entry.set_text("")
+        self.queue_paused = False
+        self._refresh_queue_view()
+        self._schedule_jobs()
+
+    def _schedule_jobs(self):
+        """Start queued jobs while the concurrency limit allows"""
+        if self.service is not None:
+            # The service schedules its own jobs
+            self._update_controls()
+            return
+        if self.closing or self.queue_paused:
+            self._update_controls()
+            return
+        if self.job_runner.start_jobs():
+            self.job_queue.save()
+            self._start_ui_updates()
+        self._refresh_queue_view()
+        self._update_controls()
+
+    def _download_options(self, job):
+        """Download settings for the next run of a job, read from the configuration"""
+        from . import engine, tracing
+        use_archive = self.config.get('use_download_archive', True)
+        self.bandwidth_budget.set_schedule(bandwidth.schedule_from_settings(self.config))
+        return {
+            'max_workers': self.config.get('max_concurrent_downloads', 1),
+            'use_pipeline': self.config.get('transcode_pipeline', False),
+            'backend': self.config.get('download_engine', engine.ENGINE_SUBPROCESS),
+            'download_archive': self.download_archive if use_archive else None,
+            'library_index': self.library_index if use_archive else None,
+            'throughput_store': self.throughput_store if self.config.get('adaptive_downloads', False) else None,
+            'bandwidth_budget': self.bandwidth_budget,
+            'output_profile': self.config.get('output_profile', profiles.DEFAULT_PROFILE),
+            'thumbnail_store': self.thumbnail_store,
+            'download_metrics': self.download_metrics,
+            'trace_dir': tracing.trace_dir_from_settings(self.config),
+            'profile_parser': self.config.get('trace_profile_parser', False),
+        }
+
+    def _other_work(self, run):
+        """True if jobs other than this run are queued or running, or it has more turns"""
+        if not run.is_final:
+            return True
+        return any(job.is_active and job is not run.job for job in self.job_queue.jobs)
+
+    def job_log(self, run, message, progress):
+        """Log line of a running job; tagged with the job when several can run at once"""
+        if message and self.job_queue.max_running > 1:
+            message = "[job {}] {}".format(run.job.number, message)
+        self.post_log(message, progress)
+
+    def job_message(self, run, message, error):
+        """Final message of a job run; successes only pop up once the queue is idle"""
+        if self.closing:
+            return
+        if error:
+            self.show_error_dialog(message)
+        elif not self._other_work(run):
+            self.show_success_dialog(message)
+
+    def job_notify(self, run, title, message, icon):
+        """Desktop notification for a job, sent when all of its videos are done"""
+        if run.is_final:
+            self.send_notification(title, message, icon)
+
+    def job_finished(self, run):
+        """A job run ended and its outcome is recorded: start the next jobs"""
+        if self.closing:
+            # The job stays queued for the next start
+            return
+        job = run.job
+        self.job_queue.save()
+        self._update_queue_progress()
+        self._schedule_jobs()
+        if not self._active_runs():
+            self.flush_ui_updates()
+            self.progress_bar.set_fraction(job.fraction)
+            self.progress_bar.set_text(job.status)
+            self.copy_log_button.show()
+
+    def _update_controls(self):
+        """Enable the stop button while jobs are running or waiting"""
+        busy = (
+            bool(self._active_runs()) or bool(self.job_queue.running())
+            or (bool(self.job_queue.queued()) and not self.queue_paused)
+        )
+        self.stop_button.set_sensitive(busy)
+        if busy:
+            self.stop_button.get_style_context().add_class("destructive-action")
+        else:
             self.stop_button.get_style_context().remove_class("destructive-action")
 
+    def update_download_label(self):
+        """Name the selected output profile on the download button"""
+        profile = self.config.get('output_profile', profiles.DEFAULT_PROFILE)
+        self.download_button.set_label(DOWNLOAD_LABELS.get(profile, DOWNLOAD_LABELS[profiles.DEFAULT_PROFILE]))
+
+    def _refresh_queue_view(self):
+        """Rebuild the queue rows after jobs were added, removed, moved or finished"""
+        selected = self._selected_job_id()
+        self.queue_store.clear()
+        for job in self.job_queue.jobs:
+            tree_iter = self.queue_store.append(
+                [job.job_id, "{}. {}".format(job.number, job.label), job.status, int(job.fraction * 100)]
+            )
+            if job.job_id == selected:
+                self.queue_view.get_selection().select_iter(tree_iter)
+        self._update_queue_buttons()
+
+    def _update_queue_progress(self):
+        """Show the latest progress of the running jobs in their rows and the progress bar"""
+        for row in self.queue_store:
+            job = self.job_queue.get(row[0])
+            if job is not None:
+                row[2] = job.status
+                row[3] = int(job.fraction * 100)
+
+        running = self.job_queue.running()
+        if len(running) == 1:
+            self.progress_bar.set_fraction(running[0].fraction)
+            self.progress_bar.set_text(running[0].status)
+        elif running:
+            self.progress_bar.set_fraction(sum(job.fraction for job in running) / len(running))
+            self.progress_bar.set_text(
+                "{} jobs running, {} queued".format(len(running), len(self.job_queue.queued()))
+            )
+
+    def _selected_job_id(self):
+        model, tree_iter = self.queue_view.get_selection().get_selected()
+        return model[tree_iter][0] if tree_iter is not None else None
+
+    def _update_queue_buttons(self):
+        selected = self._selected_job_id()
+        for button in (self.queue_up_button, self.queue_down_button, self.queue_remove_button):
+            button.set_sensitive(selected is not None)
+        self.queue_clear_button.set_sensitive(
+            any(not job.is_active for job in self.job_queue.jobs)
+        )
+
+    def _on_queue_selection_changed(self, selection):
+        self._update_queue_buttons()
+
+    def _move_selected_job(self, offset):
+        job_id = self._selected_job_id()
+        if job_id is not None and self.service is not None:
+            self._service_call(self.service.move, job_id, offset)
+            return
+        if job_id is not None and self.job_queue.move(job_id, offset):
+            self.job_queue.save()
+            self._refresh_queue_view()
+
+    def on_queue_up_clicked(self, button):
+        """Move the selected job up the queue"""
+        self._move_selected_job(-1)
+
+    def on_queue_down_clicked(self, button):
+        """Move the selected job down the queue"""
+        self._move_selected_job(1)
+
+    def on_queue_remove_clicked(self, button):
+        """Remove the selected job, stopping it first if it is running"""
+        job_id = self._selected_job_id()
+        if job_id is None:
+            return
+        if self.service is not None:
+            self._service_call(self.service.remove, job_id)
+            return
+        run = self._active_runs().get(job_id)
+        if run is not None:
+            self._stop_run(run)
+        job = self.job_queue.remove(job_id)
+        if job is not None and job.journal_id and run is None and job.state == jobqueue.QUEUED:
+            # A job that never runs again must not be offered for resuming
+            self.job_journal.finish(job.journal_id, journal.DISCARDED)
+            pipeline.remove_staging(job.download_path, job.journal_id)
+        self.job_queue.save()
+        self._refresh_queue_view()
+        self._update_controls()
+
+    def on_queue_clear_clicked(self, button):
+        """Remove finished jobs from the queue view"""
+        if self.service is not None:
+            self._service_call(self.service.clear_finished)
+            return
+        if self.job_queue.clear_finished():
+            self._refresh_queue_view()
+
+    def _connect_service(self):
+        """Client of the download service, if it is enabled and answering"""
+        if not self.config.get('use_download_service', False):
+            return None
+        address = self.config.get('download_service_address') or client.default_address()
+        try:
+            service = client.DaemonClient(address)
+        except ValueError as e:
+            logger.error(f"Invalid download service address: {e}")
+            return None
+        if not service.ping():
+            logger.warning(f"Download service not reachable at {address}, downloading in this window")
+            return None
+        logger.info(f"Attached to the download service at {address}")
+        return service
+
+    def _attach_service(self):
+        """Show the service's queue and follow its events"""
+        try:
+            snapshot = self.service.jobs()
+        except ApiError as e:
+            logger.error(f"Could not read the download service queue: {e}")
+            snapshot = {"seq": 0, "paused": False, "jobs": []}
+        self.log_message("🔗 Attached to the download service at {}".format(self.service.address))
+        self._show_service_queue(snapshot["jobs"], snapshot["paused"])
+        self._service_events = client.EventWatcher(
+            self.service,
+            lambda events, missed: GLib.idle_add(self._on_service_events, events, missed),
+            since=snapshot["seq"],
+        )
+        self._service_events.start()
+
+    def _service_call(self, func, *args):
+        """Send a request to the download service, showing an error if it fails"""
+        try:
+            return func(*args)
+        except ApiError as e:
+            logger.error(f"Download service request failed: {e}")
+            self.show_error_dialog("Download service error:\n{}".format(str(e)))
+            return None
+
+    def _submit_to_service(self, url, use_auth, auth_browser, playlist_items, playlist_info, download_path):
+        """Hand a download job to the download service"""
+        job = self._service_call(
+            self.service.submit, url, download_path or self.download_path, use_auth, auth_browser,
+            playlist_items, playlist_info
+        )
+        if job is None:
+            return
+        if not self.job_queue.has_active():
+            self.clear_log()
+            self.copy_log_button.hide()
+        self._service_jobs.add(job["id"])
+        self.log_message("📥 Queued job {}: {}".format(job["number"], url))
+        self.url_entry.set_text("")
+        if self.queue_paused:
+            self.queue_paused = False
+            self._service_call(self.service.resume)
+
+    def _show_service_queue(self, summaries, paused):
+        self.job_queue.replace(summaries, paused)
+        self.queue_paused = paused
+        self._refresh_queue_view()
+        self._update_queue_progress()
+        self._update_controls()
+
+    def _service_other_work(self, job_id):
+        """True if service jobs other than this one are queued or running"""
+        return any(job.is_active and job.job_id != job_id for job in self.job_queue.jobs)
+
+    def _on_service_events(self, events, missed):
+        """Apply a batch of events from the download service"""
+        if self.closing:
+            return False
+        if missed:
+            snapshot = self._service_call(self.service.jobs)
+            if snapshot is not None:
+                self._show_service_queue(snapshot["jobs"], snapshot["paused"])
+        for event in events:
+            kind = event.get("type")
+            own = event.get("job") in self._service_jobs
+            if kind == "jobs":
+                self._show_service_queue(event["jobs"], event["paused"])
+            elif kind == "progress":
+                self.job_queue.update_progress(event["jobs"])
+            elif kind == "log":
+                self.post_log("[job {}] {}".format(event["number"], event["message"]) if event["message"] else "")
+            elif kind == "message" and own:
+                if event["error"]:
+                    self.show_error_dialog(event["message"])
+                elif not self._service_other_work(event["job"]):
+                    self.show_success_dialog(event["message"])
+            elif kind == "notify" and own and event.get("final"):
+                self.send_notification(event["title"], event["message"], event["icon"])
+            elif kind == "finished" and not self._service_other_work(event["job"]):
+                self.copy_log_button.show()
+        self.flush_ui_updates()
+        self._update_queue_progress()
+        return False
+
     def show_error_dialog(self, message):
         """Show error dialog"""
+        self.flush_ui_updates()
         dialog = Gtk.MessageDialog(
             transient_for=self,
             modal=True,
@@ -714,6 +1502,7 @@ class YouTubeMp3Downloader(Gtk.Window):
 
     def show_success_dialog(self, message):
         """Show success dialog"""
+        self.flush_ui_updates()
         dialog = Gtk.MessageDialog(
             transient_for=self,
             modal=True,
@@ -0,0 +1,216 @@
+"""
+Persistent download archive for YouTube MP3 Downloader.
+
+Every completed download is recorded as video ID -> output path, size and
+completion time in a SQLite database under the configuration directory.
+Before a run, items whose recorded file still exists in the destination
+folder are skipped without any network work, and the same set of IDs is
+exported in yt-dlp's ``--download-archive`` format so yt-dlp itself skips
+them while walking a playlist.
+
+Entries whose file was deleted or moved out of the folder are simply not
+exported, so those videos are downloaded again.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from . import config
+from . import utils
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+ARCHIVE_FILENAME = "download_archive.sqlite3"
+# Exported yt-dlp archives, one per destination folder
+YTDLP_ARCHIVE_DIR = "download_archives"
+
+# yt-dlp identifies YouTube entries as "<extractor key> <video id>"
+YTDLP_EXTRACTOR = "youtube"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    video_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    completed_at REAL NOT NULL
+);
+"""
+
+
+class ArchiveEntry:
+    """A completed download."""
+
+    def __init__(self, video_id: str, path: str, size: int, completed_at: float) -> None:
+        self.video_id = video_id
+        self.path = path
+        self.size = size
+        self.completed_at = completed_at
+
+    def is_present(self, folder: Optional[str] = None) -> bool:
+        """
+        Return True if the recorded file still exists and is not empty.
+
+        Args:
+            folder: Only accept files inside this folder or its subfolders
+        """
+        if folder is not None:
+            root = os.path.join(os.path.normpath(os.path.abspath(folder)), "")
+            if not self.path.startswith(root):
+                return False
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def __repr__(self) -> str:
+        return "ArchiveEntry({!r}, {!r}, {})".format(self.video_id, self.path, self.size)
+
+
+class DownloadArchive:
+    """
+    SQLite-backed index of completed downloads.
+
+    A new connection is opened for every operation, so one instance can be
+    shared by all download workers.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None) -> None:
+        self.path = Path(path) if path else config.CONFIG_DIR / ARCHIVE_FILENAME
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        if not self._initialized:
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def record(self, video_id: str, path: str) -> bool:
+        """
+        Record a completed download.
+
+        Args:
+            video_id: YouTube video ID
+            path: Final output file
+
+        Returns:
+            True if the entry was stored (the file must exist)
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        if size <= 0:
+            return False
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO archive (video_id, path, size, completed_at) VALUES (?, ?, ?, ?)",
+                        (video_id, os.path.normpath(os.path.abspath(path)), size, time.time()),
+                    )
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not record {video_id} in the download archive: {e}")
+            return False
+        logger.debug(f"Archived {video_id} -> {path}")
+        return True
+
+    def lookup(self, video_id: str) -> Optional[ArchiveEntry]:
+        """Return the archive entry of a video, if any."""
+        return self.lookup_many([video_id]).get(video_id)
+
+    def lookup_many(self, video_ids: Iterable[str]) -> Dict[str, ArchiveEntry]:
+        """Return the archive entries of several videos, keyed by video ID."""
+        wanted = list(dict.fromkeys(video_ids))
+        found: Dict[str, ArchiveEntry] = {}
+        if not wanted:
+            return found
+        try:
+            conn = self._connect()
+            try:
+                # Stay well below SQLite's limit on bound parameters
+                for start in range(0, len(wanted), 500):
+                    chunk = wanted[start:start + 500]
+                    rows = conn.execute(
+                        "SELECT video_id, path, size, completed_at FROM archive WHERE video_id IN ({})".format(
+                            ",".join("?" * len(chunk))
+                        ),
+                        chunk,
+                    ).fetchall()
+                    for row in rows:
+                        found[row[0]] = ArchiveEntry(*row)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Download archive lookup failed: {e}")
+        return found
+
+    def present_ids(self, video_ids: Iterable[str], folder: str) -> Dict[str, ArchiveEntry]:
+        """Return the entries among ``video_ids`` whose file exists in ``folder``."""
+        return {
+            video_id: entry
+            for video_id, entry in self.lookup_many(video_ids).items()
+            if entry.is_present(folder)
+        }
+
+    def export_ytdlp(self, target: Union[str, Path], folder: str, extra_ids: Iterable[str] = ()) -> int:
+        """
+        Write the IDs whose file exists in ``folder`` in yt-dlp archive format.
+
+        Args:
+            target: Archive file passed to ``--download-archive``
+            folder: Destination folder of the run
+            extra_ids: Further IDs known to be in the folder (e.g. from the library index)
+
+        Returns:
+            Number of exported entries
+        """
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute("SELECT video_id, path, size, completed_at FROM archive").fetchall()
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not read the download archive: {e}")
+            rows = []
+
+        video_ids = [row[0] for row in rows if ArchiveEntry(*row).is_present(folder)]
+        video_ids = list(dict.fromkeys(video_ids + list(extra_ids)))
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for video_id in video_ids:
+                f.write("{} {}\n".format(YTDLP_EXTRACTOR, video_id))
+        os.replace(tmp, target)
+        logger.debug(f"Exported {len(video_ids)} archive entries to {target}")
+        return len(video_ids)
+
+    def forget(self, video_id: str) -> None:
+        """Remove a video from the archive."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM archive WHERE video_id = ?", (video_id,))
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not remove {video_id} from the download archive: {e}")
+
+
+def ytdlp_archive_path(folder: str) -> Path:
+    """Return the exported yt-dlp archive file for a destination folder."""
+    return config.CONFIG_DIR / YTDLP_ARCHIVE_DIR / "{}.txt".format(utils.path_digest(folder))
@@ -0,0 +1,327 @@
+"""
+Shared bandwidth budget for YouTube MP3 Downloader.
+
+With several jobs and parallel workers running, downloads can take the
+whole uplink. ``BandwidthBudget`` holds one rate for every download of
+the process, optionally varying by time of day, and hands it out two
+ways:
+
+- yt-dlp processes take a lease when they start and get a share of the
+  current rate through ``--limit-rate``: an equal part for every download
+  expected to run, never more than what other leases left over. Leases
+  are returned when the process exits, so later processes get the freed
+  share; a process keeps its limit until it exits, which is why limited
+  playlists are downloaded one process per video.
+- in-process engines report the bytes they receive to ``consume``, a
+  token bucket that makes them wait, so their shares rebalance
+  continuously.
+
+Rates are written the way yt-dlp takes them: bytes per second with an
+optional K, M or G suffix (powers of 1024), e.g. "500K" or "2.5M".
+"""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds of the rate a download may burst after being idle
+BURST_SECONDS = 1.0
+
+# Longest single sleep while waiting for tokens, so stop requests are noticed
+MAX_WAIT_SLICE = 0.25
+
+# yt-dlp rounds very low limits oddly; shares never go below this
+MIN_SHARE = 16 * 1024
+
+UNLIMITED_WORDS = ("", "0", "none", "off", "unlimited")
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+_RATE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?$")
+_RULE_PATTERN = re.compile(r"^(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+)$")
+
+# (start minute, end minute, bytes per second or None for unlimited)
+Rule = Tuple[int, int, Optional[int]]
+
+
+def parse_rate(text: str) -> Optional[int]:
+    """
+    Parse a rate such as "500K" or "2M".
+
+    Returns:
+        Bytes per second, or None for unlimited
+
+    Raises:
+        ValueError: If the rate is not understood
+    """
+    value = text.strip().upper()
+    if value.lower() in UNLIMITED_WORDS:
+        return None
+    match = _RATE_PATTERN.match(value)
+    if not match:
+        raise ValueError("Invalid rate: {!r} (use e.g. 500K or 2M)".format(text))
+    rate = int(float(match.group(1)) * _UNITS[match.group(2)])
+    return rate or None
+
+
+def format_rate(rate: Optional[int]) -> str:
+    """Format a rate for display and for ``--limit-rate``."""
+    if rate is None:
+        return "unlimited"
+    for unit in ("G", "M", "K"):
+        if rate >= _UNITS[unit]:
+            return "{:g}{}".format(round(rate / _UNITS[unit], 2), unit)
+    return str(rate)
+
+
+class BandwidthSchedule:
+    """
+    A default rate with time-of-day exceptions.
+
+    Args:
+        default: Rate outside the rules (None for unlimited)
+        rules: (start minute, end minute, rate) periods; a period may wrap
+            past midnight, and the first matching period wins
+    """
+
+    def __init__(self, default: Optional[int] = None, rules: Sequence[Rule] = ()) -> None:
+        self.default = default
+        self.rules = list(rules)
+
+    @classmethod
+    def parse(cls, limit: str = "", schedule: str = "") -> BandwidthSchedule:
+        """
+        Build a schedule from its settings text.
+
+        Args:
+            limit: Default rate, e.g. "2M" (empty for unlimited)
+            schedule: Comma-separated periods such as
+                "08:00-18:00=1M, 22:00-06:00=unlimited"
+
+        Raises:
+            ValueError: If a rate or period is not understood
+        """
+        rules: List[Rule] = []
+        for part in schedule.replace(";", ",").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            match = _RULE_PATTERN.match(part)
+            if not match:
+                raise ValueError("Invalid schedule period: {!r} (use e.g. 08:00-18:00=1M)".format(part))
+            start_h, start_m, end_h, end_m = (int(match.group(i)) for i in range(1, 5))
+            if start_h > 24 or end_h > 24 or start_m > 59 or end_m > 59:
+                raise ValueError("Invalid time in schedule period: {!r}".format(part))
+            rules.append((start_h * 60 + start_m, end_h * 60 + end_m, parse_rate(match.group(5))))
+        return cls(parse_rate(limit), rules)
+
+    @property
+    def is_unlimited(self) -> bool:
+        return self.default is None and all(rate is None for _, _, rate in self.rules)
+
+    def rate_at(self, moment: datetime.datetime) -> Optional[int]:
+        """Rate in force at a local time."""
+        minute = moment.hour * 60 + moment.minute
+        for start, end, rate in self.rules:
+            if start <= end:
+                inside = start <= minute < end
+            else:
+                inside = minute >= start or minute < end
+            if inside:
+                return rate
+        return self.default
+
+    def __repr__(self) -> str:
+        return "BandwidthSchedule({}, {})".format(format_rate(self.default), self.rules)
+
+
+def schedule_from_settings(settings: Dict[str, Any]) -> BandwidthSchedule:
+    """
+    Read the ``bandwidth_limit`` and ``bandwidth_schedule`` settings.
+
+    Invalid settings are logged and leave the bandwidth unlimited.
+    """
+    try:
+        return BandwidthSchedule.parse(
+            str(settings.get("bandwidth_limit", "") or ""), str(settings.get("bandwidth_schedule", "") or "")
+        )
+    except ValueError as e:
+        logger.warning(f"Ignoring bandwidth settings: {e}")
+        return BandwidthSchedule()
+
+
+class RateLease:
+    """
+    A download's share of the bandwidth budget.
+
+    Use it as a context manager, or call ``release`` once the download has
+    finished, so the share goes back to the budget.
+    """
+
+    def __init__(self, budget: Optional[BandwidthBudget] = None, rate: Optional[int] = None) -> None:
+        self.budget = budget
+        self.rate = rate
+
+    @property
+    def args(self) -> List[str]:
+        """yt-dlp command line arguments."""
+        return ["--limit-rate", str(self.rate)] if self.rate else []
+
+    def release(self) -> None:
+        if self.budget is not None:
+            self.budget._release(self.rate)
+            self.budget = None
+
+    def __enter__(self) -> RateLease:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+class BandwidthBudget:
+    """
+    One download rate shared by every running download.
+
+    Thread-safe. The schedule can be replaced while downloads run; leases
+    taken afterwards and the token bucket follow the new rate.
+
+    Args:
+        schedule: Rates by time of day (unlimited if None)
+        clock: Monotonic time source
+        now: Local wall clock, for the schedule
+        sleep: Waits for tokens
+    """
+
+    def __init__(
+        self,
+        schedule: Optional[BandwidthSchedule] = None,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime.datetime] = datetime.datetime.now,
+        sleep: Callable[[float], Any] = time.sleep,
+    ) -> None:
+        self.schedule = schedule or BandwidthSchedule()
+        self.clock = clock
+        self.now = now
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._leases = 0
+        # Bytes per second held by the current leases
+        self._allocated = 0
+        # Downloads the running jobs may run at the same time
+        self._expected = 0
+        self._tokens = 0.0
+        self._updated = clock()
+
+    def set_schedule(self, schedule: BandwidthSchedule) -> None:
+        with self._lock:
+            self.schedule = schedule
+
+    @property
+    def is_limited(self) -> bool:
+        return not self.schedule.is_unlimited
+
+    def rate(self) -> Optional[int]:
+        """Total rate in force now, or None when unlimited."""
+        return self.schedule.rate_at(self.now())
+
+    @property
+    def active(self) -> int:
+        """Number of downloads holding a lease."""
+        return self._leases
+
+    @property
+    def allocated(self) -> int:
+        """Bytes per second handed out to the current leases."""
+        return self._allocated
+
+    @contextlib.contextmanager
+    def expect(self, downloads: int) -> Iterator[None]:
+        """
+        Announce that a job may run up to ``downloads`` processes at once.
+
+        Leases are capped at an equal part of the rate for every expected
+        download, so the first process of a job does not take everything.
+        """
+        downloads = max(1, downloads)
+        with self._lock:
+            self._expected += downloads
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._expected = max(0, self._expected - downloads)
+
+    def lease(self) -> RateLease:
+        """Take a share of the current rate for one yt-dlp process."""
+        rate = self.rate()
+        with self._lock:
+            self._leases += 1
+            count = max(self._leases, self._expected)
+            if rate is None:
+                return RateLease(self, None)
+            # Only what other leases left over; below MIN_SHARE yt-dlp misbehaves
+            share = max(MIN_SHARE, min(rate // count, rate - self._allocated))
+            self._allocated += share
+        logger.debug(f"Bandwidth share {format_rate(share)} of {format_rate(rate)} for {count} download(s)")
+        return RateLease(self, share)
+
+    def _release(self, share: Optional[int] = None) -> None:
+        with self._lock:
+            self._leases = max(0, self._leases - 1)
+            self._allocated = max(0, self._allocated - (share or 0))
+
+    def consume(self, nbytes: int, stop_event: Optional[threading.Event] = None) -> float:
+        """
+        Take tokens for received bytes, waiting until the rate allows them.
+
+        Waiting downloads queue up behind each other, so together they
+        never go faster than the rate however many of them there are.
+
+        Returns:
+            Seconds waited
+        """
+        rate = self.rate()
+        if rate is None or nbytes <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self._tokens + (now - self._updated) * rate, rate * BURST_SECONDS)
+            self._updated = now
+            self._tokens -= nbytes
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+        deadline = self.clock() + wait
+        remaining = wait
+        while remaining > 0:
+            if stop_event is not None and stop_event.is_set():
+                break
+            self.sleep(min(remaining, MAX_WAIT_SLICE))
+            remaining = deadline - self.clock()
+        return wait
+
+
+def lease(budget: Optional[BandwidthBudget]) -> RateLease:
+    """
+    Bandwidth share for one yt-dlp process.
+
+    Returns:
+        An empty lease when there is no budget
+    """
+    if budget is None:
+        return RateLease()
+    return budget.lease()
+
+
+def expect(budget: Optional[BandwidthBudget], downloads: int) -> Any:
+    """``budget.expect(downloads)``, or a context doing nothing without a budget."""
+    if budget is None:
+        return contextlib.nullcontext()
+    return budget.expect(downloads)
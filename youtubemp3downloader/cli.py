@@ -0,0 +1,483 @@
+"""
+Command line interface for YouTube MP3 Downloader.
+
+Downloads the URLs given as arguments or listed in files with the same
+engine as the window, without GTK or a display, so bulk jobs can run
+from cron on headless machines::
+
+    youtube-mp3-downloader-cli -o ~/Music -j 2 -f urls.txt
+
+Log lines are printed as they arrive; download progress is summarised in
+one status line, redrawn in place on a terminal and printed at a slow,
+fixed interval otherwise. The exit status tells what happened:
+
+    0  every job finished without failures
+    1  some videos or jobs failed
+    2  invalid arguments, URLs or output folder
+    3  yt-dlp or ffmpeg is missing
+    130  interrupted
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
+
+from . import archive
+from . import bandwidth
+from . import download
+from . import engine
+from . import jobqueue
+from . import library
+from . import metrics
+from . import playlist_cache
+from . import profiles
+from . import scheduler
+from . import throughput
+from . import thumbnails
+from . import tracing
+from . import utils
+from .exceptions import ValidationError
+from .jobqueue import JobQueue, JobRun, QueuedJob
+from .logger import get_logger, set_console_level
+from .playlist_cache import PlaylistCache
+from .runner import JobRunner
+
+logger = get_logger(__name__)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_DEPENDENCY = 3
+EXIT_INTERRUPTED = 130
+
+# Seconds between status lines on a terminal and in logs or pipes
+STATUS_INTERVAL_TTY = 0.5
+STATUS_INTERVAL = 30.0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="youtube-mp3-downloader-cli",
+        description="Download YouTube videos and playlists as MP3 files or in their original audio format.",
+    )
+    parser.add_argument("urls", nargs="*", metavar="URL", help="YouTube video or playlist URL")
+    parser.add_argument(
+        "-f", "--file", action="append", default=[], metavar="FILE",
+        help="read URLs from FILE, one per line ('-' for standard input); may be repeated",
+    )
+    parser.add_argument("-o", "--output", default=".", metavar="DIR", help="download folder (default: current)")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=jobqueue.DEFAULT_MAX_RUNNING,
+        help="URLs downloaded at the same time (1-{})".format(jobqueue.MAX_RUNNING),
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="videos of one playlist downloaded at the same time (1-{})".format(scheduler.MAX_WORKERS),
+    )
+    parser.add_argument(
+        "--order", choices=sorted(jobqueue.POLICIES), default=jobqueue.POLICY_FIFO,
+        help="which queued URL starts next (default: fifo)",
+    )
+    parser.add_argument(
+        "--cookies-from-browser", metavar="BROWSER",
+        help="use the YouTube login of BROWSER (firefox, chrome, brave)",
+    )
+    parser.add_argument(
+        "--engine", choices=(engine.ENGINE_SUBPROCESS, engine.ENGINE_INPROCESS), default=engine.ENGINE_SUBPROCESS,
+        help="run yt-dlp as a command or in-process (default: subprocess)",
+    )
+    parser.add_argument(
+        "--format", choices=sorted(profiles.PROFILES), default=profiles.DEFAULT_PROFILE, dest="output_profile",
+        help="mp3-320 (default), mp3-v0 (VBR) or native (the original audio, not re-encoded)",
+    )
+    parser.add_argument("--pipeline", action="store_true", help="convert to MP3 while the next videos download")
+    parser.add_argument(
+        "--limit-rate", default="", metavar="RATE",
+        help="maximum download rate shared by all downloads, e.g. 500K or 2M (default: unlimited)",
+    )
+    parser.add_argument(
+        "--limit-schedule", action="append", default=[], metavar="HH:MM-HH:MM=RATE",
+        help="rate for a time of day, e.g. 08:00-18:00=1M; overrides --limit-rate then; may be repeated",
+    )
+    parser.add_argument(
+        "--adaptive", action="store_true",
+        help="tune parallel downloads (at most --workers) and fragment settings to the measured speed",
+    )
+    parser.add_argument("--no-archive", action="store_true", help="download videos even if they were downloaded before")
+    parser.add_argument(
+        "--no-thumbnail-store", action="store_true",
+        help="fetch every cover again instead of reusing the stored covers",
+    )
+    parser.add_argument(
+        "--trace", nargs="?", const="", metavar="DIR",
+        help="save a Chrome trace of each URL's download to DIR (default: the traces folder of the configuration)",
+    )
+    parser.add_argument(
+        "--metrics-textfile", metavar="FILE",
+        help="write download metrics in the Prometheus text format to FILE while downloading and at the end",
+    )
+    parser.add_argument(
+        "--profile-parser", action="store_true", help="with --trace, also save a cProfile of the output parser",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-q", "--quiet", action="store_true", help="print only errors and the final summary")
+    verbosity.add_argument("-v", "--verbose", action="store_true", help="print every yt-dlp line and debug logs")
+    return parser
+
+
+def read_url_file(path: str) -> List[str]:
+    """
+    Read URLs from a file, one per line.
+
+    Blank lines and lines starting with ``#`` are ignored.
+
+    Args:
+        path: File to read, or ``-`` for standard input
+    """
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def build_jobs(
+    urls: Sequence[str],
+    output_dir: str,
+    use_auth: bool = False,
+    auth_browser: str = "firefox",
+) -> Tuple[List[QueuedJob], List[str]]:
+    """
+    Turn URLs into queued jobs.
+
+    Returns:
+        The jobs, in order and without duplicates, and the invalid URLs
+    """
+    jobs: List[QueuedJob] = []
+    invalid: List[str] = []
+    seen = set()
+    for url in urls:
+        try:
+            url_type, _ = utils.classify_youtube_url(url)
+        except ValidationError:
+            url_type = None
+        if not url_type:
+            invalid.append(url)
+            continue
+        if url in seen:
+            continue
+        seen.add(url)
+        jobs.append(QueuedJob(url, url_type, output_dir, use_auth, auth_browser))
+    return jobs, invalid
+
+
+def missing_dependencies(backend: str) -> List[str]:
+    """Return the required tools that are not installed."""
+    missing = []
+    if not (backend == engine.ENGINE_INPROCESS and engine.is_available()) and not shutil.which("yt-dlp"):
+        missing.append("yt-dlp")
+    if not shutil.which("ffmpeg"):
+        missing.append("ffmpeg")
+    return missing
+
+
+class ConsoleSink:
+    """
+    Print the output of running jobs to a terminal or a log file.
+
+    Args:
+        out: Stream for log lines, reports and the status line
+        err: Stream for errors
+        quiet: Print only errors and the final summary
+        verbose: Also print every yt-dlp progress line
+        tagged: Prefix lines with the job number
+    """
+
+    def __init__(
+        self,
+        out: IO[str],
+        err: IO[str],
+        quiet: bool = False,
+        verbose: bool = False,
+        tagged: bool = False,
+    ) -> None:
+        self.out = out
+        self.err = err
+        self.quiet = quiet
+        self.verbose = verbose
+        self.tagged = tagged
+        self.is_tty = hasattr(out, "isatty") and out.isatty()
+        self.status_interval = STATUS_INTERVAL_TTY if self.is_tty else STATUS_INTERVAL
+        self._lock = threading.Lock()
+        self._status_width = 0
+        self._last_status = ""
+        self._last_status_time = 0.0
+        self.successful = 0
+        self.skipped = 0
+        self.failures = 0
+        self.failed_jobs = 0
+
+    def _tag(self, run: JobRun, message: str) -> str:
+        if self.tagged and message:
+            return "[job {}] {}".format(run.job.number, message)
+        return message
+
+    def _write(self, stream: IO[str], text: str) -> None:
+        with self._lock:
+            if self._status_width:
+                # Clear the status line before printing over it
+                self.out.write("\r" + " " * self._status_width + "\r")
+                self.out.flush()
+                self._status_width = 0
+            stream.write(text + "\n")
+            stream.flush()
+
+    def job_log(self, run: JobRun, message: str, progress: bool) -> None:
+        if self.quiet or (progress and not self.verbose):
+            return
+        self._write(self.out, self._tag(run, message))
+
+    def job_message(self, run: JobRun, message: str, error: bool) -> None:
+        text = self._tag(run, " ".join(line for line in message.splitlines() if line.strip()))
+        if error:
+            self._write(self.err, text)
+        elif not self.quiet:
+            self._write(self.out, text)
+
+    def job_notify(self, run: JobRun, title: str, message: str, icon: str) -> None:
+        pass
+
+    def job_finished(self, run: JobRun) -> None:
+        self.successful += run.successful
+        self.skipped += run.skipped
+        self.failures += run.failures
+        if run.job.state == jobqueue.FAILED:
+            self.failed_jobs += 1
+
+    def status(self, jobs: Sequence[QueuedJob], force: bool = False) -> None:
+        """Print the status of the running jobs, at most once per interval."""
+        if self.quiet:
+            return
+        running = [job for job in jobs if job.state == jobqueue.RUNNING]
+        if not running:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_status_time < self.status_interval:
+            return
+        waiting = sum(1 for job in jobs if job.state == jobqueue.QUEUED)
+        parts = ["{}: {:.0%} {}".format(job.number, job.fraction, job.status) for job in running]
+        line = "[{} running, {} queued] {}".format(len(running), waiting, " | ".join(parts))
+        self._last_status_time = now
+        with self._lock:
+            if self.is_tty:
+                width = shutil.get_terminal_size().columns - 1
+                line = line[:width]
+                self.out.write("\r" + line.ljust(self._status_width))
+                self._status_width = len(line)
+            elif line != self._last_status:
+                self.out.write(line + "\n")
+            self.out.flush()
+            self._last_status = line
+
+
+def _enumerate_playlists(jobs: Sequence[QueuedJob], cache: PlaylistCache, backend: str) -> None:
+    """Fetch playlist entries up front so the queue order can use them."""
+    for job in jobs:
+        if job.url_type != "Playlist":
+            continue
+        playlist_id = playlist_cache.playlist_id_from_url(job.url)
+        cached = cache.get(playlist_id) if playlist_id else None
+        if cached and cached.is_fresh:
+            playlist_info = cached.playlist_info
+            durations = cached.durations
+        else:
+            durations = {}
+            try:
+                playlist_info = download.enumerate_playlist(
+                    job.url, job.use_auth, job.auth_browser, backend, durations
+                )
+            except Exception as e:
+                logger.warning(f"Could not list {job.url}: {e}")
+                continue
+            if playlist_id and playlist_info:
+                cache.put(playlist_id, playlist_info, durations)
+        if playlist_info:
+            job.playlist_info = dict(playlist_info)
+            job.durations = dict(durations)
+            job.pending = list(range(1, len(playlist_info) + 1))
+
+
+def run_jobs(
+    jobs: Sequence[QueuedJob],
+    sink: ConsoleSink,
+    max_running: int = jobqueue.DEFAULT_MAX_RUNNING,
+    order: str = jobqueue.POLICY_FIFO,
+    options: Optional[Dict[str, Any]] = None,
+    playlist_cache: Optional[PlaylistCache] = None,
+) -> int:
+    """
+    Run jobs to completion on the calling thread.
+
+    Returns:
+        Exit status
+    """
+    job_queue = JobQueue(policy=jobqueue.make_policy(order), max_running=max_running)
+    for job in jobs:
+        job_queue.add(job)
+
+    events: queue.Queue = queue.Queue()
+    job_runner = JobRunner(
+        job_queue, sink, lambda func, *args: events.put((func, args)),
+        options=lambda job: dict(options or {}),
+        playlist_cache=playlist_cache,
+    )
+
+    def dispatch(timeout: Optional[float]) -> None:
+        try:
+            func, args = events.get(timeout=timeout)
+        except queue.Empty:
+            return
+        func(*args)
+
+    try:
+        job_runner.start_jobs()
+        while job_runner.busy or job_queue.queued():
+            dispatch(sink.status_interval)
+            job_runner.start_jobs()
+            sink.status(job_queue.jobs)
+    except KeyboardInterrupt:
+        sink._write(sink.err, "Interrupted, stopping downloads...")
+        job_runner.stop_all()
+        while job_runner.busy:
+            dispatch(1.0)
+        return EXIT_INTERRUPTED
+
+    if sink.failures or sink.failed_jobs or any(job.state != jobqueue.DONE for job in job_queue.jobs):
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    set_console_level(logging.DEBUG if args.verbose else logging.ERROR)
+    try:
+        return _run(parser, args)
+    except KeyboardInterrupt:
+        # Listing playlists and scanning the library run before any job does
+        print("Interrupted", file=sys.stderr)
+        return EXIT_INTERRUPTED
+
+
+def _run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    """Check the arguments and download every URL; returns the exit status."""
+    urls = list(args.urls)
+    for path in args.file:
+        try:
+            urls.extend(read_url_file(path))
+        except OSError as e:
+            print("Could not read {}: {}".format(path, e), file=sys.stderr)
+            return EXIT_USAGE
+    if not urls:
+        parser.print_usage(sys.stderr)
+        print("No URLs given", file=sys.stderr)
+        return EXIT_USAGE
+    if not 1 <= args.jobs <= jobqueue.MAX_RUNNING:
+        parser.error("--jobs must be between 1 and {}".format(jobqueue.MAX_RUNNING))
+    if not 1 <= args.workers <= scheduler.MAX_WORKERS:
+        parser.error("--workers must be between 1 and {}".format(scheduler.MAX_WORKERS))
+    try:
+        schedule = bandwidth.BandwidthSchedule.parse(args.limit_rate, ",".join(args.limit_schedule))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile_parser and args.trace is None:
+        parser.error("--profile-parser needs --trace")
+
+    output_dir = os.path.abspath(os.path.expanduser(args.output))
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except OSError as e:
+        print("Could not create {}: {}".format(output_dir, e), file=sys.stderr)
+        return EXIT_USAGE
+    if not os.access(output_dir, os.W_OK | os.X_OK):
+        print("Output folder is not writable: {}".format(output_dir), file=sys.stderr)
+        return EXIT_USAGE
+
+    use_auth = bool(args.cookies_from_browser)
+    jobs, invalid = build_jobs(urls, output_dir, use_auth, args.cookies_from_browser or "firefox")
+    for url in invalid:
+        print("Not a YouTube video or playlist URL: {}".format(url), file=sys.stderr)
+    if invalid:
+        return EXIT_USAGE
+
+    missing = missing_dependencies(args.engine)
+    if missing:
+        print("Missing required dependencies: {}".format(", ".join(missing)), file=sys.stderr)
+        return EXIT_DEPENDENCY
+
+    cache = PlaylistCache()
+    if args.order != jobqueue.POLICY_FIFO:
+        _enumerate_playlists(jobs, cache, args.engine)
+
+    options: Dict[str, Any] = {
+        "max_workers": args.workers,
+        "use_pipeline": args.pipeline,
+        "backend": args.engine,
+        "output_profile": args.output_profile,
+    }
+    if args.adaptive:
+        options["throughput_store"] = throughput.ThroughputStore()
+    if args.trace is not None:
+        trace_dir = os.path.expanduser(args.trace) if args.trace else str(tracing.default_trace_dir())
+        options["trace_dir"] = os.path.abspath(trace_dir)
+        options["profile_parser"] = args.profile_parser
+    if not args.no_thumbnail_store:
+        options["thumbnail_store"] = thumbnails.ThumbnailStore()
+    if not schedule.is_unlimited:
+        options["bandwidth_budget"] = bandwidth.BandwidthBudget(schedule)
+    if not args.no_archive:
+        options["download_archive"] = archive.DownloadArchive()
+        index = library.LibraryIndex(output_dir)
+        index.load()
+        index.scan()
+        index.save()
+        options["library_index"] = index
+
+    exporter = None
+    if args.metrics_textfile:
+        download_metrics = metrics.DownloadMetrics()
+        download_metrics.registry.add_collector(lambda: download_metrics.set_queue([job.state for job in jobs]))
+        exporter = metrics.TextfileExporter(
+            download_metrics.registry, os.path.abspath(os.path.expanduser(args.metrics_textfile))
+        )
+        exporter.start()
+        options["download_metrics"] = download_metrics
+
+    sink = ConsoleSink(sys.stdout, sys.stderr, args.quiet, args.verbose, tagged=args.jobs > 1)
+    started = time.monotonic()
+    try:
+        status = run_jobs(jobs, sink, args.jobs, args.order, options, cache)
+    finally:
+        if exporter is not None:
+            exporter.close()
+    if status != EXIT_INTERRUPTED:
+        summary = "{} downloaded, {} skipped, {} failed in {:.0f}s".format(
+            sink.successful, sink.skipped, sink.failures, time.monotonic() - started
+        )
+        print(summary, file=sys.stderr if status else sys.stdout)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Client of the download service for YouTube MP3 Downloader.
+
+``DaemonClient`` speaks the JSON API served by ``daemon.py`` over a Unix
+socket or a localhost TCP port. ``EventWatcher`` long-polls the event
+stream on a background thread, and ``RemoteQueue`` mirrors the service's
+queue so the window can show it with the same views as a local queue.
+
+Addresses are written as ``unix:/path/to/socket``, ``host:port`` or
+``http://host:port``. The default is a Unix socket in the user's runtime
+directory. On TCP the service writes a random token to the configuration
+directory, and the client sends it with every request.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import socket
+import threading
+import urllib.parse
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import config
+from . import jobqueue
+from .exceptions import ApiError
+from .jobqueue import JobQueue, QueuedJob
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SOCKET_FILENAME = "youtube-mp3-downloader.sock"
+
+# Holds the token TCP clients must send; only readable by the user
+TOKEN_FILENAME = "daemon_token"
+
+# Seconds a request may take; long polls add their own wait on top
+REQUEST_TIMEOUT = 10.0
+
+# Seconds the service holds an events request open when nothing happens
+POLL_TIMEOUT = 25.0
+
+# Seconds to wait before polling again after the service went away
+RETRY_DELAY = 2.0
+
+
+def default_address() -> str:
+    """The service's Unix socket in $XDG_RUNTIME_DIR, else in the configuration directory."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    folder = Path(runtime_dir) if runtime_dir else config.CONFIG_DIR
+    return "unix:{}".format(folder / SOCKET_FILENAME)
+
+
+def token_path() -> Path:
+    return config.CONFIG_DIR / TOKEN_FILENAME
+
+
+def read_token(path: Optional[Path] = None) -> Optional[str]:
+    """The token written by a service listening on TCP, if any."""
+    try:
+        with open(path or token_path(), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def parse_address(address: str) -> Tuple[str, str, int]:
+    """
+    Parse a service address.
+
+    Returns:
+        ``("unix", path, 0)`` or ``("tcp", host, port)``
+
+    Raises:
+        ValueError: If the address cannot be parsed
+    """
+    address = address.strip()
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if not path:
+            raise ValueError("Missing socket path in {!r}".format(address))
+        return "unix", path, 0
+    if "://" not in address:
+        address = "http://" + address
+    parts = urllib.parse.urlsplit(address)
+    if parts.scheme != "http" or not parts.hostname:
+        raise ValueError("Unsupported service address {!r}".format(address))
+    return "tcp", parts.hostname, parts.port or DEFAULT_PORT
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DaemonClient:
+    """
+    Blocking client of the download service's JSON API.
+
+    Args:
+        address: Service address (see ``parse_address``), the default
+            socket if None
+        timeout: Seconds a request may take
+    """
+
+    def __init__(self, address: Optional[str] = None, timeout: float = REQUEST_TIMEOUT) -> None:
+        self.address = address or default_address()
+        self.family, self.host, self.port = parse_address(self.address)
+        self.timeout = timeout
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        if self.family == "unix":
+            return _UnixHTTPConnection(self.host, timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None) -> Any:
+        """
+        Send one request and return its decoded JSON response.
+
+        Raises:
+            ApiError: If the service rejected the request or cannot be reached
+        """
+        conn = self._connect(timeout or self.timeout)
+        try:
+            headers = {"Accept": "application/json"}
+            if self.family == "tcp":
+                # Read on every request: the service writes a new token when it starts
+                token = read_token()
+                if token:
+                    headers["Authorization"] = "Bearer {}".format(token)
+            data = None
+            if body is not None:
+                data = json.dumps(body).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+            conn.request(method, path, body=data, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise ApiError("Download service not reachable at {}: {}".format(self.address, e), 503) from e
+        finally:
+            conn.close()
+        try:
+            result = json.loads(payload.decode("utf-8")) if payload else {}
+        except ValueError as e:
+            raise ApiError("Invalid response from the download service", 502) from e
+        if response.status >= 400:
+            message = result.get("error") if isinstance(result, dict) else None
+            raise ApiError(message or response.reason, response.status)
+        return result
+
+    def ping(self) -> bool:
+        """True if the service answers."""
+        try:
+            self.stats()
+        except ApiError:
+            return False
+        return True
+
+    def submit(
+        self,
+        url: str,
+        download_path: str,
+        use_auth: bool = False,
+        auth_browser: str = "firefox",
+        playlist_items: Optional[str] = None,
+        playlist_info: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Queue a job; returns its summary."""
+        body: Dict[str, Any] = {
+            "url": url,
+            "output": download_path,
+            "use_auth": use_auth,
+            "auth_browser": auth_browser,
+        }
+        if playlist_items:
+            body["playlist_items"] = playlist_items
+        if playlist_info:
+            body["playlist_info"] = [[video_id, title] for video_id, title in playlist_info.items()]
+        result: Dict[str, Any] = self.request("POST", "/api/jobs", body)
+        return result
+
+    def jobs(self) -> Dict[str, Any]:
+        """Return the queue: ``{"seq", "paused", "jobs"}``."""
+        result: Dict[str, Any] = self.request("GET", "/api/jobs")
+        return result
+
+    def remove(self, job_id: str) -> None:
+        self.request("DELETE", "/api/jobs/{}".format(job_id))
+
+    def move(self, job_id: str, offset: int) -> None:
+        self.request("POST", "/api/jobs/{}/move".format(job_id), {"offset": offset})
+
+    def stop(self, job_id: Optional[str] = None) -> None:
+        """Stop one job, or every job and hold the queue."""
+        if job_id is None:
+            self.request("POST", "/api/queue/stop", {})
+        else:
+            self.request("POST", "/api/jobs/{}/stop".format(job_id), {})
+
+    def pause(self) -> None:
+        self.request("POST", "/api/queue/pause", {})
+
+    def resume(self) -> None:
+        self.request("POST", "/api/queue/resume", {})
+
+    def clear_finished(self) -> None:
+        self.request("POST", "/api/queue/clear", {})
+
+    def stats(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.request("GET", "/api/stats")
+        return result
+
+    def events(self, since: int, timeout: float = POLL_TIMEOUT) -> Dict[str, Any]:
+        """
+        Wait for events after ``since``.
+
+        Returns:
+            ``{"seq", "events", "missed"}``; ``missed`` is true when older
+            events were already dropped and the queue should be reloaded
+        """
+        result: Dict[str, Any] = self.request(
+            "GET", "/api/events?since={}&timeout={}".format(since, timeout), timeout=self.timeout + timeout
+        )
+        return result
+
+
+class EventWatcher:
+    """
+    Long-poll the service's events on a background thread.
+
+    Args:
+        client: Client of the service
+        callback: Called on the watcher thread with each non-empty batch of
+            events and whether events were missed
+        since: Sequence number of the last event already seen
+    """
+
+    def __init__(
+        self,
+        client: DaemonClient,
+        callback: Callable[[List[Dict[str, Any]], bool], Any],
+        since: int = 0,
+    ) -> None:
+        self.client = client
+        self.callback = callback
+        self.since = since
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._watch, name="service-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.is_set():
+            try:
+                result = self.client.events(self.since)
+            except ApiError as e:
+                logger.debug(f"Event poll failed: {e}")
+                self._stop.wait(RETRY_DELAY)
+                continue
+            if self._stop.is_set():
+                break
+            events = result.get("events") or []
+            missed = bool(result.get("missed"))
+            self.since = int(result.get("seq", self.since))
+            if events or missed:
+                self.callback(events, missed)
+
+
+class RemoteJob(QueuedJob):
+    """A job of the service's queue, built from its summary."""
+
+    def __init__(self, summary: Dict[str, Any]) -> None:
+        super().__init__(
+            summary["url"],
+            summary.get("url_type", "Video"),
+            summary.get("download_path", ""),
+            job_id=summary["id"],
+        )
+        self.update(summary)
+
+    def update(self, summary: Dict[str, Any]) -> None:
+        self.number = int(summary.get("number", self.number))
+        self.state = summary.get("state", self.state)
+        self.fraction = float(summary.get("fraction", self.fraction))
+        self.status = summary.get("status", self.status)
+        self._label = summary.get("label", self.url)
+
+    @property
+    def label(self) -> str:
+        return str(self._label)
+
+
+class RemoteQueue(JobQueue):
+    """
+    Read-only mirror of the service's queue.
+
+    Changes are sent to the service; the mirror follows the job snapshots
+    and progress events it publishes. Nothing is saved locally.
+    """
+
+    def __init__(self, max_running: int = jobqueue.DEFAULT_MAX_RUNNING) -> None:
+        super().__init__(path=None, max_running=max_running)
+        self.paused = False
+
+    def replace(self, summaries: List[Dict[str, Any]], paused: Optional[bool] = None) -> None:
+        """Show a new snapshot of the service's jobs."""
+        self.jobs = [RemoteJob(summary) for summary in summaries]
+        if paused is not None:
+            self.paused = paused
+
+    def update_progress(self, updates: List[Dict[str, Any]]) -> None:
+        """Apply progress events to the mirrored jobs."""
+        for update in updates:
+            job = self.get(update.get("id", ""))
+            if isinstance(job, RemoteJob):
+                job.update(update)
+
+    def load(self) -> int:
+        return 0
+
+    def save(self) -> None:
+        pass
@@ -48,19 +48,13 @@ def load_config() -> Dict[str, Any]:
     """
     logger.debug("Loading configuration...")
 
-    # Create config directory if it doesn't exist
-    try:
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        logger.debug(f"Config directory ready: {CONFIG_DIR}")
-    except (OSError, PermissionError) as e:
-        logger.error(f"Failed to create config directory {CONFIG_DIR}: {e}")
-        return {}
-
-    # Check for legacy config file and migrate
-    if LEGACY_CONFIG_FILE.exists() and not CONFIG_FILE.exists():
+    # Check for legacy config file and migrate; the directory is created
+    # here or by the first save, not on every start
+    if not CONFIG_FILE.exists() and LEGACY_CONFIG_FILE.exists():
         try:
             import shutil
             logger.info(f"Migrating legacy config from {LEGACY_CONFIG_FILE}")
+            CONFIG_DIR.mkdir(parents=True, exist_ok=True)
             shutil.move(str(LEGACY_CONFIG_FILE), str(CONFIG_FILE))
             logger.info("Legacy config migrated successfully")
         except (OSError, PermissionError, IOError) as e:
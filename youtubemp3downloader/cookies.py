@@ -0,0 +1,363 @@
+"""
+Cached browser cookie jar for YouTube MP3 Downloader.
+
+Passing ``--cookies-from-browser`` makes every yt-dlp process open and
+decrypt the browser's cookie database again, which takes seconds and
+locks the profile. ``CookieJarCache`` exports a browser's cookies once
+into a Netscape cookie jar in the configuration directory and reuses it
+until the browser's cookie database changes or the jar is older than
+the TTL.
+
+yt-dlp writes its cookie file back when it exits, so processes never
+share the jar: each one gets a private copy through a ``CookieLease``,
+deleted once the process is done. When the export fails the lease falls
+back to ``--cookies-from-browser``.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from . import config
+from .exceptions import DownloadError
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+COOKIES_DIR = "cookies"
+SESSIONS_DIR = "sessions"
+
+# Seconds an exported jar is used before the cookies are exported again
+DEFAULT_TTL = 30 * 60
+
+# A jar this young is kept even if the cookie database changed since; an
+# open browser rewrites its database every few seconds
+REEXPORT_GRACE = 30
+
+# Seconds to wait before trying again after an export failed
+FAILURE_BACKOFF = 5 * 60
+
+# Seconds an export may take (the browser keyring may prompt for a password)
+EXPORT_TIMEOUT = 120
+
+# Private copies older than this were left behind by a crash
+STALE_SESSION_AGE = 24 * 60 * 60
+
+_CHROMIUM_PROFILES = ["*/Cookies", "*/Network/Cookies"]
+
+
+def _chromium(*roots: str) -> List[str]:
+    return [os.path.join(root, profile) for root in roots for profile in _CHROMIUM_PROFILES]
+
+
+# Where each browser keeps its cookie database on Linux, including Snap and Flatpak installs
+COOKIE_DATABASES: Dict[str, List[str]] = {
+    "firefox": [
+        "~/.mozilla/firefox/*/cookies.sqlite",
+        "~/snap/firefox/common/.mozilla/firefox/*/cookies.sqlite",
+        "~/.var/app/org.mozilla.firefox/.mozilla/firefox/*/cookies.sqlite",
+    ],
+    "chrome": _chromium("~/.config/google-chrome", "~/.var/app/com.google.Chrome/config/google-chrome"),
+    "chromium": _chromium("~/.config/chromium", "~/snap/chromium/common/chromium"),
+    "brave": _chromium(
+        "~/.config/BraveSoftware/Brave-Browser",
+        "~/snap/brave/current/.config/BraveSoftware/Brave-Browser",
+        "~/.var/app/com.brave.Browser/config/BraveSoftware/Brave-Browser",
+    ),
+    "edge": _chromium("~/.config/microsoft-edge"),
+    "opera": _chromium("~/.config/opera"),
+    "vivaldi": _chromium("~/.config/vivaldi"),
+}
+
+# Writes the cookies of a browser to a Netscape cookie file
+Exporter = Callable[[str, str], None]
+
+
+def cookie_database_mtime(browser: str) -> Optional[float]:
+    """
+    Modification time of the browser's most recently written cookie database.
+
+    Returns:
+        The newest mtime, or None if no database was found
+    """
+    newest = None
+    for pattern in COOKIE_DATABASES.get(browser.split(":", 1)[0].lower(), []):
+        for path in glob.glob(os.path.expanduser(pattern)):
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if newest is None or mtime > newest:
+                newest = mtime
+    return newest
+
+
+def export_cookies(browser: str, path: str) -> None:
+    """
+    Export a browser's cookies to a Netscape cookie file.
+
+    Uses the yt-dlp Python package when available, otherwise the yt-dlp
+    command, which saves the cookies it loaded to ``--cookies`` on exit.
+
+    Raises:
+        DownloadError: If no cookie file was written
+    """
+    try:
+        # Imported here: yt_dlp is slow to import and most starts never export cookies
+        import yt_dlp.cookies as ytdlp_cookies
+    except ImportError:  # pragma: no cover - depends on the environment
+        ytdlp_cookies = None
+    if ytdlp_cookies is not None:
+        try:
+            jar = ytdlp_cookies.extract_cookies_from_browser(browser)
+            jar.save(path, ignore_discard=True, ignore_expires=True)
+            return
+        except Exception as e:
+            logger.warning(f"In-process cookie export from {browser} failed, trying the yt-dlp command: {e}")
+
+    cmd = ["yt-dlp", "--ignore-config", "--cookies-from-browser", browser, "--cookies", path]
+    try:
+        # Without a URL yt-dlp exits with a usage error after saving the jar
+        result = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True, timeout=EXPORT_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        raise DownloadError(f"Could not run yt-dlp to export cookies: {e}") from e
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        errors = [line for line in result.stdout.splitlines() if line.startswith("ERROR:")]
+        raise DownloadError(errors[0] if errors else "yt-dlp did not write a cookie file")
+
+
+class CookieLease:
+    """
+    Cookie arguments for one yt-dlp process or YoutubeDL instance.
+
+    Use it as a context manager, or call ``release`` once the process has
+    exited, so its private copy of the jar is deleted.
+    """
+
+    def __init__(self, browser: Optional[str] = None, path: Optional[str] = None) -> None:
+        self.browser = browser
+        self.path = path
+
+    @property
+    def args(self) -> List[str]:
+        """yt-dlp command line arguments."""
+        if self.path:
+            return ["--cookies", self.path]
+        if self.browser:
+            return ["--cookies-from-browser", self.browser]
+        return []
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        """yt_dlp.YoutubeDL options."""
+        if self.path:
+            return {"cookiefile": self.path}
+        if self.browser:
+            return {"cookiesfrombrowser": (self.browser,)}
+        return {}
+
+    def release(self) -> None:
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete cookie copy {self.path}: {e}")
+            self.path = None
+
+    def __enter__(self) -> CookieLease:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+class CookieJarCache:
+    """
+    Browser cookies exported once and shared by every download.
+
+    Thread-safe: parallel workers asking at the same time wait for a
+    single export.
+
+    Args:
+        directory: Where jars are kept (CONFIG_DIR/cookies by default)
+        ttl: Seconds a jar is used before it is exported again
+        exporter: Writes a browser's cookies to a file
+        database_mtime: Returns the browser's cookie database mtime, or None
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        ttl: float = DEFAULT_TTL,
+        exporter: Exporter = export_cookies,
+        database_mtime: Callable[[str], Optional[float]] = cookie_database_mtime,
+    ) -> None:
+        self._directory = Path(directory) if directory else None
+        self.ttl = ttl
+        self.exporter = exporter
+        self.database_mtime = database_mtime
+        self._lock = threading.Lock()
+        self._failed_at: Dict[str, float] = {}
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or config.CONFIG_DIR / COOKIES_DIR
+
+    def jar_path(self, browser: str) -> Path:
+        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in browser.lower())
+        return self.directory / "{}.txt".format(name)
+
+    def _meta_path(self, browser: str) -> Path:
+        return self.jar_path(browser).with_suffix(".json")
+
+    def _read_meta(self, browser: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(browser), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if isinstance(meta, dict) else None
+
+    def is_fresh(self, browser: str) -> bool:
+        """True if the browser's jar can be used without exporting again."""
+        meta = self._read_meta(browser)
+        if meta is None or not self.jar_path(browser).is_file():
+            return False
+        try:
+            age = time.time() - float(meta["exported_at"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        if not 0 <= age < self.ttl:
+            return False
+        if age < REEXPORT_GRACE:
+            return True
+        return bool(meta.get("database_mtime") == self.database_mtime(browser))
+
+    def jar(self, browser: str) -> Optional[Path]:
+        """
+        Return a current jar for the browser, exporting the cookies if needed.
+
+        Returns:
+            The jar, or None if the cookies could not be exported
+        """
+        with self._lock:
+            if self.is_fresh(browser):
+                return self.jar_path(browser)
+            failed_at = self._failed_at.get(browser)
+            if failed_at is not None and time.monotonic() - failed_at < FAILURE_BACKOFF:
+                return None
+            return self._export(browser)
+
+    def _export(self, browser: str) -> Optional[Path]:
+        path = self.jar_path(browser)
+        database_mtime = self.database_mtime(browser)
+        started = time.monotonic()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            os.chmod(self.directory, 0o700)
+            self._remove_stale_sessions()
+            # yt-dlp reads an existing cookie file first, so the target must not exist yet
+            tmp_name = "{}.{}.tmp".format(path, os.getpid())
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            try:
+                self.exporter(browser, tmp_name)
+                os.chmod(tmp_name, 0o600)
+                os.replace(tmp_name, path)
+            finally:
+                if os.path.exists(tmp_name):
+                    os.remove(tmp_name)
+            meta = {"browser": browser, "exported_at": time.time(), "database_mtime": database_mtime}
+            meta_tmp = self._meta_path(browser).with_suffix(".json.tmp")
+            with open(meta_tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(meta_tmp, self._meta_path(browser))
+        except (OSError, DownloadError) as e:
+            logger.warning(f"Could not export {browser} cookies, reading the browser for every download: {e}")
+            self._failed_at[browser] = time.monotonic()
+            return None
+        self._failed_at.pop(browser, None)
+        logger.info(f"Exported {browser} cookies in {time.monotonic() - started:.1f}s")
+        return path
+
+    def _remove_stale_sessions(self) -> None:
+        sessions = self.directory / SESSIONS_DIR
+        cutoff = time.time() - STALE_SESSION_AGE
+        for path in sessions.glob("*.txt"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def invalidate(self, browser: Optional[str] = None) -> None:
+        """Forget the jar of one browser, or of every browser."""
+        with self._lock:
+            if browser is None:
+                paths = list(self.directory.glob("*.txt")) + list(self.directory.glob("*.json"))
+                self._failed_at.clear()
+            else:
+                paths = [self.jar_path(browser), self._meta_path(browser)]
+                self._failed_at.pop(browser, None)
+            for path in paths:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Could not delete {path}: {e}")
+
+    def lease(self, browser: str) -> CookieLease:
+        """Cookies for one yt-dlp process: a private copy of the jar when possible."""
+        jar = self.jar(browser)
+        if jar is None:
+            return CookieLease(browser)
+        sessions = self.directory / SESSIONS_DIR
+        try:
+            sessions.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd, copy = tempfile.mkstemp(prefix=jar.stem + ".", suffix=".txt", dir=sessions)
+            with os.fdopen(fd, "wb") as dst, open(jar, "rb") as src:
+                shutil.copyfileobj(src, dst)
+        except OSError as e:
+            logger.warning(f"Could not copy the cookie jar: {e}")
+            return CookieLease(browser)
+        return CookieLease(browser, copy)
+
+
+_shared_cache: Optional[CookieJarCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> CookieJarCache:
+    """The cookie jar cache shared by every download of this process."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = CookieJarCache()
+        return _shared_cache
+
+
+def lease(use_auth: bool, auth_browser: str) -> CookieLease:
+    """
+    Cookies for one yt-dlp process or YoutubeDL instance.
+
+    Returns:
+        An empty lease when authentication is off
+    """
+    if not use_auth:
+        return CookieLease()
+    return shared_cache().lease(auth_browser)
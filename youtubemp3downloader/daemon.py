@@ -0,0 +1,1001 @@
+"""
+Download service for YouTube MP3 Downloader.
+
+A long-running process that owns one job queue, one engine configuration,
+the playlist cache and the download archive, and accepts jobs from any
+number of clients over a small JSON API. The window attaches to it as a
+thin client, and scripts can use it with curl::
+
+    youtube-mp3-downloader-daemon --listen unix:$XDG_RUNTIME_DIR/ytmp3.sock
+    curl --unix-socket $XDG_RUNTIME_DIR/ytmp3.sock -H 'Content-Type: application/json' \\
+        -d '{"url": "...", "output": "/srv/music"}' http://localhost/api/jobs
+
+Endpoints:
+
+    GET    /api/jobs                 queue snapshot
+    POST   /api/jobs                 queue a job: url, output, playlist_items, playlist_info, use_auth, auth_browser
+    GET    /api/jobs/<id>            one job
+    DELETE /api/jobs/<id>            stop and remove a job
+    POST   /api/jobs/<id>/move       move a job: {"offset": -1}
+    POST   /api/jobs/<id>/stop       stop a running job
+    POST   /api/queue/<action>       pause, resume, stop (all) or clear (finished jobs)
+    GET    /api/stats                counters and queue state
+    GET    /api/events?since=N       long-poll for events after N
+    GET    /api/events/stream        the same events as server-sent events
+    GET    /metrics                  download metrics in the Prometheus text format
+
+Web pages must not be able to drive the service, so requests carrying an
+``Origin`` header are refused and POST bodies must be ``application/json``,
+which a browser cannot send cross-site without asking first. On TCP the
+``Host`` must be a loopback name, against DNS rebinding, and every request
+but ``/metrics`` needs the token the service writes to ``daemon_token`` in
+the configuration directory, sent as ``Authorization: Bearer <token>``.
+A Unix socket shared with other users (a mode wider than 0600) needs at
+least one allowed folder, and the service asks the kernel who connected
+(``SO_PEERCRED``): only its own user may download with browser cookies.
+
+The queue is only touched by the thread running ``Daemon.run``; request
+threads hand their changes to it and wait for the result. Log lines are
+published as events straight from the download threads, while progress is
+sampled from the queue twice a second and only sent when it changed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from . import archive
+from . import bandwidth
+from . import client
+from . import config
+from . import engine
+from . import jobqueue
+from . import journal
+from . import library
+from . import metrics
+from . import pipeline
+from . import playlist_cache
+from . import profiles
+from . import throughput
+from . import thumbnails
+from . import tracing
+from . import utils
+from .exceptions import ApiError, ValidationError
+from .jobqueue import JobQueue, JobRun, QueuedJob
+from .logger import get_logger, set_console_level
+from .runner import JobRunner
+
+logger = get_logger(__name__)
+
+# The service keeps its own queue and journal, so a window running on its
+# own next to it never writes the same files
+DAEMON_QUEUE_FILENAME = "daemon_queue.json"
+DAEMON_JOURNAL_FILENAME = "daemon_jobs.journal"
+
+# Events kept for clients that poll late
+EVENT_LOG_SIZE = 2000
+
+# Longest wait of a long-poll request, in seconds
+MAX_POLL_TIMEOUT = 60.0
+
+# Seconds between progress samples of the running jobs
+PROGRESS_INTERVAL = 0.5
+
+# Seconds between keep-alive comments on an idle event stream
+SSE_KEEPALIVE = 15.0
+
+# Seconds a request waits for the queue thread
+CALL_TIMEOUT = 30.0
+
+# Rescan a download folder at most this often, in seconds
+LIBRARY_RESCAN_INTERVAL = 300.0
+
+# Largest accepted request body (a long playlist selection is a few hundred KB)
+MAX_BODY_SIZE = 8 * 1024 * 1024
+
+
+def job_summary(job: QueuedJob) -> Dict[str, Any]:
+    """Describe a job for API responses and events."""
+    return {
+        "id": job.job_id,
+        "number": job.number,
+        "url": job.url,
+        "url_type": job.url_type,
+        "download_path": job.download_path,
+        "playlist_items": job.playlist_items,
+        "videos": len(job.pending) if job.pending is not None else None,
+        "label": job.label,
+        "state": job.state,
+        "status": job.status,
+        "fraction": round(job.fraction, 4),
+    }
+
+
+class EventLog:
+    """
+    Bounded, numbered log of events that clients can wait on.
+
+    Args:
+        size: Number of events kept for late readers
+    """
+
+    def __init__(self, size: int = EVENT_LOG_SIZE) -> None:
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.closed = False
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest event."""
+        return self._seq
+
+    def publish(self, kind: str, **fields: Any) -> int:
+        """Append an event and wake the waiting readers; safe from any thread."""
+        with self._cond:
+            self._seq += 1
+            fields.update(seq=self._seq, type=kind, time=round(time.time(), 3))
+            self._events.append(fields)
+            self._cond.notify_all()
+            return self._seq
+
+    def since(self, seq: int, timeout: float = 0.0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Return the events after ``seq``, waiting up to ``timeout`` for one.
+
+        Returns:
+            The events and whether some of them were already dropped
+        """
+        with self._cond:
+            if seq > self._seq:
+                # The client saw events of an earlier run of the service
+                return [], True
+            if timeout > 0:
+                self._cond.wait_for(lambda: self._seq > seq or self.closed, timeout)
+            events = [event for event in self._events if event["seq"] > seq]
+            missed = bool(self._events) and self._events[0]["seq"] > seq + 1
+            return events, missed
+
+    def close(self) -> None:
+        """Release every waiting reader."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class _Call:
+    """A function to run on the queue thread, with its result."""
+
+    def __init__(self, func: Callable[..., Any], args: Sequence[Any]) -> None:
+        self.func = func
+        self.args = args
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        try:
+            self.result = self.func(*self.args)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+class Daemon:
+    """
+    Download service state: the queue, its runner and the event log.
+
+    Args:
+        settings: Configuration (loaded from the config file if None)
+        queue_path: Queue file (defaults to the configuration directory)
+        journal_path: Journal file (defaults to the configuration directory)
+        allowed_dirs: If not empty, jobs may only write inside these folders
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Dict[str, Any]] = None,
+        queue_path: Optional[Union[str, Path]] = None,
+        journal_path: Optional[Union[str, Path]] = None,
+        allowed_dirs: Sequence[str] = (),
+    ) -> None:
+        self.settings = settings if settings is not None else config.load_config()
+        self.allowed_dirs = [os.path.realpath(os.path.expanduser(folder)) for folder in allowed_dirs]
+        self.job_queue = JobQueue(
+            queue_path or config.CONFIG_DIR / DAEMON_QUEUE_FILENAME,
+            policy=jobqueue.make_policy(self.settings.get('queue_policy', jobqueue.POLICY_FIFO)),
+            max_running=self.settings.get('max_running_jobs', jobqueue.DEFAULT_MAX_RUNNING),
+        )
+        self.job_journal = journal.JobJournal(journal_path or config.CONFIG_DIR / DAEMON_JOURNAL_FILENAME)
+        self.playlist_cache = playlist_cache.PlaylistCache(
+            ttl=self.settings.get('playlist_cache_ttl', playlist_cache.DEFAULT_TTL)
+        )
+        self.download_archive = archive.DownloadArchive()
+        self.throughput_store = throughput.ThroughputStore()
+        self.thumbnail_store = thumbnails.store_from_settings(self.settings)
+        self.bandwidth_budget = bandwidth.BandwidthBudget()
+        # Shared by every job; served at /metrics and optionally written to a textfile
+        self.metrics = metrics.DownloadMetrics()
+        self.metrics_exporter = metrics.exporter_from_settings(self.settings, self.metrics)
+        self.library_indexes: Dict[str, library.LibraryIndex] = {}
+        self._library_scans: Dict[str, float] = {}
+        self.events = EventLog()
+        self._calls: queue.Queue = queue.Queue()
+        self.job_runner = JobRunner(
+            self.job_queue, self, self._post,
+            options=self._download_options,
+            job_journal=self.job_journal,
+            playlist_cache=self.playlist_cache,
+        )
+        self.paused = False
+        self.started_at = time.time()
+        self.totals = {"downloaded": 0, "skipped": 0, "failed": 0}
+        self.finished_jobs = {jobqueue.DONE: 0, jobqueue.FAILED: 0, jobqueue.CANCELLED: 0}
+        self._published_progress: Dict[str, Tuple[float, str]] = {}
+        self._stopping = threading.Event()
+        self._owner: Optional[int] = None
+
+    # Queue thread
+
+    def _post(self, func: Callable[..., Any], *args: Any) -> None:
+        self._calls.put(_Call(func, args))
+
+    def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a function on the queue thread and return its result.
+
+        Raises:
+            ApiError: If the queue thread did not answer in time
+        """
+        if self._owner is None or self._owner == threading.get_ident():
+            return func(*args)
+        work = _Call(func, args)
+        self._calls.put(work)
+        if not work.done.wait(CALL_TIMEOUT):
+            raise ApiError("The download service is busy, try again", 503)
+        if work.error is not None:
+            raise work.error
+        return work.result
+
+    def run(self) -> None:
+        """Serve the queue on the calling thread until ``shutdown`` is called."""
+        self._owner = threading.get_ident()
+        restored = self.job_runner.restore_queue()
+        if restored:
+            logger.info(f"Restored {restored} queued job(s)")
+        self.metrics.set_queue(job.state for job in self.job_queue.jobs)
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+        self._schedule()
+        next_sample = time.monotonic() + PROGRESS_INTERVAL
+        while not self._stopping.is_set():
+            try:
+                work = self._calls.get(timeout=max(0.0, next_sample - time.monotonic()))
+            except queue.Empty:
+                pass
+            else:
+                work.run()
+                while True:
+                    try:
+                        self._calls.get_nowait().run()
+                    except queue.Empty:
+                        break
+                self._schedule()
+            if time.monotonic() >= next_sample:
+                self._publish_progress()
+                next_sample = time.monotonic() + PROGRESS_INTERVAL
+        self._close()
+
+    def shutdown(self) -> None:
+        """Ask ``run`` to stop; safe from any thread and signal handlers."""
+        self._stopping.set()
+        self._calls.put(_Call(lambda: None, ()))
+
+    def _close(self) -> None:
+        """Stop the downloads so they resume at the next start, and save state."""
+        self.job_runner.stop_all(closing=True)
+        self.job_runner.join(timeout=3)
+        self.job_queue.save()
+        self.job_journal.close()
+        for index in self.library_indexes.values():
+            index.save()
+        self.events.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.close()
+        logger.info("Download service stopped")
+
+    def _schedule(self) -> None:
+        if self.paused or self._stopping.is_set():
+            return
+        if self.job_runner.start_jobs():
+            self.job_queue.save()
+            self._publish_jobs()
+
+    def _publish_jobs(self) -> None:
+        self.metrics.set_queue(job.state for job in self.job_queue.jobs)
+        self.events.publish("jobs", jobs=[job_summary(job) for job in self.job_queue.jobs], paused=self.paused)
+
+    def _publish_progress(self) -> None:
+        """Send the progress of running jobs that changed since the last sample."""
+        changed = []
+        for job in self.job_queue.running():
+            state = (round(job.fraction, 3), job.status)
+            if self._published_progress.get(job.job_id) != state:
+                self._published_progress[job.job_id] = state
+                changed.append({"id": job.job_id, "fraction": state[0], "status": job.status})
+        if changed:
+            self.events.publish("progress", jobs=changed)
+
+    def _download_options(self, job: QueuedJob) -> Dict[str, Any]:
+        use_archive = self.settings.get('use_download_archive', True)
+        self.bandwidth_budget.set_schedule(bandwidth.schedule_from_settings(self.settings))
+        return {
+            'max_workers': self.settings.get('max_concurrent_downloads', 1),
+            'use_pipeline': self.settings.get('transcode_pipeline', False),
+            'backend': self.settings.get('download_engine', engine.ENGINE_SUBPROCESS),
+            'download_archive': self.download_archive if use_archive else None,
+            'library_index': self._library_index(job.download_path) if use_archive else None,
+            'throughput_store': self.throughput_store if self.settings.get('adaptive_downloads', False) else None,
+            'bandwidth_budget': self.bandwidth_budget,
+            'output_profile': self.settings.get('output_profile', profiles.DEFAULT_PROFILE),
+            'thumbnail_store': self.thumbnail_store,
+            'download_metrics': self.metrics,
+            'trace_dir': tracing.trace_dir_from_settings(self.settings),
+            'profile_parser': self.settings.get('trace_profile_parser', False),
+        }
+
+    def _library_index(self, folder: str) -> library.LibraryIndex:
+        """Index of a download folder, rescanned in the background when it is old."""
+        index = self.library_indexes.get(folder)
+        if index is None:
+            index = library.LibraryIndex(folder)
+            index.load()
+            self.library_indexes[folder] = index
+        now = time.monotonic()
+        if now - self._library_scans.get(folder, -LIBRARY_RESCAN_INTERVAL) >= LIBRARY_RESCAN_INTERVAL:
+            self._library_scans[folder] = now
+
+            def scan() -> None:
+                try:
+                    index.scan()
+                except Exception as e:
+                    logger.warning(f"Library scan failed: {e}")
+                index.save()
+
+            threading.Thread(target=scan, name="library-scan", daemon=True).start()
+        return index
+
+    # JobSink of the runner
+
+    def job_log(self, run: JobRun, message: str, progress: bool) -> None:
+        # yt-dlp progress lines are replaced by the sampled progress events
+        if not progress:
+            self.events.publish("log", job=run.job.job_id, number=run.job.number, message=message)
+
+    def job_message(self, run: JobRun, message: str, error: bool) -> None:
+        self.events.publish("message", job=run.job.job_id, number=run.job.number, message=message, error=error)
+
+    def job_notify(self, run: JobRun, title: str, message: str, icon: str) -> None:
+        self.events.publish(
+            "notify", job=run.job.job_id, number=run.job.number, title=title, message=message, icon=icon,
+            final=run.is_final,
+        )
+
+    def job_finished(self, run: JobRun) -> None:
+        job = run.job
+        self._published_progress.pop(job.job_id, None)
+        if run.closing:
+            return
+        self.totals["downloaded"] += run.successful
+        self.totals["skipped"] += run.skipped
+        self.totals["failed"] += run.failures
+        if job.state in self.finished_jobs:
+            self.finished_jobs[job.state] += 1
+        self.job_queue.save()
+        self.events.publish(
+            "finished", job=job.job_id, number=job.number, state=job.state,
+            downloaded=run.successful, skipped=run.skipped, failed=run.failures,
+        )
+        self._publish_jobs()
+
+    # API operations, run on the queue thread
+
+    def list_jobs(self) -> Dict[str, Any]:
+        return {
+            "seq": self.events.seq,
+            "paused": self.paused,
+            "jobs": [job_summary(job) for job in self.job_queue.jobs],
+        }
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        return job_summary(self._job(job_id))
+
+    def _job(self, job_id: str) -> QueuedJob:
+        job = self.job_queue.get(job_id)
+        if job is None:
+            raise ApiError("No job {}".format(job_id), 404)
+        return job
+
+    def add_job(self, job: QueuedJob) -> Dict[str, Any]:
+        self.job_queue.add(job)
+        self.job_queue.save()
+        logger.info(f"Accepted job {job.job_id}: {job.url}")
+        self._publish_jobs()
+        self._schedule()
+        return job_summary(job)
+
+    def remove_job(self, job_id: str) -> Dict[str, Any]:
+        job = self._job(job_id)
+        run = self.job_runner.stop(job_id)
+        self.job_queue.remove(job_id)
+        if run is None and job.journal_id and job.state == jobqueue.QUEUED:
+            # A job that never runs again must not be resumed
+            self.job_journal.finish(job.journal_id, journal.DISCARDED)
+            pipeline.remove_staging(job.download_path, job.journal_id)
+        self.job_queue.save()
+        self._publish_jobs()
+        return job_summary(job)
+
+    def move_job(self, job_id: str, offset: int) -> Dict[str, Any]:
+        job = self._job(job_id)
+        if self.job_queue.move(job_id, offset):
+            self.job_queue.save()
+            self._publish_jobs()
+        return job_summary(job)
+
+    def stop_job(self, job_id: str) -> Dict[str, Any]:
+        job = self._job(job_id)
+        if self.job_runner.stop(job_id) is None:
+            raise ApiError("Job {} is not running".format(job_id), 409)
+        return job_summary(job)
+
+    def queue_action(self, action: str) -> Dict[str, Any]:
+        if action == "pause":
+            self.paused = True
+        elif action == "resume":
+            self.paused = False
+            self._schedule()
+        elif action == "stop":
+            self.paused = True
+            self.job_runner.stop_all()
+        elif action == "clear":
+            self.job_queue.clear_finished()
+        logger.info(f"Queue action: {action}")
+        self._publish_jobs()
+        return self.list_jobs()
+
+    def stats(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for job in self.job_queue.jobs:
+            states[job.state] = states.get(job.state, 0) + 1
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "paused": self.paused,
+            "policy": self.job_queue.policy.name,
+            "max_running": self.job_queue.max_running,
+            "running": len(self.job_queue.running()),
+            "queued": len(self.job_queue.queued()),
+            "jobs": states,
+            "finished_jobs": dict(self.finished_jobs),
+            "videos": dict(self.totals),
+            "events": self.events.seq,
+        }
+
+    # Request validation, run on request threads
+
+    def build_job(self, body: Dict[str, Any], owner: bool = True) -> QueuedJob:
+        """
+        Validate a job submission.
+
+        Args:
+            body: The submitted JSON object
+            owner: The request came from the user running the service; other
+                users of a shared socket may not use its browser cookies
+
+        Raises:
+            ApiError: If the URL, the destination or the selection is invalid
+        """
+        url = body.get("url")
+        output = body.get("output")
+        if not isinstance(url, str) or not url.strip():
+            raise ApiError("Missing 'url'")
+        if not isinstance(output, str) or not output.strip():
+            raise ApiError("Missing 'output' folder")
+        url = url.strip()
+        use_auth = bool(body.get("use_auth", False))
+        if use_auth and not owner:
+            raise ApiError("Only the user running the service may download with its browser cookies", 403)
+        try:
+            url_type, _ = utils.classify_youtube_url(url)
+        except ValidationError as e:
+            raise ApiError(str(e)) from e
+        if not url_type:
+            raise ApiError("Not a YouTube video or playlist URL: {}".format(url))
+
+        folder = os.path.realpath(os.path.expanduser(output))
+        if not os.path.isabs(os.path.expanduser(output)):
+            raise ApiError("'output' must be an absolute path")
+        if self.allowed_dirs and not any(
+            os.path.commonpath([folder, allowed]) == allowed for allowed in self.allowed_dirs
+        ):
+            raise ApiError("Output folder is outside the allowed folders: {}".format(folder), 403)
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            raise ApiError("Could not create {}: {}".format(folder, e)) from e
+        if not os.access(folder, os.W_OK | os.X_OK):
+            raise ApiError("Output folder is not writable: {}".format(folder), 403)
+
+        playlist_items = body.get("playlist_items")
+        if playlist_items is not None:
+            if not isinstance(playlist_items, str):
+                raise ApiError("'playlist_items' must be a string like '1-3,7'")
+            try:
+                utils.parse_playlist_items(playlist_items)
+            except ValidationError as e:
+                raise ApiError(str(e)) from e
+        entries = body.get("playlist_info") or []
+        if isinstance(entries, dict):
+            entries = list(entries.items())
+        try:
+            playlist_info = {str(video_id): str(title) for video_id, title in entries}
+        except (TypeError, ValueError) as e:
+            raise ApiError("'playlist_info' must be a list of [video_id, title] pairs") from e
+
+        return QueuedJob(
+            url, url_type, folder,
+            use_auth,
+            str(body.get("auth_browser") or "firefox"),
+            playlist_items=playlist_items or None,
+            playlist_info=playlist_info or None,
+            # Clients on this machine enumerate playlists into the same cache
+            durations=self.playlist_cache.durations_for(url) if playlist_info else None,
+        )
+
+    def wait_events(self, since: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        return self.events.since(since, min(max(0.0, timeout), MAX_POLL_TIMEOUT))
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Route API requests to the daemon."""
+
+    server_version = "youtube-mp3-downloader"
+
+    # Body of the current request, read before it is checked and routed
+    raw_body = b""
+    # False for other users of a shared Unix socket
+    peer_is_owner = True
+
+    ROUTES = [
+        ("GET", re.compile(r"/api/jobs"), "_list_jobs"),
+        ("POST", re.compile(r"/api/jobs"), "_submit_job"),
+        ("GET", re.compile(r"/api/jobs/([\w-]+)"), "_get_job"),
+        ("DELETE", re.compile(r"/api/jobs/([\w-]+)"), "_remove_job"),
+        ("POST", re.compile(r"/api/jobs/([\w-]+)/move"), "_move_job"),
+        ("POST", re.compile(r"/api/jobs/([\w-]+)/stop"), "_stop_job"),
+        ("POST", re.compile(r"/api/queue/(pause|resume|stop|clear)"), "_queue_action"),
+        ("GET", re.compile(r"/api/stats"), "_stats"),
+        ("GET", re.compile(r"/api/events"), "_poll_events"),
+        ("GET", re.compile(r"/api/events/stream"), "_stream_events"),
+        ("GET", re.compile(r"/metrics"), "_metrics"),
+    ]
+
+    @property
+    def daemon(self) -> Daemon:
+        daemon: Daemon = getattr(self.server, "daemon")
+        return daemon
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        parts = urllib.parse.urlsplit(self.path)
+        self.query = urllib.parse.parse_qs(parts.query)
+        try:
+            self.raw_body = self._read_body()
+            self._check_request(method, parts.path)
+        except ApiError as e:
+            logger.warning(f"Refused API request {method} {parts.path}: {e}")
+            self._send_json({"error": str(e)}, e.status)
+            return
+        allowed = False
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.fullmatch(parts.path.rstrip("/") or "/")
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                result = getattr(self, name)(*match.groups())
+            except ApiError as e:
+                self._send_json({"error": str(e)}, e.status)
+            except Exception as e:
+                logger.error(f"API request {method} {self.path} failed: {e}", exc_info=True)
+                self._send_json({"error": "Internal error: {}".format(e)}, 500)
+            else:
+                if result is not None:
+                    self._send_json(result, 201 if method == "POST" and name == "_submit_job" else 200)
+            return
+        if allowed:
+            self._send_json({"error": "Method not allowed"}, 405)
+        else:
+            self._send_json({"error": "Not found"}, 404)
+
+    def _check_request(self, method: str, path: str) -> None:
+        """
+        Refuse requests that a web page could have sent.
+
+        Raises:
+            ApiError: If the request is cross-origin, for another host,
+                unauthenticated or not JSON
+        """
+        if self.headers.get("Origin") is not None:
+            raise ApiError("Requests from web pages are not accepted", 403)
+        owner_uid = getattr(self.server, "owner_uid", None)
+        if owner_uid is not None:
+            self.peer_is_owner = _peer_uid(self.connection) == owner_uid
+        token = getattr(self.server, "token", None)
+        if token is not None:
+            host = urllib.parse.urlsplit("//" + (self.headers.get("Host") or "")).hostname or ""
+            if not _is_loopback(host):
+                raise ApiError("Unexpected Host header: {}".format(host), 403)
+            if path.rstrip("/") != "/metrics" and not hmac.compare_digest(
+                self.headers.get("Authorization") or "", "Bearer {}".format(token)
+            ):
+                raise ApiError("Missing or wrong token, see {}".format(client.token_path()), 401)
+        if method == "POST":
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                raise ApiError("Request body must be application/json", 415)
+
+    def _read_body(self) -> bytes:
+        """
+        Read the whole request body before anything is answered.
+
+        A response that closes the connection while the client is still
+        sending its body would fail the request with a broken pipe.
+        """
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ApiError("Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise ApiError("Request body too large", 413)
+        return self.rfile.read(length) if length else b""
+
+    def _body(self) -> Dict[str, Any]:
+        if not self.raw_body:
+            return {}
+        try:
+            body = json.loads(self.raw_body.decode("utf-8"))
+        except ValueError as e:
+            raise ApiError("Invalid JSON: {}".format(e)) from e
+        if not isinstance(body, dict):
+            raise ApiError("Expected a JSON object")
+        return body
+
+    def _param(self, name: str, default: float) -> float:
+        try:
+            return float(self.query[name][0])
+        except (KeyError, IndexError):
+            return default
+        except ValueError:
+            raise ApiError("Invalid '{}' parameter".format(name))
+
+    def _send_json(self, data: Any, status: int = 200) -> None:
+        payload = json.dumps(data).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            logger.debug("API client went away before the response")
+
+    def _list_jobs(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.daemon.call(self.daemon.list_jobs)
+        return result
+
+    def _submit_job(self) -> Dict[str, Any]:
+        job = self.daemon.build_job(self._body(), owner=self.peer_is_owner)
+        result: Dict[str, Any] = self.daemon.call(self.daemon.add_job, job)
+        return result
+
+    def _get_job(self, job_id: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.daemon.call(self.daemon.get_job, job_id)
+        return result
+
+    def _remove_job(self, job_id: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.daemon.call(self.daemon.remove_job, job_id)
+        return result
+
+    def _move_job(self, job_id: str) -> Dict[str, Any]:
+        try:
+            offset = int(self._body().get("offset", 0))
+        except (TypeError, ValueError):
+            raise ApiError("'offset' must be an integer")
+        result: Dict[str, Any] = self.daemon.call(self.daemon.move_job, job_id, offset)
+        return result
+
+    def _stop_job(self, job_id: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.daemon.call(self.daemon.stop_job, job_id)
+        return result
+
+    def _queue_action(self, action: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.daemon.call(self.daemon.queue_action, action)
+        return result
+
+    def _stats(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = self.daemon.call(self.daemon.stats)
+        return result
+
+    def _metrics(self) -> None:
+        payload = self.daemon.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", metrics.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _poll_events(self) -> Dict[str, Any]:
+        since = int(self._param("since", self.daemon.events.seq))
+        events, missed = self.daemon.wait_events(since, self._param("timeout", 0.0))
+        seq = events[-1]["seq"] if events else min(max(since, 0), self.daemon.events.seq)
+        return {"seq": seq, "events": events, "missed": missed}
+
+    def _stream_events(self) -> None:
+        since = int(self.headers.get("Last-Event-ID") or self._param("since", self.daemon.events.seq))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while not self.daemon.stopping:
+                events, _ = self.daemon.wait_events(since, SSE_KEEPALIVE)
+                if not events:
+                    self.wfile.write(b": keep-alive\n\n")
+                for event in events:
+                    since = event["seq"]
+                    frame = "id: {}\nevent: {}\ndata: {}\n\n".format(since, event["type"], json.dumps(event))
+                    self.wfile.write(frame.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Event stream client went away")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("API: " + format % args)
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _peer_uid(connection: socket.socket) -> Optional[int]:
+    """User ID of the process at the other end of a Unix socket, if known."""
+    try:
+        creds = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    except (AttributeError, OSError):
+        return None
+    _, uid, _ = struct.unpack("3i", creds)
+    return int(uid)
+
+
+def write_token(path: Optional[Union[str, Path]] = None) -> str:
+    """
+    Write a new random token that only the user can read.
+
+    Returns:
+        The token
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    path = Path(path) if path else client.token_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    os.replace(tmp, path)
+    return token
+
+
+class _TCPServer(ThreadingHTTPServer):
+    """Threaded HTTP server on a localhost port."""
+
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server on a Unix domain socket."""
+
+    daemon_threads = True
+
+    def get_request(self) -> Tuple[Any, Any]:
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler logs client_address[0]
+        return request, ("local", 0)
+
+
+def make_server(
+    daemon: Daemon,
+    address: str,
+    socket_mode: int = 0o600,
+    token_path: Optional[Union[str, Path]] = None,
+) -> socketserver.BaseServer:
+    """
+    Create the API server for a daemon.
+
+    On TCP a new token is written to ``token_path`` (``daemon_token`` in the
+    configuration directory by default) and required from every client. A
+    Unix socket whose ``socket_mode`` lets other users connect needs allowed
+    folders on the daemon, and tells the handlers who each client is.
+
+    Raises:
+        ValueError: If the address is not a Unix socket or a loopback address,
+            or a shared socket would let other users write anywhere
+        OSError: If the address is in use
+    """
+    family, host, port = client.parse_address(address)
+    server: socketserver.BaseServer
+    if family == "unix":
+        path = host
+        shared = bool(socket_mode & 0o077)
+        if shared and not daemon.allowed_dirs:
+            raise ValueError("A socket shared with other users needs at least one --allow-dir")
+        if shared and not hasattr(socket, "SO_PEERCRED"):
+            raise ValueError("This system cannot tell who connects to a socket; keep its mode at 600")
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError("{} exists and is not a socket".format(path))
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                # Left behind by a service that did not shut down cleanly
+                os.unlink(path)
+            else:
+                raise OSError("Another download service is listening on {}".format(path))
+            finally:
+                probe.close()
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        server = _UnixServer(path, _RequestHandler)
+        os.chmod(path, socket_mode)
+        if shared:
+            setattr(server, "owner_uid", os.getuid())
+    else:
+        if not _is_loopback(host):
+            raise ValueError("The download service only listens on loopback addresses, not {}".format(host))
+        server = _TCPServer((host, port), _RequestHandler)
+        try:
+            setattr(server, "token", write_token(token_path))
+        except OSError:
+            server.server_close()
+            raise
+    setattr(server, "daemon", daemon)
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="youtube-mp3-downloader-daemon",
+        description="Run the YouTube MP3 download service with a local JSON API.",
+    )
+    parser.add_argument(
+        "-l", "--listen", metavar="ADDRESS",
+        help="unix:/path/to/socket or a loopback host:port (default: {})".format(client.default_address()),
+    )
+    parser.add_argument(
+        "--socket-mode", default="600", metavar="MODE",
+        help="permissions of the Unix socket, in octal (default: 600; 660 shares it with the group "
+             "and needs --allow-dir)",
+    )
+    parser.add_argument(
+        "--allow-dir", action="append", default=[], metavar="DIR",
+        help="only accept output folders inside DIR; may be repeated",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, metavar="N",
+        help="jobs run at the same time (1-{}, default: from preferences)".format(jobqueue.MAX_RUNNING),
+    )
+    parser.add_argument("--order", choices=sorted(jobqueue.POLICIES), help="queue order (default: from preferences)")
+    parser.add_argument(
+        "--metrics-textfile", metavar="FILE",
+        help="also write the metrics served at /metrics to FILE, e.g. for the node_exporter textfile collector",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="print debug logs")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point of the download service."""
+    args = build_parser().parse_args(argv)
+    set_console_level(logging.DEBUG if args.verbose else logging.INFO)
+
+    settings = config.load_config()
+    if args.jobs is not None:
+        settings['max_running_jobs'] = args.jobs
+    if args.order is not None:
+        settings['queue_policy'] = args.order
+    if args.metrics_textfile:
+        settings['metrics_textfile'] = os.path.abspath(os.path.expanduser(args.metrics_textfile))
+    try:
+        socket_mode = int(args.socket_mode, 8)
+    except ValueError:
+        print("Invalid socket mode: {}".format(args.socket_mode), file=sys.stderr)
+        return 2
+
+    listen = args.listen or client.default_address()
+    daemon = Daemon(settings, allowed_dirs=args.allow_dir)
+    try:
+        server = make_server(daemon, listen, socket_mode)
+    except (OSError, ValueError) as e:
+        print("Could not listen on {}: {}".format(listen, e), file=sys.stderr)
+        return 2
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.shutdown())
+    threading.Thread(target=server.serve_forever, name="api-server", daemon=True).start()
+    logger.info(f"Download service listening on {listen}")
+    try:
+        daemon.run()
+    finally:
+        server.shutdown()
+        server.server_close()
+        family, path, _ = client.parse_address(listen)
+        try:
+            # Remove the socket, or the token so it does not outlive the service
+            os.unlink(path if family == "unix" else str(client.token_path()))
+        except OSError:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
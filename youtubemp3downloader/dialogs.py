@@ -7,14 +7,23 @@ extracted from app_window.py for better code organization.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, List
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, Union
 
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GLib  # noqa: E402
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, Gtk, GLib  # noqa: E402
 
+from . import bandwidth  # noqa: E402
+from . import client  # noqa: E402
 from . import config  # noqa: E402
+from . import engine  # noqa: E402
+from . import jobqueue  # noqa: E402
+from . import logbuffer  # noqa: E402
+from . import profiles  # noqa: E402
+from . import scheduler  # noqa: E402
+from . import thumbnails  # noqa: E402
 from .logger import get_logger  # noqa: E402
 
 if TYPE_CHECKING:
@@ -22,6 +31,16 @@ if TYPE_CHECKING:
 
 logger = get_logger(__name__)
 
+# Size of the covers shown in the playlist preview
+THUMBNAIL_WIDTH = 64
+THUMBNAIL_HEIGHT = 36
+
+# Milliseconds the preview waits for scrolling to settle before loading covers
+VISIBLE_UPDATE_DELAY = 150
+
+# Rows below the visible ones whose covers are loaded ahead
+PREFETCH_ROWS = 10
+
 
 class PreferencesDialog(Gtk.Dialog):
     """Preferences dialog for application settings."""
@@ -68,6 +87,189 @@ class PreferencesDialog(Gtk.Dialog):
         auth_frame.add(auth_box)
         content.pack_start(auth_frame, False, False, 0)
 
+        # --- Downloads section ---
+        downloads_frame = Gtk.Frame(label=" Downloads ")
+        downloads_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        downloads_box.set_border_width(10)
+
+        jobs_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        jobs_label = Gtk.Label(label="Simultaneous jobs:")
+        jobs_label.set_xalign(0)
+        jobs_box.pack_start(jobs_label, False, False, 0)
+        self.jobs_spin = Gtk.SpinButton.new_with_range(1, jobqueue.MAX_RUNNING, 1)
+        self.jobs_spin.set_value(parent.job_queue.max_running)
+        self.jobs_spin.set_tooltip_text("Number of queued URLs downloaded at the same time.")
+        self.jobs_spin.connect("value-changed", self._on_jobs_changed)
+        jobs_box.pack_start(self.jobs_spin, False, False, 0)
+        downloads_box.pack_start(jobs_box, False, False, 0)
+
+        policy_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        policy_label = Gtk.Label(label="Queue order:")
+        policy_label.set_xalign(0)
+        policy_box.pack_start(policy_label, False, False, 0)
+        self.policy_combo = Gtk.ComboBoxText()
+        for policy in jobqueue.POLICIES.values():
+            self.policy_combo.append(policy.name, policy.label)
+        self.policy_combo.set_active_id(parent.job_queue.policy.name)
+        self.policy_combo.set_tooltip_text(
+            "Which queued job starts next. Taking turns downloads a few videos of each playlist at a time."
+        )
+        self.policy_combo.connect("changed", self._on_policy_changed)
+        policy_box.pack_start(self.policy_combo, False, False, 0)
+        downloads_box.pack_start(policy_box, False, False, 0)
+
+        workers_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        workers_label = Gtk.Label(label="Parallel downloads:")
+        workers_label.set_xalign(0)
+        workers_box.pack_start(workers_label, False, False, 0)
+        self.workers_spin = Gtk.SpinButton.new_with_range(1, scheduler.MAX_WORKERS, 1)
+        self.workers_spin.set_value(parent.config.get("max_concurrent_downloads", 1))
+        self.workers_spin.set_tooltip_text("Number of playlist videos downloaded at the same time.")
+        self.workers_spin.connect("value-changed", self._on_workers_changed)
+        workers_box.pack_start(self.workers_spin, False, False, 0)
+        downloads_box.pack_start(workers_box, False, False, 0)
+
+        self.adaptive_checkbox = Gtk.CheckButton(label="Adapt parallel downloads to the connection speed")
+        self.adaptive_checkbox.set_active(parent.config.get("adaptive_downloads", False))
+        self.adaptive_checkbox.set_tooltip_text(
+            "Removes and adds back parallel downloads, up to the number above, and fragments "
+            "while measuring the speed. The best settings are remembered for each network."
+        )
+        self.adaptive_checkbox.connect("toggled", self._on_adaptive_toggled)
+        downloads_box.pack_start(self.adaptive_checkbox, False, False, 0)
+
+        limit_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        limit_label = Gtk.Label(label="Bandwidth limit:")
+        limit_label.set_xalign(0)
+        limit_box.pack_start(limit_label, False, False, 0)
+        self.limit_entry = Gtk.Entry()
+        self.limit_entry.set_text(parent.config.get("bandwidth_limit", ""))
+        self.limit_entry.set_placeholder_text("unlimited")
+        self.limit_entry.set_tooltip_text(
+            "Bytes per second shared by all downloads together, e.g. 500K or 2M. Leave empty for no limit."
+        )
+        self.limit_entry.connect("changed", self._on_bandwidth_changed)
+        limit_box.pack_start(self.limit_entry, True, True, 0)
+        downloads_box.pack_start(limit_box, False, False, 0)
+
+        schedule_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        schedule_label = Gtk.Label(label="Limit by time of day:")
+        schedule_label.set_xalign(0)
+        schedule_box.pack_start(schedule_label, False, False, 0)
+        self.schedule_entry = Gtk.Entry()
+        self.schedule_entry.set_text(parent.config.get("bandwidth_schedule", ""))
+        self.schedule_entry.set_placeholder_text("08:00-18:00=1M")
+        self.schedule_entry.set_tooltip_text(
+            "Comma-separated periods with their own limit, e.g. 08:00-18:00=1M, 22:00-06:00=unlimited. "
+            "Outside them the bandwidth limit above applies."
+        )
+        self.schedule_entry.connect("changed", self._on_bandwidth_changed)
+        schedule_box.pack_start(self.schedule_entry, True, True, 0)
+        downloads_box.pack_start(schedule_box, False, False, 0)
+
+        format_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        format_label = Gtk.Label(label="Save audio as:")
+        format_label.set_xalign(0)
+        format_box.pack_start(format_label, False, False, 0)
+        self.format_combo = Gtk.ComboBoxText()
+        for profile in profiles.PROFILES.values():
+            self.format_combo.append(profile.name, profile.label)
+        self.format_combo.set_active_id(parent.config.get("output_profile", profiles.DEFAULT_PROFILE))
+        self.format_combo.set_tooltip_text(
+            "VBR V0 MP3 files are smaller at the same quality. Original audio keeps YouTube's Opus or M4A "
+            "stream without re-encoding: fastest, and no quality is lost."
+        )
+        self.format_combo.connect("changed", self._on_format_changed)
+        format_box.pack_start(self.format_combo, False, False, 0)
+        downloads_box.pack_start(format_box, False, False, 0)
+
+        self.pipeline_checkbox = Gtk.CheckButton(label="Convert to MP3 while the next videos download")
+        self.pipeline_checkbox.set_active(parent.config.get("transcode_pipeline", False))
+        self.pipeline_checkbox.set_tooltip_text(
+            "Downloads the original audio first and encodes MP3 files on all CPU cores in parallel."
+        )
+        self.pipeline_checkbox.connect("toggled", self._on_pipeline_toggled)
+        downloads_box.pack_start(self.pipeline_checkbox, False, False, 0)
+
+        engine_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        engine_label = Gtk.Label(label="Download engine:")
+        engine_label.set_xalign(0)
+        engine_box.pack_start(engine_label, False, False, 0)
+        self.engine_combo = Gtk.ComboBoxText()
+        self.engine_combo.append(engine.ENGINE_SUBPROCESS, "yt-dlp command")
+        self.engine_combo.append(engine.ENGINE_INPROCESS, "Built-in (faster startup)")
+        self.engine_combo.set_active_id(parent.config.get("download_engine", engine.ENGINE_SUBPROCESS))
+        if not engine.is_available():
+            self.engine_combo.set_sensitive(False)
+            self.engine_combo.set_tooltip_text("Install the yt-dlp Python package to use the built-in engine.")
+        self.engine_combo.connect("changed", self._on_engine_changed)
+        engine_box.pack_start(self.engine_combo, False, False, 0)
+        downloads_box.pack_start(engine_box, False, False, 0)
+
+        self.archive_checkbox = Gtk.CheckButton(label="Skip videos that were already downloaded")
+        self.archive_checkbox.set_active(parent.config.get("use_download_archive", True))
+        self.archive_checkbox.set_tooltip_text(
+            "Remembers completed downloads and skips them while the MP3 file is still in the download folder."
+        )
+        self.archive_checkbox.connect("toggled", self._on_archive_toggled)
+        downloads_box.pack_start(self.archive_checkbox, False, False, 0)
+
+        downloads_frame.add(downloads_box)
+        content.pack_start(downloads_frame, False, False, 0)
+
+        # --- Download service section ---
+        service_frame = Gtk.Frame(label=" Download Service ")
+        service_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        service_box.set_border_width(10)
+
+        self.service_checkbox = Gtk.CheckButton(label="Send downloads to the background download service")
+        self.service_checkbox.set_active(parent.config.get("use_download_service", False))
+        self.service_checkbox.set_tooltip_text(
+            "Jobs run in youtube-mp3-downloader-daemon and keep running after the window is closed. "
+            "Takes effect at the next start."
+        )
+        self.service_checkbox.connect("toggled", self._on_service_toggled)
+        service_box.pack_start(self.service_checkbox, False, False, 0)
+
+        address_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        address_label = Gtk.Label(label="Service address:")
+        address_label.set_xalign(0)
+        address_box.pack_start(address_label, False, False, 0)
+        self.service_entry = Gtk.Entry()
+        self.service_entry.set_text(parent.config.get("download_service_address") or client.default_address())
+        self.service_entry.set_tooltip_text("unix:/path/to/socket or host:port")
+        self.service_entry.set_sensitive(self.service_checkbox.get_active())
+        self.service_entry.connect("changed", self._on_service_address_changed)
+        address_box.pack_start(self.service_entry, True, True, 0)
+        service_box.pack_start(address_box, False, False, 0)
+
+        service_frame.add(service_box)
+        content.pack_start(service_frame, False, False, 0)
+
+        # --- Log section ---
+        log_frame = Gtk.Frame(label=" Log ")
+        log_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        log_box.set_border_width(10)
+
+        log_lines_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        log_lines_label = Gtk.Label(label="Lines kept in the log:")
+        log_lines_label.set_xalign(0)
+        log_lines_box.pack_start(log_lines_label, False, False, 0)
+        self.log_lines_spin = Gtk.SpinButton.new_with_range(logbuffer.MIN_MAX_LINES, logbuffer.MAX_MAX_LINES, 100)
+        self.log_lines_spin.set_value(parent.log_lines.max_lines)
+        self.log_lines_spin.set_tooltip_text("Older lines are removed once the log grows past this size.")
+        self.log_lines_spin.connect("value-changed", self._on_log_lines_changed)
+        log_lines_box.pack_start(self.log_lines_spin, False, False, 0)
+        log_box.pack_start(log_lines_box, False, False, 0)
+
+        self.collapse_checkbox = Gtk.CheckButton(label="Show download progress as a single updating line")
+        self.collapse_checkbox.set_active(parent.collapse_progress_lines)
+        self.collapse_checkbox.connect("toggled", self._on_collapse_toggled)
+        log_box.pack_start(self.collapse_checkbox, False, False, 0)
+
+        log_frame.add(log_box)
+        content.pack_start(log_frame, False, False, 0)
+
         # --- Notifications section ---
         notif_frame = Gtk.Frame(label=" Notifications ")
         notif_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
@@ -105,6 +307,136 @@ class PreferencesDialog(Gtk.Dialog):
         except Exception as e:
             logger.error(f"Failed to save browser setting: {e}")
 
+    def _on_jobs_changed(self, spin: Gtk.SpinButton) -> None:
+        try:
+            max_running = spin.get_value_as_int()
+            self.parent_window.job_queue.max_running = max_running
+            self.parent_window.config["max_running_jobs"] = max_running
+            config.save_config(self.parent_window.config)
+            self.parent_window._schedule_jobs()
+            logger.info(f"Simultaneous jobs changed to: {max_running}")
+        except Exception as e:
+            logger.error(f"Failed to save simultaneous jobs setting: {e}")
+
+    def _on_policy_changed(self, combo: Gtk.ComboBoxText) -> None:
+        try:
+            name = combo.get_active_id()
+            self.parent_window.job_queue.policy = jobqueue.make_policy(name)
+            self.parent_window.config["queue_policy"] = name
+            config.save_config(self.parent_window.config)
+            logger.info(f"Queue order changed to: {name}")
+        except Exception as e:
+            logger.error(f"Failed to save queue order setting: {e}")
+
+    def _on_workers_changed(self, spin: Gtk.SpinButton) -> None:
+        try:
+            workers = spin.get_value_as_int()
+            self.parent_window.config["max_concurrent_downloads"] = workers
+            config.save_config(self.parent_window.config)
+            logger.info(f"Parallel downloads changed to: {workers}")
+        except Exception as e:
+            logger.error(f"Failed to save parallel downloads setting: {e}")
+
+    def _on_adaptive_toggled(self, checkbox: Gtk.CheckButton) -> None:
+        try:
+            self.parent_window.config["adaptive_downloads"] = checkbox.get_active()
+            config.save_config(self.parent_window.config)
+            logger.info(f"Adaptive downloads {'enabled' if checkbox.get_active() else 'disabled'}")
+        except Exception as e:
+            logger.error(f"Failed to save adaptive downloads setting: {e}")
+
+    def _on_bandwidth_changed(self, entry: Gtk.Entry) -> None:
+        limit = self.limit_entry.get_text().strip()
+        schedule = self.schedule_entry.get_text().strip()
+        try:
+            bandwidth.BandwidthSchedule.parse(limit, schedule)
+        except ValueError as e:
+            # Keep the last valid setting while the user is still typing
+            entry.set_icon_from_icon_name(Gtk.EntryIconPosition.SECONDARY, "dialog-warning")
+            entry.set_icon_tooltip_text(Gtk.EntryIconPosition.SECONDARY, str(e))
+            return
+        for valid in (self.limit_entry, self.schedule_entry):
+            valid.set_icon_from_icon_name(Gtk.EntryIconPosition.SECONDARY, None)
+        try:
+            self.parent_window.config["bandwidth_limit"] = limit
+            self.parent_window.config["bandwidth_schedule"] = schedule
+            config.save_config(self.parent_window.config)
+            logger.info(f"Bandwidth limit changed to: {limit or 'unlimited'} {schedule}".rstrip())
+        except Exception as e:
+            logger.error(f"Failed to save bandwidth setting: {e}")
+
+    def _on_format_changed(self, combo: Gtk.ComboBoxText) -> None:
+        try:
+            name = combo.get_active_id()
+            self.parent_window.config["output_profile"] = name
+            config.save_config(self.parent_window.config)
+            self.parent_window.update_download_label()
+            logger.info(f"Output profile changed to: {name}")
+        except Exception as e:
+            logger.error(f"Failed to save output profile setting: {e}")
+
+    def _on_pipeline_toggled(self, checkbox: Gtk.CheckButton) -> None:
+        try:
+            self.parent_window.config["transcode_pipeline"] = checkbox.get_active()
+            config.save_config(self.parent_window.config)
+            logger.info(f"Transcode pipeline {'enabled' if checkbox.get_active() else 'disabled'}")
+        except Exception as e:
+            logger.error(f"Failed to save transcode pipeline setting: {e}")
+
+    def _on_engine_changed(self, combo: Gtk.ComboBoxText) -> None:
+        try:
+            backend = combo.get_active_id()
+            self.parent_window.config["download_engine"] = backend
+            config.save_config(self.parent_window.config)
+            logger.info(f"Download engine changed to: {backend}")
+        except Exception as e:
+            logger.error(f"Failed to save download engine setting: {e}")
+
+    def _on_archive_toggled(self, checkbox: Gtk.CheckButton) -> None:
+        try:
+            self.parent_window.config["use_download_archive"] = checkbox.get_active()
+            config.save_config(self.parent_window.config)
+            logger.info(f"Download archive {'enabled' if checkbox.get_active() else 'disabled'}")
+        except Exception as e:
+            logger.error(f"Failed to save download archive setting: {e}")
+
+    def _on_service_toggled(self, checkbox: Gtk.CheckButton) -> None:
+        try:
+            self.service_entry.set_sensitive(checkbox.get_active())
+            self.parent_window.config["use_download_service"] = checkbox.get_active()
+            config.save_config(self.parent_window.config)
+            logger.info(f"Download service {'enabled' if checkbox.get_active() else 'disabled'}")
+        except Exception as e:
+            logger.error(f"Failed to save download service setting: {e}")
+
+    def _on_service_address_changed(self, entry: Gtk.Entry) -> None:
+        try:
+            address = entry.get_text().strip()
+            self.parent_window.config["download_service_address"] = address or client.default_address()
+            config.save_config(self.parent_window.config)
+            logger.info(f"Download service address changed to: {address}")
+        except Exception as e:
+            logger.error(f"Failed to save download service address: {e}")
+
+    def _on_log_lines_changed(self, spin: Gtk.SpinButton) -> None:
+        try:
+            max_lines = spin.get_value_as_int()
+            self.parent_window.log_lines.set_max_lines(max_lines)
+            self.parent_window.config["log_max_lines"] = max_lines
+            config.save_config(self.parent_window.config)
+            logger.info(f"Log line cap changed to: {max_lines}")
+        except Exception as e:
+            logger.error(f"Failed to save log line cap setting: {e}")
+
+    def _on_collapse_toggled(self, checkbox: Gtk.CheckButton) -> None:
+        try:
+            self.parent_window.collapse_progress_lines = checkbox.get_active()
+            self.parent_window.config["collapse_progress_lines"] = checkbox.get_active()
+            config.save_config(self.parent_window.config)
+            logger.info(f"Progress line collapsing {'enabled' if checkbox.get_active() else 'disabled'}")
+        except Exception as e:
+            logger.error(f"Failed to save progress line setting: {e}")
+
     def _on_notif_toggled(self, checkbox: Gtk.CheckButton) -> None:
         try:
             self.parent_window.notifications_enabled = checkbox.get_active()
@@ -122,9 +454,26 @@ class PreferencesDialog(Gtk.Dialog):
 
 
 class PlaylistPreviewDialog(Gtk.Dialog):
-    """Dialog to preview and select videos from a playlist before downloading."""
+    """
+    Dialog to preview and select videos from a playlist before downloading.
+
+    Entries live in a Gtk.ListStore shown by a fixed-height TreeView, so
+    only the visible rows are rendered and playlists with thousands of
+    videos open instantly. The number of selected rows is kept up to date
+    incrementally instead of being recounted on every toggle.
+
+    With ``loading`` True the dialog opens before the playlist is fully
+    enumerated; entries are added with append_entries() as they arrive and
+    finish_loading() is called once enumeration ends.
+
+    When the parent has a thumbnail store, covers are shown for the rows in
+    view only: once scrolling settles the visible rows are handed to a
+    ThumbnailLoader, and the cover column draws from its LRU cache.
+    """
+
+    COL_SELECTED, COL_INDEX, COL_VIDEO_ID, COL_TITLE = range(4)
 
-    def __init__(self, parent: YouTubeMp3Downloader, playlist_info: Dict[str, str]) -> None:
+    def __init__(self, parent: YouTubeMp3Downloader, playlist_info: Dict[str, str], loading: bool = False) -> None:
         super().__init__(
             title="Playlist Preview",
             transient_for=parent,
@@ -138,10 +487,14 @@ class PlaylistPreviewDialog(Gtk.Dialog):
         content.set_spacing(10)
 
         # Header
-        header = Gtk.Label()
-        header.set_markup("<b>{} videos found in playlist</b>".format(len(playlist_info)))
-        header.set_xalign(0)
-        content.pack_start(header, False, False, 0)
+        header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        self.spinner = Gtk.Spinner()
+        self.spinner.set_no_show_all(True)
+        header_box.pack_start(self.spinner, False, False, 0)
+        self.header = Gtk.Label()
+        self.header.set_xalign(0)
+        header_box.pack_start(self.header, True, True, 0)
+        content.pack_start(header_box, False, False, 0)
 
         # Select all / Deselect all buttons
         select_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
@@ -153,30 +506,65 @@ class PlaylistPreviewDialog(Gtk.Dialog):
         select_box.pack_start(deselect_all_btn, False, False, 0)
         content.pack_start(select_box, False, False, 0)
 
-        # Scrollable list of checkboxes
+        # Scrollable list of videos
+        self.store = Gtk.ListStore(bool, int, str, str)
+        self.tree = Gtk.TreeView(model=self.store)
+        self.tree.set_headers_visible(False)
+        self.tree.set_enable_search(False)
+
+        toggle = Gtk.CellRendererToggle()
+        toggle.connect("toggled", self._on_row_toggled)
+        toggle_column = Gtk.TreeViewColumn("", toggle, active=self.COL_SELECTED)
+        toggle_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        toggle_column.set_fixed_width(32)
+        self.tree.append_column(toggle_column)
+
+        self.thumbnails: Optional[thumbnails.ThumbnailLoader] = None
+        self._positions: Dict[str, int] = {}
+        self._visible_update: Optional[int] = None
+        thumbnail_store = getattr(parent, "thumbnail_store", None)
+        if thumbnail_store is not None:
+            self.thumbnails = thumbnails.ThumbnailLoader(
+                thumbnail_store, self._decode_thumbnail, self._on_thumbnail_loaded, GLib.idle_add
+            )
+            cover = Gtk.CellRendererPixbuf()
+            cover.set_fixed_size(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+            cover_column = Gtk.TreeViewColumn("", cover)
+            cover_column.set_cell_data_func(cover, self._render_thumbnail)
+            cover_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            cover_column.set_fixed_width(THUMBNAIL_WIDTH + 8)
+            self.tree.append_column(cover_column)
+
+        title_column = Gtk.TreeViewColumn("Title", Gtk.CellRendererText(), text=self.COL_TITLE)
+        title_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        title_column.set_expand(True)
+        self.tree.append_column(title_column)
+
+        # Every row has the same height, so GTK does not measure each one
+        self.tree.set_fixed_height_mode(True)
+        self.tree.connect("row-activated", self._on_row_activated)
+
         scrolled = Gtk.ScrolledWindow()
         scrolled.set_vexpand(True)
-        listbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
-
-        self.checkboxes: List[Gtk.CheckButton] = []
-        for video_id, title in playlist_info.items():
-            cb = Gtk.CheckButton(label=title)
-            cb.set_active(True)
-            cb.video_id = video_id  # type: ignore[attr-defined]
-            self.checkboxes.append(cb)
-            listbox.pack_start(cb, False, False, 0)
-
-        scrolled.add(listbox)
+        scrolled.add(self.tree)
         content.pack_start(scrolled, True, True, 0)
+        if self.thumbnails is not None:
+            scrolled.get_vadjustment().connect("value-changed", self._schedule_visible_update)
+            scrolled.get_vadjustment().connect("changed", self._schedule_visible_update)
+            self.connect("destroy", self._on_destroy)
 
         # Selection count label
         self.count_label = Gtk.Label()
-        self._update_count()
         content.pack_start(self.count_label, False, False, 0)
 
-        # Connect toggles to update count
-        for cb in self.checkboxes:
-            cb.connect("toggled", lambda w: self._update_count())
+        self.loading = loading
+        self.load_error: Optional[str] = None
+        self.playlist_info: Dict[str, str] = {}
+        self.selected_count = 0
+        self.set_playlist_info(playlist_info)
+        if loading:
+            self.spinner.show()
+            self.spinner.start()
 
         # Buttons
         self.add_button("Cancel", Gtk.ResponseType.CANCEL)
@@ -185,18 +573,130 @@ class PlaylistPreviewDialog(Gtk.Dialog):
 
         self.show_all()
 
+    def set_playlist_info(self, playlist_info: Dict[str, str]) -> None:
+        """Show a (new) list of videos, keeping the selection of videos already listed."""
+        previous = {row[self.COL_VIDEO_ID]: row[self.COL_SELECTED] for row in self.store}
+        # Detach the model while rebuilding it so the view is not updated per row
+        self.tree.set_model(None)
+        self.store.clear()
+        self.playlist_info = {}
+        self._positions = {}
+        self.selected_count = 0
+        self._add_entries(playlist_info.items(), previous)
+        self.tree.set_model(self.store)
+        self._update_header()
+        self._update_count()
+
+    def append_entries(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """Add entries reported while the playlist is still being enumerated."""
+        self._add_entries(entries, {})
+        self._update_header()
+        self._update_count()
+
+    def finish_loading(self, error: Optional[str] = None) -> None:
+        """Mark enumeration as finished, optionally because it failed."""
+        self.loading = False
+        self.load_error = error
+        self.spinner.stop()
+        self.spinner.hide()
+        self._update_header()
+
+    def _add_entries(self, entries: Iterable[Tuple[str, str]], previous: Dict[str, bool]) -> None:
+        for video_id, title in entries:
+            if video_id in self.playlist_info:
+                continue
+            self.playlist_info[video_id] = title
+            self._positions[video_id] = len(self.playlist_info) - 1
+            selected = previous.get(video_id, True)
+            self.store.append([selected, len(self.playlist_info), video_id, title])
+            if selected:
+                self.selected_count += 1
+
+    def _decode_thumbnail(self, path: str) -> GdkPixbuf.Pixbuf:
+        # Runs on a loader thread
+        return GdkPixbuf.Pixbuf.new_from_file_at_scale(path, THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT, True)
+
+    def _render_thumbnail(
+        self,
+        column: Gtk.TreeViewColumn,
+        renderer: Gtk.CellRendererPixbuf,
+        model: Gtk.ListStore,
+        tree_iter: Gtk.TreeIter,
+        data: object = None,
+    ) -> None:
+        renderer.set_property("pixbuf", self.thumbnails.get(model[tree_iter][self.COL_VIDEO_ID]))
+
+    def _on_thumbnail_loaded(self, video_id: str, pixbuf: GdkPixbuf.Pixbuf) -> bool:
+        position = self._positions.get(video_id)
+        if position is not None and position < len(self.store):
+            path = Gtk.TreePath(position)
+            self.store.row_changed(path, self.store.get_iter(path))
+        return False
+
+    def _schedule_visible_update(self, *args: object) -> None:
+        if self._visible_update is None:
+            self._visible_update = GLib.timeout_add(VISIBLE_UPDATE_DELAY, self._update_visible)
+
+    def _update_visible(self) -> bool:
+        """Ask for the covers of the rows in view and a few below them."""
+        self._visible_update = None
+        visible = self.tree.get_visible_range()
+        if visible is None or self.thumbnails is None:
+            return False
+        first = visible[0].get_indices()[0]
+        last = min(visible[1].get_indices()[0] + PREFETCH_ROWS, len(self.store) - 1)
+        self.thumbnails.request([self.store[row][self.COL_VIDEO_ID] for row in range(first, last + 1)])
+        return False
+
+    def _on_destroy(self, widget: Gtk.Widget) -> None:
+        if self._visible_update is not None:
+            GLib.source_remove(self._visible_update)
+            self._visible_update = None
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+
+    def _update_header(self) -> None:
+        count = len(self.playlist_info)
+        if self.loading:
+            self.header.set_markup("<b>Fetching playlist... {} videos so far</b>".format(count))
+        elif self.load_error:
+            self.header.set_markup(
+                "<b>{} videos found</b> (listing incomplete: {})".format(
+                    count, GLib.markup_escape_text(self.load_error)
+                )
+            )
+        else:
+            self.header.set_markup("<b>{} videos found in playlist</b>".format(count))
+
     def _update_count(self) -> None:
-        selected = sum(1 for cb in self.checkboxes if cb.get_active())
-        self.count_label.set_text("{} of {} selected".format(selected, len(self.checkboxes)))
+        self.count_label.set_text("{} of {} selected".format(self.selected_count, len(self.store)))
+
+    def _toggle_row(self, path: Union[str, Gtk.TreePath]) -> None:
+        row = self.store[path]
+        row[self.COL_SELECTED] = not row[self.COL_SELECTED]
+        self.selected_count += 1 if row[self.COL_SELECTED] else -1
+        self._update_count()
+
+    def _on_row_toggled(self, renderer: Gtk.CellRendererToggle, path: str) -> None:
+        self._toggle_row(path)
+
+    def _on_row_activated(self, tree: Gtk.TreeView, path: Gtk.TreePath, column: Gtk.TreeViewColumn) -> None:
+        self._toggle_row(path)
+
+    def _set_all(self, selected: bool) -> None:
+        self.tree.set_model(None)
+        for row in self.store:
+            row[self.COL_SELECTED] = selected
+        self.tree.set_model(self.store)
+        self.selected_count = len(self.store) if selected else 0
+        self._update_count()
 
     def _on_select_all(self, button: Gtk.Button) -> None:
-        for cb in self.checkboxes:
-            cb.set_active(True)
+        self._set_all(True)
 
     def _on_deselect_all(self, button: Gtk.Button) -> None:
-        for cb in self.checkboxes:
-            cb.set_active(False)
+        self._set_all(False)
 
     def get_selected_indices(self) -> List[int]:
         """Return 1-based indices of selected videos."""
-        return [i + 1 for i, cb in enumerate(self.checkboxes) if cb.get_active()]
+        return [row[self.COL_INDEX] for row in self.store if row[self.COL_SELECTED]]
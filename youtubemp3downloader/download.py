@@ -5,30 +5,1188 @@ import subprocess
 import re
 import os
 import glob
-from typing import TYPE_CHECKING, Optional
+import shutil
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
-from gi.repository import GLib
 
+from . import archive
+from . import bandwidth
+from . import cookies
+from . import engine
+from . import enumeration
+from . import events
+from . import journal
+from . import library
+from . import metrics
+from . import pipeline
+from . import playlist_cache
+from . import profiles
+from . import progress
+from . import scheduler
+from . import throughput
+from . import thumbnails
+from . import tracing
+from . import utils
 from .exceptions import DownloadError, ValidationError
 from .logger import get_logger
 
 if TYPE_CHECKING:
-    from .app_window import YouTubeMp3Downloader
+    from .jobqueue import JobRun
 
 logger = get_logger(__name__)
 
+# Called with (video_id, journal state) whenever an item changes state
+ItemStateCallback = Callable[[str, str], None]
+
+# Final scheduler states worth journaling; cancelled items stay unfinished
+_JOURNAL_STATES = {
+    scheduler.DONE: journal.DONE,
+    scheduler.SKIPPED: journal.SKIPPED,
+    scheduler.FAILED: journal.FAILED,
+}
+
+
+UNAVAILABLE_KEYWORDS = [
+    "Video unavailable",
+    "This video has been",
+    "Private video",
+    "This video is no longer available",
+    "removed by the uploader",
+    "account associated with this video has been terminated",
+    "Video is not available",
+    "Members-only",
+    "Join this channel to get access",
+    "This live stream recording is not available"
+]
+
+
+class _OutputProcessor:
+    """Turn the output of one download backend into counters and UI updates."""
+
+    def __init__(
+        self,
+        run: JobRun,
+        playlist_info: Dict[str, str],
+        prefix: str = "",
+        show_progress: bool = True,
+        download_archive: Optional[archive.DownloadArchive] = None,
+        on_item_state: Optional[ItemStateCallback] = None,
+        on_event: Optional[Callable[[events.DownloadEvent], None]] = None,
+        profile: Optional[profiles.OutputProfile] = None,
+        thumbnail_store: Optional[thumbnails.ThumbnailStore] = None,
+        tracer: Optional[tracing.Tracer] = None,
+        download_metrics: Optional[metrics.DownloadMetrics] = None,
+    ) -> None:
+        self.run = run
+        self.profile = profile or profiles.get_profile(profiles.DEFAULT_PROFILE)
+        # Takes the thumbnails yt-dlp was told to keep next to finished files
+        self.thumbnail_store = thumbnail_store
+        self.playlist_info = playlist_info
+        self.prefix = prefix
+        self.show_progress = show_progress
+        # Completed items are recorded here; None while staging for the pipeline
+        self.download_archive = download_archive
+        self.on_item_state = on_item_state
+        # Sees every event before it is applied, e.g. to measure throughput
+        self.on_event = on_event
+        self.current_video_id: Optional[str] = None
+        self.current_video_title = ""
+        self.current_target: Optional[str] = None
+        self.current_skipped = False
+        self.completed_path: Optional[str] = None
+        self.successful_downloads = 0
+        self.failed_downloads = 0
+        self.skipped_downloads = 0
+        self.skipped_videos: List[str] = []
+        self.failed_videos: List[Dict[str, str]] = []
+        self.current_video_index = 0
+        self.total_videos = 0
+        self.last_error: Optional[str] = None
+        self.parser = progress.ProgressParser()
+        # Records the phases of each item when the job is traced
+        self.tracer = tracer
+        self.item_trace: Optional[tracing.ItemTrace] = None
+        self.trace_outcome: Optional[str] = None
+        # Measures bytes, speed and the time of the download and conversion phases
+        self.metrics = download_metrics
+        self.phase: Optional[str] = None
+        self.phase_started = 0.0
+        self.received = 0.0
+
+    def start_trace(self, label: str, **args: Optional[str]) -> Optional[tracing.ItemTrace]:
+        """Start tracing a new item, ending the previous one."""
+        self.finish_item()
+        if self.tracer is None:
+            return None
+        self.item_trace = self.tracer.item(label, **args)
+        self.item_trace.enter(tracing.EXTRACT)
+        self.trace_outcome = None
+        return self.item_trace
+
+    def trace_phase(self, phase: str) -> None:
+        if self.item_trace is not None:
+            self.item_trace.enter(phase)
+
+    def end_phase(self) -> None:
+        """Record how long the download or conversion of the current item took."""
+        phase = self.phase
+        self.phase = None
+        if self.metrics is None or phase is None:
+            return
+        seconds = time.monotonic() - self.phase_started
+        if phase == tracing.DOWNLOAD:
+            self.metrics.download_seconds.observe(seconds)
+        elif phase == tracing.CONVERT:
+            self.metrics.transcode_seconds.observe(seconds)
+
+    def _measure(self, event: events.DownloadEvent) -> None:
+        if isinstance(event, events.ItemStart):
+            self.end_phase()
+        elif isinstance(event, events.Destination):
+            self.received = 0.0
+        elif isinstance(event, events.Progress):
+            if event.speed_bps:
+                self.metrics.record_speed(event.speed_bps)
+            if event.downloaded_bytes is not None:
+                # A smaller count is the next file of the item, e.g. a retried format
+                done = event.downloaded_bytes
+                self.metrics.record_bytes(done - self.received if done >= self.received else done)
+                self.received = done
+        phase = tracing.next_phase(self.phase, event)
+        if phase is not None:
+            self.end_phase()
+            self.phase = phase
+            self.phase_started = time.monotonic()
+        if isinstance(event, (events.Skipped, events.PostprocessDone)):
+            self.end_phase()
+
+    def finish_item(self, outcome: Optional[str] = None) -> None:
+        """End the measurements and the trace of the current item with what became of it."""
+        self.end_phase()
+        if self.item_trace is None:
+            return
+        if outcome is None:
+            outcome = self.trace_outcome or (
+                scheduler.CANCELLED if self.run.download_stopped.is_set() else scheduler.FAILED
+            )
+        self.item_trace.close(outcome)
+        self.item_trace = None
+
+    def _trace_event(self, event: events.DownloadEvent) -> None:
+        if isinstance(event, events.ItemStart):
+            self.start_trace("#{}".format(event.index), video_id=event.video_id)
+        elif self.item_trace is not None:
+            self.item_trace.on_event(event)
+        elif tracing.phase_for(event) is not None:
+            # A single video has no item start; its trace begins with the download
+            trace = self.start_trace(self.current_video_id or self.parser.item_id or "video")
+            if trace is not None:
+                trace.on_event(event)
+
+    def store_thumbnail(self, video_id: Optional[str], path: str) -> None:
+        """Move the thumbnail kept next to a finished file into the thumbnail store."""
+        video_id = video_id or self.current_video_id or self.parser.item_id
+        base = os.path.splitext(path)[0]
+        for extension in pipeline.THUMBNAIL_EXTENSIONS:
+            thumbnail = base + extension
+            if not os.path.isfile(thumbnail):
+                continue
+            if video_id:
+                self.thumbnail_store.add_file(video_id, thumbnail)
+            try:
+                os.remove(thumbnail)
+            except OSError as e:
+                logger.warning(f"Could not delete thumbnail {thumbnail}: {e}")
+
+    def release_target(self) -> None:
+        if self.current_target:
+            with self.run.download_lock:
+                self.run.active_download_targets.discard(self.current_target)
+        self.current_target = None
+        self.current_video_title = ""
+
+    def record_completed(self, video_id: Optional[str], path: Optional[str]) -> None:
+        """Add a finished item to the download archive."""
+        video_id = video_id or self.current_video_id or self.parser.item_id
+        if self.download_archive is None or not video_id or not path:
+            return
+        self.download_archive.record(video_id, path)
+
+    def record_state(self, video_id: Optional[str], state: str) -> None:
+        """Report an item state change to the job journal."""
+        video_id = video_id or self.current_video_id or self.parser.item_id
+        if self.on_item_state is not None and video_id:
+            self.on_item_state(video_id, state)
+
+    def process_line(self, line: str) -> None:
+        """Handle a single line of yt-dlp output."""
+        if self.tracer is None:
+            parsed = self.parser.feed(line)
+        else:
+            parsed = self.tracer.profile(self.parser.feed, line)
+        for event in parsed:
+            self.handle_event(event)
+
+    def handle_event(self, event: events.DownloadEvent) -> None:
+        """Apply a single download event."""
+        run = self.run
+        if self.on_event is not None:
+            self.on_event(event)
+        if self.tracer is not None:
+            self._trace_event(event)
+        if self.metrics is not None:
+            self._measure(event)
+
+        if isinstance(event, events.LogLine):
+            run.post_log(self.prefix + event.text)
+
+        elif isinstance(event, events.ItemStart):
+            self.current_video_index = event.index
+            self.total_videos = event.total
+            self.current_skipped = False
+            self.current_video_id = event.video_id
+            if event.title:
+                self.current_video_title = event.title
+            elif not self.current_video_title:
+                self.current_video_title = "Video #{}".format(self.current_video_index)
+            if self.show_progress:
+                if self.total_videos > 0:
+                    playlist_status = "Video {}/{}".format(self.current_video_index, self.total_videos)
+                    run.post_progress(text=playlist_status)
+                else:
+                    run.post_progress(text="Downloading playlist...")
+
+        elif isinstance(event, events.Destination):
+            destination = event.path
+            self.current_target = destination
+            self.current_skipped = False
+            with run.download_lock:
+                run.active_download_targets.add(destination)
+            self.record_state(None, journal.DOWNLOADING)
+
+            filename = os.path.basename(destination)
+            self.current_video_title = os.path.splitext(filename)[0]
+
+            # Duplicate detection: check if the output file already exists
+            base, _ = os.path.splitext(destination)
+            for extension in self.profile.extensions:
+                existing = base + extension
+                if existing != destination and os.path.isfile(existing) and os.path.getsize(existing) > 1024:
+                    existing_name = os.path.basename(existing)
+                    run.post_log("⚠ Already exists, will be overwritten: {}".format(existing_name))
+                    logger.info(f"Duplicate detected: {existing_name}")
+                    break
+
+        elif isinstance(event, events.Skipped):
+            self.skipped_downloads += 1
+            self.current_skipped = True
+            video_name = self.current_video_title or "Unknown"
+            self.skipped_videos.append(video_name)
+            run.post_log("⏭ Skipped (already exists): {}".format(video_name))
+            logger.info(f"Skipped duplicate: {video_name}")
+            self.record_completed(event.video_id, event.path)
+            self.record_state(event.video_id, journal.SKIPPED)
+            self.trace_outcome = scheduler.SKIPPED
+            self.release_target()
+
+        elif isinstance(event, events.PostprocessDone):
+            # The in-process engine reports completion for skipped items too
+            if not self.current_skipped:
+                self.successful_downloads += 1
+            self.current_skipped = False
+            path = event.path
+            if not path and self.current_target:
+                path = os.path.splitext(self.current_target)[0] + self.profile.extension
+            self.record_completed(event.video_id, path)
+            if path and os.path.isfile(path):
+                self.completed_path = path
+                self.record_state(event.video_id, journal.DONE)
+                if self.thumbnail_store is not None:
+                    self.store_thumbnail(event.video_id, path)
+            self.trace_outcome = scheduler.DONE
+            self.release_target()
+
+        elif isinstance(event, events.ItemError):
+            line = event.message
+            self.last_error = line
+            video_identifier = self.current_video_title
+
+            if not video_identifier:
+                video_id = event.video_id
+                if not video_id:
+                    match = re.search(r'\[youtube\]\s+([A-Za-z0-9_-]+):', line)
+                    video_id = match.group(1) if match else None
+                if video_id:
+                    video_identifier = self.playlist_info.get(video_id, "ID: {}".format(video_id))
+                else:
+                    video_identifier = "Unknown"
+
+            error_info = {
+                "line": line,
+                "video_context": video_identifier
+            }
+
+            if any(keyword in line for keyword in UNAVAILABLE_KEYWORDS):
+                self.failed_downloads += 1
+                self.failed_videos.append(error_info)
+                self.record_state(event.video_id, journal.FAILED)
+                self.trace_outcome = scheduler.FAILED
+                self.release_target()
+
+        elif isinstance(event, events.Progress):
+            percent = event.percent
+            log_line = "[download] {:5.1f}%".format(percent)
+            if event.speed:
+                log_line += " at {}".format(event.speed)
+            if event.eta:
+                log_line += " ETA {}".format(event.eta)
+            run.post_log(self.prefix + log_line, progress=True)
+            if not self.show_progress:
+                return
+            if self.total_videos > 0:
+                progress_text = "Video {}/{} - {:.1f}%".format(
+                    self.current_video_index, self.total_videos, percent
+                )
+            else:
+                progress_text = "{:.1f}%".format(percent)
+            if event.speed:
+                progress_text += " | {}".format(event.speed)
+            if event.eta:
+                progress_text += " | ETA {}".format(event.eta)
+            run.post_progress(percent / 100, progress_text)
+
+
+def enumerate_playlist(
+    url: str,
+    use_auth: bool,
+    auth_browser: str,
+    backend: str = engine.ENGINE_SUBPROCESS,
+    durations: Optional[Dict[str, float]] = None,
+) -> Dict[str, str]:
+    """
+    Enumerate a playlist without resolving each video.
+
+    ``durations`` is filled with the length in seconds of the videos that
+    report one.
+
+    Returns:
+        Ordered mapping of video ID to "index - title" display titles
+
+    Raises:
+        subprocess.TimeoutExpired: If yt-dlp stopped producing output
+        DownloadError: If the playlist could not be enumerated
+    """
+    return dict(enumeration.stream_playlist(url, use_auth, auth_browser, backend, durations=durations))
+
+
+def _fetch_playlist_info(
+    run: JobRun,
+    url: str,
+    use_auth: bool,
+    auth_browser: str,
+    backend: str = engine.ENGINE_SUBPROCESS,
+) -> Dict[str, str]:
+    """Fetch the ordered video ID to title mapping of a playlist"""
+    playlist_info: Dict[str, str] = {}
+    playlist_id = playlist_cache.playlist_id_from_url(url)
+    if playlist_id:
+        cached: Optional[playlist_cache.CachedPlaylist] = run.playlist_cache.get(playlist_id)
+        if cached and cached.is_fresh:
+            run.post_log(
+                "✓ Playlist information loaded from cache: {} videos".format(len(cached.playlist_info))
+            )
+            run.post_log("")
+            logger.info(f"Playlist info for {playlist_id} served from cache")
+            return cached.playlist_info
+
+    try:
+        run.post_log("Getting playlist information...")
+        logger.debug("Fetching playlist information...")
+        durations: Dict[str, float] = {}
+        playlist_info = enumerate_playlist(url, use_auth, auth_browser, backend, durations)
+        if playlist_info:
+            run.post_log(
+                "✓ Playlist information obtained: {} videos".format(len(playlist_info))
+            )
+            run.post_log("")
+            logger.info(f"Playlist info retrieved: {len(playlist_info)} videos")
+            if playlist_id:
+                run.playlist_cache.put(playlist_id, playlist_info, durations)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Playlist info fetch stalled for {enumeration.DEFAULT_INACTIVITY_TIMEOUT} seconds")
+        run.post_log("⚠ Playlist info fetch timed out, continuing anyway")
+        run.post_log("")
+    except subprocess.SubprocessError as e:
+        logger.warning(f"Subprocess error getting playlist info: {e}")
+        run.post_log("⚠ Could not get playlist info: {}".format(str(e)))
+        run.post_log("")
+    except Exception as e:
+        logger.warning(f"Unexpected error getting playlist info: {e}")
+        run.post_log("⚠ Could not get playlist info: {}".format(str(e)))
+        run.post_log("")
+    return playlist_info
+
+
+def _base_command(
+    use_auth: bool,
+    auth_browser: str,
+    extract_audio: bool = True,
+    download_archive: Optional[str] = None,
+    cookie_args: Optional[List[str]] = None,
+    tuning_args: Optional[List[str]] = None,
+    rate_args: Optional[List[str]] = None,
+    profile: Optional[profiles.OutputProfile] = None,
+    fetch_thumbnail: bool = True,
+    keep_thumbnail: bool = False,
+    embed_thumbnail: Optional[bool] = None,
+) -> List[str]:
+    """
+    Build the yt-dlp arguments shared by every download process.
+
+    The audio is extracted as the output ``profile`` says, 320 kbps MP3 by
+    default. With ``extract_audio`` False the conversion is left to the
+    transcode stage: yt-dlp only fetches the best audio stream and its thumbnail.
+    ``download_archive`` lets yt-dlp skip the IDs listed in that file
+    without requesting them. ``cookie_args`` come from a cookie lease and
+    replace reading the browser's cookies in every process. ``tuning_args``
+    set the fragment options picked by the throughput controller, and
+    ``rate_args`` the process's share of the bandwidth budget. Without
+    ``fetch_thumbnail`` yt-dlp leaves the cover alone because the thumbnail
+    store has it; ``keep_thumbnail`` leaves the embedded cover next to the
+    audio file so it can be stored. ``embed_thumbnail`` says whether yt-dlp
+    can embed the cover, as resolved once for the run; the profile is asked
+    if it is None.
+    """
+    cmd = ["yt-dlp"]
+    cmd.extend(progress.PROGRESS_ARGS)
+    profile = profile or profiles.get_profile(profiles.DEFAULT_PROFILE)
+    if extract_audio:
+        cmd.extend(profile.ytdlp_args())
+        if embed_thumbnail is None:
+            embed_thumbnail = profile.embeds_thumbnail()
+        if fetch_thumbnail and embed_thumbnail:
+            cmd.append("--embed-thumbnail")
+        if fetch_thumbnail and keep_thumbnail:
+            cmd.extend(["--write-thumbnail", "--convert-thumbnails", "jpg"])
+    else:
+        cmd.extend(["-f", "bestaudio/best"])
+        if fetch_thumbnail:
+            cmd.extend(["--write-thumbnail", "--convert-thumbnails", "jpg"])
+    cmd.extend([
+        "--add-metadata",
+        "--yes-playlist",
+        "--ignore-errors",
+        "--retries", "3",
+        "--fragment-retries", "3",
+        "--socket-timeout", "30",
+    ])
+    if tuning_args:
+        cmd.extend(tuning_args)
+    if rate_args:
+        cmd.extend(rate_args)
+    if download_archive:
+        cmd.extend(["--download-archive", download_archive])
+    if cookie_args is not None:
+        cmd.extend(cookie_args)
+    elif use_auth:
+        cmd.extend(["--cookies-from-browser", auth_browser])
+    return cmd
+
+
+def _export_archive(
+    download_archive: Optional[archive.DownloadArchive],
+    download_path: str,
+    library_index: Optional[library.LibraryIndex] = None,
+) -> Optional[str]:
+    """Write the yt-dlp archive file for this destination and return its path"""
+    if download_archive is None:
+        return None
+    path = archive.ytdlp_archive_path(download_path)
+    extra_ids = [video_id for video_id, _ in library_index.items()] if library_index else []
+    try:
+        count = download_archive.export_ytdlp(path, download_path, extra_ids)
+    except OSError as e:
+        logger.warning(f"Could not write yt-dlp download archive: {e}")
+        return None
+    logger.info(f"Download archive lists {count} video(s) for {download_path}")
+    return str(path)
+
+
+def _skip_known(
+    run: JobRun,
+    download_archive: Optional[archive.DownloadArchive],
+    library_index: Optional[library.LibraryIndex],
+    download_path: str,
+    items: List[scheduler.PlaylistItem],
+    on_item_state: Optional[ItemStateCallback] = None,
+) -> List[scheduler.PlaylistItem]:
+    """Mark items found in the archive or the library as skipped and return the rest"""
+    pending = [item for item in items if item.state == scheduler.PENDING]
+    if download_archive is None or not pending:
+        return pending
+    present = set(download_archive.present_ids((item.video_id for item in pending), download_path))
+    in_library = 0
+    if library_index is not None:
+        for item in pending:
+            if item.video_id in present:
+                continue
+            path = library_index.lookup(item.video_id)
+            if path and os.path.isfile(path):
+                present.add(item.video_id)
+                in_library += 1
+    if not present:
+        return pending
+    for item in pending:
+        if item.video_id in present:
+            item.state = scheduler.SKIPPED
+            if on_item_state is not None:
+                on_item_state(item.video_id, journal.SKIPPED)
+    run.post_log("⏭ Already downloaded: {} video(s)".format(len(present)))
+    logger.info(f"Skipping {len(present)} known video(s) before scheduling ({in_library} found in the library)")
+    return [item for item in pending if item.state == scheduler.PENDING]
+
+
+def _start_process(run: JobRun, cmd: List[str]) -> subprocess.Popen:
+    """Start a yt-dlp process and register it with the job run"""
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.error(f"Failed to start yt-dlp process: {e}")
+        raise DownloadError(f"Could not start download process: {e}") from e
+
+    with run.download_lock:
+        run.active_processes.add(process)
+    logger.debug(f"Download process started with PID: {process.pid}")
+
+    # The stop button may have fired between scheduling and registration
+    if run.download_stopped.is_set():
+        process.terminate()
+    return process
+
+
+def _finish_process(run: JobRun, process: subprocess.Popen) -> None:
+    """Wait for a yt-dlp process to exit and unregister it"""
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        logger.warning("Process did not exit after stdout closed, killing")
+        process.kill()
+        process.wait(timeout=10)
+    finally:
+        with run.download_lock:
+            run.active_processes.discard(process)
+    logger.info(f"Download process completed with return code: {process.returncode}")
+
+
+def _download_serial(
+    run: JobRun,
+    url: str,
+    download_path: str,
+    use_auth: bool,
+    auth_browser: str,
+    playlist_items: Optional[str],
+    playlist_info: Dict[str, str],
+    backend: str = engine.ENGINE_SUBPROCESS,
+    download_archive: Optional[archive.DownloadArchive] = None,
+    archive_file: Optional[str] = None,
+    on_item_state: Optional[ItemStateCallback] = None,
+    tuning: Optional[throughput.TuningProfile] = None,
+    budget: Optional[bandwidth.BandwidthBudget] = None,
+    profile: Optional[profiles.OutputProfile] = None,
+    thumbnail_store: Optional[thumbnails.ThumbnailStore] = None,
+    tracer: Optional[tracing.Tracer] = None,
+    download_metrics: Optional[metrics.DownloadMetrics] = None,
+    embed_thumbnail: Optional[bool] = None,
+) -> Tuple[_OutputProcessor, int]:
+    """Download everything with a single yt-dlp process or engine instance"""
+    output_template = str(Path(download_path) / "%(playlist_index|)s%(playlist_index& - |)s%(title)s.%(ext)s")
+    processor = _OutputProcessor(
+        run, playlist_info, download_archive=download_archive, on_item_state=on_item_state, profile=profile,
+        thumbnail_store=thumbnail_store, tracer=tracer, download_metrics=download_metrics,
+    )
+
+    if playlist_items:
+        logger.info(f"Downloading selected playlist items: {playlist_items}")
+
+    if backend == engine.ENGINE_INPROCESS:
+        run.post_log("Running yt-dlp in-process: {}".format(url))
+        run.post_log("")
+        ydl_engine = engine.InProcessEngine(
+            output_template,
+            processor.handle_event,
+            stop_event=run.download_cancel_requested,
+            use_auth=use_auth,
+            auth_browser=auth_browser,
+            playlist_items=playlist_items,
+            download_archive=archive_file,
+            tuning=tuning.ydl_options() if tuning else None,
+            rate_limiter=budget.consume if budget else None,
+            profile=profile,
+            keep_thumbnail=thumbnail_store is not None,
+            embed_thumbnail=embed_thumbnail,
+        )
+        try:
+            returncode = ydl_engine.download(url)
+        finally:
+            ydl_engine.close()
+            processor.finish_item()
+        return processor, returncode
+
+    with cookies.lease(use_auth, auth_browser) as cookie_lease, bandwidth.lease(budget) as rate_lease:
+        cmd = _base_command(
+            use_auth, auth_browser, download_archive=archive_file, cookie_args=cookie_lease.args,
+            tuning_args=tuning.command_args() if tuning else None, rate_args=rate_lease.args, profile=profile,
+            keep_thumbnail=thumbnail_store is not None, embed_thumbnail=embed_thumbnail,
+        )
+        cmd.extend(["-o", output_template])
+        if playlist_items:
+            cmd.extend(["--playlist-items", playlist_items])
+        cmd.append(url)
+
+        run.post_log("Running: {}".format(' '.join(cmd)))
+        run.post_log("")
+        logger.debug(f"Executing command: {' '.join(cmd)}")
+
+        process = _start_process(run, cmd)
+        try:
+            for line in process.stdout:
+                processor.process_line(line)
+        finally:
+            _finish_process(run, process)
+            processor.finish_item()
+
+    return processor, process.returncode
+
+
+def _transcode(run: JobRun, task: pipeline.TranscodeTask) -> bool:
+    """Encode or remux a staged file to its final location with ffmpeg"""
+    item = task.item
+    partial = task.target + ".part"
+    if os.path.isfile(task.target) and os.path.getsize(task.target) > 1024:
+        run.post_log(
+            "⚠ Already exists, will be overwritten: {}".format(os.path.basename(task.target))
+        )
+        logger.info(f"Duplicate detected: {task.target}")
+
+    with run.download_lock:
+        run.active_download_targets.add(task.target)
+
+    cmd = pipeline.build_transcode_command(task.source, partial, task.thumbnail, audio_args=task.audio_args)
+    logger.debug(f"Transcoding item #{item.index}: {' '.join(cmd)}")
+    run.post_log("[#{}] 🎵 Converting to {}: {}".format(
+        item.index, os.path.splitext(task.target)[1][1:].upper(), os.path.basename(task.target)
+    ))
+
+    process = _start_process(run, cmd)
+    try:
+        for line in process.stdout:
+            line = line.strip()
+            if line:
+                run.post_log("[#{}] {}".format(item.index, line))
+                item.error = line
+    finally:
+        _finish_process(run, process)
+
+    if run.download_stopped.is_set():
+        return False
+    if process.returncode != 0:
+        item.error = item.error or "ffmpeg exited with code {}".format(process.returncode)
+        try:
+            if os.path.isfile(partial):
+                os.remove(partial)
+        except OSError as e:
+            logger.warning(f"Could not delete failed conversion {partial}: {e}")
+        with run.download_lock:
+            run.active_download_targets.discard(task.target)
+        return False
+
+    os.replace(partial, task.target)
+    with run.download_lock:
+        run.active_download_targets.discard(task.target)
+    run.post_log("[#{}] ✓ Saved: {}".format(item.index, os.path.basename(task.target)))
+    return True
+
+
+def _embed_cover(path: str, cover: str) -> bool:
+    """Embed a stored cover into a finished file, copying the audio stream"""
+    _, audio_args, cover_ok = profiles.remux_args(path)
+    if not cover_ok:
+        return False
+    partial = path + ".part"
+    cmd = pipeline.build_transcode_command(path, partial, cover, audio_args=audio_args)
+    logger.debug(f"Embedding stored cover: {' '.join(cmd)}")
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not embed the cover into {path}: {e}")
+        return False
+    if result.returncode != 0:
+        logger.warning(f"Could not embed the cover into {path}: {result.stdout.strip()}")
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        return False
+    os.replace(partial, path)
+    return True
+
+
+def _download_scheduled(
+    run: JobRun,
+    download_path: str,
+    use_auth: bool,
+    auth_browser: str,
+    playlist_info: Dict[str, str],
+    items: List[scheduler.PlaylistItem],
+    max_workers: int,
+    use_pipeline: bool = False,
+    backend: str = engine.ENGINE_SUBPROCESS,
+    download_archive: Optional[archive.DownloadArchive] = None,
+    archive_file: Optional[str] = None,
+    on_item_state: Optional[ItemStateCallback] = None,
+    controller: Optional[throughput.ThroughputController] = None,
+    budget: Optional[bandwidth.BandwidthBudget] = None,
+    profile: Optional[profiles.OutputProfile] = None,
+    thumbnail_store: Optional[thumbnails.ThumbnailStore] = None,
+    tracer: Optional[tracing.Tracer] = None,
+    download_metrics: Optional[metrics.DownloadMetrics] = None,
+    staging_id: Optional[str] = None,
+    embed_thumbnail: Optional[bool] = None,
+) -> List[scheduler.PlaylistItem]:
+    """
+    Download items one at a time per worker.
+
+    Items are spread across ``max_workers`` network workers, each running a
+    yt-dlp process per item or reusing its own in-process engine. With
+    ``use_pipeline`` the workers only fetch audio into a staging directory
+    and a transcode pool sized to the CPU cores encodes the files in the
+    output ``profile``.
+    With a ``controller`` the number of running workers and the fragment
+    settings follow the measured throughput, up to ``max_workers``. A
+    ``budget`` caps the rate of all workers together. Covers found in the
+    ``thumbnail_store`` are embedded from there instead of being fetched
+    again, and new covers are added to it. A ``tracer`` records the phases
+    of every item on its worker's track and conversions on the encoders'.
+    ``download_metrics`` receives the bytes, speed and phase times of every
+    item. With a ``staging_id`` (the journal ID of the job) the staging
+    folder is kept for the next run of the job, which resumes the partial
+    downloads in it; otherwise it is deleted when the run ends.
+    ``embed_thumbnail`` says whether yt-dlp can embed covers; it is asked
+    here, before the workers start, if the caller did not.
+    """
+    profile = profile or profiles.get_profile(profiles.DEFAULT_PROFILE)
+    if embed_thumbnail is None:
+        embed_thumbnail = profile.embeds_thumbnail(in_process=backend == engine.ENGINE_INPROCESS)
+    total = len(items)
+    index_width = len(str(len(playlist_info))) if playlist_info else 0
+    finished = [0]
+    finished_lock = threading.Lock()
+    staging_root = None
+    transcoder = None
+    worker_state = threading.local()
+    engines: List[engine.InProcessEngine] = []
+    # Item traces by index, ended by the worker once the item left it
+    item_traces: Dict[int, tracing.ItemTrace] = {}
+
+    workers = controller.workers if controller else max_workers
+    run.post_log(
+        "Downloading {} video(s) with {} parallel worker(s)".format(total, min(workers, total))
+    )
+
+    def item_finished(item: scheduler.PlaylistItem) -> None:
+        if tracer is not None:
+            with finished_lock:
+                trace = item_traces.pop(item.index, None)
+            if trace is not None:
+                trace.close(item.state)
+        if item.state == scheduler.DOWNLOADED:
+            return
+        if on_item_state is not None and item.state in _JOURNAL_STATES:
+            on_item_state(item.video_id, _JOURNAL_STATES[item.state])
+        with finished_lock:
+            finished[0] += 1
+            done = finished[0]
+        if item.state == scheduler.FAILED:
+            run.post_log("✗ [#{}] Failed: {}".format(item.index, item.title))
+        if item.state != scheduler.CANCELLED:
+            run.post_progress(done / total, "Video {}/{}".format(done, total))
+
+    def transcode_finished(task: pipeline.TranscodeTask, success: bool) -> None:
+        item = task.item
+        if success:
+            item.state = scheduler.DONE
+            if download_archive is not None:
+                download_archive.record(item.video_id, task.target)
+        elif run.download_stopped.is_set():
+            item.state = scheduler.CANCELLED
+        else:
+            item.state = scheduler.FAILED
+        # Stopped items stay staged; an app that is closing resumes them later
+        if item.state != scheduler.CANCELLED:
+            task.remove_staged()
+        item_finished(item)
+
+    def transcode(task: pipeline.TranscodeTask) -> bool:
+        with tracing.span(tracer, tracing.CONVERT, tracing.ITEM, item="#{}".format(task.item.index)) as convert:
+            started = time.monotonic()
+            success = _transcode(run, task)
+            convert.end(success=success)
+        if success and download_metrics is not None:
+            download_metrics.transcode_seconds.observe(time.monotonic() - started)
+        return success
+
+    def measure_event(item: scheduler.PlaylistItem) -> Callable[[events.DownloadEvent], None]:
+        def on_event(event: events.DownloadEvent) -> None:
+            if isinstance(event, events.Progress) and event.speed_bps:
+                controller.record(item.index, event.speed_bps)
+            elif isinstance(event, events.ItemError):
+                controller.record_error(event.message)
+            elif isinstance(event, events.LogLine):
+                # Retried fragments and timeouts show up as warnings first
+                controller.record_error(event.text)
+        return on_event
+
+    def workers_changed(count: int) -> None:
+        pool.set_limit(count)
+        run.post_log("📶 Adjusting to {} parallel download(s)".format(count))
+
+    def download_item(item: scheduler.PlaylistItem) -> str:
+        if run.download_cancel_requested.is_set():
+            return scheduler.CANCELLED
+        if on_item_state is not None:
+            on_item_state(item.video_id, journal.DOWNLOADING)
+
+        prefix = "{} - ".format(str(item.index).zfill(index_width)) if index_width else ""
+        output_dir = staging_root if transcoder else download_path
+        # The in-process engine is shared between items, so it always fetches the cover
+        cover = None
+        if thumbnail_store is not None and (transcoder or backend != engine.ENGINE_INPROCESS):
+            cover = thumbnail_store.get(item.video_id)
+        processor = _OutputProcessor(
+            run,
+            playlist_info,
+            prefix="[#{}] ".format(item.index),
+            show_progress=False,
+            download_archive=None if transcoder else download_archive,
+            on_event=measure_event(item) if controller else None,
+            profile=profile,
+            thumbnail_store=thumbnail_store if cover is None and not transcoder else None,
+            tracer=tracer,
+            download_metrics=download_metrics,
+        )
+        trace = processor.start_trace("#{}".format(item.index), video_id=item.video_id)
+        if trace is not None:
+            with finished_lock:
+                item_traces[item.index] = trace
+        processor.current_video_id = item.video_id
+        tuning = controller.current() if controller else None
+        processor.current_video_title = item.title
+
+        if backend == engine.ENGINE_INPROCESS:
+            # Each worker reuses one YoutubeDL instance for all of its items
+            ydl_engine = getattr(worker_state, "engine", None)
+            if ydl_engine is None:
+                ydl_engine = engine.InProcessEngine(
+                    os.path.join(output_dir, "%(ytmp3_prefix|)s%(title)s.%(ext)s"),
+                    processor.handle_event,
+                    stop_event=run.download_cancel_requested,
+                    use_auth=use_auth,
+                    auth_browser=auth_browser,
+                    extract_audio=transcoder is None,
+                    download_archive=archive_file,
+                    rate_limiter=budget.consume if budget else None,
+                    profile=profile,
+                    keep_thumbnail=thumbnail_store is not None,
+                    embed_thumbnail=embed_thumbnail,
+                )
+                worker_state.engine = ydl_engine
+                with finished_lock:
+                    engines.append(ydl_engine)
+            ydl_engine.on_event = processor.handle_event
+            if tuning:
+                ydl_engine.tune(tuning.ydl_options())
+            returncode = ydl_engine.download(
+                item.url, extra_info={"ytmp3_prefix": prefix}, fetch_thumbnail=cover is None
+            )
+        else:
+            output_template = os.path.join(output_dir, prefix + "%(title)s.%(ext)s")
+            with cookies.lease(use_auth, auth_browser) as cookie_lease, bandwidth.lease(budget) as rate_lease:
+                cmd = _base_command(
+                    use_auth, auth_browser, extract_audio=transcoder is None, download_archive=archive_file,
+                    cookie_args=cookie_lease.args, tuning_args=tuning.command_args() if tuning else None,
+                    rate_args=rate_lease.args, profile=profile, fetch_thumbnail=cover is None,
+                    keep_thumbnail=thumbnail_store is not None, embed_thumbnail=embed_thumbnail,
+                )
+                cmd.extend(["-o", output_template, item.url])
+                logger.debug(f"Executing command for item #{item.index}: {' '.join(cmd)}")
+
+                process = _start_process(run, cmd)
+                try:
+                    for line in process.stdout:
+                        processor.process_line(line)
+                finally:
+                    _finish_process(run, process)
+            returncode = process.returncode
+        processor.end_phase()
+        if controller:
+            controller.item_finished(item.index)
+
+        if run.download_stopped.is_set():
+            return scheduler.DONE if processor.successful_downloads and not transcoder else scheduler.CANCELLED
+
+        if transcoder:
+            source, staged_thumbnail = pipeline.find_staged_files(staging_root, prefix)
+            staged = [path for path in (source, staged_thumbnail) if path]
+            if returncode != 0 or not source:
+                item.error = processor.last_error or "yt-dlp exited with code {}".format(returncode)
+                pipeline.remove_staged_files(staged)
+                return scheduler.FAILED
+            if cover is None and staged_thumbnail and thumbnail_store is not None:
+                cover = thumbnail_store.add_file(item.video_id, staged_thumbnail)
+            thumbnail = cover or staged_thumbnail
+            # Staged files are not final outputs, so cleanup must not track them
+            with run.download_lock:
+                run.active_download_targets.discard(processor.current_target)
+            stem = os.path.splitext(os.path.basename(source))[0]
+            extension, audio_args, cover = profile.output_for(source)
+            target = os.path.join(download_path, stem + extension)
+            task = pipeline.TranscodeTask(item, source, target, thumbnail if cover else None, audio_args, staged)
+            if not transcoder.submit(task):
+                return scheduler.CANCELLED
+            return scheduler.DOWNLOADED
+
+        if processor.successful_downloads:
+            if cover and processor.completed_path and embed_thumbnail:
+                processor.trace_phase(tracing.EMBED)
+                _embed_cover(processor.completed_path, cover)
+            return scheduler.DONE
+        if processor.skipped_downloads:
+            return scheduler.SKIPPED
+        item.error = processor.last_error or "yt-dlp exited with code {}".format(returncode)
+        return scheduler.FAILED
+
+    try:
+        if use_pipeline:
+            staging_root = pipeline.staging_dir(download_path, staging_id)
+            transcoder = pipeline.TranscodePipeline(
+                transcode,
+                stop_event=run.download_cancel_requested,
+                on_finished=transcode_finished,
+            )
+            transcoder.start()
+            run.post_log(
+                "Converting to MP3 with {} parallel encoder(s)".format(transcoder.workers)
+            )
+        run.post_log("")
+
+        pool = scheduler.PlaylistScheduler(
+            items,
+            download_item,
+            max_workers=max_workers,
+            stop_event=run.download_cancel_requested,
+            on_item_finished=item_finished,
+            limit=workers,
+        )
+        if controller:
+            controller.on_workers_changed = workers_changed
+        pool.run()
+    finally:
+        for ydl_engine in engines:
+            ydl_engine.close()
+        if transcoder:
+            transcoder.close()
+        if staging_root and staging_id is None:
+            shutil.rmtree(staging_root, ignore_errors=True)
+
+    # Items still marked DOWNLOADED never reached a transcoder
+    for item in items:
+        if item.state == scheduler.DOWNLOADED:
+            item.state = scheduler.CANCELLED
+    return items
+
+
+def _remember_throughput(
+    run: JobRun,
+    store: throughput.ThroughputStore,
+    network: str,
+    controller: throughput.ThroughputController,
+) -> None:
+    """Save the best settings the controller found for this network"""
+    best = controller.best_profile()
+    if best is None:
+        return
+    store.put(network, best)
+    run.post_log("📶 Best throughput {} with {} parallel download(s) and {} fragment(s)".format(
+        events.format_speed(best.throughput), best.workers, best.fragments
+    ))
+    logger.info(f"Learned throughput settings for network {network}: {best!r}")
+
+
+def _report_summary(
+    run: JobRun,
+    successful_downloads: int,
+    skipped_downloads: int,
+    failed_downloads: int,
+    failed_videos: List[Dict[str, str]],
+    returncode: int,
+    download_metrics: Optional[metrics.DownloadMetrics] = None,
+) -> None:
+    """Log the end-of-run summary and report the outcome"""
+    run.record_summary(successful_downloads, skipped_downloads, failed_downloads)
+    if download_metrics is not None:
+        download_metrics.record_outcomes(
+            successful_downloads, skipped_downloads, [failed['line'] for failed in failed_videos]
+        )
+    if run.download_stopped.is_set():
+        run.post_log("")
+        run.post_log("=" * 60)
+        if successful_downloads > 0:
+            msg = "ℹ Download stopped. Files completed before stopping: {}"
+            run.post_log(msg.format(successful_downloads))
+            logger.info(f"Download stopped with {successful_downloads} files completed")
+        else:
+            run.post_log("ℹ Download stopped. No files were completed.")
+            logger.info("Download stopped with no files completed")
+        if skipped_downloads > 0:
+            run.post_log("⏭ Skipped (already existed): {}".format(skipped_downloads))
+        return
+
+    if successful_downloads > 0:
+        run.post_progress(fraction=1.0)
+        run.post_log("")
+        run.post_log("=" * 60)
+
+        if failed_downloads > 0:
+            run.post_progress(text="Completed with warnings")
+            msg = "✓ Download completed: {} file(s) downloaded"
+            run.post_log(msg.format(successful_downloads))
+            if skipped_downloads > 0:
+                msg = "⏭ Skipped (already existed): {}"
+                run.post_log(msg.format(skipped_downloads))
+            msg = "⚠ Warning: {} video(s) unavailable or failed"
+            run.post_log(msg.format(failed_downloads))
+            logger.warning(
+                f"Download completed with {successful_downloads} successes, "
+                f"{skipped_downloads} skipped, {failed_downloads} failures"
+            )
+
+            if failed_videos:
+                run.post_log("")
+                run.post_log("Failed videos:")
+                run.post_log("-" * 60)
+                for i, failed in enumerate(failed_videos, 1):
+                    run.post_log("{}. {}".format(i, failed['video_context']))
+                    run.post_log("   Error: {}".format(failed['line']))
+                run.post_log("-" * 60)
+
+            run.report(
+                "Download completed!\n\n✓ {} file(s) downloaded\n"
+                "⚠ {} video(s) unavailable".format(successful_downloads, failed_downloads)
+            )
+            run.notify(
+                "Download completed with warnings",
+                "{} file(s) downloaded, {} unavailable".format(
+                    successful_downloads, failed_downloads
+                ),
+                "dialog-warning"
+            )
+        else:
+            run.post_progress(text="Completed!")
+            msg = "✓ Download completed successfully: {} file(s)"
+            run.post_log(msg.format(successful_downloads))
+            if skipped_downloads > 0:
+                msg = "⏭ Skipped (already existed): {}"
+                run.post_log(msg.format(skipped_downloads))
+            logger.info(
+                f"Download completed successfully: {successful_downloads} files, "
+                f"{skipped_downloads} skipped"
+            )
+            run.report(
+                "Download completed successfully!\n\n{} file(s) downloaded".format(
+                    successful_downloads
+                )
+            )
+            run.notify(
+                "Download completed!",
+                "{} file(s) downloaded successfully".format(successful_downloads),
+                "emblem-default"
+            )
+    elif returncode == 0:
+        run.post_progress(1.0, "Completed!")
+        run.post_log("")
+        run.post_log("=" * 60)
+        run.post_log("✓ Process completed")
+        if skipped_downloads > 0:
+            run.post_log("⏭ Skipped (already existed): {}".format(skipped_downloads))
+        logger.info("Process completed with return code 0 but no files downloaded")
+        run.report("Process completed!")
+        run.notify(
+            "Process completed",
+            "The download process has finished",
+            "dialog-information"
+        )
+    else:
+        run.post_progress(text="Error")
+        run.post_log("")
+        msg = "✗ Error: Could not download any files (code {})"
+        run.post_log(msg.format(returncode))
+        logger.error(f"Download failed with return code {returncode}")
+        run.report(
+            "Error: Could not download any files.\nCheck the log for more details.", error=True
+        )
+
 
 def download_thread(
-    window: YouTubeMp3Downloader,
+    run: JobRun,
     url: str,
     url_type: str,
     download_path: str,
     use_auth: bool,
     auth_browser: str = "firefox",
     playlist_items: Optional[str] = None,
+    playlist_info: Optional[Dict[str, str]] = None,
+    max_workers: int = 1,
+    use_pipeline: bool = False,
+    backend: str = engine.ENGINE_SUBPROCESS,
+    download_archive: Optional[archive.DownloadArchive] = None,
+    library_index: Optional[library.LibraryIndex] = None,
+    job_journal: Optional[journal.JobJournal] = None,
+    job_id: Optional[str] = None,
+    finish_job: bool = True,
+    throughput_store: Optional[throughput.ThroughputStore] = None,
+    bandwidth_budget: Optional[bandwidth.BandwidthBudget] = None,
+    output_profile: str = profiles.DEFAULT_PROFILE,
+    thumbnail_store: Optional[thumbnails.ThumbnailStore] = None,
+    trace_dir: Optional[str] = None,
+    profile_parser: bool = False,
+    download_metrics: Optional[metrics.DownloadMetrics] = None,
 ) -> None:
-    """Run yt-dlp in a separate thread"""
+    """Run yt-dlp in a separate thread
+
+    ``finish_job`` is False when more runs of the same journal job follow,
+    as with round-robin queue turns. With a ``throughput_store`` playlists
+    are downloaded adaptively: up to ``max_workers`` parallel downloads and
+    the fragment settings follow the measured speed, and the best settings
+    are remembered for the current network. ``bandwidth_budget`` is shared
+    by every running job and splits one rate limit between their downloads.
+    ``output_profile`` names the profile the audio is saved in, and covers
+    are kept in the ``thumbnail_store`` so they are only fetched once.
+    With a ``trace_dir`` the stages of the job and the phases of every item
+    are saved there as a Chrome trace, plus a cProfile of the output parser
+    with ``profile_parser``. ``download_metrics`` is shared by every job and
+    counts the bytes, outcomes and timings of this one.
+    """
     logger.info(f"Download thread started for {url_type}: {url}")
+    tracer = tracing.Tracer.for_job(trace_dir, url, profile_parser) if trace_dir else None
+    job_span = tracing.span(tracer, "job", tracing.JOB, url=url, type=url_type)
 
     try:
         # Validate download path
@@ -40,419 +1198,197 @@ def download_thread(
             logger.error(f"Download path not writable: {download_path}")
             raise ValidationError(f"Download path is not writable: {download_path}")
 
-        playlist_info = {}
-        should_fetch_playlist_info = ((url_type == "Playlist") or use_auth) and not playlist_items
+        if backend == engine.ENGINE_INPROCESS and not engine.is_available():
+            logger.warning("yt-dlp Python package not available, using the yt-dlp command")
+            run.post_log("⚠ Built-in yt-dlp engine not available, using the yt-dlp command")
+            backend = engine.ENGINE_SUBPROCESS
+
+        if library_index is not None and library_index.folder != os.path.normpath(os.path.abspath(download_path)):
+            library_index = None
+
+        profile = profiles.get_profile(output_profile)
+        # Asking the yt-dlp command for mutagen starts a process, so it is done
+        # once here rather than by every worker
+        embed_thumbnail = profile.embeds_thumbnail(in_process=backend == engine.ENGINE_INPROCESS)
+        playlist_info = dict(playlist_info or {})
+        network = throughput.network_id() if throughput_store is not None else None
+        learned = throughput_store.get(network) if throughput_store is not None and network else None
+        # A yt-dlp process keeps its bandwidth share until it exits, so limited
+        # playlists run one process per video and each takes a fresh share
+        limited = bandwidth_budget is not None and bandwidth_budget.is_limited and backend == engine.ENGINE_SUBPROCESS
+        parallel = (max_workers > 1 or throughput_store is not None or limited) and url_type == "Playlist"
+        should_fetch_playlist_info = not playlist_info and (
+            ((parallel or use_pipeline) and url_type == "Playlist")
+            or (((url_type == "Playlist") or use_auth) and not playlist_items)
+        )
         if should_fetch_playlist_info:
-            try:
-                GLib.idle_add(window.log_message, "Getting playlist information...")
-                logger.debug("Fetching playlist information...")
-                info_cmd = [
-                    "yt-dlp",
-                    "--flat-playlist",
-                    "--print",
-                    "%(id)s:::%(playlist_index|)s%(playlist_index& - |)s%(title)s",
-                ]
-                if use_auth:
-                    info_cmd.extend(["--cookies-from-browser", auth_browser])
-                info_cmd.append(url)
-
-                info_process = subprocess.run(
-                    info_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                if info_process.returncode == 0:
-                    for line in info_process.stdout.strip().split('\n'):
-                        if ':::' in line:
-                            parts = line.split(':::', 1)
-                            if len(parts) == 2:
-                                video_id = parts[0].strip()
-                                title = parts[1].strip()
-                                playlist_info[video_id] = title
-                    GLib.idle_add(
-                        window.log_message,
-                        "✓ Playlist information obtained: {} videos".format(len(playlist_info))
-                    )
-                    GLib.idle_add(window.log_message, "")
-                    logger.info(f"Playlist info retrieved: {len(playlist_info)} videos")
-                else:
-                    logger.warning(f"Failed to get playlist info, return code: {info_process.returncode}")
-            except subprocess.TimeoutExpired:
-                logger.warning("Playlist info fetch timed out after 60 seconds")
-                GLib.idle_add(window.log_message, "⚠ Playlist info fetch timed out, continuing anyway")
-                GLib.idle_add(window.log_message, "")
-            except subprocess.SubprocessError as e:
-                logger.warning(f"Subprocess error getting playlist info: {e}")
-                GLib.idle_add(window.log_message, "⚠ Could not get playlist info: {}".format(str(e)))
-                GLib.idle_add(window.log_message, "")
-            except Exception as e:
-                logger.warning(f"Unexpected error getting playlist info: {e}")
-                GLib.idle_add(window.log_message, "⚠ Could not get playlist info: {}".format(str(e)))
-                GLib.idle_add(window.log_message, "")
-
-        if window.download_cancel_requested.is_set():
-            GLib.idle_add(window.log_message, "")
-            GLib.idle_add(window.log_message, "✓ Download cancelled before starting")
+            with tracing.span(tracer, "fetch playlist info"):
+                playlist_info = _fetch_playlist_info(run, url, use_auth, auth_browser, backend)
+
+        if run.download_cancel_requested.is_set():
+            run.post_log("")
+            run.post_log("✓ Download cancelled before starting")
             logger.info("Download cancelled by user before starting")
             return
 
-        output_template = str(Path(download_path) / "%(playlist_index|)s%(playlist_index& - |)s%(title)s.%(ext)s")
-        cmd = [
-            "yt-dlp",
-            "-x",
-            "--audio-format", "mp3",
-            "--postprocessor-args", "ffmpeg:-b:a 320k",
-            "--embed-thumbnail",
-            "--add-metadata",
-            "--yes-playlist",
-            "--ignore-errors",
-            "--retries", "3",
-            "--fragment-retries", "3",
-            "--socket-timeout", "30",
-            "-o", output_template,
-        ]
+        # Journal the job before any item starts so it can be resumed after a crash
+        if job_journal is not None and job_id is None:
+            job_id = job_journal.begin(
+                url, url_type, download_path, use_auth, auth_browser, playlist_info, playlist_items
+            )
 
-        if playlist_items:
-            cmd.extend(["--playlist-items", playlist_items])
-            logger.info(f"Downloading selected playlist items: {playlist_items}")
+        def on_item_state(video_id: str, state: str) -> None:
+            run.record_item(video_id, state)
+            if job_journal is not None and job_id is not None:
+                job_journal.mark(job_id, video_id, state)
 
         if use_auth:
-            cmd.extend(["--cookies-from-browser", auth_browser])
             browser_name = auth_browser.capitalize()
-            GLib.idle_add(window.log_message, "🔐 Authentication enabled: using {} cookies".format(browser_name))
-            GLib.idle_add(window.log_message, "   (Make sure you are logged into YouTube in {})".format(browser_name))
-            GLib.idle_add(window.log_message, "")
+            run.post_log("🔐 Authentication enabled: using {} cookies".format(browser_name))
+            run.post_log("   (Make sure you are logged into YouTube in {})".format(browser_name))
+            run.post_log("")
             logger.info("Using %s cookies for authentication", browser_name)
 
-        cmd.append(url)
-
-        GLib.idle_add(window.log_message, "Running: {}".format(' '.join(cmd)))
-        GLib.idle_add(window.log_message, "")
-        logger.debug(f"Executing command: {' '.join(cmd)}")
-
-        try:
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-        except (OSError, subprocess.SubprocessError) as e:
-            logger.error(f"Failed to start yt-dlp process: {e}")
-            raise DownloadError(f"Could not start download process: {e}") from e
-
-        with window.download_lock:
-            window.current_process = process
-        logger.debug(f"Download process started with PID: {process.pid}")
-
-        current_video_title = ""
-        successful_downloads = 0
-        failed_downloads = 0
-        skipped_downloads = 0
-        skipped_videos = []
-        failed_videos = []
-        current_video_index = 0
-        total_videos = 0
-
-        for line in process.stdout:
-            line = line.strip()
-            if not line:
-                continue
-
-            if line.startswith("[TITLE]"):
-                current_video_title = line.replace("[TITLE]", "", 1)
-                continue
-
-            if "[download] Downloading item" in line or "[download] Downloading video" in line:
-                try:
-                    import_match = re.search(r'Downloading (?:item|video) (\d+) of (\d+)', line)
-                    if import_match:
-                        current_video_index = int(import_match.group(1))
-                        total_videos = int(import_match.group(2))
-                        if not current_video_title:
-                            current_video_title = "Video #{}".format(current_video_index)
-                except (ValueError, AttributeError) as e:
-                    logger.debug(f"Could not parse video index from line: {e}")
-
-            GLib.idle_add(window.log_message, line)
-
-            if "[download] Destination:" in line:
-                try:
-                    window.current_downloading_file = line.split("[download] Destination:")[1].strip()
-                    window.current_download_original = window.current_downloading_file
-                    with window.download_lock:
-                        window.active_download_targets.add(window.current_download_original)
-
-                    filename = os.path.basename(window.current_downloading_file)
-                    current_video_title = os.path.splitext(filename)[0]
-
-                    # Duplicate detection: check if MP3 already exists
-                    base, _ = os.path.splitext(window.current_downloading_file)
-                    existing_mp3 = base + ".mp3"
-                    if os.path.isfile(existing_mp3) and os.path.getsize(existing_mp3) > 1024:
-                        mp3_name = os.path.basename(existing_mp3)
-                        GLib.idle_add(window.log_message, "⚠ Already exists, will be overwritten: {}".format(mp3_name))
-                        logger.info(f"Duplicate detected: {mp3_name}")
-                except (IndexError, AttributeError) as e:
-                    logger.debug(f"Could not parse destination from line: {e}")
-
-            if "has already been downloaded" in line:
-                skipped_downloads += 1
-                video_name = current_video_title or "Unknown"
-                skipped_videos.append(video_name)
-                GLib.idle_add(window.log_message, "⏭ Skipped (already exists): {}".format(video_name))
-                logger.info(f"Skipped duplicate: {video_name}")
-                if window.current_download_original:
-                    with window.download_lock:
-                        window.active_download_targets.discard(window.current_download_original)
-                window.current_downloading_file = None
-                window.current_download_original = None
-                current_video_title = ""
-
-            if "Deleting original file" in line:
-                successful_downloads += 1
-                if window.current_download_original:
-                    with window.download_lock:
-                        window.active_download_targets.discard(window.current_download_original)
-                window.current_downloading_file = None
-                window.current_download_original = None
-                current_video_title = ""
-
-            if "ERROR:" in line:
-                video_identifier = current_video_title
-
-                if not video_identifier:
-                    try:
-                        match = re.search(r'\[youtube\]\s+([A-Za-z0-9_-]+):', line)
-                        if match:
-                            video_id = match.group(1)
-                            video_identifier = playlist_info.get(video_id, "ID: {}".format(video_id))
-                        else:
-                            video_identifier = "Unknown"
-                    except (AttributeError, IndexError) as e:
-                        logger.debug(f"Could not extract video ID from error line: {e}")
-                        video_identifier = "Unknown"
-
-                error_info = {
-                    "line": line,
-                    "video_context": video_identifier
-                }
-
-                if any(keyword in line for keyword in [
-                    "Video unavailable",
-                    "This video has been",
-                    "Private video",
-                    "This video is no longer available",
-                    "removed by the uploader",
-                    "account associated with this video has been terminated",
-                    "Video is not available",
-                    "Members-only",
-                    "Join this channel to get access",
-                    "This live stream recording is not available"
-                ]):
-                    failed_downloads += 1
-                    failed_videos.append(error_info)
-                    if window.current_download_original:
-                        with window.download_lock:
-                            window.active_download_targets.discard(window.current_download_original)
-                    window.current_downloading_file = None
-                    window.current_download_original = None
-                    current_video_title = ""
-
-            if "[download] Downloading item" in line or "[download] Downloading video" in line:
-                if total_videos > 0:
-                    playlist_status = "Video {}/{}".format(current_video_index, total_videos)
-                    GLib.idle_add(window.progress_bar.set_text, playlist_status)
-                else:
-                    GLib.idle_add(window.progress_bar.set_text, "Downloading playlist...")
-
-            if "%" in line and "[download]" in line:
-                try:
-                    parts = line.split()
-                    percent = None
-                    speed = None
-                    eta = None
-                    for i, part in enumerate(parts):
-                        if "%" in part:
-                            try:
-                                percent = float(part.replace("%", ""))
-                            except ValueError:
-                                pass
-                        if part == "at" and i + 1 < len(parts):
-                            speed = parts[i + 1]
-                        if part == "ETA" and i + 1 < len(parts):
-                            eta = parts[i + 1]
-
-                    if percent is not None:
-                        GLib.idle_add(window.progress_bar.set_fraction, percent / 100)
-                        if total_videos > 0:
-                            progress_text = "Video {}/{} - {:.1f}%".format(current_video_index, total_videos, percent)
-                        else:
-                            progress_text = "{:.1f}%".format(percent)
-                        if speed:
-                            progress_text += " | {}".format(speed)
-                        if eta:
-                            progress_text += " | ETA {}".format(eta)
-                        GLib.idle_add(window.progress_bar.set_text, progress_text)
-                except (ValueError, IndexError) as e:
-                    logger.debug(f"Could not parse progress: {e}")
+        if profile.name != profiles.DEFAULT_PROFILE:
+            run.post_log("🎧 Saving audio as: {}".format(profile.label))
 
-        try:
-            process.wait(timeout=30)
-        except subprocess.TimeoutExpired:
-            logger.warning("Process did not exit after stdout closed, killing")
-            process.kill()
-            process.wait(timeout=10)
-        logger.info(f"Download process completed with return code: {process.returncode}")
-
-        if window.download_stopped.is_set():
-            GLib.idle_add(window.log_message, "")
-            GLib.idle_add(window.log_message, "=" * 60)
-            if successful_downloads > 0:
-                msg = "ℹ Download stopped. Files completed before stopping: {}"
-                GLib.idle_add(window.log_message, msg.format(successful_downloads))
-                logger.info(f"Download stopped with {successful_downloads} files completed")
-            else:
-                GLib.idle_add(window.log_message, "ℹ Download stopped. No files were completed.")
-                logger.info("Download stopped with no files completed")
-            if skipped_downloads > 0:
-                GLib.idle_add(window.log_message, "⏭ Skipped (already existed): {}".format(skipped_downloads))
-            return
+        rate = bandwidth_budget.rate() if bandwidth_budget is not None else None
+        if rate is not None:
+            run.post_log("🚦 Bandwidth limited to {}, shared by all downloads".format(events.format_speed(rate)))
+            run.post_log("")
 
-        if successful_downloads > 0:
-            GLib.idle_add(window.progress_bar.set_fraction, 1.0)
-            GLib.idle_add(window.log_message, "")
-            GLib.idle_add(window.log_message, "=" * 60)
-
-            if failed_downloads > 0:
-                GLib.idle_add(window.progress_bar.set_text, "Completed with warnings")
-                msg = "✓ Download completed: {} file(s) downloaded"
-                GLib.idle_add(window.log_message, msg.format(successful_downloads))
-                if skipped_downloads > 0:
-                    msg = "⏭ Skipped (already existed): {}"
-                    GLib.idle_add(window.log_message, msg.format(skipped_downloads))
-                msg = "⚠ Warning: {} video(s) unavailable or failed"
-                GLib.idle_add(window.log_message, msg.format(failed_downloads))
-                logger.warning(
-                    f"Download completed with {successful_downloads} successes, "
-                    f"{skipped_downloads} skipped, {failed_downloads} failures"
-                )
+        items: List[scheduler.PlaylistItem] = []
+        archived = 0
+        if url_type == "Playlist" and (parallel or use_pipeline) and playlist_info:
+            selected = utils.parse_playlist_items(playlist_items) if playlist_items else None
+            items = scheduler.build_items(playlist_info, selected)
+        elif url_type != "Playlist" and use_pipeline:
+            _, match = utils.classify_youtube_url(url)
+            if match:
+                items = [scheduler.PlaylistItem(1, match.group(1), url)]
+                playlist_info = {}
+        elif download_archive is not None:
+            # Sequential download: leave archived videos out of the selection
+            wanted: List[scheduler.PlaylistItem] = []
+            if url_type == "Playlist" and playlist_info:
+                selected = utils.parse_playlist_items(playlist_items) if playlist_items else None
+                wanted = scheduler.build_items(playlist_info, selected)
+            elif url_type != "Playlist":
+                _, match = utils.classify_youtube_url(url)
+                if match:
+                    wanted = [scheduler.PlaylistItem(1, match.group(1), url)]
+            with tracing.span(tracer, "skip known", items=len(wanted)):
+                remaining = _skip_known(run, download_archive, library_index, download_path, wanted, on_item_state)
+            archived = len(wanted) - len(remaining)
+            if wanted and not remaining:
+                # Nothing left to download, only the summary
+                items = wanted
+            elif archived:
+                playlist_items = utils.compress_ranges(item.index for item in remaining)
 
-                if failed_videos:
-                    GLib.idle_add(window.log_message, "")
-                    GLib.idle_add(window.log_message, "Failed videos:")
-                    GLib.idle_add(window.log_message, "-" * 60)
-                    for i, failed in enumerate(failed_videos, 1):
-                        GLib.idle_add(window.log_message, "{}. {}".format(i, failed['video_context']))
-                        GLib.idle_add(window.log_message, "   Error: {}".format(failed['line']))
-                    GLib.idle_add(window.log_message, "-" * 60)
-
-                GLib.idle_add(
-                    window.show_success_dialog,
-                    "Download completed!\n\n✓ {} file(s) downloaded\n"
-                    "⚠ {} video(s) unavailable".format(successful_downloads, failed_downloads)
-                )
-                GLib.idle_add(
-                    window.send_notification,
-                    "Download completed with warnings",
-                    "{} file(s) downloaded, {} unavailable".format(
-                        successful_downloads, failed_downloads
-                    ),
-                    "dialog-warning"
-                )
-            else:
-                GLib.idle_add(window.progress_bar.set_text, "Completed!")
-                msg = "✓ Download completed successfully: {} file(s)"
-                GLib.idle_add(window.log_message, msg.format(successful_downloads))
-                if skipped_downloads > 0:
-                    msg = "⏭ Skipped (already existed): {}"
-                    GLib.idle_add(window.log_message, msg.format(skipped_downloads))
-                logger.info(
-                    f"Download completed successfully: {successful_downloads} files, "
-                    f"{skipped_downloads} skipped"
-                )
-                GLib.idle_add(
-                    window.show_success_dialog,
-                    "Download completed successfully!\n\n{} file(s) downloaded".format(
-                        successful_downloads
+        if items:
+            with tracing.span(tracer, "skip known", items=len(items)):
+                pending = _skip_known(run, download_archive, library_index, download_path, items, on_item_state)
+            if pending:
+                with tracing.span(tracer, "export archive"):
+                    archive_file = _export_archive(download_archive, download_path, library_index)
+                controller = None
+                if throughput_store is not None and parallel:
+                    # The configured workers are the ceiling; what worked on this
+                    # network before only seeds the fragment settings
+                    start = throughput.TuningProfile(workers=max_workers)
+                    if learned is not None:
+                        start.fragments, start.chunk_mb = learned.fragments, learned.chunk_mb
+                    controller = throughput.ThroughputController(max_workers, start)
+                # The controller may run fewer workers than its pool and adjusts them
+                expected = min(controller.workers if controller else max_workers, len(pending))
+                with tracing.span(tracer, "download", items=len(pending)), \
+                        bandwidth.expect(bandwidth_budget, expected):
+                    _download_scheduled(
+                        run, download_path, use_auth, auth_browser, playlist_info, pending,
+                        controller.max_workers if controller else max_workers,
+                        use_pipeline, backend, download_archive, archive_file, on_item_state, controller,
+                        bandwidth_budget, profile, thumbnail_store, tracer, download_metrics, job_id,
+                        embed_thumbnail,
                     )
-                )
-                GLib.idle_add(
-                    window.send_notification,
-                    "Download completed!",
-                    "{} file(s) downloaded successfully".format(successful_downloads),
-                    "emblem-default"
-                )
-        elif process.returncode == 0:
-            GLib.idle_add(window.progress_bar.set_fraction, 1.0)
-            GLib.idle_add(window.progress_bar.set_text, "Completed!")
-            GLib.idle_add(window.log_message, "")
-            GLib.idle_add(window.log_message, "=" * 60)
-            GLib.idle_add(window.log_message, "✓ Process completed")
-            logger.info("Process completed with return code 0 but no files downloaded")
-            GLib.idle_add(window.show_success_dialog, "Process completed!")
-            GLib.idle_add(
-                window.send_notification,
-                "Process completed",
-                "The download process has finished",
-                "dialog-information"
+                if controller is not None and network:
+                    _remember_throughput(run, throughput_store, network, controller)
+            failed_items = [item for item in items if item.state == scheduler.FAILED]
+            _report_summary(
+                run,
+                sum(1 for item in items if item.state == scheduler.DONE),
+                sum(1 for item in items if item.state == scheduler.SKIPPED),
+                len(failed_items),
+                [{"line": item.error or "", "video_context": item.title} for item in failed_items],
+                1 if failed_items else 0,
+                download_metrics,
             )
         else:
-            GLib.idle_add(window.progress_bar.set_text, "Error")
-            GLib.idle_add(window.log_message, "")
-            msg = "✗ Error: Could not download any files (code {})"
-            GLib.idle_add(window.log_message, msg.format(process.returncode))
-            logger.error(f"Download failed with return code {process.returncode}")
-            GLib.idle_add(
-                window.show_error_dialog,
-                "Error: Could not download any files.\nCheck the log for more details."
+            if parallel or use_pipeline:
+                run.post_log("⚠ Playlist entries unknown, downloading sequentially")
+            with tracing.span(tracer, "export archive"):
+                archive_file = _export_archive(download_archive, download_path, library_index)
+            with tracing.span(tracer, "download"), bandwidth.expect(bandwidth_budget, 1):
+                processor, returncode = _download_serial(
+                    run, url, download_path, use_auth, auth_browser, playlist_items, playlist_info, backend,
+                    download_archive, archive_file, on_item_state, learned, bandwidth_budget, profile,
+                    thumbnail_store, tracer, download_metrics, embed_thumbnail,
+                )
+            _report_summary(
+                run,
+                processor.successful_downloads,
+                processor.skipped_downloads + archived,
+                processor.failed_downloads,
+                processor.failed_videos,
+                returncode,
+                download_metrics,
             )
 
+        if backend == engine.ENGINE_INPROCESS and run.download_stopped.is_set() and not run.closing:
+            # There was no yt-dlp process for the stop button to kill and clean up after
+            with tracing.span(tracer, "cleanup"):
+                cleanup_partial_files(run)
+
     except ValidationError as e:
         logger.error(f"Validation error in download: {e}")
-        GLib.idle_add(window.log_message, "✗ Validation error: {}".format(str(e)))
-        GLib.idle_add(window.show_error_dialog, "Validation error:\n{}".format(str(e)))
-        GLib.idle_add(window.progress_bar.set_text, "Error")
+        run.post_log("✗ Validation error: {}".format(str(e)))
+        run.report("Validation error:\n{}".format(str(e)), error=True)
+        run.post_progress(text="Error")
     except DownloadError as e:
         logger.error(f"Download error: {e}")
-        GLib.idle_add(window.log_message, "✗ Download error: {}".format(str(e)))
-        GLib.idle_add(window.show_error_dialog, "Download error:\n{}".format(str(e)))
-        GLib.idle_add(window.progress_bar.set_text, "Error")
+        run.post_log("✗ Download error: {}".format(str(e)))
+        run.report("Download error:\n{}".format(str(e)), error=True)
+        run.post_progress(text="Error")
     except Exception as e:
         logger.error(f"Unexpected error in download thread: {e}", exc_info=True)
-        GLib.idle_add(window.log_message, "✗ Unexpected error: {}".format(str(e)))
-        GLib.idle_add(window.show_error_dialog, "Unexpected error:\n{}".format(str(e)))
-        GLib.idle_add(window.progress_bar.set_text, "Error")
+        run.post_log("✗ Unexpected error: {}".format(str(e)))
+        run.report("Unexpected error:\n{}".format(str(e)), error=True)
+        run.post_progress(text="Error")
     finally:
-        with window.download_lock:
-            window.current_process = None
-        window.current_downloading_file = None
-        window.current_download_original = None
+        # Closing the app leaves the job unfinished so it is offered again on startup
+        if job_journal is not None and job_id is not None and not run.closing:
+            if run.download_stopped.is_set():
+                job_journal.finish(job_id, journal.CANCELLED)
+                pipeline.remove_staging(download_path, job_id)
+            elif finish_job:
+                job_journal.finish(job_id, journal.COMPLETED)
+                pipeline.remove_staging(download_path, job_id)
+        job_span.end()
+        if tracer is not None:
+            trace_path = tracer.save()
+            if trace_path is not None:
+                run.post_log("🔬 Trace saved: {}".format(trace_path))
         logger.debug("Download thread cleanup completed")
+        run.finished()
 
-        def restore_download_button():
-            window.download_button.set_sensitive(True)
-            window.download_button.get_style_context().add_class("suggested-action")
-
-        def restore_stop_button():
-            window.stop_button.set_sensitive(False)
-            window.stop_button.get_style_context().remove_class("destructive-action")
 
-        GLib.idle_add(restore_download_button)
-        GLib.idle_add(restore_stop_button)
-        GLib.idle_add(window.copy_log_button.show)
-        GLib.idle_add(window._set_ui_sensitive, True)
-
-
-def cleanup_partial_files(window: YouTubeMp3Downloader) -> None:
+def cleanup_partial_files(run: JobRun) -> None:
     """Delete partial files left by yt-dlp when the download is stopped"""
     logger.info("Starting cleanup of partial files")
     try:
         files_deleted = 0
-        with window.download_lock:
-            targets = list(window.active_download_targets)
+        with run.download_lock:
+            targets = list(run.active_download_targets)
 
         logger.debug(f"Cleaning up {len(targets)} target(s)")
 
@@ -471,12 +1407,12 @@ def cleanup_partial_files(window: YouTubeMp3Downloader) -> None:
                         if os.path.isfile(candidate):
                             os.remove(candidate)
                             filename = os.path.basename(candidate)
-                            window.log_message("🗑 Deleted partial file: {}".format(filename))
+                            run.log_message("🗑 Deleted partial file: {}".format(filename))
                             logger.debug(f"Deleted: {filename}")
                             files_deleted += 1
                     except (OSError, PermissionError) as e:
                         logger.warning(f"Could not delete {candidate}: {e}")
-                        window.log_message("⚠ Could not delete {}: {}".format(os.path.basename(candidate), str(e)))
+                        run.log_message("⚠ Could not delete {}: {}".format(os.path.basename(candidate), str(e)))
 
                 # Clean up fragment files using glob
                 for wildcard in [f"{base}.f*", f"{base}.fragment*", f"{base}.frag*"]:
@@ -486,7 +1422,7 @@ def cleanup_partial_files(window: YouTubeMp3Downloader) -> None:
                                 if os.path.isfile(candidate):
                                     os.remove(candidate)
                                     filename = os.path.basename(candidate)
-                                    window.log_message("🗑 Deleted residual chunk: {}".format(filename))
+                                    run.log_message("🗑 Deleted residual chunk: {}".format(filename))
                                     logger.debug(f"Deleted chunk: {filename}")
                                     files_deleted += 1
                             except (OSError, PermissionError) as e:
@@ -500,40 +1436,41 @@ def cleanup_partial_files(window: YouTubeMp3Downloader) -> None:
                         if os.path.isfile(thumbnail):
                             os.remove(thumbnail)
                             filename = os.path.basename(thumbnail)
-                            window.log_message("🗑 Deleted residual thumbnail: {}".format(filename))
+                            run.log_message("🗑 Deleted residual thumbnail: {}".format(filename))
                             logger.debug(f"Deleted thumbnail: {filename}")
                             files_deleted += 1
                     except (OSError, PermissionError) as e:
                         logger.warning(f"Could not delete thumbnail {thumbnail}: {e}")
 
-                # Check for incomplete MP3 files
-                mp3_candidate = f"{base}.mp3"
-                try:
-                    if os.path.isfile(mp3_candidate):
-                        if os.path.getsize(mp3_candidate) < 1024:
-                            os.remove(mp3_candidate)
-                            filename = os.path.basename(mp3_candidate)
-                            window.log_message("🗑 Deleted incomplete MP3: {}".format(filename))
-                            logger.debug(f"Deleted incomplete MP3: {filename}")
-                            files_deleted += 1
-                except (OSError, PermissionError) as e:
-                    logger.warning(f"Could not process MP3 {mp3_candidate}: {e}")
+                # Check for incomplete output files of any profile
+                for extension in profiles.AUDIO_EXTENSIONS:
+                    audio_candidate = f"{base}{extension}"
+                    try:
+                        if os.path.isfile(audio_candidate) and audio_candidate != target:
+                            if os.path.getsize(audio_candidate) < 1024:
+                                os.remove(audio_candidate)
+                                filename = os.path.basename(audio_candidate)
+                                run.log_message("🗑 Deleted incomplete audio file: {}".format(filename))
+                                logger.debug(f"Deleted incomplete audio file: {filename}")
+                                files_deleted += 1
+                    except (OSError, PermissionError) as e:
+                        logger.warning(f"Could not process audio file {audio_candidate}: {e}")
 
             except Exception as file_error:
                 logger.error(f"Error cleaning target {target}: {file_error}")
-                window.log_message("⚠ Could not clean {}: {}".format(os.path.basename(target), str(file_error)))
+                run.log_message("⚠ Could not clean {}: {}".format(os.path.basename(target), str(file_error)))
 
-        with window.download_lock:
+        with run.download_lock:
             for target in targets:
-                window.active_download_targets.discard(target)
+                run.active_download_targets.discard(target)
 
         if files_deleted > 0:
-            window.log_message("✓ {} partial file(s) deleted".format(files_deleted))
+            run.log_message("✓ {} partial file(s) deleted".format(files_deleted))
             logger.info(f"Cleanup completed: {files_deleted} files deleted")
         else:
-            window.log_message("ℹ No partial files found to delete")
+            run.log_message("ℹ No partial files found to delete")
             logger.info("Cleanup completed: no files to delete")
 
     except Exception as e:
         logger.error(f"Error in cleanup_partial_files: {e}", exc_info=True)
-        window.log_message("⚠ Error cleaning partial files: {}".format(str(e)))
+        run.log_message("⚠ Error cleaning partial files: {}".format(str(e)))
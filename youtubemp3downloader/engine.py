@@ -0,0 +1,384 @@
+"""
+In-process yt-dlp engine for YouTube MP3 Downloader.
+
+Drives ``yt_dlp.YoutubeDL`` directly instead of spawning the ``yt-dlp``
+command for every job and item. One YoutubeDL instance (and its HTTP
+session) is reused across items, and progress is reported through
+``progress_hooks``/``postprocessor_hooks`` as typed events rather than
+scraped from stdout.
+
+The yt-dlp Python package is optional: when it cannot be imported the
+application keeps using the command-line backend.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import cookies
+from . import events
+from . import profiles
+from .exceptions import DownloadError
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Importing yt_dlp takes a large part of the application's startup, so it
+# is only imported once an engine is used
+_NOT_LOADED: Any = object()
+yt_dlp: Any = _NOT_LOADED
+
+ENGINE_SUBPROCESS = "subprocess"
+ENGINE_INPROCESS = "inprocess"
+
+EventCallback = Callable[[events.DownloadEvent], None]
+
+# Called with the bytes just received and the stop event; may block to slow the download
+RateLimiter = Callable[[int, threading.Event], Any]
+
+
+def _load_yt_dlp() -> Any:
+    """Import the yt_dlp package on first use; None if it is not installed."""
+    global yt_dlp
+    if yt_dlp is _NOT_LOADED:
+        try:
+            import yt_dlp as module
+        except ImportError:  # pragma: no cover - depends on the environment
+            module = None
+        yt_dlp = module
+    return yt_dlp
+
+
+def is_available() -> bool:
+    """Return True if the yt-dlp Python package can be used in-process."""
+    if yt_dlp is _NOT_LOADED:
+        return importlib.util.find_spec("yt_dlp") is not None
+    return yt_dlp is not None
+
+
+class _YdlLogger:
+    """Route yt-dlp messages to the application log and the event stream."""
+
+    def __init__(self, engine: InProcessEngine) -> None:
+        self.engine = engine
+
+    def debug(self, message: str) -> None:
+        # yt-dlp passes both debug and info messages here; info has no prefix
+        if message.startswith("[debug] "):
+            logger.debug(message)
+            return
+        if "has already been downloaded" in message:
+            path = message.split("[download] ", 1)[-1].replace(" has already been downloaded", "").strip()
+            self.engine._emit(events.LogLine(message))
+            self.engine._emit(events.Skipped(path or None))
+            return
+        if "has already been recorded in the archive" in message:
+            self.engine._emit(events.LogLine(message))
+            self.engine._emit(events.Skipped())
+            return
+        self.engine._emit(events.LogLine(message))
+
+    def info(self, message: str) -> None:
+        self.debug(message)
+
+    def warning(self, message: str) -> None:
+        self.engine._emit(events.LogLine("WARNING: {}".format(message)))
+
+    def error(self, message: str) -> None:
+        self.engine._emit(events.LogLine(message))
+        self.engine._emit(events.ItemError(message))
+
+
+class InProcessEngine:
+    """
+    A reusable yt_dlp.YoutubeDL instance reporting typed events.
+
+    Instances are not thread-safe; parallel workers each keep their own
+    engine and reuse it for every item they process.
+    """
+
+    def __init__(
+        self,
+        output_template: str,
+        on_event: EventCallback,
+        stop_event: Optional[threading.Event] = None,
+        use_auth: bool = False,
+        auth_browser: str = "firefox",
+        extract_audio: bool = True,
+        playlist_items: Optional[str] = None,
+        download_archive: Optional[str] = None,
+        tuning: Optional[Dict[str, Any]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        profile: Optional[profiles.OutputProfile] = None,
+        keep_thumbnail: bool = False,
+        embed_thumbnail: Optional[bool] = None,
+    ) -> None:
+        if _load_yt_dlp() is None:
+            raise DownloadError("The yt-dlp Python package is not installed")
+
+        self.on_event = on_event
+        self.stop_event = stop_event or threading.Event()
+        self.errors = 0
+        self._started_ids: set = set()
+        self.rate_limiter = rate_limiter
+        self._received: Dict[str, int] = {}
+
+        # Held until close(): YoutubeDL writes its cookie file back when closed
+        self._cookie_lease = cookies.lease(use_auth, auth_browser)
+        options = build_options(
+            output_template, use_auth, auth_browser, extract_audio, playlist_items, download_archive,
+            cookie_options=self._cookie_lease.options, profile=profile, keep_thumbnail=keep_thumbnail,
+            embed_thumbnail=embed_thumbnail,
+        )
+        # Items whose cover is already stored switch the thumbnail off in download()
+        self._write_thumbnail = options["writethumbnail"]
+        options.update(tuning or {})
+        options["logger"] = _YdlLogger(self)
+        options["progress_hooks"] = [self._progress_hook]
+        options["postprocessor_hooks"] = [self._postprocessor_hook]
+        try:
+            self._ydl = yt_dlp.YoutubeDL(options)
+        except Exception:
+            self._cookie_lease.release()
+            raise
+        logger.debug("In-process yt-dlp engine created")
+
+    def _emit(self, event: events.DownloadEvent) -> None:
+        if isinstance(event, events.ItemError):
+            self.errors += 1
+        try:
+            self.on_event(event)
+        except Exception as e:
+            logger.warning(f"Event handler failed for {event!r}: {e}")
+
+    def _check_stop(self) -> None:
+        if self.stop_event.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Download stopped by user")
+
+    def _progress_hook(self, status: Dict[str, Any]) -> None:
+        self._check_stop()
+        info = status.get("info_dict") or {}
+        video_id = info.get("id")
+
+        if video_id and video_id not in self._started_ids:
+            self._started_ids.add(video_id)
+            index = info.get("playlist_index") or info.get("playlist_autonumber")
+            total = info.get("n_entries") or info.get("playlist_count")
+            if index and total:
+                self._emit(events.ItemStart(int(index), int(total), video_id, info.get("title")))
+            filename = status.get("filename")
+            if filename:
+                self._emit(events.Destination(filename))
+
+        if status.get("status") == "downloading":
+            downloaded = status.get("downloaded_bytes") or 0
+            total_bytes = status.get("total_bytes") or status.get("total_bytes_estimate")
+            if total_bytes:
+                speed = status.get("speed")
+                self._emit(events.Progress(
+                    downloaded * 100.0 / total_bytes,
+                    events.format_speed(speed),
+                    events.format_eta(status.get("eta")),
+                    speed,
+                    downloaded,
+                ))
+            if self.rate_limiter is not None:
+                self._limit_rate(status)
+        elif status.get("status") == "finished":
+            self._received.pop(status.get("tmpfilename") or status.get("filename") or "", None)
+
+    def _limit_rate(self, status: Dict[str, Any]) -> None:
+        """Hand the bytes received since the last hook call to the rate limiter."""
+        key = status.get("tmpfilename") or status.get("filename") or ""
+        received = status.get("downloaded_bytes") or 0
+        delta = received - self._received.get(key, 0)
+        self._received[key] = received
+        if delta > 0:
+            self.rate_limiter(delta, self.stop_event)
+            self._check_stop()
+
+    def _postprocessor_hook(self, status: Dict[str, Any]) -> None:
+        # MoveFilesAfterDownload is the last step yt-dlp runs for every item
+        if status.get("status") == "finished" and status.get("postprocessor") == "MoveFilesAfterDownload":
+            info = status.get("info_dict") or {}
+            self._emit(events.PostprocessDone(info.get("filepath"), info.get("id")))
+
+    def tune(self, tuning: Dict[str, Any]) -> None:
+        """Change download options such as the fragment settings for the next items."""
+        self._ydl.params.update(tuning)
+
+    def download(
+        self,
+        url: str,
+        extra_info: Optional[Dict[str, Any]] = None,
+        fetch_thumbnail: bool = True,
+    ) -> int:
+        """
+        Download a video or playlist URL with the shared YoutubeDL instance.
+
+        Args:
+            url: Video or playlist URL
+            extra_info: Extra fields made available to the output template
+            fetch_thumbnail: False if the thumbnail store has the cover, which
+                the caller embeds itself
+
+        Returns:
+            0 on success, 1 if any error was reported
+        """
+        errors_before = self.errors
+        self._ydl.params["writethumbnail"] = self._write_thumbnail and fetch_thumbnail
+        try:
+            self._ydl.extract_info(url, download=True, extra_info=extra_info or {})
+        except yt_dlp.utils.DownloadCancelled:
+            logger.info("In-process download cancelled")
+            return 1
+        except yt_dlp.utils.DownloadError as e:
+            # Already reported through the logger
+            logger.debug(f"yt-dlp download error: {e}")
+            return 1
+        return 0 if self.errors == errors_before else 1
+
+    def close(self) -> None:
+        """Release the HTTP session and cookie jar held by YoutubeDL."""
+        try:
+            self._ydl.close()
+        except Exception as e:
+            logger.debug(f"Error closing YoutubeDL: {e}")
+        self._cookie_lease.release()
+
+
+def build_options(
+    output_template: str,
+    use_auth: bool = False,
+    auth_browser: str = "firefox",
+    extract_audio: bool = True,
+    playlist_items: Optional[str] = None,
+    download_archive: Optional[str] = None,
+    cookie_options: Optional[Dict[str, Any]] = None,
+    profile: Optional[profiles.OutputProfile] = None,
+    keep_thumbnail: bool = False,
+    fetch_thumbnail: bool = True,
+    embed_thumbnail: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Translate the application's yt-dlp command line into YoutubeDL options.
+
+    Args:
+        output_template: Output filename template
+        use_auth: Whether to load cookies from the browser
+        auth_browser: Browser to read cookies from
+        extract_audio: Extract the audio inside yt-dlp (False for the pipeline)
+        playlist_items: Optional ``--playlist-items`` specification
+        download_archive: Optional ``--download-archive`` file
+        cookie_options: Cookie options of a cookie lease, used instead of
+            reading the browser's cookies
+        profile: Output profile the audio is extracted to (320 kbps MP3 by default)
+        keep_thumbnail: Leave the embedded thumbnail next to the audio file,
+            for the thumbnail store
+        fetch_thumbnail: Download the thumbnail; False if the thumbnail store
+            already has the cover
+        embed_thumbnail: Whether yt-dlp can embed the cover, resolved once
+            per run; the profile is asked if None
+
+    Returns:
+        Options dictionary for yt_dlp.YoutubeDL
+    """
+    profile = profile or profiles.get_profile(profiles.DEFAULT_PROFILE)
+    if embed_thumbnail is None:
+        embed_thumbnail = profile.embeds_thumbnail(in_process=True)
+    embeds = extract_audio and embed_thumbnail
+    # The transcode stage embeds the cover itself; after extraction it is only
+    # worth fetching if yt-dlp embeds it or it is kept for the thumbnail store
+    write_thumbnail = fetch_thumbnail and (not extract_audio or embeds or keep_thumbnail)
+    options: Dict[str, Any] = {
+        "outtmpl": {"default": output_template},
+        "format": "bestaudio/best",
+        "writethumbnail": write_thumbnail,
+        "ignoreerrors": True,
+        "noplaylist": False,
+        "retries": 3,
+        "fragment_retries": 3,
+        "socket_timeout": 30,
+        "quiet": True,
+        "noprogress": True,
+        "no_warnings": False,
+    }
+    postprocessors: List[Dict[str, Any]] = []
+    if extract_audio:
+        postprocessors.append(profile.postprocessor())
+        if profile.postprocessor_args():
+            options["postprocessor_args"] = profile.postprocessor_args()
+    if write_thumbnail and (keep_thumbnail or not extract_audio):
+        postprocessors.append({"key": "FFmpegThumbnailsConvertor", "format": "jpg", "when": "before_dl"})
+    postprocessors.append({"key": "FFmpegMetadata", "add_metadata": True})
+    if write_thumbnail and embeds:
+        postprocessors.append({"key": "EmbedThumbnail", "already_have_thumbnail": keep_thumbnail})
+    options["postprocessors"] = postprocessors
+    if playlist_items:
+        options["playlist_items"] = playlist_items
+    if download_archive:
+        options["download_archive"] = download_archive
+    if cookie_options is not None:
+        options.update(cookie_options)
+    elif use_auth:
+        options["cookiesfrombrowser"] = (auth_browser,)
+    return options
+
+
+def iter_playlist_entries(
+    url: str,
+    use_auth: bool = False,
+    auth_browser: str = "firefox",
+    durations: Optional[Dict[str, float]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Enumerate a playlist in-process, yielding entries as yt-dlp pages them in.
+
+    ``durations`` is filled with the length in seconds of every entry that
+    reports one.
+
+    Yields:
+        (video_id, "index - title") tuples in playlist order
+
+    Raises:
+        DownloadError: If the playlist cannot be enumerated
+    """
+    if _load_yt_dlp() is None:
+        raise DownloadError("The yt-dlp Python package is not installed")
+
+    options: Dict[str, Any] = {
+        "extract_flat": "in_playlist",
+        "quiet": True,
+        "no_warnings": True,
+        "socket_timeout": 30,
+    }
+
+    # YoutubeDL writes its cookie file back when closed, before the lease is released
+    with cookies.lease(use_auth, auth_browser) as cookie_lease:
+        options.update(cookie_lease.options)
+        with yt_dlp.YoutubeDL(options) as ydl:
+            try:
+                # Unprocessed results keep "entries" lazy, so the first page
+                # arrives without waiting for the whole playlist
+                result = ydl.extract_info(url, download=False, process=False)
+                for position, entry in enumerate((result or {}).get("entries") or [], 1):
+                    if not entry or not entry.get("id"):
+                        continue
+                    index = entry.get("playlist_index") or position
+                    if durations is not None and entry.get("duration"):
+                        durations[entry["id"]] = float(entry["duration"])
+                    yield entry["id"], "{} - {}".format(index, entry.get("title") or entry["id"])
+            except yt_dlp.utils.DownloadError as e:
+                raise DownloadError(f"Could not enumerate playlist: {e}") from e
+
+
+def fetch_playlist_info(url: str, use_auth: bool = False, auth_browser: str = "firefox") -> Dict[str, str]:
+    """
+    Enumerate a playlist in-process without resolving each video.
+
+    Returns:
+        Ordered mapping of video ID to "index - title" display titles
+    """
+    return dict(iter_playlist_entries(url, use_auth, auth_browser))
@@ -0,0 +1,219 @@
+"""
+Streaming playlist enumeration for YouTube MP3 Downloader.
+
+``yt-dlp --flat-playlist`` prints one line per entry as it pages through a
+playlist. ``stream_playlist`` reads those lines as they arrive and yields
+each entry immediately, so the preview can fill in while enumeration is
+still running. Flat entries carry the video's duration, which is collected
+on the side for queue ordering. The only time limit is an inactivity timeout: a playlist
+that keeps producing entries may take as long as it needs.
+"""
+
+from __future__ import annotations
+
+import queue
+import subprocess
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import cookies
+from . import engine
+from .exceptions import DownloadError
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Give up when yt-dlp prints nothing for this long
+DEFAULT_INACTIVITY_TIMEOUT = 60
+
+ENTRY_SEPARATOR = ":::"
+PRINT_TEMPLATE = (
+    "%(id)s" + ENTRY_SEPARATOR + "%(duration|)s" + ENTRY_SEPARATOR
+    + "%(playlist_index|)s%(playlist_index& - |)s%(title)s"
+)
+
+_EOF = None
+
+
+def build_command(
+    url: str,
+    use_auth: bool = False,
+    auth_browser: str = "firefox",
+    cookie_args: Optional[List[str]] = None,
+) -> List[str]:
+    """Build the yt-dlp command that lists playlist entries; ``cookie_args`` come from a cookie lease."""
+    cmd = ["yt-dlp", "--flat-playlist", "--print", PRINT_TEMPLATE]
+    if cookie_args is not None:
+        cmd.extend(cookie_args)
+    elif use_auth:
+        cmd.extend(["--cookies-from-browser", auth_browser])
+    cmd.append(url)
+    return cmd
+
+
+def parse_line(line: str) -> Optional[Tuple[str, str, Optional[float]]]:
+    """
+    Parse one line printed with PRINT_TEMPLATE.
+
+    Lines without the duration field, as printed by older versions of the
+    template, are accepted too.
+
+    Returns:
+        (video_id, display_title, seconds or None), or None for other output
+    """
+    parts = line.split(ENTRY_SEPARATOR, 2)
+    if len(parts) < 2:
+        return None
+    video_id = parts[0].strip()
+    if not video_id:
+        return None
+    title = ENTRY_SEPARATOR.join(parts[1:])
+    duration = None
+    if len(parts) == 3:
+        field = parts[1].strip()
+        try:
+            duration = float(field) if field not in ("", "NA") else None
+            title = parts[2]
+        except ValueError:
+            # No duration field; the title contains the separator
+            pass
+    if duration is not None and duration <= 0:
+        duration = None
+    return video_id, title.strip(), duration
+
+
+def parse_entry(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Parse one line printed with PRINT_TEMPLATE.
+
+    Returns:
+        (video_id, display_title), or None for other output
+    """
+    parsed = parse_line(line)
+    return parsed[:2] if parsed is not None else None
+
+
+def _pump(stream, lines: queue.Queue) -> None:
+    try:
+        for line in stream:
+            lines.put(line)
+    except (OSError, ValueError) as e:
+        logger.debug(f"Playlist enumeration output closed: {e}")
+    finally:
+        lines.put(_EOF)
+
+
+def _stop_process(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait(timeout=5)
+
+
+def stream_playlist(
+    url: str,
+    use_auth: bool = False,
+    auth_browser: str = "firefox",
+    backend: str = engine.ENGINE_SUBPROCESS,
+    inactivity_timeout: float = DEFAULT_INACTIVITY_TIMEOUT,
+    stop_event: Optional[threading.Event] = None,
+    durations: Optional[Dict[str, float]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Enumerate a playlist, yielding entries as soon as yt-dlp reports them.
+
+    Args:
+        url: Playlist URL
+        use_auth: Whether to load cookies from the browser
+        auth_browser: Browser to read cookies from
+        backend: engine.ENGINE_SUBPROCESS or engine.ENGINE_INPROCESS
+        inactivity_timeout: Seconds without any output before giving up
+        stop_event: Set to stop enumerating early (the generator just ends)
+        durations: Filled with the length in seconds of every entry that has one
+
+    Yields:
+        (video_id, "index - title") tuples in playlist order
+
+    Raises:
+        subprocess.TimeoutExpired: If yt-dlp stayed silent for too long
+        DownloadError: If yt-dlp failed before reporting any entry
+    """
+    stop_event = stop_event or threading.Event()
+
+    if backend == engine.ENGINE_INPROCESS:
+        for entry in engine.iter_playlist_entries(url, use_auth, auth_browser, durations):
+            if stop_event.is_set():
+                return
+            yield entry
+        return
+
+    # The lease's copy of the cookie jar must outlive the yt-dlp process
+    with cookies.lease(use_auth, auth_browser) as cookie_lease:
+        cmd = build_command(url, use_auth, auth_browser, cookie_lease.args)
+        yield from _stream_process(cmd, inactivity_timeout, stop_event, durations)
+
+
+def _stream_process(
+    cmd: List[str],
+    inactivity_timeout: float,
+    stop_event: threading.Event,
+    durations: Optional[Dict[str, float]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Run an enumeration command and yield its entries."""
+    logger.debug(f"Enumerating playlist: {' '.join(cmd)}")
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        raise DownloadError(f"Could not start yt-dlp: {e}") from e
+
+    lines: queue.Queue = queue.Queue()
+    reader = threading.Thread(target=_pump, args=(process.stdout, lines), name="playlist-enumeration", daemon=True)
+    reader.start()
+
+    count = 0
+    last_message = None
+    last_activity = time.monotonic()
+    try:
+        while True:
+            if stop_event.is_set():
+                logger.info("Playlist enumeration stopped")
+                return
+            try:
+                line = lines.get(timeout=0.25)
+            except queue.Empty:
+                if time.monotonic() - last_activity >= inactivity_timeout:
+                    logger.warning(f"Playlist enumeration silent for {inactivity_timeout}s after {count} entries")
+                    raise subprocess.TimeoutExpired(cmd, inactivity_timeout)
+                continue
+            if line is _EOF:
+                break
+            last_activity = time.monotonic()
+            parsed = parse_line(line)
+            if parsed is None:
+                if line.strip():
+                    last_message = line.strip()
+                continue
+            video_id, title, duration = parsed
+            if durations is not None and duration is not None:
+                durations[video_id] = duration
+            count += 1
+            yield video_id, title
+
+        process.wait(timeout=30)
+        if process.returncode != 0:
+            if count == 0:
+                raise DownloadError(last_message or f"yt-dlp exited with code {process.returncode}")
+            logger.warning(f"Playlist enumeration exited with code {process.returncode} after {count} entries")
+        logger.info(f"Playlist enumeration finished: {count} entries")
+    finally:
+        _stop_process(process)
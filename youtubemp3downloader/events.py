@@ -0,0 +1,137 @@
+"""
+Typed download events for YouTube MP3 Downloader.
+
+Both download backends (the yt-dlp command and the in-process engine)
+report what happens to each item through these small event objects, so
+the code consuming them does not depend on where they came from.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+
+class DownloadEvent:
+    """Base class for all download events."""
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join("{}={!r}".format(name, getattr(self, name)) for name in self.__slots__)
+        return "{}({})".format(type(self).__name__, fields)
+
+    def __eq__(self, other: object) -> bool:
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+class LogLine(DownloadEvent):
+    """A human readable line for the log area."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class ItemStart(DownloadEvent):
+    """A new playlist item started downloading."""
+
+    __slots__ = ("index", "total", "video_id", "title")
+
+    def __init__(
+        self,
+        index: int,
+        total: int,
+        video_id: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> None:
+        self.index = index
+        self.total = total
+        self.video_id = video_id
+        self.title = title
+
+
+class Progress(DownloadEvent):
+    """Download progress of the current item."""
+
+    __slots__ = ("percent", "speed", "eta", "speed_bps", "downloaded_bytes")
+
+    def __init__(
+        self,
+        percent: float,
+        speed: Optional[str] = None,
+        eta: Optional[str] = None,
+        speed_bps: Optional[float] = None,
+        downloaded_bytes: Optional[float] = None,
+    ) -> None:
+        self.percent = percent
+        self.speed = speed
+        self.eta = eta
+        self.speed_bps = speed_bps
+        # Bytes of the file being downloaded received so far
+        self.downloaded_bytes = downloaded_bytes
+
+
+class Destination(DownloadEvent):
+    """The file the current item is being downloaded to."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+
+class Skipped(DownloadEvent):
+    """The current item already exists and was not downloaded again."""
+
+    __slots__ = ("path", "video_id")
+
+    def __init__(self, path: Optional[str] = None, video_id: Optional[str] = None) -> None:
+        self.path = path
+        self.video_id = video_id
+
+
+class PostprocessDone(DownloadEvent):
+    """The current item was converted and its intermediate file removed."""
+
+    __slots__ = ("path", "video_id")
+
+    def __init__(self, path: Optional[str] = None, video_id: Optional[str] = None) -> None:
+        self.path = path
+        self.video_id = video_id
+
+
+class ItemError(DownloadEvent):
+    """yt-dlp reported an error, usually for the current item."""
+
+    __slots__ = ("message", "video_id")
+
+    def __init__(self, message: str, video_id: Optional[str] = None) -> None:
+        self.message = message
+        self.video_id = video_id
+
+
+def format_speed(bytes_per_second: Optional[float]) -> Optional[str]:
+    """Format a transfer rate the way yt-dlp prints it (e.g. "1.50MiB/s")."""
+    if bytes_per_second is None:
+        return None
+    value = float(bytes_per_second)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return "{:.2f}{}/s".format(value, unit)
+        value /= 1024
+    return None
+
+
+def format_eta(seconds: Optional[float]) -> Optional[str]:
+    """Format an ETA the way yt-dlp prints it (MM:SS or HH:MM:SS)."""
+    if seconds is None:
+        return None
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return "{:02d}:{:02d}:{:02d}".format(hours, minutes, secs)
+    return "{:02d}:{:02d}".format(minutes, secs)
@@ -35,3 +35,11 @@ class DownloadError(YouTubeMp3DownloaderError):
 class ValidationError(YouTubeMp3DownloaderError):
     """Exception raised for invalid URLs, paths, or other validation failures."""
     pass
+
+
+class ApiError(YouTubeMp3DownloaderError):
+    """Exception raised for rejected or failed requests to the download service."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        self.status = status
+        super().__init__(message)
@@ -0,0 +1,609 @@
+"""
+Persistent multi-job download queue for YouTube MP3 Downloader.
+
+Every URL the user submits becomes a ``QueuedJob``. The window starts
+queued jobs while fewer than ``max_running`` are running, and a
+``SchedulingPolicy`` decides which one goes next:
+
+- ``FifoPolicy`` runs jobs in queue order.
+- ``RoundRobinPolicy`` runs playlists a few videos at a time and rotates
+  between jobs, so one huge playlist does not hold back the rest.
+- ``ShortestFirstPolicy`` runs the job with the least video time left
+  first, counting videos when their durations are not known.
+
+Jobs that have not finished are saved to the configuration directory and
+restored at the next start. ``JobRun`` carries the runtime state of one
+running job (stop events, processes, partial files) and forwards its log
+lines and reports to a ``JobSink``, so the download code does not depend
+on any user interface.
+
+The queue itself is not thread-safe; it is only used from the main loop.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Set, Tuple, Union
+
+from . import config
+from . import journal
+from . import utils
+from .exceptions import ValidationError
+from .logger import get_logger
+from .playlist_cache import PlaylistCache
+
+logger = get_logger(__name__)
+
+QUEUE_FILENAME = "queue.json"
+QUEUE_VERSION = 1
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Global limit on jobs running at the same time
+DEFAULT_MAX_RUNNING = 1
+MAX_RUNNING = 4
+
+# Videos a round-robin turn downloads before the next job gets its turn
+ROUND_ROBIN_CHUNK = 5
+
+# Assumed size of a playlist whose entries are not known yet
+UNKNOWN_PLAYLIST_SIZE = 50
+
+# Assumed length of a video, in seconds, when no queued video has a known one
+DEFAULT_VIDEO_SECONDS = 240.0
+
+POLICY_FIFO = "fifo"
+POLICY_ROUND_ROBIN = "round_robin"
+POLICY_SHORTEST_FIRST = "shortest_first"
+
+
+class QueuedJob:
+    """A download job waiting in, or running from, the queue."""
+
+    def __init__(
+        self,
+        url: str,
+        url_type: str,
+        download_path: str,
+        use_auth: bool = False,
+        auth_browser: str = "firefox",
+        playlist_items: Optional[str] = None,
+        playlist_info: Optional[Dict[str, str]] = None,
+        journal_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+        durations: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.url = url
+        self.url_type = url_type
+        self.download_path = download_path
+        self.use_auth = use_auth
+        self.auth_browser = auth_browser
+        self.playlist_items = playlist_items
+        self.playlist_info = dict(playlist_info or {})
+        # Length in seconds of the videos whose duration the enumeration reported
+        self.durations = dict(durations or {})
+        self.journal_id = journal_id
+        # Short number shown in the queue view and log, assigned by the queue
+        self.number = 0
+        self.state = QUEUED
+        # Latest progress reported by the running download
+        self.fraction = 0.0
+        self.status = "Queued"
+        # Order in which jobs were last started, for round-robin turns
+        self.turn = 0
+        # Playlist indices still to download; None when the entries are unknown
+        self.pending: Optional[List[int]] = None
+        if self.playlist_info:
+            self.pending = self._selected_indices()
+        # Playlist indices that failed in an earlier turn and were put back once
+        self.retried: Set[int] = set()
+        # Playlist indices that failed again; the job ends failed
+        self.failed_items: Set[int] = set()
+
+    def _selected_indices(self) -> List[int]:
+        count = len(self.playlist_info)
+        if self.playlist_items:
+            try:
+                return [i for i in utils.parse_playlist_items(self.playlist_items) if i <= count]
+            except ValidationError:
+                pass
+        return list(range(1, count + 1))
+
+    @property
+    def size(self) -> int:
+        """Number of videos left to download (estimated when unknown)."""
+        if self.pending is not None:
+            return len(self.pending)
+        return UNKNOWN_PLAYLIST_SIZE if self.url_type == "Playlist" else 1
+
+    def pending_durations(self) -> List[float]:
+        """Known lengths, in seconds, of the videos left to download."""
+        if self.pending is None or not self.durations:
+            return []
+        video_ids = list(self.playlist_info)
+        return [
+            self.durations[video_ids[index - 1]] for index in self.pending
+            if index <= len(video_ids) and video_ids[index - 1] in self.durations
+        ]
+
+    def estimated_seconds(self, average: float = DEFAULT_VIDEO_SECONDS) -> float:
+        """Seconds of video left to download, taking ``average`` for videos of unknown length."""
+        known = self.pending_durations()
+        return sum(known) + (self.size - len(known)) * average
+
+    @property
+    def label(self) -> str:
+        """Short description for the queue view."""
+        if self.pending is not None:
+            return "{} ({} videos)".format(self.url, len(self.pending))
+        return self.url
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "job": self.job_id,
+            "url": self.url,
+            "url_type": self.url_type,
+            "download_path": self.download_path,
+            "use_auth": self.use_auth,
+            "auth_browser": self.auth_browser,
+            "playlist_items": self.playlist_items,
+            "playlist_info": [[video_id, title] for video_id, title in self.playlist_info.items()],
+            "durations": self.durations,
+            "pending": self.pending,
+            "retried": sorted(self.retried),
+            "failed_items": sorted(self.failed_items),
+            "journal": self.journal_id,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> QueuedJob:
+        job = cls(
+            record["url"],
+            record.get("url_type", "Playlist"),
+            record["download_path"],
+            bool(record.get("use_auth", False)),
+            record.get("auth_browser", "firefox"),
+            record.get("playlist_items"),
+            {video_id: title for video_id, title in record.get("playlist_info") or []},
+            record.get("journal"),
+            record.get("job"),
+            {str(video_id): float(seconds) for video_id, seconds in (record.get("durations") or {}).items()},
+        )
+        if job.pending is not None and record.get("pending") is not None:
+            job.pending = [int(index) for index in record["pending"]]
+        job.retried = {int(index) for index in record.get("retried") or []}
+        job.failed_items = {int(index) for index in record.get("failed_items") or []}
+        return job
+
+    def __repr__(self) -> str:
+        return "QueuedJob({!r}, {!r}, {})".format(self.job_id, self.url, self.state)
+
+
+class SchedulingPolicy:
+    """Decide which queued job runs next and how much of it."""
+
+    name = POLICY_FIFO
+    label = "First in, first out"
+
+    def choose(self, queued: Sequence[QueuedJob]) -> Optional[QueuedJob]:
+        """Return the next job to start, or None."""
+        return queued[0] if queued else None
+
+    def batch(self, job: QueuedJob) -> Optional[List[int]]:
+        """
+        Return the playlist indices to download in this run.
+
+        Returns:
+            A subset of the pending indices, or None to run the whole job
+        """
+        return None
+
+
+class FifoPolicy(SchedulingPolicy):
+    """Run jobs in the order they were queued."""
+
+
+class RoundRobinPolicy(SchedulingPolicy):
+    """Take turns between jobs, a few playlist videos per turn."""
+
+    name = POLICY_ROUND_ROBIN
+    label = "Take turns between playlists"
+
+    def __init__(self, chunk_size: int = ROUND_ROBIN_CHUNK) -> None:
+        self.chunk_size = max(1, chunk_size)
+
+    def choose(self, queued: Sequence[QueuedJob]) -> Optional[QueuedJob]:
+        # Jobs that never ran have turn 0; min() keeps queue order on ties
+        return min(queued, key=lambda job: job.turn) if queued else None
+
+    def batch(self, job: QueuedJob) -> Optional[List[int]]:
+        if job.pending is None:
+            return None
+        return job.pending[:self.chunk_size]
+
+
+class ShortestFirstPolicy(SchedulingPolicy):
+    """
+    Run the job with the least video time left first.
+
+    Videos of unknown length count as long as the average known video of
+    the queued jobs, so without any durations jobs are ordered by their
+    number of videos.
+    """
+
+    name = POLICY_SHORTEST_FIRST
+    label = "Shortest jobs first"
+
+    def choose(self, queued: Sequence[QueuedJob]) -> Optional[QueuedJob]:
+        if not queued:
+            return None
+        known = [seconds for job in queued for seconds in job.pending_durations()]
+        average = sum(known) / len(known) if known else DEFAULT_VIDEO_SECONDS
+        return min(queued, key=lambda job: job.estimated_seconds(average))
+
+
+POLICIES = {
+    policy.name: policy
+    for policy in (FifoPolicy, RoundRobinPolicy, ShortestFirstPolicy)
+}
+
+
+def make_policy(name: Optional[str]) -> SchedulingPolicy:
+    """Create a scheduling policy by name, falling back to FIFO."""
+    return POLICIES.get(name or POLICY_FIFO, FifoPolicy)()
+
+
+class JobQueue:
+    """
+    Ordered, persistent queue of download jobs.
+
+    Args:
+        path: Queue file (defaults to the configuration directory)
+        policy: Scheduling policy (FIFO if None)
+        max_running: Number of jobs allowed to run at the same time
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        policy: Optional[SchedulingPolicy] = None,
+        max_running: int = DEFAULT_MAX_RUNNING,
+    ) -> None:
+        self.path = Path(path) if path else config.CONFIG_DIR / QUEUE_FILENAME
+        self.policy = policy or FifoPolicy()
+        self.max_running = max(1, min(MAX_RUNNING, max_running))
+        self.jobs: List[QueuedJob] = []
+        self._turns = 0
+        self._numbers = 0
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def get(self, job_id: str) -> Optional[QueuedJob]:
+        for job in self.jobs:
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def queued(self) -> List[QueuedJob]:
+        return [job for job in self.jobs if job.state == QUEUED]
+
+    def running(self) -> List[QueuedJob]:
+        return [job for job in self.jobs if job.state == RUNNING]
+
+    def has_active(self) -> bool:
+        return any(job.is_active for job in self.jobs)
+
+    def add(self, job: QueuedJob) -> QueuedJob:
+        """Append a job to the end of the queue."""
+        self._numbers += 1
+        job.number = self._numbers
+        self.jobs.append(job)
+        logger.info(f"Queued job {job.job_id}: {job.url}")
+        return job
+
+    def remove(self, job_id: str) -> Optional[QueuedJob]:
+        """Take a job out of the queue; a running job has to be stopped by the caller."""
+        job = self.get(job_id)
+        if job is not None:
+            self.jobs.remove(job)
+            logger.info(f"Removed job {job_id} from the queue")
+        return job
+
+    def move(self, job_id: str, offset: int) -> bool:
+        """
+        Move a job up (negative offset) or down the queue.
+
+        Returns:
+            True if the job changed position
+        """
+        job = self.get(job_id)
+        if job is None:
+            return False
+        old = self.jobs.index(job)
+        new = max(0, min(len(self.jobs) - 1, old + offset))
+        if new == old:
+            return False
+        self.jobs.insert(new, self.jobs.pop(old))
+        return True
+
+    def clear_finished(self) -> int:
+        """Drop jobs that are no longer queued or running."""
+        before = len(self.jobs)
+        self.jobs = [job for job in self.jobs if job.is_active]
+        return before - len(self.jobs)
+
+    def next_job(self) -> Optional[Tuple[QueuedJob, Optional[List[int]]]]:
+        """
+        Pick the next job to start if a slot is free and mark it running.
+
+        Returns:
+            The job and the playlist indices for this run (None for all of
+            them), or None when nothing can start
+        """
+        if len(self.running()) >= self.max_running:
+            return None
+        job = self.policy.choose(self.queued())
+        if job is None:
+            return None
+        batch = self.policy.batch(job)
+        if batch is not None and job.pending is not None and len(batch) >= len(job.pending):
+            batch = None
+        self._turns += 1
+        job.turn = self._turns
+        job.state = RUNNING
+        job.fraction = 0.0
+        job.status = "Starting..."
+        return job, batch
+
+    def finish_run(
+        self,
+        job: QueuedJob,
+        batch: Optional[List[int]],
+        state: str,
+        outcomes: Optional[Dict[int, str]] = None,
+    ) -> None:
+        """
+        Record the end of one run of a job.
+
+        A round-robin run that covered only part of the pending videos puts
+        the job back in the queue for its next turn. ``outcomes`` maps the
+        playlist indices the run finished to their journal state; without
+        them a DONE run counts as having finished its whole batch. Videos
+        the run never got to stay pending, and failed videos are put back
+        once before the job is marked failed.
+        """
+        if batch is not None and job.pending is not None and state != CANCELLED:
+            if outcomes is None:
+                outcomes = dict.fromkeys(batch, journal.DONE) if state == DONE else {}
+            in_batch = set(batch)
+            finished = {index for index, outcome in outcomes.items() if index in in_batch}
+            if state == FAILED and not finished:
+                # Nothing came of this turn; running it again would not either
+                job.state = FAILED
+                return
+            failed = [index for index in batch if outcomes.get(index) == journal.FAILED]
+            retry = [index for index in failed if index not in job.retried]
+            job.retried.update(retry)
+            job.failed_items.update(index for index in failed if index not in retry)
+            job.pending = [index for index in job.pending if index not in finished] + retry
+            if job.pending:
+                job.state = QUEUED
+                job.status = "Waiting for its next turn"
+                return
+            state = DONE
+        if state == DONE and job.failed_items:
+            state = FAILED
+        job.state = state
+
+    def load(self) -> int:
+        """
+        Restore the jobs saved by ``save``.
+
+        Returns:
+            Number of jobs restored
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read job queue {self.path}: {e}")
+            return 0
+        if data.get("version") != QUEUE_VERSION:
+            return 0
+        restored = 0
+        for record in data.get("jobs", []):
+            try:
+                job = QueuedJob.from_record(record)
+            except (KeyError, TypeError, ValueError):
+                logger.debug("Job queue: skipped unreadable job")
+                continue
+            if self.get(job.job_id) is None:
+                self._numbers += 1
+                job.number = self._numbers
+                self.jobs.append(job)
+                restored += 1
+        logger.debug(f"Restored {restored} queued job(s)")
+        return restored
+
+    def save(self) -> None:
+        """Persist the queued and running jobs; running jobs are restored as queued."""
+        data = {
+            "version": QUEUE_VERSION,
+            "jobs": [job.to_record() for job in self.jobs if job.is_active],
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save job queue: {e}")
+
+
+class JobSink(Protocol):
+    """
+    Receiver of the output of running jobs.
+
+    Every method may be called from a download thread.
+    """
+
+    def job_log(self, run: JobRun, message: str, progress: bool) -> None: ...
+
+    def job_message(self, run: JobRun, message: str, error: bool) -> None: ...
+
+    def job_notify(self, run: JobRun, title: str, message: str, icon: str) -> None: ...
+
+    def job_finished(self, run: JobRun) -> None: ...
+
+
+class JobRun:
+    """
+    Runtime state of one run of a queued job.
+
+    The download functions receive it in place of a window. Stop events,
+    processes and partial-file targets belong to this run only, so stopping
+    one job leaves the others running. Log lines, the final report and the
+    end of the run are forwarded to the sink; progress is kept on the job
+    for the sink to poll at its own pace.
+
+    Args:
+        job: Job being run
+        sink: Receiver of log lines, reports and the end of the run
+        batch: Playlist indices of this run, or None for the whole job
+        playlist_cache: Cache used when the playlist has to be enumerated
+    """
+
+    def __init__(
+        self,
+        job: QueuedJob,
+        sink: JobSink,
+        batch: Optional[List[int]] = None,
+        playlist_cache: Optional[PlaylistCache] = None,
+    ) -> None:
+        self.job = job
+        self.sink = sink
+        self.batch = batch
+        self.playlist_cache = playlist_cache if playlist_cache is not None else PlaylistCache()
+        self.download_stopped = threading.Event()
+        self.download_cancel_requested = threading.Event()
+        self.download_lock = threading.Lock()
+        self.active_processes: Set[subprocess.Popen] = set()
+        self.active_download_targets: Set[str] = set()
+        # Set while the application closes, so the job stays resumable
+        self.closing = False
+        self.failed = False
+        # End-of-run counters
+        self.successful = 0
+        self.skipped = 0
+        self.failures = 0
+        # Latest journal state of every item this run reached, by video ID
+        self.item_states: Dict[str, str] = {}
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def is_final(self) -> bool:
+        """True if this run covers everything the job has left."""
+        return self.batch is None
+
+    @property
+    def playlist_items(self) -> Optional[str]:
+        """The ``--playlist-items`` specification for this run."""
+        if self.batch is not None:
+            return utils.compress_ranges(self.batch)
+        if self.job.pending is not None:
+            return utils.compress_ranges(self.job.pending)
+        return self.job.playlist_items
+
+    def post_log(self, message: str, progress: bool = False) -> None:
+        self.sink.job_log(self, message, progress)
+
+    def log_message(self, message: str) -> None:
+        self.sink.job_log(self, message, False)
+
+    def post_progress(self, fraction: Optional[float] = None, text: Optional[str] = None) -> None:
+        if fraction is not None:
+            self.job.fraction = fraction
+        if text is not None:
+            self.job.status = text
+
+    def record_summary(self, successful: int, skipped: int, failures: int) -> None:
+        self.successful = successful
+        self.skipped = skipped
+        self.failures = failures
+
+    def record_item(self, video_id: str, state: str) -> None:
+        """Remember the journal state an item of this run reached."""
+        self.item_states[video_id] = state
+
+    def item_outcomes(self) -> Dict[int, str]:
+        """The items this run finished, by playlist index, with their journal state."""
+        outcomes = {}
+        for index, video_id in enumerate(self.job.playlist_info, 1):
+            state = self.item_states.get(video_id)
+            if state in journal.FINISHED_STATES:
+                outcomes[index] = state
+        return outcomes
+
+    def report(self, message: str, error: bool = False) -> None:
+        """Report the outcome of the run."""
+        if error:
+            self.failed = True
+        self.sink.job_message(self, message, error)
+
+    def notify(self, title: str, message: str, icon: str = "dialog-information") -> None:
+        self.sink.job_notify(self, title, message, icon)
+
+    def finished(self) -> None:
+        """Report the end of the download thread."""
+        self.sink.job_finished(self)
+
+    def stop(self) -> int:
+        """
+        Stop this run and terminate its yt-dlp processes.
+
+        Returns:
+            Number of processes that were terminated
+        """
+        self.download_stopped.set()
+        self.download_cancel_requested.set()
+        with self.download_lock:
+            processes = list(self.active_processes)
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError as e:
+                logger.warning(f"Could not terminate download process: {e}")
+        for process in processes:
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                logger.warning("Process did not terminate, forcing kill")
+                process.kill()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    logger.error(f"Download process {process.pid} did not exit")
+        if processes:
+            logger.debug(f"Terminated {len(processes)} download process(es) of job {self.job.job_id}")
+        return len(processes)
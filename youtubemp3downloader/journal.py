@@ -0,0 +1,343 @@
+"""
+Crash-safe job journal for YouTube MP3 Downloader.
+
+Every download job is written to an append-only journal in the
+configuration directory before any item starts: its URL, destination,
+options, the playlist entries and the selected items. Each item state
+transition is appended as one small JSON line, so after a crash, a power
+cut or closing the window mid-download the unfinished jobs can be replayed
+and resumed at their first unfinished item. yt-dlp picks up the ``.part``
+files left behind.
+
+Every record is flushed to the operating system at once, which is enough
+to survive the app crashing. Writes reach the disk in groups: the file is
+fsynced at most once per ``SYNC_INTERVAL`` and whenever a job starts or
+ends or an item is done or failed, so a power cut can only lose recent
+in-progress states, and those items are downloaded again on resume.
+
+Records are never rewritten in place. A torn last line is ignored on
+replay, and the journal is compacted (rewritten with only the unfinished
+jobs) once it has grown by ``compact_after`` records.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional, Union
+
+from . import config
+from . import utils
+from .exceptions import ValidationError
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+JOURNAL_FILENAME = "jobs.journal"
+
+# Rewrite the journal after this many appended records
+DEFAULT_COMPACT_AFTER = 2000
+
+# Seconds between fsyncs of records that can be lost without harm
+SYNC_INTERVAL = 1.0
+
+# Item states
+PENDING = "pending"
+DOWNLOADING = "downloading"
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+FINISHED_STATES = (DONE, SKIPPED, FAILED)
+
+# Item states written to disk before the journal call returns
+_DURABLE_STATES = (DONE, FAILED)
+
+# Job outcomes
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+DISCARDED = "discarded"
+
+
+class JournalJob:
+    """A job replayed from the journal."""
+
+    def __init__(
+        self,
+        job_id: str,
+        url: str,
+        url_type: str,
+        download_path: str,
+        use_auth: bool = False,
+        auth_browser: str = "firefox",
+        playlist_info: Optional[Dict[str, str]] = None,
+        selected: Optional[str] = None,
+        created_at: float = 0.0,
+    ) -> None:
+        self.job_id = job_id
+        self.url = url
+        self.url_type = url_type
+        self.download_path = download_path
+        self.use_auth = use_auth
+        self.auth_browser = auth_browser
+        self.playlist_info = playlist_info or {}
+        self.selected = selected
+        self.created_at = created_at
+        self.updated_at = created_at
+        self.states: Dict[str, str] = {}
+        self.outcome: Optional[str] = None
+
+    def selected_indices(self) -> List[int]:
+        """Return the 1-based playlist indices selected for this job."""
+        if self.selected:
+            try:
+                return utils.parse_playlist_items(self.selected)
+            except ValidationError:
+                pass
+        return list(range(1, len(self.playlist_info) + 1))
+
+    def remaining_indices(self) -> List[int]:
+        """Return the selected indices whose item has not finished yet."""
+        video_ids = list(self.playlist_info)
+        return [
+            index for index in self.selected_indices()
+            if index <= len(video_ids) and self.states.get(video_ids[index - 1]) not in FINISHED_STATES
+        ]
+
+    def remaining_items(self) -> Optional[str]:
+        """
+        Return the ``--playlist-items`` specification for resuming.
+
+        Returns:
+            The unfinished items, or None when the entries are unknown and
+            the whole URL has to be downloaded again
+        """
+        if not self.playlist_info:
+            return None
+        return utils.compress_ranges(self.remaining_indices())
+
+    @property
+    def finished_count(self) -> int:
+        return sum(1 for state in self.states.values() if state in FINISHED_STATES)
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "op": "job",
+            "job": self.job_id,
+            "url": self.url,
+            "url_type": self.url_type,
+            "download_path": self.download_path,
+            "use_auth": self.use_auth,
+            "auth_browser": self.auth_browser,
+            "playlist_info": [[video_id, title] for video_id, title in self.playlist_info.items()],
+            "selected": self.selected,
+            "t": self.created_at,
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> JournalJob:
+        return cls(
+            record["job"],
+            record["url"],
+            record.get("url_type", "Playlist"),
+            record["download_path"],
+            bool(record.get("use_auth", False)),
+            record.get("auth_browser", "firefox"),
+            {video_id: title for video_id, title in record.get("playlist_info") or []},
+            record.get("selected"),
+            float(record.get("t", 0.0)),
+        )
+
+    def __repr__(self) -> str:
+        return "JournalJob({!r}, {!r}, {}/{} finished)".format(
+            self.job_id, self.url, self.finished_count, len(self.selected_indices())
+        )
+
+
+class JobJournal:
+    """
+    Append-only, thread-safe journal of download jobs.
+
+    Args:
+        path: Journal file (defaults to the configuration directory)
+        compact_after: Number of appended records that triggers compaction
+        sync: fsync the records (disable only in tests)
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        compact_after: int = DEFAULT_COMPACT_AFTER,
+        sync: bool = True,
+    ) -> None:
+        self.path = Path(path) if path else config.CONFIG_DIR / JOURNAL_FILENAME
+        self.compact_after = compact_after
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self._appended = 0
+        # Last state journaled for each item of the jobs written this session
+        self._states: Dict[str, Dict[str, str]] = {}
+        self._synced_at = 0.0
+        self._unsynced = False
+
+    def begin(
+        self,
+        url: str,
+        url_type: str,
+        download_path: str,
+        use_auth: bool = False,
+        auth_browser: str = "firefox",
+        playlist_info: Optional[Dict[str, str]] = None,
+        selected: Optional[str] = None,
+    ) -> str:
+        """
+        Record a new job before it starts.
+
+        Returns:
+            The job ID used for later records
+        """
+        job = JournalJob(
+            uuid.uuid4().hex[:12], url, url_type, download_path, use_auth, auth_browser,
+            playlist_info, selected, time.time(),
+        )
+        self._append(job.to_record(), durable=True)
+        logger.debug(f"Journal: started job {job.job_id} for {url}")
+        return job.job_id
+
+    def mark(self, job_id: str, video_id: str, state: str) -> None:
+        """Record the new state of one item; repeating its current state is a no-op."""
+        with self._lock:
+            states = self._states.setdefault(job_id, {})
+            if states.get(video_id) == state:
+                return
+            states[video_id] = state
+        self._append({"op": "item", "job": job_id, "id": video_id, "state": state}, durable=state in _DURABLE_STATES)
+
+    def finish(self, job_id: str, outcome: str = COMPLETED) -> None:
+        """Record that a job ended and must not be resumed."""
+        with self._lock:
+            self._states.pop(job_id, None)
+        self._append({"op": "end", "job": job_id, "outcome": outcome, "t": time.time()}, durable=True)
+        logger.debug(f"Journal: job {job_id} {outcome}")
+
+    def replay(self) -> Dict[str, JournalJob]:
+        """Read every job and its latest item states from the journal."""
+        jobs: Dict[str, JournalJob] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        op = record["op"]
+                        if op == "job":
+                            jobs[record["job"]] = JournalJob.from_record(record)
+                            continue
+                        job = jobs.get(record["job"])
+                        if job is None:
+                            continue
+                        if op == "item":
+                            job.states[record["id"]] = record["state"]
+                        elif op == "end":
+                            job.outcome = record.get("outcome", COMPLETED)
+                            job.updated_at = float(record.get("t", job.updated_at))
+                    except (ValueError, KeyError, TypeError):
+                        # A torn write from a crash; nothing after it is lost
+                        logger.debug("Journal: skipped unreadable record")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not read job journal: {e}")
+        return jobs
+
+    def unfinished(self) -> List[JournalJob]:
+        """Return the jobs that never ended, newest first."""
+        jobs = [job for job in self.replay().values() if job.outcome is None]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return jobs
+
+    def compact(self) -> None:
+        """Rewrite the journal keeping only the unfinished jobs."""
+        with self._lock:
+            self._close_file()
+            self._unsynced = False
+            jobs = [job for job in self.replay().values() if job.outcome is None]
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for job in jobs:
+                        f.write(json.dumps(job.to_record()) + "\n")
+                        for video_id, state in job.states.items():
+                            f.write(json.dumps({"op": "item", "job": job.job_id, "id": video_id, "state": state}))
+                            f.write("\n")
+                    f.flush()
+                    if self.sync:
+                        os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self._appended = 0
+                logger.debug(f"Journal compacted: {len(jobs)} unfinished job(s)")
+            except OSError as e:
+                logger.warning(f"Could not compact job journal: {e}")
+
+    def close(self) -> None:
+        """Write the remaining records to disk and close the journal file."""
+        with self._lock:
+            if self._file is not None and self._unsynced and self.sync:
+                try:
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    logger.warning(f"Could not write to job journal: {e}")
+            self._unsynced = False
+            self._close_file()
+
+    def _append(self, record: Dict[str, Any], durable: bool = False) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = self._open_for_append()
+                self._file.write(line)
+                self._file.flush()
+                self._unsynced = True
+                now = time.monotonic()
+                if self.sync and (durable or now - self._synced_at >= SYNC_INTERVAL):
+                    os.fsync(self._file.fileno())
+                    self._synced_at = now
+                    self._unsynced = False
+                self._appended += 1
+            except OSError as e:
+                logger.warning(f"Could not write to job journal: {e}")
+                return
+            needs_compaction = self._appended >= self.compact_after
+        if needs_compaction:
+            self.compact()
+
+    def _open_for_append(self) -> IO[str]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        torn = False
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+        except FileNotFoundError:
+            pass
+        handle = open(self.path, "a", encoding="utf-8")
+        if torn:
+            # Terminate a record cut short by a crash so the next one stays readable
+            handle.write("\n")
+        return handle
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
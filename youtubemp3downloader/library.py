@@ -0,0 +1,510 @@
+"""
+Library index of downloaded audio files for YouTube MP3 Downloader.
+
+``--add-metadata`` stores the video URL in every file it writes (the
+``purl`` and comment tags). ``LibraryIndex`` scans the download folder once
+with a thread pool, reads those tags and keeps a video ID -> file index, so
+a video is recognised as downloaded even after its file was renamed or
+moved to a subfolder. The index is persisted with each file's size and
+modification time; later scans only read the tags of files that changed.
+
+The window keeps the index current from file monitor events on the folder
+and each of its subfolders through ``update_path``/``update_folder``/
+``remove_path``, called off the main loop. Only the small tag header of each file is
+read, never the audio or the embedded cover art.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from . import config
+from . import profiles
+from . import utils
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+LIBRARY_DIR = "library"
+INDEX_VERSION = 1
+
+# Tag reading is I/O bound; a few more threads than cores keeps disks busy
+SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+_VIDEO_URL_RE = re.compile(r"(?:[?&]v=|youtu\.be/|/shorts/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])")
+
+# Frames that may hold the source URL
+_URL_FRAMES = {b"TXXX", b"COMM", b"WXXX", b"WOAS"}
+_TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+# Vorbis comments and MP4 atoms that may hold the source URL
+_URL_COMMENTS = {b"purl", b"comment"}
+_URL_ATOMS = {b"\xa9cmt"}
+# Longer tags are cover art or descriptions, skipped without reading them
+_MAX_COMMENT = 4096
+
+# One indexed file: (size, mtime_ns, video_id)
+FileRecord = Tuple[int, int, Optional[str]]
+
+
+def _syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _frame_text(frame_id: bytes, body: bytes) -> str:
+    if frame_id == b"WOAS":
+        return body.decode("latin-1", "replace")
+    if not body:
+        return ""
+    encoding = _TEXT_ENCODINGS.get(body[0], "latin-1")
+    payload = body[4:] if frame_id == b"COMM" else body[1:]
+    if frame_id == b"WXXX":
+        # The description uses the declared encoding, the URL is always latin-1
+        return payload.decode("latin-1", "replace")
+    return payload.decode(encoding, "replace")
+
+
+def _read_id3(f: BinaryIO, header: bytes) -> Optional[str]:
+    version, flags = header[3], header[5]
+    if version not in (3, 4):
+        return None
+    end = 10 + _syncsafe(header[6:10])
+    f.seek(10)
+    if flags & 0x40:
+        # Skip the extended header
+        ext = f.read(4)
+        if len(ext) < 4:
+            return None
+        ext_size = _syncsafe(ext) if version == 4 else struct.unpack(">I", ext)[0] + 4
+        f.seek(10 + ext_size)
+
+    while f.tell() + 10 <= end:
+        frame_header = f.read(10)
+        frame_id = frame_header[:4]
+        if len(frame_header) < 10 or not frame_id.strip(b"\0"):
+            break
+        if version == 4:
+            size = _syncsafe(frame_header[4:8])
+        else:
+            size = struct.unpack(">I", frame_header[4:8])[0]
+        if size <= 0 or f.tell() + size > end:
+            break
+        if frame_id not in _URL_FRAMES:
+            f.seek(size, os.SEEK_CUR)
+            continue
+        match = _VIDEO_URL_RE.search(_frame_text(frame_id, f.read(size)))
+        if match:
+            return match.group(1)
+    return None
+
+
+class _OggPacket:
+    """Reads one logical packet of an Ogg stream across page boundaries."""
+
+    def __init__(self, f: BinaryIO) -> None:
+        self.f = f
+        self.left = 0
+
+    def next_page(self) -> bool:
+        header = self.f.read(27)
+        if len(header) < 27 or header[:4] != b"OggS":
+            return False
+        table = self.f.read(header[26])
+        if len(table) < header[26]:
+            return False
+        self.left = sum(table)
+        return True
+
+    def read(self, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            if not self.left and not self.next_page():
+                break
+            chunk = self.f.read(min(size, self.left))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self.left -= len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def skip(self, size: int) -> bool:
+        while size > 0:
+            if not self.left and not self.next_page():
+                return False
+            step = min(size, self.left)
+            self.f.seek(step, os.SEEK_CUR)
+            self.left -= step
+            size -= step
+        return True
+
+    def finish_page(self) -> None:
+        self.f.seek(self.left, os.SEEK_CUR)
+        self.left = 0
+
+
+def _read_vorbis_comments(f: BinaryIO) -> Optional[str]:
+    packet = _OggPacket(f)
+    # The identification header fills the first page on its own
+    f.seek(0)
+    if not packet.next_page():
+        return None
+    packet.finish_page()
+    magic = packet.read(7)
+    if magic != b"\x03vorbis" and magic + packet.read(1) != b"OpusTags":
+        return None
+    vendor = packet.read(4)
+    if len(vendor) < 4 or not packet.skip(struct.unpack("<I", vendor)[0]):
+        return None
+    count = packet.read(4)
+    if len(count) < 4:
+        return None
+    for _ in range(struct.unpack("<I", count)[0]):
+        length = packet.read(4)
+        if len(length) < 4:
+            break
+        size = struct.unpack("<I", length)[0]
+        # Cover art is a comment too; only short ones can hold the URL
+        if size > _MAX_COMMENT:
+            if not packet.skip(size):
+                break
+            continue
+        key, _, value = packet.read(size).partition(b"=")
+        if key.lower() in _URL_COMMENTS:
+            match = _VIDEO_URL_RE.search(value.decode("utf-8", "replace"))
+            if match:
+                return match.group(1)
+    return None
+
+
+def _mp4_atoms(f: BinaryIO, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, body start, body end) of the atoms up to ``end``."""
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I", header[:4])[0], header[4:]
+        body = start + 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size, body = struct.unpack(">Q", large)[0], start + 16
+        elif size == 0:
+            size = end - start
+        if size < body - start or start + size > end:
+            return
+        yield kind, body, start + size
+        f.seek(start + size)
+
+
+def _find_mp4_atom(f: BinaryIO, path: Tuple[bytes, ...], end: int) -> Optional[Tuple[int, int]]:
+    for kind, body, atom_end in _mp4_atoms(f, end):
+        if kind != path[0]:
+            continue
+        if len(path) == 1:
+            return body, atom_end
+        if kind == b"meta":
+            # A full atom: its children follow the version and flags
+            f.seek(body + 4)
+        else:
+            f.seek(body)
+        return _find_mp4_atom(f, path[1:], atom_end)
+    return None
+
+
+def _read_mp4(f: BinaryIO) -> Optional[str]:
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    ilst = _find_mp4_atom(f, (b"moov", b"udta", b"meta", b"ilst"), size)
+    if ilst is None:
+        return None
+    f.seek(ilst[0])
+    for kind, body, end in _mp4_atoms(f, ilst[1]):
+        if kind not in _URL_ATOMS or end - body > _MAX_COMMENT:
+            continue
+        f.seek(body)
+        for data_kind, data_body, data_end in _mp4_atoms(f, end):
+            if data_kind != b"data":
+                continue
+            # Skip the type and locale before the value
+            f.seek(data_body + 8)
+            match = _VIDEO_URL_RE.search(f.read(data_end - data_body - 8).decode("utf-8", "replace"))
+            if match:
+                return match.group(1)
+            f.seek(data_end)
+        f.seek(end)
+    return None
+
+
+def read_video_id(path: Union[str, Path]) -> Optional[str]:
+    """
+    Read the YouTube video ID from the tags of an audio file.
+
+    MP3 files carry ID3v2 tags, Opus and Vorbis files Vorbis comments and
+    M4A files iTunes metadata atoms; the container is detected from the
+    first bytes rather than the extension.
+
+    Args:
+        path: Audio file
+
+    Returns:
+        The video ID found in the URL tags, or None
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) >= 10 and header[:3] == b"ID3":
+                return _read_id3(f, header)
+            if header[:4] == b"OggS":
+                return _read_vorbis_comments(f)
+            if header[4:8] == b"ftyp":
+                return _read_mp4(f)
+    except OSError as e:
+        logger.debug(f"Could not read tags of {path}: {e}")
+    return None
+
+
+def index_path(folder: str) -> Path:
+    """Return the location of the persisted index for a folder."""
+    return config.CONFIG_DIR / LIBRARY_DIR / "{}.json".format(utils.path_digest(folder))
+
+
+class LibraryIndex:
+    """
+    Thread-safe video ID -> path index of the audio files under one folder.
+
+    Args:
+        folder: Download folder to index (including subfolders)
+        path: Persisted index file (defaults to one per folder in the config directory)
+    """
+
+    def __init__(self, folder: str, path: Optional[Union[str, Path]] = None) -> None:
+        self.folder = os.path.normpath(os.path.abspath(folder))
+        self.path = Path(path) if path else index_path(self.folder)
+        self._lock = threading.Lock()
+        self._files: Dict[str, FileRecord] = {}
+        self._by_id: Dict[str, str] = {}
+        self.dirty = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_id)
+
+    def lookup(self, video_id: str) -> Optional[str]:
+        """Return the file holding a video, if it is in the library."""
+        with self._lock:
+            return self._by_id.get(video_id)
+
+    def items(self) -> List[Tuple[str, str]]:
+        """Return (video_id, path) pairs for every indexed video."""
+        with self._lock:
+            return list(self._by_id.items())
+
+    def load(self) -> bool:
+        """
+        Load the persisted index.
+
+        Returns:
+            True if an index for this folder was loaded
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read library index {self.path}: {e}")
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("folder") != self.folder:
+            return False
+        files = {
+            path: (int(record[0]), int(record[1]), record[2])
+            for path, record in data.get("files", {}).items()
+        }
+        with self._lock:
+            self._files = files
+            self._rebuild_ids()
+            self.dirty = False
+        logger.debug(f"Loaded library index: {len(files)} files")
+        return True
+
+    def save(self) -> None:
+        """Persist the index if it changed."""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {"version": INDEX_VERSION, "folder": self.folder, "files": dict(self._files)}
+            self.dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save library index: {e}")
+
+    def scan(self, workers: int = SCAN_WORKERS, stop_event: Optional[threading.Event] = None) -> int:
+        """
+        Bring the index in line with the folder contents.
+
+        Files whose size and modification time match the index are not
+        opened; the tags of new and changed files are read in parallel.
+
+        Returns:
+            Number of files whose tags were read
+        """
+        with self._lock:
+            known = dict(self._files)
+        found: Dict[str, Tuple[int, int]] = {}
+        for path in self._walk():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+
+        changed = [
+            path for path, (size, mtime) in found.items()
+            if path not in known or known[path][:2] != (size, mtime)
+        ]
+
+        results: Dict[str, Optional[str]] = {}
+        if changed:
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="library-scan") as pool:
+                futures = [pool.submit(read_video_id, path) for path in changed]
+                try:
+                    for path, future in zip(changed, futures):
+                        if stop_event is not None and stop_event.is_set():
+                            break
+                        results[path] = future.result()
+                finally:
+                    # After a stop or Ctrl-C, don't wait for the files not read yet
+                    for future in futures:
+                        future.cancel()
+
+        with self._lock:
+            files = {}
+            for path, (size, mtime) in found.items():
+                if path in results:
+                    files[path] = (size, mtime, results[path])
+                elif path in known and known[path][:2] == (size, mtime):
+                    files[path] = known[path]
+            # Keep files the monitor reported while the scan was running
+            for path, record in self._files.items():
+                if path not in known and path not in files:
+                    files[path] = record
+            if files != self._files:
+                self._files = files
+                self._rebuild_ids()
+                self.dirty = True
+        logger.info(f"Library scan of {self.folder}: {len(found)} files, {len(results)} read")
+        return len(results)
+
+    def update_path(self, path: str) -> Optional[str]:
+        """
+        Index a file that was created, changed or moved in.
+
+        Returns:
+            The video ID of the file, or None
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        if not path.lower().endswith(profiles.AUDIO_EXTENSIONS):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.remove_path(path)
+            return None
+        video_id = read_video_id(path)
+        with self._lock:
+            previous = self._files.get(path)
+            self._files[path] = (stat.st_size, stat.st_mtime_ns, video_id)
+            if previous and previous[2] and previous[2] != video_id:
+                self._rebuild_ids()
+            elif video_id:
+                self._by_id.setdefault(video_id, path)
+            self.dirty = True
+        return video_id
+
+    def update_folder(self, path: str, workers: int = SCAN_WORKERS) -> int:
+        """
+        Index the files below a folder that was created or moved in.
+
+        Returns:
+            Number of files whose tags were read
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        if os.path.basename(path).startswith("."):
+            return 0
+        found: Dict[str, Tuple[int, int]] = {}
+        for file_path in self._walk(path):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            found[file_path] = (stat.st_size, stat.st_mtime_ns)
+        if not found:
+            return 0
+        paths = list(found)
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="library-scan") as pool:
+            video_ids = list(pool.map(read_video_id, paths))
+        with self._lock:
+            for file_path, video_id in zip(paths, video_ids):
+                self._files[file_path] = found[file_path] + (video_id,)
+            self._rebuild_ids()
+            self.dirty = True
+        return len(paths)
+
+    def folders(self, root: Optional[str] = None) -> List[str]:
+        """Return a folder and the subfolders below it that are indexed (the whole library by default)."""
+        root = os.path.normpath(os.path.abspath(root)) if root else self.folder
+        if root != self.folder and os.path.basename(root).startswith("."):
+            return []
+        found = []
+        for current, dirs, _ in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            found.append(current)
+        return found
+
+    def remove_path(self, path: str) -> None:
+        """Forget a file that was deleted or moved out."""
+        path = os.path.normpath(os.path.abspath(path))
+        with self._lock:
+            record = self._files.pop(path, None)
+            if record is None:
+                # A folder may have been removed: drop everything below it
+                prefix = path + os.sep
+                removed = [p for p in self._files if p.startswith(prefix)]
+                if not removed:
+                    return
+                for p in removed:
+                    del self._files[p]
+                self._rebuild_ids()
+            elif record[2] and self._by_id.get(record[2]) == path:
+                self._rebuild_ids()
+            self.dirty = True
+
+    def _walk(self, folder: Optional[str] = None) -> Iterator[str]:
+        for root, dirs, files in os.walk(folder or self.folder):
+            # Skip hidden folders such as the pipeline staging directories
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.lower().endswith(profiles.AUDIO_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+    def _rebuild_ids(self) -> None:
+        by_id: Dict[str, str] = {}
+        for path, (_, _, video_id) in self._files.items():
+            if video_id:
+                by_id.setdefault(video_id, path)
+        self._by_id = by_id
@@ -0,0 +1,116 @@
+"""
+Bounded log bookkeeping for YouTube MP3 Downloader.
+
+The log area keeps at most ``max_lines`` lines. ``LogBuffer`` tracks how
+many lines the view holds and turns each batch of new entries into one
+``LogUpdate``: the text to insert in a single operation, whether the
+trailing progress line must be replaced, and how many of the oldest lines
+to evict. Eviction happens in chunks so the view is not trimmed on every
+insert. Consecutive progress entries collapse into one line that is
+updated in place, the way a terminal progress bar behaves.
+
+This module has no GTK dependency; the window applies the updates to its
+Gtk.TextBuffer.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_LINES = 5000
+MIN_MAX_LINES = 100
+MAX_MAX_LINES = 100000
+
+# A queued log entry: (text, is_progress_line)
+LogEntry = Tuple[str, bool]
+
+
+class LogUpdate:
+    """One batched change to the log view."""
+
+    __slots__ = ("replace_progress", "text", "evict")
+
+    def __init__(self, replace_progress: bool, text: str, evict: int) -> None:
+        # Delete the last line (a progress line) before inserting
+        self.replace_progress = replace_progress
+        # Text to append at the end, each line terminated by a newline
+        self.text = text
+        # Number of leading lines to delete after inserting
+        self.evict = evict
+
+    def __repr__(self) -> str:
+        return "LogUpdate(replace_progress={}, text={!r}, evict={})".format(
+            self.replace_progress, self.text, self.evict
+        )
+
+
+def clamp_max_lines(value: Optional[int]) -> int:
+    """Return a usable line cap from a configured value."""
+    try:
+        value = int(value) if value is not None else DEFAULT_MAX_LINES
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_LINES
+    return max(MIN_MAX_LINES, min(value, MAX_MAX_LINES))
+
+
+class LogBuffer:
+    """Line accounting for a log view with a line cap."""
+
+    def __init__(self, max_lines: Optional[int] = DEFAULT_MAX_LINES) -> None:
+        self.line_count = 0
+        self.trailing_progress = False
+        self.set_max_lines(max_lines)
+
+    def set_max_lines(self, max_lines: Optional[int]) -> None:
+        """Change the line cap; it takes effect with the next update."""
+        self.max_lines = clamp_max_lines(max_lines)
+        # Evict a tenth of the cap at a time
+        self.evict_chunk = max(1, self.max_lines // 10)
+
+    def reset(self) -> None:
+        """Forget all lines (the view was cleared)."""
+        self.line_count = 0
+        self.trailing_progress = False
+
+    def plan(self, entries: Sequence[LogEntry]) -> Optional[LogUpdate]:
+        """
+        Fold a batch of entries into a single update.
+
+        Args:
+            entries: Log entries in the order they were posted
+
+        Returns:
+            The update to apply, or None if there is nothing to do
+        """
+        if not entries:
+            return None
+
+        replace_progress = False
+        lines: List[str] = []
+        last_is_progress = self.trailing_progress
+        for text, is_progress in entries:
+            if is_progress:
+                text = text.replace("\n", " ")
+                if last_is_progress:
+                    if lines:
+                        lines[-1] = text
+                    else:
+                        replace_progress = True
+                        lines.append(text)
+                    continue
+            lines.extend(text.split("\n"))
+            last_is_progress = is_progress
+
+        existing = self.line_count - (1 if replace_progress else 0)
+        total = existing + len(lines)
+        evict = 0
+        if total > self.max_lines:
+            evict = total - (self.max_lines - self.evict_chunk)
+            if evict >= existing:
+                # The batch alone fills the view: drop its oldest lines as well
+                lines = lines[evict - existing:]
+                evict = existing
+
+        self.line_count = existing - evict + len(lines)
+        self.trailing_progress = last_is_progress
+        return LogUpdate(replace_progress, "".join(line + "\n" for line in lines), evict)
@@ -83,3 +83,20 @@ def get_logger(name: str = "youtubemp3downloader") -> logging.Logger:
     if not logger.handlers:
         return setup_logger(name)
     return logger
+
+
+def set_console_level(level: int) -> None:
+    """
+    Change the level of the console handlers of every application logger.
+
+    The log file keeps recording at its own level.
+
+    Args:
+        level: New minimum level for messages printed to the terminal
+    """
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if not name.startswith("youtubemp3downloader") or not isinstance(logger, logging.Logger):
+            continue
+        for handler in logger.handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setLevel(level)
@@ -1,36 +1,42 @@
 import sys
-import shutil
 
-import gi
+# Imported first so the startup timer includes loading GTK
+from . import startup
+
+import gi  # noqa: E402
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GLib, Gio  # noqa: E402
 
-from .app_window import YouTubeMp3Downloader  # noqa: E402
-from .dialogs import PreferencesDialog  # noqa: E402
 from . import config  # noqa: E402
 from .exceptions import DependencyError  # noqa: E402
 from .logger import get_logger  # noqa: E402
 
 logger = get_logger(__name__)
 
+STARTUP_TIMING_FLAG = "--startup-timing"
+
 
 def check_dependencies() -> bool:
     """
     Check for required command-line tools.
 
+    The result of the last check is reused while PATH and the tools are
+    unchanged; see ``startup.check_dependencies``.
+
     Raises:
         DependencyError: If required dependencies are missing
     """
     logger.info("Checking dependencies...")
 
+    report = startup.check_dependencies()
+    for tool in ("yt-dlp", "ffmpeg"):
+        if report.version(tool):
+            logger.info(f"{tool}: {report.version(tool)}")
+
     # Check required dependencies
-    missing_deps = []
-    if not shutil.which("yt-dlp"):
-        logger.error("yt-dlp not found in PATH")
-        missing_deps.append("yt-dlp")
-    if not shutil.which("ffmpeg"):
-        logger.error("ffmpeg not found in PATH")
-        missing_deps.append("ffmpeg")
+    missing_deps = report.missing_required
+    for tool in missing_deps:
+        logger.error(f"{tool} not found in PATH")
 
     if missing_deps:
         logger.critical(f"Missing required dependencies: {', '.join(missing_deps)}")
@@ -59,13 +65,13 @@ def check_dependencies() -> bool:
         raise DependencyError(missing_deps)
 
     # Check optional dependencies and warn if missing
-    optional_deps = []
-    if not shutil.which("notify-send"):
+    optional_deps = report.missing_optional
+    if "notify-send" in optional_deps:
         logger.warning("notify-send not found - notifications may not work")
-        optional_deps.append("notify-send")
-    if not shutil.which("xdg-open"):
+    if "xdg-open" in optional_deps:
         logger.warning("xdg-open not found - opening folders may not work")
-        optional_deps.append("xdg-open")
+    if report.encoders and not report.has_encoder("libmp3lame"):
+        logger.warning("ffmpeg has no libmp3lame encoder - MP3 conversion will fail")
 
     if optional_deps:
         logger.info(f"Optional dependencies missing (non-critical): {', '.join(optional_deps)}")
@@ -75,16 +81,21 @@ def check_dependencies() -> bool:
 
 
 class Application(Gtk.Application):
-    def __init__(self):
+    def __init__(self, startup_timing=False):
         super().__init__(application_id="com.github.youtube-mp3-downloader")
         self.window = None
+        self.startup_timing = startup_timing
 
     def do_activate(self):
         """Activate the application and create the main window."""
         try:
             if not self.window:
                 logger.info("Creating application window...")
+                # Imported here so GTK is up before the window modules load
+                from .app_window import YouTubeMp3Downloader
+                startup.timer.mark("window modules")
                 self.window = YouTubeMp3Downloader()
+                startup.timer.mark("main window")
                 self.window.set_application(self)
                 self.add_window(self.window)
 
@@ -112,6 +123,9 @@ class Application(Gtk.Application):
 
             self.window.show_all()
             logger.info("Application window shown")
+            if self.startup_timing and not any(phase == "first frame" for phase, _ in startup.timer.phases):
+                # Idle callbacks run once the pending redraw is done
+                GLib.idle_add(self._report_startup_timing)
         except Exception as e:
             logger.critical(f"Failed to activate application: {e}", exc_info=True)
             # Show error dialog if possible
@@ -133,9 +147,19 @@ class Application(Gtk.Application):
                 logger.error(f"Failed to show error dialog: {dialog_error}")
             raise
 
+    def _report_startup_timing(self):
+        """Print the time each startup phase took"""
+        startup.timer.mark("first frame")
+        # What the window saves by importing the job modules with the first job
+        from .app_window import import_job_modules
+        startup.timer.measure_deferred("job modules", import_job_modules)
+        print(startup.timer.report(), file=sys.stderr)
+        return False
+
     def on_show_preferences(self, action, parameter):
         """Show the preferences dialog"""
         try:
+            from .dialogs import PreferencesDialog
             PreferencesDialog(self.window)
         except Exception as e:
             logger.error(f"Failed to show preferences dialog: {e}")
@@ -162,6 +186,11 @@ class Application(Gtk.Application):
 def main() -> int:
     """Main entry point for the application."""
     logger.info("YouTube MP3 Downloader starting...")
+    startup.timer.mark("imports")
+
+    # Our own switch; GTK would reject it
+    argv = [arg for arg in sys.argv if arg != STARTUP_TIMING_FLAG]
+    startup_timing = len(argv) != len(sys.argv)
 
     try:
         # Check dependencies before starting the app
@@ -169,10 +198,11 @@ def main() -> int:
     except DependencyError:
         logger.critical("Cannot start application due to missing dependencies")
         return 1
+    startup.timer.mark("dependency check")
 
     try:
-        app = Application()
-        return int(app.run(sys.argv))
+        app = Application(startup_timing=startup_timing)
+        return int(app.run(argv))
     except Exception as e:
         logger.critical(f"Application crashed: {e}", exc_info=True)
         return 1
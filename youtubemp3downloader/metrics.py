@@ -0,0 +1,411 @@
+"""
+Download metrics for YouTube MP3 Downloader.
+
+A small registry of counters, gauges and histograms that renders the
+Prometheus text exposition format, so download boxes can be graphed
+over time:
+
+- ``DownloadMetrics`` holds what the downloads report: bytes received,
+  item outcomes, failure classes, per-item download and conversion
+  seconds, speed samples and the number of jobs in each queue state.
+- ``TextfileExporter`` writes the registry to a ``.prom`` file for the
+  node_exporter textfile collector at a fixed interval. The download
+  service also serves it at ``GET /metrics``.
+
+Only the standard library is used; metric names follow the Prometheus
+conventions (``_total`` counters, base units).
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds between textfile writes
+DEFAULT_INTERVAL = 15.0
+
+# Item durations, in seconds
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Download speed samples, in bytes per second
+SPEED_BUCKETS = tuple(float(2 ** power) for power in range(16, 27, 2))
+
+# Failure classes, checked in order against the error message
+FAILURE_CLASSES = (
+    ("unavailable", ("Video unavailable", "This video has been", "no longer available", "removed by the uploader",
+                     "has been terminated", "Video is not available", "recording is not available")),
+    ("private", ("Private video", "Sign in to confirm", "login required")),
+    ("members_only", ("Members-only", "Join this channel")),
+    ("rate_limited", ("HTTP Error 429", "Too Many Requests")),
+    ("forbidden", ("HTTP Error 403", "Forbidden")),
+    ("network", ("timed out", "Connection reset", "Connection refused", "Temporary failure in name resolution",
+                 "Unable to download webpage", "IncompleteRead")),
+    ("conversion", ("ffmpeg", "Postprocessing", "conversion failed")),
+)
+OTHER_FAILURE = "other"
+
+LabelValues = Tuple[str, ...]
+
+
+def classify_failure(message: Optional[str]) -> str:
+    """Failure class of a yt-dlp or ffmpeg error message."""
+    text = (message or "").lower()
+    for name, keywords in FAILURE_CLASSES:
+        if any(keyword.lower() in text for keyword in keywords):
+            return name
+    return OTHER_FAILURE
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, _escape(str(value))) for name, value in pairs) + "}"
+
+
+class _Metric:
+    """A metric family: one value per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError("{} takes the labels {}, not {}".format(self.name, self.labelnames, sorted(labels)))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = ["# HELP {} {}".format(self.name, self.help.replace("\\", "\\\\").replace("\n", "\\n")),
+                 "# TYPE {} {}".format(self.name, self.kind)]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters cannot go down")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def label_values(self) -> List[LabelValues]:
+        """Every combination of label values seen so far."""
+        with self._lock:
+            return list(self._values)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return ["{}{} {}".format(self.name, _labels(self.labelnames, key), _format_value(value))
+                for key, value in values]
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, with their sum.
+
+    Args:
+        buckets: Upper bounds, in increasing order; +Inf is added
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Sequence[float] = DURATION_BUCKETS,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        # Per label values: (count per bucket, +Inf last; sum)
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+        if not self.labelnames:
+            self._values[()] = ([0] * (len(self.buckets) + 1), 0.0)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels)) or ([0], 0.0)
+            return sum(counts)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(
+                    self.name, _labels(self.labelnames, key, [("le", _format_value(bound))]), cumulative
+                ))
+            lines.append("{}_sum{} {}".format(self.name, _labels(self.labelnames, key), _format_value(total)))
+            lines.append("{}_count{} {}".format(self.name, _labels(self.labelnames, key), cumulative))
+        return lines
+
+
+class Registry:
+    """
+    The metrics of one process.
+
+    Collectors run before every render, to refresh values that are read
+    rather than counted, such as the queue depth.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Any]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError("Metric {} is already registered".format(metric.name))
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.register(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, help_text, labelnames)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self, name: str, help_text: str, buckets: Sequence[float] = DURATION_BUCKETS, labelnames: Sequence[str] = ()
+    ) -> Histogram:
+        metric = Histogram(name, help_text, buckets, labelnames)
+        self.register(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Any]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format."""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+    def write_textfile(self, path: Union[str, Path]) -> None:
+        """
+        Write the registry to a file, replacing it atomically.
+
+        Raises:
+            OSError: If the file could not be written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+class DownloadMetrics:
+    """
+    What the downloads of this process report.
+
+    Thread-safe; one instance is shared by every job.
+
+    Args:
+        registry: Registry the metrics are added to (a new one if None)
+    """
+
+    def __init__(self, registry: Optional[Registry] = None) -> None:
+        self.registry = registry or Registry()
+        r = self.registry
+        self.downloaded_bytes = r.counter("ytmp3_downloaded_bytes_total", "Bytes received by downloads.")
+        self.items = r.counter("ytmp3_items_total", "Finished videos by outcome.", ["outcome"])
+        self.failures = r.counter("ytmp3_failures_total", "Failed videos by failure class.", ["reason"])
+        self.download_seconds = r.histogram(
+            "ytmp3_item_download_seconds", "Time spent downloading one video.", DURATION_BUCKETS
+        )
+        self.transcode_seconds = r.histogram(
+            "ytmp3_item_transcode_seconds", "Time spent converting one video.", DURATION_BUCKETS
+        )
+        self.speed = r.histogram(
+            "ytmp3_download_speed_bytes_per_second", "Download speed samples.", SPEED_BUCKETS
+        )
+        self.jobs = r.gauge("ytmp3_jobs", "Jobs in the queue by state.", ["state"])
+
+    def record_bytes(self, count: float) -> None:
+        if count > 0:
+            self.downloaded_bytes.inc(count)
+
+    def record_speed(self, bytes_per_second: float) -> None:
+        self.speed.observe(bytes_per_second)
+
+    def record_outcomes(self, successful: int, skipped: int, failed_messages: Iterable[Optional[str]]) -> None:
+        """Count the finished videos of a run, and the class of each failure."""
+        if successful:
+            self.items.inc(successful, outcome="done")
+        if skipped:
+            self.items.inc(skipped, outcome="skipped")
+        for message in failed_messages:
+            self.items.inc(outcome="failed")
+            self.failures.inc(reason=classify_failure(message))
+
+    def set_queue(self, states: Iterable[str]) -> None:
+        """Set the queue depth from the states of the queued jobs."""
+        counts: Dict[str, int] = {}
+        for state in states:
+            counts[state] = counts.get(state, 0) + 1
+        # States no job is in any more go back to zero rather than disappearing
+        known = [key[0] for key in self.jobs.label_values()]
+        for state in set(known) | set(counts):
+            self.jobs.set(counts.get(state, 0), state=state)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class TextfileExporter:
+    """
+    Writes a registry to a file at a fixed interval.
+
+    Point the node_exporter textfile collector at a ``.prom`` file to have
+    the metrics scraped with the rest of the machine's.
+
+    Args:
+        registry: Metrics to write
+        path: File to write
+        interval: Seconds between writes
+    """
+
+    def __init__(self, registry: Registry, path: Union[str, Path], interval: float = DEFAULT_INTERVAL) -> None:
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> bool:
+        try:
+            self.registry.write_textfile(self.path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {self.path}: {e}")
+            return False
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+        self._thread.start()
+        logger.info(f"Writing metrics to {self.path} every {self.interval:g}s")
+
+    def _run(self) -> None:
+        self.write()
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self) -> None:
+        """Stop writing, after a last write with the final values."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        self.write()
+
+
+def exporter_from_settings(
+    settings: Dict[str, Any], download_metrics: DownloadMetrics
+) -> Optional[TextfileExporter]:
+    """
+    Read the ``metrics_textfile`` and ``metrics_interval`` settings.
+
+    Returns:
+        An exporter that is not started yet, or None if no file is set
+    """
+    path = settings.get("metrics_textfile")
+    if not path:
+        return None
+    try:
+        interval = float(settings.get("metrics_interval", DEFAULT_INTERVAL))
+    except (TypeError, ValueError):
+        logger.warning("Invalid metrics_interval setting, using the default")
+        interval = DEFAULT_INTERVAL
+    return TextfileExporter(download_metrics.registry, os.path.expanduser(str(path)), max(interval, 1.0))
@@ -0,0 +1,265 @@
+"""
+Two-stage download/transcode pipeline for YouTube MP3 Downloader.
+
+The network stage fetches the best audio stream into a staging directory
+and hands each finished file to a pool of transcoders through a bounded
+queue. A full queue blocks the network stage (backpressure), so downloads
+and the CPU-heavy MP3 encode overlap instead of alternating per video.
+
+Each staged file is deleted as soon as its item is finished with. A
+journaled job stages into a folder named after its journal ID, so a
+resumed job finds the partial downloads it left behind; the folder is
+deleted once the job ends or is discarded.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from typing import Callable, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Extensions yt-dlp may leave next to the audio file in a staging directory
+THUMBNAIL_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+TEMPORARY_EXTENSIONS = (".part", ".ytdl", ".temp")
+
+# Staging folders are hidden inside the download folder
+STAGING_PREFIX = ".ytmp3-staging-"
+
+_SENTINEL = None
+
+
+def default_transcode_workers() -> int:
+    """Return the transcoder pool size (one per CPU core)."""
+    return os.cpu_count() or 1
+
+
+class TranscodeTask:
+    """A staged audio file waiting to be encoded into its final location."""
+
+    def __init__(
+        self,
+        item,
+        source: str,
+        target: str,
+        thumbnail: Optional[str] = None,
+        audio_args: Optional[List[str]] = None,
+        staged: Optional[List[str]] = None,
+    ) -> None:
+        self.item = item
+        self.source = source
+        self.target = target
+        self.thumbnail = thumbnail
+        # ffmpeg audio and container options; 320 kbps MP3 if None
+        self.audio_args = audio_args
+        # Staging files to delete once the item is finished with
+        self.staged = list(staged) if staged is not None else [source]
+
+    def remove_staged(self) -> None:
+        """Delete the staged files of the task."""
+        remove_staged_files(self.staged)
+
+
+def remove_staged_files(paths: List[str]) -> None:
+    """Delete staged files that are no longer needed."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete staged file {path}: {e}")
+
+
+def staging_dir(download_path: str, job_id: Optional[str] = None) -> str:
+    """
+    Create the staging folder of a job inside its download folder.
+
+    Args:
+        download_path: Download folder
+        job_id: Journal ID of the job; the same folder is returned every
+            time, so a resumed job reuses it. Without one a new folder is made.
+
+    Returns:
+        Path of the staging folder
+    """
+    if job_id is None:
+        return tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=download_path)
+    path = os.path.join(download_path, STAGING_PREFIX + job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def remove_staging(download_path: str, job_id: Optional[str]) -> None:
+    """Delete the staging folder of a job that ended or was discarded."""
+    if not job_id or not download_path:
+        return
+    path = os.path.join(download_path, STAGING_PREFIX + job_id)
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+        logger.debug(f"Removed staging folder {path}")
+
+
+def find_staged_files(staging_dir: str, prefix: str = ""):
+    """
+    Locate the audio file and thumbnail yt-dlp left in a staging directory.
+
+    Args:
+        staging_dir: Staging directory shared by all items of a run
+        prefix: Filename prefix identifying the item ("" matches any file)
+
+    Returns:
+        Tuple of (audio_path, thumbnail_path); either may be None
+    """
+    audio = None
+    thumbnail = None
+    try:
+        names = sorted(os.listdir(staging_dir))
+    except OSError as e:
+        logger.warning(f"Could not list staging directory {staging_dir}: {e}")
+        return None, None
+
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        path = os.path.join(staging_dir, name)
+        if not os.path.isfile(path):
+            continue
+        lower = name.lower()
+        if lower.endswith(TEMPORARY_EXTENSIONS):
+            continue
+        if lower.endswith(THUMBNAIL_EXTENSIONS):
+            if thumbnail is None or lower.endswith((".jpg", ".jpeg")):
+                thumbnail = path
+        elif audio is None:
+            audio = path
+    return audio, thumbnail
+
+
+def build_transcode_command(
+    source: str,
+    output: str,
+    thumbnail: Optional[str] = None,
+    bitrate: str = "320k",
+    audio_args: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Build the ffmpeg command that encodes a staged file to MP3.
+
+    Args:
+        source: Staged audio file (any container ffmpeg can read)
+        output: Path ffmpeg writes to (the format is set explicitly, whatever the extension)
+        thumbnail: Optional cover image to embed as front cover
+        bitrate: Constant bitrate for LAME
+        audio_args: Audio codec and container options replacing the MP3
+            encoding, e.g. a stream copy for an output profile
+
+    Returns:
+        The ffmpeg argument list
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", source]
+    if thumbnail:
+        cmd.extend(["-i", thumbnail])
+    cmd.extend(["-map", "0:a", "-map_metadata", "0"])
+    if thumbnail:
+        cmd.extend([
+            "-map", "1:v",
+            "-c:v", "mjpeg",
+            "-disposition:v", "attached_pic",
+            "-metadata:s:v", "title=Album cover",
+            "-metadata:s:v", "comment=Cover (front)",
+        ])
+    if audio_args is None:
+        audio_args = [
+            "-c:a", "libmp3lame",
+            "-b:a", bitrate,
+            "-id3v2_version", "3",
+            "-f", "mp3",
+        ]
+    cmd.extend(audio_args)
+    cmd.append(output)
+    return cmd
+
+
+class TranscodePipeline:
+    """
+    Bounded hand-off between the network stage and a pool of transcoders.
+
+    ``transcode`` is called from a worker thread for every submitted task
+    and should return True on success. ``on_finished`` receives the task and
+    the outcome once the task left the pipeline.
+    """
+
+    def __init__(
+        self,
+        transcode: Callable[[TranscodeTask], bool],
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        stop_event: Optional[threading.Event] = None,
+        on_finished: Optional[Callable[[TranscodeTask, bool], None]] = None,
+    ) -> None:
+        self.transcode = transcode
+        self.workers = max(1, workers or default_transcode_workers())
+        self.stop_event = stop_event or threading.Event()
+        self.on_finished = on_finished
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or self.workers * 2)
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the transcoder threads."""
+        logger.info(f"Starting transcode pool with {self.workers} worker(s)")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name="transcode-worker-{}".format(i), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, task: TranscodeTask) -> bool:
+        """
+        Queue a staged file for transcoding, blocking while the queue is full.
+
+        Returns:
+            False if the pipeline was stopped before the task was accepted
+        """
+        while not self.stop_event.is_set():
+            try:
+                self._queue.put(task, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @property
+    def pending(self) -> int:
+        """Number of staged files waiting for a transcoder."""
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Wait for queued tasks to finish and stop the transcoder threads."""
+        for _ in self._threads:
+            self._queue.put(_SENTINEL)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker_loop(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is _SENTINEL:
+                return
+            success = False
+            if not self.stop_event.is_set():
+                try:
+                    success = bool(self.transcode(task))
+                except Exception as e:
+                    logger.error(f"Transcode failed for {task.source}: {e}", exc_info=True)
+            if self.on_finished:
+                try:
+                    self.on_finished(task, success)
+                except Exception as e:
+                    logger.warning(f"Transcode finished callback failed: {e}")
@@ -0,0 +1,270 @@
+"""
+Persistent playlist metadata cache for YouTube MP3 Downloader.
+
+Enumerating a large playlist with ``yt-dlp --flat-playlist`` can take tens
+of seconds. The entries of every enumerated playlist are kept in a SQLite
+database under the configuration directory, keyed by playlist ID, so a
+playlist can be shown again instantly and refreshed in the background.
+
+Entries younger than the TTL are considered fresh. Older entries are still
+returned (flagged as stale) until they reach the maximum age, after which
+they are evicted. The least recently used playlists are also evicted once
+the cache holds more than ``max_entries`` videos in total.
+
+The cache is an optimization only: database errors are logged and treated
+as cache misses.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from . import config
+from . import utils
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILENAME = "playlist_cache.sqlite3"
+
+# Entries younger than this are used without revalidation
+DEFAULT_TTL = 6 * 3600
+# Entries older than this are evicted
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+# Upper bound for the number of cached videos across all playlists
+DEFAULT_MAX_ENTRIES = 200000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    playlist_id TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    entry_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    playlist_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS durations (
+    playlist_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (playlist_id, video_id)
+) WITHOUT ROWID;
+"""
+
+
+def default_cache_path() -> Path:
+    """Return the location of the cache database."""
+    return config.CONFIG_DIR / CACHE_FILENAME
+
+
+def playlist_id_from_url(url: str) -> Optional[str]:
+    """Return the playlist ID of a playlist URL, or None for other URLs."""
+    try:
+        url_type, match = utils.classify_youtube_url(url)
+    except Exception:
+        return None
+    if url_type != "Playlist" or not match:
+        return None
+    return str(match.group(1))
+
+
+class CachedPlaylist:
+    """Playlist entries read from the cache, with the durations known for them."""
+
+    def __init__(
+        self,
+        playlist_id: str,
+        playlist_info: Dict[str, str],
+        fetched_at: float,
+        ttl: float,
+        durations: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.playlist_id = playlist_id
+        self.playlist_info = playlist_info
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.durations = durations or {}
+
+    @property
+    def age(self) -> float:
+        """Seconds since the entries were fetched."""
+        return max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def is_fresh(self) -> bool:
+        """True if the entries are younger than the TTL."""
+        return self.age < self.ttl
+
+
+class PlaylistCache:
+    """
+    SQLite-backed store of playlist entries.
+
+    A new connection is opened for every operation, so one instance can be
+    shared between the UI thread and background fetch threads.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ttl: float = DEFAULT_TTL,
+        max_age: float = DEFAULT_MAX_AGE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = Path(path) if path else default_cache_path()
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        if not self._initialized:
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def get(self, playlist_id: str) -> Optional[CachedPlaylist]:
+        """
+        Look up a playlist.
+
+        Args:
+            playlist_id: YouTube playlist ID
+
+        Returns:
+            The cached entries (possibly stale), or None on a miss
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    row = conn.execute(
+                        "SELECT fetched_at FROM playlists WHERE playlist_id = ?", (playlist_id,)
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    fetched_at = row[0]
+                    if now - fetched_at >= self.max_age:
+                        self._delete(conn, playlist_id)
+                        return None
+                    rows = conn.execute(
+                        "SELECT video_id, title FROM entries WHERE playlist_id = ? ORDER BY position",
+                        (playlist_id,),
+                    ).fetchall()
+                    durations = conn.execute(
+                        "SELECT video_id, seconds FROM durations WHERE playlist_id = ?", (playlist_id,)
+                    ).fetchall()
+                    conn.execute("UPDATE playlists SET last_used = ? WHERE playlist_id = ?", (now, playlist_id))
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Playlist cache lookup failed: {e}")
+            return None
+
+        if not rows:
+            return None
+        logger.debug(f"Playlist cache hit for {playlist_id}: {len(rows)} entries")
+        return CachedPlaylist(playlist_id, dict(rows), fetched_at, self.ttl, dict(durations))
+
+    def durations_for(self, url: str) -> Dict[str, float]:
+        """Video durations cached for a playlist URL; empty for other URLs and misses."""
+        playlist_id = playlist_id_from_url(url)
+        cached = self.get(playlist_id) if playlist_id else None
+        return cached.durations if cached is not None else {}
+
+    def put(
+        self,
+        playlist_id: str,
+        playlist_info: Dict[str, str],
+        durations: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """
+        Store the entries of a playlist, replacing any previous entries.
+
+        Args:
+            playlist_id: YouTube playlist ID
+            playlist_info: Ordered mapping of video ID to display title
+            durations: Length in seconds of the videos that report one
+        """
+        if not playlist_info:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    self._delete(conn, playlist_id)
+                    conn.execute(
+                        "INSERT INTO playlists (playlist_id, fetched_at, last_used, entry_count) VALUES (?, ?, ?, ?)",
+                        (playlist_id, now, now, len(playlist_info)),
+                    )
+                    conn.executemany(
+                        "INSERT INTO entries (playlist_id, position, video_id, title) VALUES (?, ?, ?, ?)",
+                        (
+                            (playlist_id, position, video_id, title)
+                            for position, (video_id, title) in enumerate(playlist_info.items(), 1)
+                        ),
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO durations (playlist_id, video_id, seconds) VALUES (?, ?, ?)",
+                        (
+                            (playlist_id, video_id, seconds)
+                            for video_id, seconds in (durations or {}).items() if video_id in playlist_info
+                        ),
+                    )
+                    self._evict(conn, now)
+            finally:
+                conn.close()
+            logger.debug(f"Cached {len(playlist_info)} entries for playlist {playlist_id}")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not update playlist cache: {e}")
+
+    def invalidate(self, playlist_id: str) -> None:
+        """Remove a playlist from the cache."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    self._delete(conn, playlist_id)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not invalidate playlist cache entry: {e}")
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, playlist_id: str) -> None:
+        conn.execute("DELETE FROM entries WHERE playlist_id = ?", (playlist_id,))
+        conn.execute("DELETE FROM durations WHERE playlist_id = ?", (playlist_id,))
+        conn.execute("DELETE FROM playlists WHERE playlist_id = ?", (playlist_id,))
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT playlist_id FROM playlists WHERE fetched_at <= ?", (now - self.max_age,)
+        ).fetchall()
+        for (playlist_id,) in expired:
+            self._delete(conn, playlist_id)
+
+        total = conn.execute("SELECT COALESCE(SUM(entry_count), 0) FROM playlists").fetchone()[0]
+        if total <= self.max_entries:
+            return
+        # Least recently used first; always keep the playlist just stored
+        candidates = conn.execute(
+            "SELECT playlist_id, entry_count FROM playlists ORDER BY last_used ASC, fetched_at ASC"
+        ).fetchall()
+        for playlist_id, entry_count in candidates[:-1]:
+            if total <= self.max_entries:
+                break
+            self._delete(conn, playlist_id)
+            total -= entry_count
+            logger.debug(f"Evicted playlist {playlist_id} from cache ({entry_count} entries)")
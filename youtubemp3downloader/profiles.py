@@ -0,0 +1,178 @@
+"""
+Output profiles for YouTube MP3 Downloader.
+
+A profile decides what the downloaded audio becomes. YouTube serves Opus
+(in WebM) and AAC (in M4A) audio at around 130-160 kbps, so encoding it
+to MP3 costs a full decode and LAME encode without improving quality:
+
+- ``mp3-320``: constant 320 kbps MP3, the historical default
+- ``mp3-v0``: variable bitrate MP3 at LAME's best quality setting, about
+  245 kbps on average and encoded just as fast
+- ``native``: the original audio stream copied into an Opus or M4A file,
+  with no re-encoding at all
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import startup
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_MP3_320 = "mp3-320"
+PROFILE_MP3_V0 = "mp3-v0"
+PROFILE_NATIVE = "native"
+
+DEFAULT_PROFILE = PROFILE_MP3_320
+
+# Container for a copied audio stream, by the extension yt-dlp downloaded it with
+_NATIVE_CONTAINERS = {
+    ".m4a": (".m4a", "ipod"),
+    ".mp4": (".m4a", "ipod"),
+    ".aac": (".m4a", "ipod"),
+    ".webm": (".opus", "opus"),
+    ".opus": (".opus", "opus"),
+    ".ogg": (".ogg", "ogg"),
+    ".mp3": (".mp3", "mp3"),
+}
+
+# Containers ffmpeg can attach a cover image to
+_COVER_CONTAINERS = ("mp3", "ipod")
+
+
+class OutputProfile:
+    """
+    How downloaded audio is turned into the final file.
+
+    Args:
+        name: Identifier stored in the configuration
+        label: Name shown in the interface
+        codec: yt-dlp ``--audio-format`` ("best" keeps the original codec)
+        quality: yt-dlp ``--audio-quality`` VBR level, if any
+        extensions: Extensions of the files this profile produces, the
+            usual one first
+        encoder_args: Extra ffmpeg arguments for the encoder, e.g. a bitrate
+    """
+
+    def __init__(
+        self,
+        name: str,
+        label: str,
+        codec: str,
+        quality: Optional[str],
+        extensions: Tuple[str, ...],
+        encoder_args: Tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.label = label
+        self.codec = codec
+        self.quality = quality
+        self.extensions = extensions
+        self.encoder_args = encoder_args
+
+    @property
+    def transcodes(self) -> bool:
+        """True if the audio is re-encoded rather than copied."""
+        return self.codec != "best"
+
+    def embeds_thumbnail(self, in_process: bool = False) -> bool:
+        """
+        True if yt-dlp can embed the cover into every file this profile makes.
+
+        yt-dlp needs mutagen to embed a cover into Opus files.
+
+        Args:
+            in_process: yt-dlp runs in the in-process engine rather than as a command
+        """
+        return self.transcodes or startup.has_mutagen(in_process)
+
+    @property
+    def extension(self) -> str:
+        return self.extensions[0]
+
+    def ytdlp_args(self) -> List[str]:
+        """yt-dlp arguments extracting the audio in this profile."""
+        args = ["-x", "--audio-format", self.codec]
+        if self.quality:
+            args.extend(["--audio-quality", self.quality])
+        if self.encoder_args:
+            args.extend(["--postprocessor-args", "ffmpeg:" + " ".join(self.encoder_args)])
+        return args
+
+    def postprocessor(self) -> Dict[str, Any]:
+        """yt_dlp.YoutubeDL FFmpegExtractAudio postprocessor for this profile."""
+        pp: Dict[str, Any] = {"key": "FFmpegExtractAudio", "preferredcodec": self.codec}
+        if self.quality:
+            pp["preferredquality"] = self.quality
+        return pp
+
+    def postprocessor_args(self) -> Dict[str, List[str]]:
+        """yt_dlp.YoutubeDL ``postprocessor_args`` for this profile."""
+        return {"ffmpeg": list(self.encoder_args)} if self.encoder_args else {}
+
+    def output_for(self, source: str) -> Tuple[str, List[str], bool]:
+        """
+        Pick the final file type for a staged download.
+
+        Args:
+            source: Staged audio file as downloaded by yt-dlp
+
+        Returns:
+            (extension, ffmpeg arguments for the audio stream and container,
+            whether the container can hold a cover image)
+        """
+        if not self.transcodes:
+            return remux_args(source)
+        args = ["-c:a", "libmp3lame"]
+        if self.quality:
+            args.extend(["-q:a", self.quality])
+        args.extend(self.encoder_args)
+        args.extend(["-id3v2_version", "3", "-f", "mp3"])
+        return ".mp3", args, True
+
+    def __repr__(self) -> str:
+        return "OutputProfile({!r})".format(self.name)
+
+
+PROFILES: Dict[str, OutputProfile] = {
+    PROFILE_MP3_320: OutputProfile(PROFILE_MP3_320, "MP3 320 kbps", "mp3", None, (".mp3",), ("-b:a", "320k")),
+    PROFILE_MP3_V0: OutputProfile(PROFILE_MP3_V0, "MP3 VBR V0", "mp3", "0", (".mp3",)),
+    PROFILE_NATIVE: OutputProfile(PROFILE_NATIVE, "Original audio (no re-encoding)", "best", None,
+                                  (".opus", ".m4a", ".ogg", ".mp3")),
+}
+
+# Every extension some profile can produce
+AUDIO_EXTENSIONS = tuple(sorted({ext for profile in PROFILES.values() for ext in profile.extensions}))
+
+
+def remux_args(source: str) -> Tuple[str, List[str], bool]:
+    """
+    ffmpeg arguments copying an audio stream into a matching container.
+
+    Returns:
+        (extension, ffmpeg arguments for the audio stream and container,
+        whether the container can hold a cover image)
+    """
+    extension, muxer = _NATIVE_CONTAINERS.get(os.path.splitext(source)[1].lower(), (".m4a", "ipod"))
+    args = ["-c:a", "copy"]
+    if muxer == "mp3":
+        args.extend(["-id3v2_version", "3"])
+    args.extend(["-f", muxer])
+    return extension, args, muxer in _COVER_CONTAINERS
+
+
+def get_profile(name: Optional[str]) -> OutputProfile:
+    """
+    Look up a profile by name.
+
+    Returns:
+        The profile, or the default profile if the name is unknown
+    """
+    profile = PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        logger.warning(f"Unknown output profile {name!r}, using {DEFAULT_PROFILE}")
+        return PROFILES[DEFAULT_PROFILE]
+    return profile
@@ -0,0 +1,209 @@
+"""
+Machine-readable yt-dlp progress protocol for YouTube MP3 Downloader.
+
+yt-dlp is started with ``--progress-template`` so every progress update
+arrives as one compact tab-separated record instead of the human progress
+bar, and with ``--print`` templates that announce each item when it was
+extracted (``pre_process``) and once its final file is in place
+(``after_move``). ``ProgressParser`` turns those records into typed events.
+Human lines are only read for errors and for videos listed in the download
+archive, which yt-dlp rejects before any ``--print`` stage runs. The parser
+has no GTK dependency so it can be tested and benchmarked on its own.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+
+from . import events
+
+RECORD_PREFIX = "[ytmp3]"
+
+# Record kinds printed with --print; progress records carry the yt-dlp status
+ITEM_RECORD = "item"
+SAVED_RECORD = "saved"
+
+# Field order of a progress record; the filename goes last because it may
+# contain any character except a newline.
+PROGRESS_TEMPLATE = "\t".join([
+    RECORD_PREFIX,
+    "%(progress.status)s",
+    "%(info.id|)s",
+    "%(progress.downloaded_bytes|)s",
+    "%(progress.total_bytes|)s",
+    "%(progress.total_bytes_estimate|)s",
+    "%(progress.speed|)s",
+    "%(progress.eta|)s",
+    "%(progress.filename|)s",
+])
+
+# An item was extracted: its position among the items being downloaded,
+# how many there are, and its title
+ITEM_TEMPLATE = "\t".join([
+    RECORD_PREFIX,
+    ITEM_RECORD,
+    "%(id)s",
+    "%(playlist_autonumber|)s",
+    "%(n_entries|)s",
+    "%(title|)s",
+])
+
+# An item is finished: its final file after conversion and moving
+SAVED_TEMPLATE = "\t".join([
+    RECORD_PREFIX,
+    SAVED_RECORD,
+    "%(id)s",
+    "%(filepath|)s",
+])
+
+# --print implies --quiet and --simulate; the log still shows yt-dlp's messages
+PROGRESS_ARGS = [
+    "--newline",
+    "--progress-template", "download:" + PROGRESS_TEMPLATE,
+    "--no-quiet", "--no-simulate",
+    "--print", "pre_process:" + ITEM_TEMPLATE,
+    "--print", "after_move:" + SAVED_TEMPLATE,
+]
+
+_FIELD_COUNT = 9
+_ITEM_FIELD_COUNT = 6
+_SAVED_FIELD_COUNT = 4
+
+# Parser states
+IDLE = "idle"
+DOWNLOADING = "downloading"
+POSTPROCESSING = "postprocessing"
+
+_ARCHIVED_RE = re.compile(r"\[[\w:]+\] (.+?):? has already been recorded in the archive")
+_VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{11}$")
+_ERROR_ID_RE = re.compile(r"\[youtube(?::tab)?\]\s+([A-Za-z0-9_-]+):")
+
+
+def _to_float(value: str) -> Optional[float]:
+    if not value or value == "NA":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _is_video_id(value: str) -> bool:
+    return len(value) == 11 and _VIDEO_ID_RE.match(value) is not None
+
+
+class ProgressParser:
+    """
+    Incremental parser for yt-dlp output.
+
+    Feed it one line at a time; it returns the events that line produced
+    and keeps track of the current item so that destination events are
+    only emitted when they change.
+    """
+
+    __slots__ = ("state", "video_id", "item_id", "index", "total", "destination", "downloaded")
+
+    def __init__(self) -> None:
+        self.state = IDLE
+        self.video_id: Optional[str] = None
+        # Video of the current item, also known before its first progress record
+        self.item_id: Optional[str] = None
+        self.index = 0
+        self.total = 0
+        self.destination: Optional[str] = None
+        # The current item received data; without any it was already on disk
+        self.downloaded = False
+
+    def feed(self, line: str) -> List[events.DownloadEvent]:
+        """Parse one line of output and return the resulting events."""
+        line = line.strip()
+        if not line:
+            return []
+        if line.startswith(RECORD_PREFIX):
+            kind = line[len(RECORD_PREFIX) + 1:].split("\t", 1)[0]
+            if kind == ITEM_RECORD:
+                return self._item(line)
+            if kind == SAVED_RECORD:
+                return self._saved(line)
+            return self._record(line)
+        return self._human(line)
+
+    def _item(self, line: str) -> List[events.DownloadEvent]:
+        fields = line.split("\t", _ITEM_FIELD_COUNT - 1)
+        if len(fields) != _ITEM_FIELD_COUNT:
+            return []
+        _, _, video_id, index, total, title = fields
+        self.video_id = None
+        self.item_id = video_id or None
+        self.destination = None
+        self.downloaded = False
+        self.state = IDLE
+        if not (index.isdigit() and total.isdigit()):
+            # A single video has no position
+            return []
+        self.index = int(index)
+        self.total = int(total)
+        return [events.ItemStart(self.index, self.total, self.item_id, title or None)]
+
+    def _saved(self, line: str) -> List[events.DownloadEvent]:
+        fields = line.split("\t", _SAVED_FIELD_COUNT - 1)
+        if len(fields) != _SAVED_FIELD_COUNT:
+            return []
+        _, _, video_id, path = fields
+        item_id = video_id or self.item_id
+        event: events.DownloadEvent
+        if self.downloaded:
+            event = events.PostprocessDone(path or None, item_id)
+        else:
+            event = events.Skipped(path or None, item_id)
+        self.downloaded = False
+        self.state = IDLE
+        return [event]
+
+    def _record(self, line: str) -> List[events.DownloadEvent]:
+        fields = line.split("\t", _FIELD_COUNT - 1)
+        if len(fields) != _FIELD_COUNT:
+            return []
+        _, status, video_id, downloaded, total_bytes, estimate, speed, eta, filename = fields
+        result: List[events.DownloadEvent] = []
+
+        if video_id and video_id != self.video_id:
+            self.video_id = video_id
+            self.item_id = video_id
+        if filename and filename != self.destination:
+            self.destination = filename
+            result.append(events.Destination(filename))
+
+        if status == "downloading":
+            self.state = DOWNLOADING
+            self.downloaded = True
+            done = _to_float(downloaded)
+            size = _to_float(total_bytes) or _to_float(estimate)
+            if done is not None and size:
+                speed_bps = _to_float(speed)
+                eta_seconds = _to_float(eta)
+                result.append(events.Progress(
+                    done * 100.0 / size,
+                    events.format_speed(speed_bps),
+                    events.format_eta(eta_seconds),
+                    speed_bps,
+                    done,
+                ))
+        elif status == "finished":
+            self.state = POSTPROCESSING
+        return result
+
+    def _human(self, line: str) -> List[events.DownloadEvent]:
+        result: List[events.DownloadEvent] = [events.LogLine(line)]
+
+        if "has already been recorded in the archive" in line:
+            match = _ARCHIVED_RE.match(line)
+            result.append(events.Skipped(None, match.group(1) if match and _is_video_id(match.group(1)) else None))
+            self.state = IDLE
+            return result
+
+        if "ERROR:" in line:
+            match = _ERROR_ID_RE.search(line)
+            result.append(events.ItemError(line, match.group(1) if match else None))
+        return result
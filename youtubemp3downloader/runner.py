@@ -0,0 +1,222 @@
+"""
+Headless job runner for YouTube MP3 Downloader.
+
+``JobRunner`` starts the jobs of a ``JobQueue`` on download threads while
+the queue's concurrency limit allows, and starts the next ones as runs
+end. It has no user interface of its own: log lines go straight to a
+``JobSink``, while reports and the end of each run are handed to the
+thread that owns the queue through a ``post`` callable. The window passes
+``GLib.idle_add``; the command line interface drains its own event queue.
+All queue changes therefore happen on that one thread.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from . import download
+from . import jobqueue
+from . import pipeline
+from .jobqueue import JobQueue, JobRun, JobSink, QueuedJob
+from .journal import JobJournal
+from .logger import get_logger
+from .playlist_cache import PlaylistCache
+
+logger = get_logger(__name__)
+
+# Schedules a callable on the thread that owns the queue
+PostCallable = Callable[..., Any]
+
+# Returns the download_thread keyword arguments for the next run of a job
+OptionsCallable = Callable[[QueuedJob], Dict[str, Any]]
+
+
+class JobRunner:
+    """
+    Run queued jobs on download threads.
+
+    The runner is the sink of its runs: it forwards their output to
+    ``sink`` and updates the queue when a run ends.
+
+    Args:
+        queue: Jobs to run; only touched from the owner thread
+        sink: Receiver of log lines, reports and finished runs
+        post: Schedules a callable on the owner thread
+        options: Returns download settings (workers, engine, archive...) for a job's run
+        job_journal: Journal every job is recorded in before it starts
+        playlist_cache: Cache used when playlists have to be enumerated
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        sink: JobSink,
+        post: PostCallable,
+        options: Optional[OptionsCallable] = None,
+        job_journal: Optional[JobJournal] = None,
+        playlist_cache: Optional[PlaylistCache] = None,
+    ) -> None:
+        self.queue = queue
+        self.sink = sink
+        self.post = post
+        self.options = options or (lambda job: {})
+        self.job_journal = job_journal
+        self.playlist_cache = playlist_cache if playlist_cache is not None else PlaylistCache()
+        self.runs: Dict[str, JobRun] = {}
+
+    @property
+    def busy(self) -> bool:
+        """True while any job is running."""
+        return bool(self.runs)
+
+    def restore_queue(self) -> int:
+        """
+        Load the jobs left in the queue and trim what their journal finished.
+
+        Returns:
+            Number of jobs restored
+        """
+        if not self.queue.load():
+            return 0
+        if self.job_journal is not None:
+            unfinished = {entry.job_id: entry for entry in self.job_journal.unfinished()}
+            for job in list(self.queue.jobs):
+                entry = unfinished.get(job.journal_id)
+                if entry is not None and job.pending is not None:
+                    left = set(entry.remaining_indices())
+                    job.pending = [index for index in job.pending if index in left]
+                    if not job.pending:
+                        self.job_journal.finish(entry.job_id)
+                        pipeline.remove_staging(job.download_path, entry.job_id)
+                        self.queue.remove(job.job_id)
+        if not self.queue.jobs:
+            self.queue.save()
+        return len(self.queue.jobs)
+
+    def start_jobs(self) -> List[JobRun]:
+        """
+        Start queued jobs while the concurrency limit allows.
+
+        Returns:
+            The runs that were started
+        """
+        started = []
+        while True:
+            picked = self.queue.next_job()
+            if picked is None:
+                break
+            run = self._start(*picked)
+            if run is not None:
+                started.append(run)
+        return started
+
+    def _start(self, job: QueuedJob, batch: Optional[List[int]]) -> Optional[JobRun]:
+        # Journal the whole job once, so every run of it resumes the same entry
+        if self.job_journal is not None and job.journal_id is None:
+            job.journal_id = self.job_journal.begin(
+                job.url, job.url_type, job.download_path, job.use_auth, job.auth_browser,
+                job.playlist_info, job.playlist_items
+            )
+
+        run = JobRun(job, self, batch, self.playlist_cache)
+        run.log_message("Starting download of: {}".format(job.url))
+        run.log_message("Destination: {}".format(job.download_path))
+        if run.playlist_items:
+            run.log_message("Selected videos: {}".format(run.playlist_items))
+        run.log_message("-" * 60)
+        logger.info(f"Starting download thread for {job.url_type} (job {job.job_id})")
+
+        kwargs = dict(self.options(job))
+        kwargs.update(
+            playlist_info=job.playlist_info,
+            job_journal=self.job_journal,
+            job_id=job.journal_id,
+            finish_job=run.is_final,
+        )
+        try:
+            run.thread = threading.Thread(
+                target=download.download_thread,
+                args=(run, job.url, job.url_type, job.download_path, job.use_auth, job.auth_browser,
+                      run.playlist_items),
+                kwargs=kwargs,
+                name="job-{}".format(job.number),
+                daemon=True,
+            )
+            run.thread.start()
+        except Exception as e:
+            logger.error(f"Failed to start download thread: {e}")
+            self.queue.finish_run(job, batch, jobqueue.FAILED)
+            job.status = "Error"
+            run.failed = True
+            self.sink.job_message(run, "Could not start download:\n{}".format(str(e)), True)
+            self.sink.job_finished(run)
+            return None
+        self.runs[job.job_id] = run
+        logger.debug("Download thread started")
+        return run
+
+    def stop(self, job_id: str) -> Optional[JobRun]:
+        """
+        Stop one running job and delete its partial files.
+
+        Returns:
+            The stopped run, or None if the job was not running
+        """
+        run = self.runs.get(job_id)
+        if run is None:
+            return None
+        if run.stop():
+            download.cleanup_partial_files(run)
+        return run
+
+    def stop_all(self, closing: bool = False) -> List[JobRun]:
+        """
+        Stop every running job.
+
+        Args:
+            closing: The application is exiting; jobs stay resumable and
+                partial files are kept for yt-dlp to continue
+        """
+        runs = list(self.runs.values())
+        for run in runs:
+            if closing:
+                run.closing = True
+                run.stop()
+            else:
+                self.stop(run.job.job_id)
+        return runs
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the download threads of the running jobs."""
+        for run in list(self.runs.values()):
+            if run.thread is not None and run.thread.is_alive():
+                run.thread.join(timeout)
+
+    # JobSink of the runs; called from download threads
+
+    def job_log(self, run: JobRun, message: str, progress: bool) -> None:
+        self.sink.job_log(run, message, progress)
+
+    def job_message(self, run: JobRun, message: str, error: bool) -> None:
+        self.post(self.sink.job_message, run, message, error)
+
+    def job_notify(self, run: JobRun, title: str, message: str, icon: str) -> None:
+        self.post(self.sink.job_notify, run, title, message, icon)
+
+    def job_finished(self, run: JobRun) -> None:
+        self.post(self._finish, run)
+
+    def _finish(self, run: JobRun) -> None:
+        """Record the outcome of a run on the owner thread."""
+        job = run.job
+        self.runs.pop(job.job_id, None)
+        if not run.closing and job.state == jobqueue.RUNNING:
+            if run.download_stopped.is_set():
+                state = jobqueue.CANCELLED
+            elif run.failed:
+                state = jobqueue.FAILED
+            else:
+                state = jobqueue.DONE
+            self.queue.finish_run(job, run.batch, state, run.item_outcomes())
+        self.sink.job_finished(run)
@@ -0,0 +1,191 @@
+"""
+Parallel per-item download scheduler for YouTube MP3 Downloader.
+
+Splits the selected playlist items across a pool of worker threads. Each
+worker drives its own download for one item at a time, and the scheduler
+keeps per-item state so that successes, skips and failures can be folded
+into a single end-of-run summary.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Per-item states
+PENDING = "pending"
+RUNNING = "running"
+DOWNLOADED = "downloaded"
+DONE = "done"
+SKIPPED = "skipped"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, SKIPPED, FAILED, CANCELLED)
+
+# States a worker may return; DOWNLOADED hands the item to a later stage
+WORKER_STATES = FINISHED_STATES + (DOWNLOADED,)
+
+# Upper bound for concurrent workers; YouTube throttles aggressively beyond this
+MAX_WORKERS = 8
+
+
+class PlaylistItem:
+    """A single playlist entry and its download state."""
+
+    def __init__(self, index: int, video_id: str, title: str) -> None:
+        self.index = index
+        self.video_id = video_id
+        self.title = title
+        self.state = PENDING
+        self.error: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return "https://www.youtube.com/watch?v={}".format(self.video_id)
+
+    def __repr__(self) -> str:
+        return "PlaylistItem({}, {!r}, {})".format(self.index, self.video_id, self.state)
+
+
+def build_items(playlist_info: Dict[str, str], selected: Optional[Sequence[int]] = None) -> List[PlaylistItem]:
+    """
+    Build schedulable items from playlist information.
+
+    Args:
+        playlist_info: Ordered mapping of video ID to display title
+        selected: 1-based playlist indices to keep (all entries if None)
+
+    Returns:
+        List of PlaylistItem in playlist order
+    """
+    wanted = set(selected) if selected is not None else None
+    items = []
+    for position, (video_id, title) in enumerate(playlist_info.items(), 1):
+        if wanted is None or position in wanted:
+            items.append(PlaylistItem(position, video_id, title))
+    return items
+
+
+class PlaylistScheduler:
+    """
+    Run a worker callable over playlist items with bounded concurrency.
+
+    The worker receives a PlaylistItem and returns the final state for it
+    (DONE, SKIPPED or FAILED), or DOWNLOADED when the item was handed off to
+    a later pipeline stage. Items not yet started when the stop event is set
+    are marked CANCELLED.
+
+    ``limit`` caps how many items run at once below ``max_workers``; it can
+    be changed with ``set_limit`` while the pool runs.
+    """
+
+    def __init__(
+        self,
+        items: Sequence[PlaylistItem],
+        worker: Callable[[PlaylistItem], str],
+        max_workers: int = 1,
+        stop_event: Optional[threading.Event] = None,
+        on_item_finished: Optional[Callable[[PlaylistItem], None]] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        self.items = list(items)
+        self.worker = worker
+        self.max_workers = max(1, min(int(max_workers), MAX_WORKERS))
+        self.stop_event = stop_event or threading.Event()
+        self.on_item_finished = on_item_finished
+        self._pending: Deque[PlaylistItem] = deque(self.items)
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self.limit = self.max_workers
+        self._running = 0
+        if limit is not None:
+            self.set_limit(limit)
+
+    def set_limit(self, limit: int) -> None:
+        """Change how many items may run at once; running items are not interrupted."""
+        with self._lock:
+            self.limit = max(1, min(int(limit), self.max_workers))
+            self._slot_freed.notify_all()
+
+    def _next_item(self) -> Optional[PlaylistItem]:
+        with self._lock:
+            while self._running >= self.limit and self._pending and not self.stop_event.is_set():
+                # Time out now and then so a stop request is noticed
+                self._slot_freed.wait(0.5)
+            if self.stop_event.is_set() or not self._pending:
+                return None
+            item = self._pending.popleft()
+            item.state = RUNNING
+            self._running += 1
+            return item
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._running -= 1
+            self._slot_freed.notify()
+
+    def _finish(self, item: PlaylistItem) -> None:
+        if self.on_item_finished:
+            try:
+                self.on_item_finished(item)
+            except Exception as e:
+                logger.warning(f"Item finished callback failed for #{item.index}: {e}")
+
+    def _worker_loop(self) -> None:
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            try:
+                state = self.worker(item)
+            except Exception as e:
+                logger.error(f"Worker failed on item #{item.index}: {e}", exc_info=True)
+                item.error = str(e)
+                state = FAILED
+            if state not in WORKER_STATES:
+                logger.warning(f"Worker returned unexpected state {state!r} for item #{item.index}")
+                state = FAILED
+            item.state = state
+            self._release_slot()
+            self._finish(item)
+
+    def run(self) -> List[PlaylistItem]:
+        """
+        Process all items and block until the pool is drained.
+
+        Returns:
+            The items with their final states
+        """
+        worker_count = min(self.max_workers, len(self.items)) or 1
+        logger.info(f"Scheduling {len(self.items)} item(s) across {worker_count} worker(s)")
+
+        threads = [
+            threading.Thread(target=self._worker_loop, name="download-worker-{}".format(i), daemon=True)
+            for i in range(worker_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self._lock:
+            leftover = list(self._pending)
+            self._pending.clear()
+        for item in leftover:
+            item.state = CANCELLED
+            self._finish(item)
+
+        return self.items
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of items in each state."""
+        result = {state: 0 for state in (PENDING, RUNNING) + WORKER_STATES}
+        for item in self.items:
+            result[item.state] += 1
+        return result
@@ -0,0 +1,386 @@
+"""
+Startup helpers for YouTube MP3 Downloader.
+
+The window should appear as soon as possible, so work that does not
+change between launches is not repeated on every start:
+
+- ``check_dependencies`` looks up the external tools, their versions and
+  ffmpeg's audio encoders once and caches the result in the configuration
+  directory, keyed on PATH and the modification times of the binaries.
+  A cached result that still matches is used right away and checked again
+  on a background thread. The report includes the optional libraries the
+  yt-dlp command was built with.
+- ``has_mutagen`` tells once per backend whether yt-dlp can embed covers
+  into Opus files.
+- ``StartupTimer`` measures the phases of startup for ``--startup-timing``,
+  and the work deferred until after the first frame.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from . import config
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FILENAME = "dependencies.json"
+
+REQUIRED_TOOLS = ("yt-dlp", "ffmpeg")
+OPTIONAL_TOOLS = ("notify-send", "xdg-open")
+
+# Arguments printing a tool's version on the first line
+VERSION_ARGS = {
+    "yt-dlp": ["--version"],
+    "ffmpeg": ["-hide_banner", "-version"],
+}
+
+# Arguments making yt-dlp print its debug header, including its optional libraries;
+# without a URL it stops right after
+DEBUG_ARGS = ["--verbose", "--ignore-config"]
+
+# Seconds a version or encoder query may take
+PROBE_TIMEOUT = 20
+
+_LIBRARIES_RE = re.compile(r"^\[debug\] Optional libraries: (.*)$", re.MULTILINE)
+
+# Runs a command and returns its output, or None if it failed (see run_tool)
+Runner = Callable[..., Optional[str]]
+
+
+def run_tool(cmd: List[str], stderr: bool = False) -> Optional[str]:
+    """
+    Run a probe command and return its output.
+
+    Args:
+        cmd: Command to run
+        stderr: Return the error output instead, whatever the exit status
+    """
+    try:
+        result = subprocess.run(
+            cmd, stdout=subprocess.DEVNULL if stderr else subprocess.PIPE,
+            stderr=subprocess.PIPE if stderr else subprocess.DEVNULL,
+            universal_newlines=True, timeout=PROBE_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not run {cmd[0]}: {e}")
+        return None
+    if stderr:
+        return result.stderr
+    return result.stdout if result.returncode == 0 else None
+
+
+def parse_encoders(output: str) -> List[str]:
+    """Names of the audio encoders listed by ``ffmpeg -encoders``."""
+    encoders = []
+    listing = False
+    for line in output.splitlines():
+        parts = line.split()
+        if not listing:
+            # The legend ends with a line of dashes
+            listing = bool(parts) and set(parts[0]) == {"-"}
+            continue
+        # Capability flags come first, e.g. "A....D libmp3lame  libmp3lame MP3 ..."
+        if len(parts) >= 2 and parts[0].startswith("A"):
+            encoders.append(parts[1])
+    return encoders
+
+
+def parse_libraries(output: str) -> List[str]:
+    """Names of the optional libraries in yt-dlp's debug header, e.g. "mutagen"."""
+    match = _LIBRARIES_RE.search(output)
+    if match is None:
+        return []
+    libraries = []
+    for entry in match.group(1).split(","):
+        name = re.match(r"[A-Za-z0-9_.]+?(?=-|\s|$)", entry.strip())
+        if name:
+            libraries.append(name.group(0).lower())
+    return libraries
+
+
+def _mtime(path: Optional[str]) -> Optional[float]:
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class DependencyReport:
+    """
+    Where the external tools are, and what they can do.
+
+    Args:
+        path_env: PATH the tools were looked up in
+        tools: Tool name to (path, mtime, version); path is None if missing
+        encoders: Audio encoders of ffmpeg
+        ytdlp_libraries: Optional libraries of the yt-dlp command, lowercase
+        probed_at: When the tools were probed
+        cached: True if the report was read from the cache
+    """
+
+    def __init__(
+        self,
+        path_env: str,
+        tools: Dict[str, Tuple[Optional[str], Optional[float], Optional[str]]],
+        encoders: Sequence[str] = (),
+        ytdlp_libraries: Sequence[str] = (),
+        probed_at: Optional[float] = None,
+        cached: bool = False,
+    ) -> None:
+        self.path_env = path_env
+        self.tools = tools
+        self.encoders = list(encoders)
+        self.ytdlp_libraries = list(ytdlp_libraries)
+        self.probed_at = probed_at if probed_at is not None else time.time()
+        self.cached = cached
+
+    def path(self, tool: str) -> Optional[str]:
+        return self.tools.get(tool, (None, None, None))[0]
+
+    def version(self, tool: str) -> Optional[str]:
+        return self.tools.get(tool, (None, None, None))[2]
+
+    @property
+    def missing_required(self) -> List[str]:
+        return [tool for tool in REQUIRED_TOOLS if not self.path(tool)]
+
+    @property
+    def missing_optional(self) -> List[str]:
+        return [tool for tool in OPTIONAL_TOOLS if not self.path(tool)]
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def is_current(self, path_env: str) -> bool:
+        """
+        True if the report still describes the tools found with ``path_env``.
+
+        Only the binaries found are checked, with one stat each; a tool
+        installed since is noticed by the background check.
+        """
+        if path_env != self.path_env:
+            return False
+        for path, mtime, _ in self.tools.values():
+            if path and _mtime(path) != mtime:
+                return False
+        return True
+
+    def same_tools(self, other: DependencyReport) -> bool:
+        return {name: tool[0] for name, tool in self.tools.items()} == {
+            name: tool[0] for name, tool in other.tools.items()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path_env": self.path_env,
+            "tools": {name: list(tool) for name, tool in self.tools.items()},
+            "encoders": self.encoders,
+            "ytdlp_libraries": self.ytdlp_libraries,
+            "probed_at": self.probed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> DependencyReport:
+        tools = {}
+        for name, tool in data["tools"].items():
+            path, mtime, version = tool
+            tools[str(name)] = (path, None if mtime is None else float(mtime), version)
+        # Reports written before the libraries were probed are probed again
+        return cls(
+            str(data["path_env"]), tools, data.get("encoders", []), data["ytdlp_libraries"],
+            float(data["probed_at"]), cached=True,
+        )
+
+
+def probe_dependencies(
+    path_env: Optional[str] = None,
+    which: Callable[..., Optional[str]] = shutil.which,
+    run: Runner = run_tool,
+) -> DependencyReport:
+    """Look up every tool, its version, ffmpeg's audio encoders and yt-dlp's libraries."""
+    path_env = os.environ.get("PATH", os.defpath) if path_env is None else path_env
+    tools: Dict[str, Tuple[Optional[str], Optional[float], Optional[str]]] = {}
+    for tool in REQUIRED_TOOLS + OPTIONAL_TOOLS:
+        path = which(tool, path=path_env)
+        version = None
+        if path and tool in VERSION_ARGS:
+            output = run([path] + VERSION_ARGS[tool])
+            version = output.splitlines()[0].strip() if output else None
+        tools[tool] = (path, _mtime(path), version)
+    encoders: List[str] = []
+    ffmpeg = tools["ffmpeg"][0]
+    if ffmpeg:
+        output = run([ffmpeg, "-hide_banner", "-encoders"])
+        encoders = parse_encoders(output) if output else []
+    libraries: List[str] = []
+    ytdlp = tools["yt-dlp"][0]
+    if ytdlp:
+        output = run([ytdlp] + DEBUG_ARGS, stderr=True)
+        libraries = parse_libraries(output) if output else []
+    return DependencyReport(path_env, tools, encoders, libraries)
+
+
+class DependencyCache:
+    """
+    The last dependency report, stored as JSON.
+
+    Args:
+        path: Cache file (CONFIG_DIR/dependencies.json by default)
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None) -> None:
+        self._path = Path(path) if path else None
+
+    @property
+    def path(self) -> Path:
+        return self._path or config.CONFIG_DIR / CACHE_FILENAME
+
+    def load(self) -> Optional[DependencyReport]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return DependencyReport.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"Ignoring dependency cache: {e}")
+            return None
+
+    def save(self, report: DependencyReport) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(report.to_dict(), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write dependency cache: {e}")
+
+
+def revalidate(
+    cache: DependencyCache,
+    cached: DependencyReport,
+    probe: Callable[[], DependencyReport] = probe_dependencies,
+) -> DependencyReport:
+    """Probe the tools again and update the cache."""
+    report = probe()
+    cache.save(report)
+    if not report.same_tools(cached):
+        logger.info("External tools changed since the last start")
+        for tool in report.missing_required:
+            logger.warning(f"{tool} is no longer found in PATH")
+    return report
+
+
+def check_dependencies(
+    cache: Optional[DependencyCache] = None,
+    probe: Callable[[], DependencyReport] = probe_dependencies,
+    background: bool = True,
+) -> DependencyReport:
+    """
+    Return the dependency report, from the cache when it is still current.
+
+    A cached report missing a required tool is never trusted, so a tool
+    installed since the last start is found. A cached report that is used
+    is checked again on a background thread when ``background`` is True.
+    """
+    cache = cache or DependencyCache()
+    path_env = os.environ.get("PATH", os.defpath)
+    cached = cache.load()
+    if cached is not None and not cached.missing_required and cached.is_current(path_env):
+        logger.debug("Using cached dependency report")
+        if background:
+            threading.Thread(
+                target=revalidate, args=(cache, cached, probe), name="dependency-check", daemon=True
+            ).start()
+        return cached
+    report = probe()
+    cache.save(report)
+    return report
+
+
+class StartupTimer:
+    """
+    Wall-clock time of each startup phase.
+
+    Each ``mark`` ends a phase that started at the previous mark, or when
+    the timer was created.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.started = clock()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+        self.deferred: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str) -> float:
+        """End a phase; returns its duration in seconds."""
+        now = self.clock()
+        duration = now - self._last
+        self._last = now
+        self.phases.append((phase, duration))
+        return duration
+
+    def measure_deferred(self, phase: str, func: Callable[[], Any]) -> float:
+        """Time work that startup no longer does; reported apart from the total."""
+        started = self.clock()
+        func()
+        duration = self.clock() - started
+        self.deferred.append((phase, duration))
+        return duration
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> str:
+        width = max([len(phase) for phase, _ in self.phases + self.deferred] + [len("total")])
+        lines = ["Startup timing:"]
+        for phase, duration in self.phases:
+            lines.append("  {:<{}}  {:8.1f} ms".format(phase, width, duration * 1000))
+        lines.append("  {:<{}}  {:8.1f} ms".format("total", width, self.total * 1000))
+        if self.deferred:
+            lines.append("Deferred until needed:")
+            for phase, duration in self.deferred:
+                lines.append("  {:<{}}  {:8.1f} ms".format(phase, width, duration * 1000))
+        return "\n".join(lines)
+
+
+# Started when the application imports this module, before GTK
+timer = StartupTimer()
+
+
+# Backend -> whether its yt-dlp can use mutagen, probed once per process
+_mutagen: Dict[bool, bool] = {}
+_mutagen_lock = threading.Lock()
+
+
+def has_mutagen(in_process: bool = False) -> bool:
+    """
+    True if yt-dlp can use mutagen, which it needs to embed covers into Opus files.
+
+    The in-process engine imports yt-dlp into this interpreter, so this
+    interpreter's packages count. The yt-dlp command counts its own;
+    standalone builds bundle mutagen. Its libraries come from the
+    dependency report, so they are probed again only when the binary changes.
+    """
+    with _mutagen_lock:
+        if in_process not in _mutagen:
+            if in_process:
+                _mutagen[in_process] = importlib.util.find_spec("mutagen") is not None
+            else:
+                _mutagen[in_process] = "mutagen" in check_dependencies(background=False).ytdlp_libraries
+        return _mutagen[in_process]
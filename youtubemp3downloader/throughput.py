@@ -0,0 +1,407 @@
+"""
+Adaptive download throughput for YouTube MP3 Downloader.
+
+No single setting for parallel downloads, ``--concurrent-fragments`` and
+``--http-chunk-size`` suits both a 20 Mbit office link and a 1 Gbit one.
+``ThroughputController`` measures the aggregate speed of the running
+downloads from the progress yt-dlp already reports and tunes those
+settings while a playlist downloads, in the additive-increase /
+multiplicative-decrease style of TCP congestion control:
+
+- every measurement window it probes one more worker or fragment and
+  keeps the step only if the aggregate speed rose noticeably;
+- throttling errors (HTTP 429, timeouts, resets) or a collapse of the
+  aggregate speed halve the settings.
+
+The best settings seen are kept per network in ``ThroughputStore`` so the
+next download on the same network starts from them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from . import config, events
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+THROUGHPUT_FILENAME = "throughput.json"
+
+# Seconds of progress averaged before the settings are reconsidered
+ADJUST_INTERVAL = 10.0
+
+# A speed report older than this no longer counts toward the aggregate
+SAMPLE_TTL = 5.0
+
+# An increase is kept only if the aggregate speed rose by this fraction
+GAIN_THRESHOLD = 0.05
+
+# The settings are halved if the aggregate speed fell by this fraction
+DROP_THRESHOLD = 0.4
+
+# Stable windows before probing for more throughput again
+PROBE_WINDOWS = 3
+
+# Windows to wait after a decrease before measuring again
+BACKOFF_WINDOWS = 2
+
+# A window counts only if this share of the workers was downloading; items
+# still being extracted and the tail of a playlist would skew it otherwise
+MIN_BUSY_SHARE = 0.75
+
+MAX_FRAGMENTS = 16
+
+# HTTP chunks are sized to this many seconds of a single download
+CHUNK_SECONDS = 4
+MIN_CHUNK_MB = 1
+MAX_CHUNK_MB = 64
+
+# Networks remembered in the store; the least recently updated are dropped
+MAX_NETWORKS = 32
+
+# yt-dlp errors that mean the server or the link is pushing back
+THROTTLE_MARKERS = (
+    "HTTP Error 429",
+    "Too Many Requests",
+    "timed out",
+    "Connection reset",
+    "IncompleteRead",
+)
+
+_WORKERS = "workers"
+_FRAGMENTS = "fragments"
+
+
+def network_id() -> str:
+    """
+    Identify the network this machine is on.
+
+    Uses the hardware address of the default gateway, which tells an office
+    LAN apart from a home link even when both hand out the same addresses.
+
+    Returns:
+        A short stable key, or "default" if the gateway is unknown
+    """
+    try:
+        gateway = None
+        with open("/proc/net/route", encoding="ascii") as f:
+            for line in f.readlines()[1:]:
+                fields = line.split()
+                if len(fields) > 2 and fields[1] == "00000000":
+                    address = int(fields[2], 16)
+                    gateway = ".".join(str((address >> shift) & 0xFF) for shift in (0, 8, 16, 24))
+                    break
+        if gateway is None:
+            return "default"
+        key = gateway
+        with open("/proc/net/arp", encoding="ascii") as f:
+            for line in f.readlines()[1:]:
+                fields = line.split()
+                if len(fields) > 3 and fields[0] == gateway:
+                    key = "{}/{}".format(gateway, fields[3])
+                    break
+    except (OSError, ValueError):
+        return "default"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class TuningProfile:
+    """Download settings and the aggregate speed they reached."""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        fragments: int = 1,
+        chunk_mb: Optional[int] = None,
+        throughput: float = 0.0,
+        updated_at: float = 0.0,
+    ) -> None:
+        self.workers = workers
+        self.fragments = fragments
+        self.chunk_mb = chunk_mb
+        self.throughput = throughput
+        self.updated_at = updated_at
+
+    def command_args(self) -> List[str]:
+        """yt-dlp command line arguments for the fragment settings."""
+        args = []
+        if self.fragments > 1:
+            args.extend(["--concurrent-fragments", str(self.fragments)])
+        if self.chunk_mb:
+            args.extend(["--http-chunk-size", "{}M".format(self.chunk_mb)])
+        return args
+
+    def ydl_options(self) -> Dict[str, Any]:
+        """yt_dlp.YoutubeDL options for the fragment settings."""
+        options: Dict[str, Any] = {"concurrent_fragment_downloads": self.fragments}
+        if self.chunk_mb:
+            options["http_chunk_size"] = self.chunk_mb * 1024 * 1024
+        return options
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "fragments": self.fragments,
+            "chunk_mb": self.chunk_mb,
+            "throughput": self.throughput,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TuningProfile:
+        chunk_mb = data.get("chunk_mb")
+        return cls(
+            workers=max(1, int(data.get("workers", 1))),
+            fragments=max(1, min(int(data.get("fragments", 1)), MAX_FRAGMENTS)),
+            chunk_mb=max(MIN_CHUNK_MB, min(int(chunk_mb), MAX_CHUNK_MB)) if chunk_mb else None,
+            throughput=float(data.get("throughput", 0.0)),
+            updated_at=float(data.get("updated_at", 0.0)),
+        )
+
+    def __repr__(self) -> str:
+        return "TuningProfile(workers={}, fragments={}, chunk_mb={}, throughput={:.0f})".format(
+            self.workers, self.fragments, self.chunk_mb, self.throughput
+        )
+
+
+class ThroughputStore:
+    """
+    Best download settings per network, kept in a JSON file.
+
+    Args:
+        path: Store file (CONFIG_DIR/throughput.json by default)
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None) -> None:
+        self._path = Path(path) if path else None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path or config.CONFIG_DIR / THROUGHPUT_FILENAME
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read throughput settings {self.path}: {e}")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {key: value for key, value in data.items() if isinstance(value, dict)}
+
+    def get(self, network: str) -> Optional[TuningProfile]:
+        """Return the settings learned on a network, if any."""
+        with self._lock:
+            data = self._load().get(network)
+        if data is None:
+            return None
+        try:
+            return TuningProfile.from_dict(data)
+        except (TypeError, ValueError):
+            return None
+
+    def put(self, network: str, profile: TuningProfile) -> None:
+        """Remember the settings for a network."""
+        with self._lock:
+            data = self._load()
+            profile.updated_at = time.time()
+            data[network] = profile.to_dict()
+            if len(data) > MAX_NETWORKS:
+                by_age = sorted(data, key=lambda key: data[key].get("updated_at", 0))
+                for key in by_age[:len(data) - MAX_NETWORKS]:
+                    del data[key]
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save throughput settings {self.path}: {e}")
+
+
+class ThroughputController:
+    """
+    Tune parallel workers and fragment settings from measured speed.
+
+    Thread-safe: every download worker reports its own progress. The
+    worker count is applied through ``on_workers_changed``; fragment and
+    chunk settings are read with ``current`` when an item starts.
+
+    Args:
+        max_workers: Upper bound for parallel downloads
+        profile: Settings to start from, usually learned on this network
+        on_workers_changed: Called with the new worker count
+        clock: Monotonic time source
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        profile: Optional[TuningProfile] = None,
+        on_workers_changed: Optional[Callable[[int], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        start = profile or TuningProfile()
+        self.max_workers = max(1, max_workers)
+        self.workers = max(1, min(start.workers, self.max_workers))
+        self.fragments = max(1, min(start.fragments, MAX_FRAGMENTS))
+        self.chunk_mb = start.chunk_mb
+        self.on_workers_changed = on_workers_changed
+        self.clock = clock
+        self.adjustments = 0
+        self._lock = threading.Lock()
+        self._speeds: Dict[Any, Tuple[float, float]] = {}
+        self._window_start = clock()
+        self._window_total = 0.0
+        self._window_busy = 0.0
+        self._window_item_speed = 0.0
+        self._window_samples = 0
+        self._throttled = False
+        self._reference = 0.0
+        self._probing: Optional[str] = None
+        self._next_dimension = _WORKERS
+        self._stable_windows = PROBE_WINDOWS
+        self._wait_windows = 0
+        self._best: Optional[TuningProfile] = None
+
+    def current(self) -> TuningProfile:
+        """The settings to use for the next item."""
+        with self._lock:
+            return TuningProfile(self.workers, self.fragments, self.chunk_mb)
+
+    def record(self, key: Any, speed_bps: float) -> None:
+        """
+        Record a speed reported by one download.
+
+        Args:
+            key: Identifies the download, e.g. the playlist index
+            speed_bps: Its current speed in bytes per second
+        """
+        with self._lock:
+            now = self.clock()
+            self._speeds[key] = (speed_bps, now)
+            fresh = [speed for speed, seen in self._speeds.values() if now - seen <= SAMPLE_TTL]
+            self._window_total += sum(fresh)
+            self._window_busy += len(fresh)
+            self._window_item_speed += sum(fresh) / len(fresh)
+            self._window_samples += 1
+            workers = self._tick(now)
+        if workers is not None and self.on_workers_changed is not None:
+            self.on_workers_changed(workers)
+
+    def item_finished(self, key: Any) -> None:
+        """Stop counting a download that ended."""
+        with self._lock:
+            self._speeds.pop(key, None)
+
+    def record_error(self, message: str) -> None:
+        """Note a download error; throttling errors trigger a decrease."""
+        if any(marker in message for marker in THROTTLE_MARKERS):
+            with self._lock:
+                self._throttled = True
+
+    def _tick(self, now: float) -> Optional[int]:
+        """Close the measurement window if it is over; returns a new worker count."""
+        if now - self._window_start < ADJUST_INTERVAL or not self._window_samples:
+            return None
+        throughput = self._window_total / self._window_samples
+        busy = self._window_busy / self._window_samples
+        item_speed = self._window_item_speed / self._window_samples
+        self._window_start = now
+        self._window_total = self._window_busy = self._window_item_speed = 0.0
+        self._window_samples = 0
+
+        workers_before = self.workers
+        self._adjust(throughput, busy >= self.workers * MIN_BUSY_SHARE)
+        if item_speed > 0:
+            chunk_mb = int(item_speed * CHUNK_SECONDS / (1024 * 1024)) + 1
+            self.chunk_mb = max(MIN_CHUNK_MB, min(chunk_mb, MAX_CHUNK_MB))
+        return self.workers if self.workers != workers_before else None
+
+    def _adjust(self, throughput: float, saturated: bool) -> None:
+        if self._throttled:
+            self._throttled = False
+            self._decrease("throttled")
+            return
+        if self._wait_windows:
+            self._wait_windows -= 1
+            return
+        if not saturated:
+            return
+
+        if self._best is None or throughput > self._best.throughput:
+            self._best = TuningProfile(self.workers, self.fragments, self.chunk_mb, throughput)
+
+        if self._probing is not None:
+            if throughput >= self._reference * (1 + GAIN_THRESHOLD):
+                logger.debug(f"More {self._probing} raised throughput to {events.format_speed(throughput)}")
+                self._reference = throughput
+                self._probe()
+            else:
+                # The step did not pay off: take it back and hold for a while
+                if self._probing == _WORKERS:
+                    self.workers -= 1
+                else:
+                    self.fragments -= 1
+                self._probing = None
+                self._stable_windows = 0
+                self.adjustments += 1
+            return
+
+        if self._reference and throughput < self._reference * (1 - DROP_THRESHOLD):
+            self._decrease("throughput dropped to {}".format(events.format_speed(throughput)))
+            return
+        self._reference = throughput
+        self._stable_windows += 1
+        if self._stable_windows >= PROBE_WINDOWS:
+            self._probe()
+
+    def _probe(self) -> None:
+        """Add one worker or fragment, alternating between the two."""
+        can_add_worker = self.workers < self.max_workers
+        can_add_fragment = self.fragments < MAX_FRAGMENTS
+        if not (can_add_worker or can_add_fragment):
+            self._probing = None
+            return
+        if can_add_worker and (self._next_dimension == _WORKERS or not can_add_fragment):
+            self.workers += 1
+            self._probing = _WORKERS
+            self._next_dimension = _FRAGMENTS
+            # The new worker spends its first seconds extracting, not downloading
+            self._wait_windows = 1
+        else:
+            self.fragments += 1
+            self._probing = _FRAGMENTS
+            self._next_dimension = _WORKERS
+        self._stable_windows = 0
+        self.adjustments += 1
+
+    def _decrease(self, reason: str) -> None:
+        self.workers = max(1, self.workers // 2)
+        self.fragments = max(1, self.fragments // 2)
+        self._probing = None
+        self._reference = 0.0
+        self._stable_windows = 0
+        self._wait_windows = BACKOFF_WINDOWS
+        self.adjustments += 1
+        logger.info(f"Backing off to {self.workers} worker(s), {self.fragments} fragment(s): {reason}")
+
+    def best_profile(self) -> Optional[TuningProfile]:
+        """The settings that reached the highest aggregate speed, if measured."""
+        with self._lock:
+            if self._best is None:
+                return None
+            best = self._best
+            return TuningProfile(best.workers, best.fragments, self.chunk_mb or best.chunk_mb, best.throughput)
@@ -0,0 +1,480 @@
+"""
+Shared thumbnail store for YouTube MP3 Downloader.
+
+yt-dlp downloads and converts the cover of every video it embeds, on
+every run. ``ThumbnailStore`` keeps each cover once, as a JPEG sized for
+embedding, so re-downloads, conversions and the playlist preview reuse
+it instead of fetching it again.
+
+Covers are stored by the SHA-256 of their JPEG data, so videos sharing a
+cover share one file. A SQLite index under the configuration directory
+maps video IDs to covers. Once the covers take more than ``max_bytes``
+the least recently used ones are evicted.
+
+The store is an optimization only: errors are logged and treated as
+misses.
+
+``ThumbnailLoader`` loads covers for the playlist preview: only the rows
+in view are requested, a few worker threads fetch and decode them, and
+the decoded images are kept in a small ``LRUCache``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
+
+from . import config
+from .exceptions import DownloadError
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+THUMBNAILS_DIR = "thumbnails"
+INDEX_FILENAME = "index.sqlite3"
+
+# Upper bound for the size of all stored covers
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# Longest side of a stored cover; larger images only bloat the audio files
+EMBED_SIZE = 600
+
+# Seconds a cover download or conversion may take
+FETCH_TIMEOUT = 15
+CONVERT_TIMEOUT = 30
+
+# Decoded covers kept by the preview, and threads fetching them
+DEFAULT_CACHE_SIZE = 200
+DEFAULT_LOADER_WORKERS = 4
+
+# YouTube's cover images, best first; every video has the "hq" one
+THUMBNAIL_URLS = (
+    "https://i.ytimg.com/vi/{}/hqdefault.jpg",
+    "https://i.ytimg.com/vi/{}/mqdefault.jpg",
+)
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_by_digest ON videos (digest);
+"""
+
+# Writes a JPEG version of an image file to a destination path
+Converter = Callable[[str, str], None]
+
+# Returns the body of a URL
+Fetcher = Callable[[str], bytes]
+
+
+def thumbnail_urls(video_id: str) -> List[str]:
+    """Cover image URLs of a video, best first."""
+    return [url.format(video_id) for url in THUMBNAIL_URLS]
+
+
+def store_from_settings(settings: Dict[str, Any]) -> Optional[ThumbnailStore]:
+    """
+    Create the store sized by the ``thumbnail_store_mb`` setting.
+
+    Returns:
+        The store, or None when the setting is 0
+    """
+    try:
+        megabytes = int(settings.get("thumbnail_store_mb", DEFAULT_MAX_BYTES // (1024 * 1024)))
+    except (TypeError, ValueError):
+        logger.warning("Ignoring invalid thumbnail_store_mb setting")
+        megabytes = DEFAULT_MAX_BYTES // (1024 * 1024)
+    if megabytes <= 0:
+        return None
+    return ThumbnailStore(max_bytes=megabytes * 1024 * 1024)
+
+
+def convert_to_jpeg(source: str, destination: str) -> None:
+    """
+    Convert an image to a JPEG no larger than ``EMBED_SIZE`` with ffmpeg.
+
+    JPEG files are copied as they are when ffmpeg is not available.
+
+    Raises:
+        DownloadError: If the image could not be converted
+    """
+    scale = "scale='min({0},iw)':'min({0},ih)':force_original_aspect_ratio=decrease".format(EMBED_SIZE)
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+        "-i", source, "-vf", scale, "-frames:v", "1", "-q:v", "3", "-f", "mjpeg", destination,
+    ]
+    try:
+        result = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True, timeout=CONVERT_TIMEOUT,
+        )
+        if result.returncode == 0 and os.path.isfile(destination):
+            return
+        error = result.stdout.strip() or "ffmpeg exited with code {}".format(result.returncode)
+    except (OSError, subprocess.SubprocessError) as e:
+        error = str(e)
+    with open(source, "rb") as f:
+        is_jpeg = f.read(len(_JPEG_MAGIC)) == _JPEG_MAGIC
+    if not is_jpeg:
+        raise DownloadError(f"Could not convert {source} to JPEG: {error}")
+    shutil.copyfile(source, destination)
+
+
+def fetch_url(url: str) -> bytes:
+    """Download a cover image."""
+    request = urllib.request.Request(url, headers={"User-Agent": "youtube-mp3-downloader"})
+    with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+        data: bytes = response.read()
+        return data
+
+
+class ThumbnailStore:
+    """
+    Covers shared by every download, keyed by video ID and content hash.
+
+    A new database connection is opened for every operation, so one
+    instance can be shared between download workers and the UI thread.
+
+    Args:
+        directory: Where covers are kept (CONFIG_DIR/thumbnails by default)
+        max_bytes: Size of all covers above which the least recently used
+            ones are evicted
+        converter: Turns a downloaded image into the stored JPEG
+        fetcher: Downloads a cover URL
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        converter: Converter = convert_to_jpeg,
+        fetcher: Fetcher = fetch_url,
+    ) -> None:
+        self._directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self.converter = converter
+        self.fetcher = fetcher
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._fetching: Dict[str, threading.Lock] = {}
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or config.CONFIG_DIR / THUMBNAILS_DIR
+
+    def cover_path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / "{}.jpg".format(digest)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.directory / INDEX_FILENAME), timeout=5)
+        if not self._initialized:
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def get(self, video_id: str) -> Optional[str]:
+        """
+        Look up the cover of a video.
+
+        Returns:
+            Path of the stored JPEG, or None on a miss
+        """
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    row = conn.execute("SELECT digest FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+                    if row is None:
+                        return None
+                    path = self.cover_path(row[0])
+                    if not path.is_file():
+                        conn.execute("DELETE FROM videos WHERE digest = ?", (row[0],))
+                        conn.execute("DELETE FROM covers WHERE digest = ?", (row[0],))
+                        return None
+                    conn.execute("UPDATE covers SET last_used = ? WHERE digest = ?", (time.time(), row[0]))
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Thumbnail store lookup failed: {e}")
+            return None
+        return str(path)
+
+    def add_file(self, video_id: str, source: str) -> Optional[str]:
+        """
+        Store an image as the cover of a video.
+
+        The image is converted to a JPEG sized for embedding; the source
+        file is left in place.
+
+        Returns:
+            Path of the stored JPEG, or None if it could not be stored
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, converted = tempfile.mkstemp(prefix=".cover.", suffix=".jpg", dir=self.directory)
+            os.close(fd)
+            try:
+                self.converter(source, converted)
+                digest = hashlib.sha256(Path(converted).read_bytes()).hexdigest()
+                size = os.path.getsize(converted)
+                path = self.cover_path(digest)
+                if not path.is_file():
+                    path.parent.mkdir(exist_ok=True)
+                    os.replace(converted, path)
+            finally:
+                if os.path.exists(converted):
+                    os.remove(converted)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO covers (digest, size, last_used) VALUES (?, ?, ?)",
+                        (digest, size, time.time()),
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO videos (video_id, digest) VALUES (?, ?)", (video_id, digest)
+                    )
+                    self._evict(conn, keep=digest)
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError, DownloadError) as e:
+            logger.warning(f"Could not store the thumbnail of {video_id}: {e}")
+            return None
+        logger.debug(f"Stored thumbnail of {video_id} as {digest[:12]}")
+        return str(path)
+
+    def add_bytes(self, video_id: str, data: bytes) -> Optional[str]:
+        """Store downloaded image data as the cover of a video."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, raw = tempfile.mkstemp(prefix=".download.", dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning(f"Could not store the thumbnail of {video_id}: {e}")
+            return None
+        try:
+            return self.add_file(video_id, raw)
+        finally:
+            os.remove(raw)
+
+    def fetch(self, video_id: str, urls: Optional[Sequence[str]] = None) -> Optional[str]:
+        """
+        Return the cover of a video, downloading it once if it is not stored.
+
+        Callers asking for the same video at the same time wait for a
+        single download.
+
+        Args:
+            video_id: YouTube video ID
+            urls: Image URLs to try in order (YouTube's covers by default)
+
+        Returns:
+            Path of the stored JPEG, or None if no URL could be fetched
+        """
+        with self._lock:
+            video_lock = self._fetching.setdefault(video_id, threading.Lock())
+        try:
+            with video_lock:
+                path = self.get(video_id)
+                if path is not None:
+                    return path
+                for url in urls or thumbnail_urls(video_id):
+                    try:
+                        data = self.fetcher(url)
+                    except Exception as e:
+                        logger.debug(f"Could not fetch thumbnail {url}: {e}")
+                        continue
+                    if data:
+                        return self.add_bytes(video_id, data)
+                return None
+        finally:
+            with self._lock:
+                self._fetching.pop(video_id, None)
+
+    def total_bytes(self) -> int:
+        """Size of all stored covers."""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM covers").fetchone()
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Thumbnail store lookup failed: {e}")
+            return 0
+        return int(row[0])
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM covers").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = conn.execute(
+            "SELECT digest, size FROM covers WHERE digest != ? ORDER BY last_used", (keep,)
+        ).fetchall()
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM videos WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM covers WHERE digest = ?", (digest,))
+            try:
+                self.cover_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        logger.debug(f"Evicted {evicted} thumbnail(s) from the store")
+
+
+class LRUCache:
+    """Thread-safe mapping keeping the ``capacity`` most recently used items."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self._items: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class ThumbnailLoader:
+    """
+    Loads the covers of the rows in view, a few at a time.
+
+    Every ``request`` replaces the previous one, so covers of rows scrolled
+    past before a worker got to them are never fetched. Covers are fetched
+    through the store, decoded on the worker thread and delivered with
+    ``post``, e.g. GLib.idle_add, so ``on_loaded`` runs on the UI thread.
+    A cover that could not be loaded is not requested again.
+
+    Args:
+        store: Where covers are fetched and kept
+        decode: Turns a stored JPEG into the image shown
+        on_loaded: Called with (video_id, image) once a cover is decoded
+        post: Schedules a call with its arguments on the UI thread
+        workers: Number of fetch threads
+        cache_size: Number of decoded images kept
+        urls: Cover URLs of a video
+    """
+
+    def __init__(
+        self,
+        store: ThumbnailStore,
+        decode: Callable[[str], Any],
+        on_loaded: Callable[[str, Any], Any],
+        post: Callable[..., Any],
+        workers: int = DEFAULT_LOADER_WORKERS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        urls: Callable[[str], List[str]] = thumbnail_urls,
+    ) -> None:
+        self.store = store
+        self.decode = decode
+        self.on_loaded = on_loaded
+        self.post = post
+        self.workers = max(1, workers)
+        self.cache = LRUCache(cache_size)
+        self.urls = urls
+        self._cond = threading.Condition()
+        self._wanted: List[str] = []
+        self._loading: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def get(self, video_id: str) -> Optional[Any]:
+        """The decoded cover of a video, if it is cached."""
+        return self.cache.get(video_id)
+
+    def request(self, video_ids: Sequence[str]) -> None:
+        """Load these covers, first ones first, dropping earlier requests not started yet."""
+        with self._cond:
+            if self._closed:
+                return
+            self._wanted = [
+                video_id for video_id in dict.fromkeys(video_ids)
+                if video_id not in self._loading and video_id not in self._failed and video_id not in self.cache
+            ]
+            while len(self._threads) < min(self.workers, len(self._wanted) + len(self._loading)):
+                thread = threading.Thread(target=self._work, name="thumbnail-loader", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Stop loading; covers being fetched are dropped."""
+        with self._cond:
+            self._closed = True
+            self._wanted = []
+            self._cond.notify_all()
+        self.cache.clear()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._wanted and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                video_id = self._wanted.pop(0)
+                self._loading.add(video_id)
+            image = None
+            try:
+                path = self.store.fetch(video_id, self.urls(video_id))
+                if path is not None:
+                    image = self.decode(path)
+            except Exception as e:
+                logger.debug(f"Could not load the thumbnail of {video_id}: {e}")
+            with self._cond:
+                self._loading.discard(video_id)
+                if self._closed:
+                    return
+                if image is None:
+                    self._failed.add(video_id)
+                    continue
+                self.cache.put(video_id, image)
+            self.post(self.on_loaded, video_id, image)
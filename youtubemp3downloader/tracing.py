@@ -0,0 +1,373 @@
+"""
+Per-job tracing for YouTube MP3 Downloader.
+
+A ``Tracer`` records where a job spent its time as spans with monotonic
+timestamps: the stages of the job (playlist metadata, skipping known
+videos, downloading, the summary, cleanup) and the phases of every item
+(extraction, network download, conversion, cover embedding). When the
+job ends the spans are written as Chrome trace JSON, which Perfetto
+(https://ui.perfetto.dev) and chrome://tracing open directly. Each thread
+gets its own track, so parallel workers and encoders show side by side.
+
+Optionally the progress parser is run under cProfile and its statistics
+are saved next to the trace, for ``python -m pstats`` or snakeviz.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
+
+from . import config
+from . import events
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+TRACES_DIR = "traces"
+
+# Oldest traces are deleted beyond this many files
+MAX_TRACES = 50
+
+# Only one profiler can run in a process (sys.monitoring allows one profiler
+# tool since Python 3.12), so the profilers of all tracers take turns
+_profile_lock = threading.Lock()
+_profiling = threading.local()
+
+# Span categories
+JOB = "job"
+STAGE = "stage"
+ITEM = "item"
+
+# Item phases
+EXTRACT = "extract"
+DOWNLOAD = "download"
+CONVERT = "convert"
+EMBED = "embed"
+CLEANUP = "cleanup"
+
+# yt-dlp output lines that start a phase of the current item
+_PHASE_PREFIXES = (
+    ("[ExtractAudio]", CONVERT),
+    ("[EmbedThumbnail]", EMBED),
+    ("[Metadata]", EMBED),
+    ("Deleting original file", CLEANUP),
+)
+
+
+def phase_for(event: events.DownloadEvent) -> Optional[str]:
+    """Item phase a download event starts, if any."""
+    if isinstance(event, (events.Destination, events.Progress)):
+        return DOWNLOAD
+    if isinstance(event, events.LogLine):
+        for prefix, phase in _PHASE_PREFIXES:
+            if event.text.startswith(prefix):
+                return phase
+    return None
+
+
+def next_phase(current: Optional[str], event: events.DownloadEvent) -> Optional[str]:
+    """
+    Phase an item moves to with a download event.
+
+    Returns:
+        The new phase, or None if the item stays in ``current``
+    """
+    phase = phase_for(event)
+    if phase is None or phase == current:
+        return None
+    # Late progress records must not take a converted item back to downloading
+    if phase == DOWNLOAD and current not in (None, EXTRACT):
+        return None
+    return phase
+
+
+def default_trace_dir() -> Path:
+    return config.CONFIG_DIR / TRACES_DIR
+
+
+def trace_dir_from_settings(settings: Dict[str, Any]) -> Optional[str]:
+    """
+    Read the ``trace_jobs`` and ``trace_dir`` settings.
+
+    Returns:
+        Folder for the traces of every job, or None if tracing is off
+    """
+    if not settings.get("trace_jobs", False):
+        return None
+    return str(settings.get("trace_dir") or default_trace_dir())
+
+
+class Span:
+    """
+    A timed section, recorded when it ends.
+
+    Use it as a context manager or call ``end``. A span without a tracer
+    records nothing, so callers need not check whether tracing is on.
+    """
+
+    __slots__ = ("tracer", "name", "cat", "args", "start", "tid")
+
+    def __init__(self, tracer: Optional[Tracer], name: str, cat: str = STAGE, **args: Any) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = tracer.clock() if tracer is not None else 0.0
+        self.tid = threading.get_ident()
+
+    def end(self, **args: Any) -> None:
+        """Record the span; later calls do nothing."""
+        tracer = self.tracer
+        if tracer is None:
+            return
+        self.tracer = None
+        self.args.update(args)
+        tracer.add(self.name, self.cat, self.start, tracer.clock(), self.args, self.tid)
+
+    def __enter__(self) -> Span:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            self.end(error=exc_type.__name__)
+        else:
+            self.end()
+
+
+def span(tracer: Optional[Tracer], name: str, cat: str = STAGE, **args: Any) -> Span:
+    """Start a span on ``tracer``, or a span recording nothing if it is None."""
+    return Span(tracer, name, cat, **args)
+
+
+class ItemTrace:
+    """
+    The consecutive phases of one item.
+
+    Each phase ends when the next one starts; ``close`` ends the last
+    phase and records a span for the whole item around them.
+    """
+
+    def __init__(self, tracer: Tracer, label: str, **args: Any) -> None:
+        self.tracer = tracer
+        self.label = label
+        self.args = args
+        self.item = Span(tracer, label, ITEM, **args)
+        self.phase: Optional[Span] = None
+
+    @property
+    def current(self) -> Optional[str]:
+        return self.phase.name if self.phase is not None else None
+
+    def enter(self, phase: str) -> None:
+        """Start a phase unless it is the current one."""
+        if phase == self.current:
+            return
+        if self.phase is not None:
+            self.phase.end()
+        self.phase = Span(self.tracer, phase, ITEM, item=self.label)
+
+    def on_event(self, event: events.DownloadEvent) -> None:
+        """Follow the phases announced by the item's download events."""
+        phase = next_phase(self.current, event)
+        if phase is not None:
+            self.enter(phase)
+
+    def close(self, outcome: str) -> None:
+        if self.phase is not None:
+            self.phase.end()
+            self.phase = None
+        self.item.end(outcome=outcome)
+
+
+class Tracer:
+    """
+    Spans of one job, exported as Chrome trace JSON.
+
+    Thread-safe: spans can be recorded from every worker of the job.
+
+    Args:
+        name: Shown as the process name in the trace viewer
+        path: Trace file written by ``save``
+        profile_parser: Run the progress parser under cProfile
+        clock: Monotonic time source in seconds
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        path: Optional[Union[str, Path]] = None,
+        profile_parser: bool = False,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.name = name
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.epoch = clock()
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self.profiler = cProfile.Profile() if profile_parser else None
+        self._profiled = False
+
+    @classmethod
+    def for_job(cls, trace_dir: Union[str, Path], label: str, profile_parser: bool = False) -> Tracer:
+        """A tracer saving to a new file in ``trace_dir`` named after the job."""
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "-", label).strip("-")[-40:] or "job"
+        return cls(label, Path(trace_dir) / "{}-{}.json".format(time.strftime("%Y%m%d-%H%M%S"), slug),
+                   profile_parser)
+
+    def _micros(self, moment: float) -> float:
+        return round((moment - self.epoch) * 1e6, 3)
+
+    def add(
+        self,
+        name: str,
+        cat: str,
+        start: float,
+        end: float,
+        args: Optional[Dict[str, Any]] = None,
+        tid: Optional[int] = None,
+    ) -> None:
+        """Record a finished span; times come from ``clock``."""
+        tid = tid if tid is not None else threading.get_ident()
+        event = {
+            "name": name, "cat": cat, "ph": "X", "ts": self._micros(start),
+            "dur": round(max(end - start, 0.0) * 1e6, 3), "tid": tid,
+        }
+        if args:
+            event["args"] = {key: value for key, value in args.items() if value is not None}
+        with self._lock:
+            self._events.append(event)
+            if tid not in self._threads:
+                self._threads[tid] = self._thread_name(tid)
+
+    def instant(self, name: str, cat: str = STAGE, **args: Any) -> None:
+        """Record a moment, e.g. a stop request."""
+        tid = threading.get_ident()
+        event = {"name": name, "cat": cat, "ph": "i", "s": "t", "ts": self._micros(self.clock()), "tid": tid}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            if tid not in self._threads:
+                self._threads[tid] = self._thread_name(tid)
+
+    @staticmethod
+    def _thread_name(tid: int) -> str:
+        for thread in threading.enumerate():
+            if thread.ident == tid:
+                return thread.name
+        return str(tid)
+
+    def item(self, label: str, **args: Any) -> ItemTrace:
+        return ItemTrace(self, label, **args)
+
+    def profile(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Call ``func`` under the profiler when parser profiling is on.
+
+        Calls from parallel workers and concurrent jobs take turns, because
+        only one profiler can be active at a time. Calls made while another
+        profiler is active (a nested call, or the whole application being
+        profiled) run without profiling.
+        """
+        if self.profiler is None or getattr(_profiling, "active", False):
+            return func(*args)
+        with _profile_lock:
+            if _profiler_active():
+                return func(*args)
+            self._profiled = True
+            _profiling.active = True
+            try:
+                result: T = self.profiler.runcall(func, *args)
+            finally:
+                _profiling.active = False
+        return result
+
+    @property
+    def spans(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """The trace in the Chrome trace event format."""
+        pid = os.getpid()
+        with self._lock:
+            trace_events = [dict(event, pid=pid) for event in self._events]
+            threads = dict(self._threads)
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.name or "job"}}]
+        for tid, name in threads.items():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        return {"traceEvents": metadata + trace_events, "displayTimeUnit": "ms"}
+
+    @property
+    def profile_path(self) -> Optional[Path]:
+        return self.path.with_suffix(".prof") if self.path is not None else None
+
+    def save(self) -> Optional[Path]:
+        """
+        Write the trace, and the parser profile if any, then prune old traces.
+
+        Returns:
+            The trace file, or None if it could not be written
+        """
+        if self.path is None:
+            return None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_chrome(), f)
+            os.replace(tmp_path, self.path)
+            if self.profiler is not None and self._profiled:
+                with _profile_lock:
+                    self.profiler.dump_stats(str(self.profile_path))
+        except OSError as e:
+            logger.warning(f"Could not write trace {self.path}: {e}")
+            return None
+        logger.info(f"Trace saved to {self.path}")
+        prune(self.path.parent)
+        return self.path
+
+
+def _profiler_active() -> bool:
+    """True if a profiler outside this module is running."""
+    monitoring = getattr(sys, "monitoring", None)
+    if monitoring is not None:
+        return monitoring.get_tool(monitoring.PROFILER_ID) is not None
+    return sys.getprofile() is not None
+
+
+def prune(directory: Union[str, Path], keep: int = MAX_TRACES) -> int:
+    """
+    Delete the oldest traces beyond ``keep`` and their profiles.
+
+    Returns:
+        Number of traces deleted
+    """
+    try:
+        traces = sorted(Path(directory).glob("*.json"), key=lambda path: path.stat().st_mtime)
+    except OSError as e:
+        logger.debug(f"Could not list traces in {directory}: {e}")
+        return 0
+    deleted = 0
+    for path in traces[:max(len(traces) - keep, 0)]:
+        for candidate in (path, path.with_suffix(".prof")):
+            try:
+                candidate.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"Could not delete old trace {candidate}: {e}")
+        deleted += 1
+    return deleted
@@ -0,0 +1,83 @@
+"""
+Coalescing bridge between download threads and the GTK main loop.
+
+Worker threads never schedule UI callbacks themselves. They append log
+lines to a queue and overwrite a single "latest progress" slot; the window
+drains both from one periodic GLib timeout, so a burst of yt-dlp output
+costs one buffer insert and one progress bar update per frame instead of
+several main-loop callbacks per line. Consecutive progress lines are
+collapsed while queued, so a hidden window does not pile them up.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from .logbuffer import MAX_MAX_LINES, LogEntry
+
+# Rate at which the window drains pending updates
+UPDATE_HZ = 15
+UPDATE_INTERVAL_MS = 1000 // UPDATE_HZ
+
+
+class UIUpdateBridge:
+    """Thread-safe store of UI updates waiting for the main loop."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Lines beyond the largest log cap would be evicted right away
+        self._lines: Deque[LogEntry] = deque(maxlen=MAX_MAX_LINES)
+        self._fraction: Optional[float] = None
+        self._text: Optional[str] = None
+
+    def log(self, text: str, progress: bool = False) -> None:
+        """
+        Queue a line for the log area.
+
+        Args:
+            text: Line to show
+            progress: True for a progress-only line that the next progress
+                line may replace
+        """
+        with self._lock:
+            if progress and self._lines and self._lines[-1][1]:
+                self._lines[-1] = (text, True)
+            else:
+                self._lines.append((text, progress))
+
+    def progress(self, fraction: Optional[float] = None, text: Optional[str] = None) -> None:
+        """
+        Record the latest progress state, replacing any value not yet shown.
+
+        Args:
+            fraction: Progress bar fraction (0.0 - 1.0), or None to keep it
+            text: Progress bar text, or None to keep it
+        """
+        with self._lock:
+            if fraction is not None:
+                self._fraction = min(1.0, max(0.0, fraction))
+            if text is not None:
+                self._text = text
+
+    def has_pending(self) -> bool:
+        """Return True if anything is waiting to be drained."""
+        with self._lock:
+            return bool(self._lines) or self._fraction is not None or self._text is not None
+
+    def drain(self) -> Tuple[List[LogEntry], Optional[float], Optional[str]]:
+        """
+        Take everything queued since the last drain.
+
+        Returns:
+            Tuple of (log_entries, fraction, text); fraction and text are None
+            when they did not change
+        """
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            fraction, text = self._fraction, self._text
+            self._fraction = None
+            self._text = None
+        return lines, fraction, text
@@ -1,5 +1,7 @@
+import hashlib
+import os
 import re
-from typing import Optional, Tuple
+from typing import Iterable, List, Optional, Set, Tuple
 
 from .exceptions import ValidationError
 from .logger import get_logger
@@ -52,3 +54,77 @@ def classify_youtube_url(url: str) -> Tuple[Optional[str], Optional[re.Match]]:
 
     logger.debug(f"URL not recognized as valid YouTube URL: {cleaned_url}")
     return None, None
+
+
+def parse_playlist_items(spec: str) -> List[int]:
+    """
+    Expand a yt-dlp ``--playlist-items`` specification into indices.
+
+    Args:
+        spec: Comma separated indices and ranges, e.g. "1,3-5,9"
+
+    Returns:
+        Sorted list of unique 1-based indices
+
+    Raises:
+        ValidationError: If the specification is malformed
+    """
+    indices: Set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start_str, end_str = part.split("-", 1)
+                start, end = int(start_str), int(end_str)
+                if start < 1 or end < start:
+                    raise ValueError(part)
+                indices.update(range(start, end + 1))
+            else:
+                index = int(part)
+                if index < 1:
+                    raise ValueError(part)
+                indices.add(index)
+        except ValueError:
+            logger.warning(f"Invalid playlist items specification: {spec}")
+            raise ValidationError(f"Invalid playlist item: {part}")
+    return sorted(indices)
+
+
+def compress_ranges(indices: Iterable[int]) -> str:
+    """
+    Compress indices into a ``--playlist-items`` specification.
+
+    Args:
+        indices: 1-based indices in any order; duplicates are ignored
+
+    Returns:
+        Comma separated indices and ranges, e.g. "1-499,501-5000"
+    """
+    parts: List[str] = []
+    start = end = None
+    for index in sorted(set(indices)):
+        if end is not None and index == end + 1:
+            end = index
+            continue
+        if start is not None:
+            parts.append(str(start) if start == end else "{}-{}".format(start, end))
+        start = end = index
+    if start is not None:
+        parts.append(str(start) if start == end else "{}-{}".format(start, end))
+    return ",".join(parts)
+
+
+def path_digest(path: str) -> str:
+    """
+    Return a short stable key for a folder, used to name per-folder state files.
+
+    Args:
+        path: Folder path; trailing separators and relative forms are normalized
+
+    Returns:
+        16 hexadecimal characters
+    """
+    normalized = os.path.normpath(os.path.abspath(path))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]